@@ -2,17 +2,25 @@
 
 import os
 import re
-import time
 import json
-from typing import List, Dict, Any, Union
+import time
+import hashlib
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
 
-import requests
-from bs4 import BeautifulSoup
 import google.generativeai as genai
-from tavily import TavilyClient
 from google.adk.agents import Agent
 from dotenv import load_dotenv
 
+from core_logic.async_scraper import get_async_scraper
+from core_logic.cache_paths import cache_path
+from core_logic.domain_index import dedupe_by_domain, registrable_domain
+from core_logic.lead_prefilter import LEAD_PREFILTER_ENABLED, LeadPrefilter
+from core_logic.query_fanout import build_widening_query
+from core_logic.rate_limiter import get_rate_limiter
+from core_logic.tavily_client import get_tavily_client
+
 # Carrega variáveis de ambiente do arquivo .env
 load_dotenv()
 
@@ -20,6 +28,23 @@ load_dotenv()
 DELAY_BETWEEN_GEMINI_CALLS_SECONDS = 5  # Atraso para respeitar limites de taxa da API Gemini
 MAX_GEMINI_INPUT_CHARS = 50000          # Limite de caracteres para input no Gemini para evitar estouro de tokens
 MAX_SCRAPE_RESULTS = 5                  # Número máximo de resultados de busca do Tavily a serem raspados pelas ferramentas
+MAX_MERGED_SUBPAGES = 2                 # Subpáginas da mesma empresa (ex.: /contato) cujo texto é anexado ao lead
+BULK_ANALYSIS_WORKERS = int(os.getenv("BULK_ANALYSIS_WORKERS", "4"))  # Análises Gemini simultâneas no modo em lote (sujeitas ao limitador)
+# Agendador por cota de iter_structured_leads: candidatos buscados por lead pedido, extrações simultâneas,
+# candidatos extras em andamento além dos que faltam para a cota e rodadas de busca ampliada se o rendimento for baixo
+LEAD_OVERFETCH_FACTOR = int(os.getenv("LEAD_OVERFETCH_FACTOR", "3"))
+LEAD_EXTRACTION_WORKERS = int(os.getenv("LEAD_EXTRACTION_WORKERS", "4"))
+LEAD_SCHEDULER_LOOKAHEAD = int(os.getenv("LEAD_SCHEDULER_LOOKAHEAD", "2"))
+LEAD_WIDEN_ROUNDS = int(os.getenv("LEAD_WIDEN_ROUNDS", "1"))
+TAVILY_MAX_RESULTS_CAP = 20  # Limite de resultados por busca da API Tavily
+# Caminho absoluto (relativo ao projeto) para que o lote possa ser retomado de qualquer diretório de trabalho
+URL_BATCH_CHECKPOINT_DIR = os.path.abspath(os.getenv("URL_BATCH_CHECKPOINT_DIR", cache_path("url_batches")))
+DEFAULT_LEAD_ANALYSIS_INSTRUCTION = "Analise este conteúdo para identificar e extrair informações de leads como nome da empresa, site, e-mails de contato e números de telefone. Apresente como um objeto JSON com os campos: company_name, website, contact_emails (lista), contact_phones (lista), industry, description, size. Se uma informação não for encontrada, use null."
+
+# Limitador compartilhado: garante o intervalo mínimo entre chamadas ao Gemini sem dormir após cada raspagem
+_gemini_rate_limiter = get_rate_limiter("gemini", DELAY_BETWEEN_GEMINI_CALLS_SECONDS)
+# Pré-filtro barato: descarta notícias, vagas, marketplaces etc. antes de gastar uma chamada ao Gemini
+_lead_prefilter = LeadPrefilter()
 
 
 # --- Funções Auxiliares (Reutilizadas e Adaptadas) ---
@@ -35,53 +60,102 @@ def web_scraper(url: str) -> dict:
         Um dicionário contendo:
         - "title": O título da página web.
         - "url": A URL original.
-        - "content": O conteúdo textual limpo da página web.
+        - "content": O conteúdo principal da página (sem menus, rodapés e banners), seguido da seção de contatos.
+        - "main_content": Apenas o conteúdo principal.
+        - "contact_info": Apenas a seção de contatos (e-mails, telefones, endereços do rodapé).
         - "error": Uma mensagem de erro se a busca ou o parsing falhar.
     """
-    try:
-        # Limpa a URL de caracteres indesejados
-        cleaned_url = url.strip().replace('\t', '').replace('\n', '').replace('\r', '')
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(cleaned_url, headers=headers, timeout=10)
-        response.raise_for_status()  # Levanta uma exceção para códigos de status HTTP de erro
-
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        title = soup.title.string if soup.title else 'No Title Found'
-
-        # Remove scripts e estilos para obter apenas o texto visível
-        for script_or_style in soup(['script', 'style']):
-            script_or_style.extract()
-
-        text_content = soup.get_text(separator=' ', strip=True)
-
-        return {
-            "title": title,
-            "url": url,
-            "content": text_content
-        }
-    except requests.exceptions.RequestException as e:
-        return {"error": f"Falha ao buscar conteúdo de {url} (limpa para '{cleaned_url}'): {e}"}
-    except Exception as e:
-        return {"error": f"Um erro inesperado ocorreu ao raspar {url} (limpa para '{cleaned_url}'): {e}"}
+    # Usa o motor assíncrono compartilhado (conexões reaproveitadas, limites por host e de tamanho)
+    return get_async_scraper().scrape_sync(url)
+
+
+def _submit_scrapes(results: List[Dict], max_results: int, start: int = 0) -> Dict[int, Any]:
+    """
+    Dispara em paralelo a raspagem das URLs válidas entre os resultados de índice `start` a `max_results`.
+    Retorna um dicionário índice -> future, consumido em ordem pelas ferramentas.
+    """
+    candidates = {
+        idx: r.get('url') for idx, r in enumerate(results[:max_results])
+        if idx >= start and r.get('url') and r.get('url').startswith('http')
+    }
+    futures = get_async_scraper().submit_many(list(candidates.values()))
+    return dict(zip(candidates.keys(), futures))
+
+
+def _prefilter_search_results(results: List[Dict], caller: str) -> List[Dict]:
+    """
+    Remove resultados cujo domínio indica que não são o site de uma empresa (antes da raspagem).
+    Resultados rejeitados só pelo caminho (ex.: uma notícia ou vaga no site da empresa) são trocados pela home do site.
+    """
+    if not LEAD_PREFILTER_ENABLED:
+        return results
+    kept = []
+    for r in results:
+        decision = _lead_prefilter.check_url(r.get('url') or '')
+        if decision.accept:
+            kept.append(r)
+        elif decision.homepage_url:
+            print(f"--- DEBUG ({caller}): Pré-filtro trocou '{r.get('url')}' ({decision.reason}) pela home {decision.homepage_url} ---")
+            kept.append({**r, 'url': decision.homepage_url})
+        else:
+            print(f"--- DEBUG ({caller}): Pré-filtro descartou '{r.get('url')}' ({decision.reason}) ---")
+    return kept
+
+
+def _dedupe_search_results(results: List[Dict], caller: str) -> List[Dict]:
+    """Mantém um resultado por domínio registrável; as demais URLs da empresa ficam em 'duplicate_urls'."""
+    deduped = dedupe_by_domain(results)
+    if len(deduped) < len(results):
+        print(f"--- DEBUG ({caller}): {len(results)} resultados agrupados em {len(deduped)} domínios ---")
+    return deduped
+
+
+def _submit_subpage_scrapes(results: List[Dict], max_results: int, start: int = 0) -> Dict[int, List[Tuple[str, Any]]]:
+    """
+    Dispara a raspagem das subpáginas (mesmo domínio) dos resultados de índice `start` a `max_results`.
+    Retorna índice -> [(url, future)], para anexar o texto ao lead em vez de extraí-lo como outro lead.
+    """
+    subpage_futures = {}
+    for idx, r in enumerate(results[:max_results]):
+        if idx < start:
+            continue
+        urls = (r.get('duplicate_urls') or [])[:MAX_MERGED_SUBPAGES]
+        if urls:
+            subpage_futures[idx] = list(zip(urls, get_async_scraper().submit_many(urls)))
+    return subpage_futures
+
+
+def _merge_subpages(scraped_data: Dict[str, Any], subpages: List[Tuple[str, Any]]) -> Dict[str, Any]:
+    """Anexa ao conteúdo da página principal o texto das subpáginas raspadas com sucesso."""
+    content = scraped_data.get('content') or ''
+    for url, future in subpages:
+        subpage = future.result()
+        if not subpage.get('error') and subpage.get('content'):
+            content += f"\n\n--- {url} ---\n{subpage['content']}"
+    return {**scraped_data, 'content': content}
+
+
+def _cancel_pending(scrape_futures: Dict[Any, Any]) -> None:
+    """Cancela raspagens ainda não consumidas (ex.: limite de leads atingido)."""
+    for future in scrape_futures.values():
+        future.cancel()
 
 
-def _tavily_search_internal(query: str, max_results: int = 10) -> List[Dict]: # Aumentado para 10 links
+def _tavily_search_internal(query: str, max_results: int = 10, exclude_domains: Optional[List[str]] = None) -> List[Dict]: # Aumentado para 10 links
     """
     Realiza uma busca usando a API Tavily e retorna uma lista de resultados brutos.
     Requer que TAVILY_API_KEY esteja configurada nas variáveis de ambiente.
+    exclude_domains remove da busca domínios já vistos.
     """
     tavily_api_key = os.getenv("TAVILY_API_KEY")
     if not tavily_api_key:
         raise ValueError("TAVILY_API_KEY não está configurada nas variáveis de ambiente.")
 
     try:
-        tavily = TavilyClient(api_key=tavily_api_key)
+        # Cliente compartilhado: conexão reutilizada e resultados em cache entre chamadas
         # depth="advanced" para resultados mais abrangentes, include_answer=False para focar nos links
-        response = tavily.search(query=query, search_depth="advanced", max_results=max_results, include_answer=False, include_raw_content=False)
+        response = get_tavily_client(tavily_api_key).search(query=query, search_depth="advanced", max_results=max_results, include_answer=False,
+                                                          exclude_domains=exclude_domains)
 
         results = []
         if response and response.get('results'):
@@ -108,6 +182,18 @@ def _initialize_gemini_model():
 
 # --- FERRAMENTAS COMPOSITAS (Adaptadas para Geração de Leads) ---
 
+def search_company_sites(query: str, max_results: int) -> List[Dict[str, Any]]:
+    """
+    Busca sites de empresas para a query, sem raspá-los: resultados da Tavily já pré-filtrados
+    e agrupados por domínio ({'url', 'title', 'snippet', 'domain', 'duplicate_urls'}).
+    Usada pelo harvester Playwright assíncrono, que faz a renderização por conta própria.
+    """
+    print(f"--- DEBUG (search_company_sites): Called with query='{query}', max_results={max_results} ---")
+    search_results = _tavily_search_internal(query=query, max_results=max_results * 2)
+    search_results = _prefilter_search_results(search_results, "search_company_sites")
+    return _dedupe_search_results(search_results, "search_company_sites")[:max_results]
+
+
 def search_and_qualify_leads(query: str, max_search_results_to_scrape: int) -> List[Dict[str, Any]]:
     """
     Realiza uma busca web por potenciais leads, raspa o conteúdo e faz uma qualificação inicial
@@ -141,9 +227,12 @@ def search_and_qualify_leads(query: str, max_search_results_to_scrape: int) -> L
             print("--- DEBUG (search_and_qualify_leads): No search results from Tavily. ---")
             return [{"error": "Não foram encontrados resultados na busca inicial com a Tavily."}]
 
+        search_results = _prefilter_search_results(search_results, "search_and_qualify_leads")
+        search_results = _dedupe_search_results(search_results, "search_and_qualify_leads")
         qualified_leads_data: list[dict[str, Any]] = []
         successfully_scraped_leads = 0
         leads_attempted_to_scrape = 0
+        scrape_futures = _submit_scrapes(search_results, max_search_results_to_scrape)
 
         for result_idx, result in enumerate(search_results):
             if leads_attempted_to_scrape >= max_search_results_to_scrape:
@@ -160,7 +249,7 @@ def search_and_qualify_leads(query: str, max_search_results_to_scrape: int) -> L
                     break
 
                 print(f"--- DEBUG (search_and_qualify_leads): [Attempt {leads_attempted_to_scrape}/{max_search_results_to_scrape}] Calling web_scraper for {url_to_scrape} ---")
-                scraped_data = web_scraper(url=url_to_scrape)
+                scraped_data = scrape_futures.pop(result_idx).result()
                 print(f"--- DEBUG (search_and_qualify_leads): [Attempt {leads_attempted_to_scrape}/{max_search_results_to_scrape}] web_scraper returned for {url_to_scrape} ---")
 
                 if not scraped_data.get('error') and scraped_data.get('content'):
@@ -177,6 +266,7 @@ def search_and_qualify_leads(query: str, max_search_results_to_scrape: int) -> L
                     qualification_summary = "Não foi possível qualificar com Gemini. Conteúdo bruto disponível." # Default value
                     print(f"--- DEBUG (search_and_qualify_leads): [Attempt {leads_attempted_to_scrape}/{max_search_results_to_scrape}] Calling Gemini's model.generate_content for qualification of {url_to_scrape}. ---")
                     try:
+                        _gemini_rate_limiter.acquire()  # Respeita limites de taxa da API
                         gemini_response = model.generate_content(prompt_qualify)
                         print(f"--- DEBUG (search_and_qualify_leads): [Attempt {leads_attempted_to_scrape}/{max_search_results_to_scrape}] Gemini's model.generate_content returned for qualification of {url_to_scrape}. ---")
                         qualification_summary = gemini_response.text
@@ -196,8 +286,6 @@ def search_and_qualify_leads(query: str, max_search_results_to_scrape: int) -> L
                     if successfully_scraped_leads >= max_search_results_to_scrape:
                          print(f"--- DEBUG (search_and_qualify_leads): [Attempt {leads_attempted_to_scrape}/{max_search_results_to_scrape}] Successfully scraped leads limit ({max_search_results_to_scrape}) reached after qualifying {url_to_scrape}. ---")
                          # The main loop condition will handle breaking if this was the last attempt allowed.
-
-                    time.sleep(DELAY_BETWEEN_GEMINI_CALLS_SECONDS)  # Pausa para gerenciar limites de taxa
                 else:
                     print(f"--- DEBUG (search_and_qualify_leads): [Attempt {leads_attempted_to_scrape}/{max_search_results_to_scrape}] Falha ao raspar '{url_to_scrape}': {scraped_data.get('error', 'Conteúdo vazio/erro desconhecido')} ---")
             else:
@@ -207,6 +295,7 @@ def search_and_qualify_leads(query: str, max_search_results_to_scrape: int) -> L
                 print(f"--- DEBUG (search_and_qualify_leads): Successfully scraped leads limit ({max_search_results_to_scrape}) reached within the outer loop for URL {url_to_scrape}. Stopping. ---")
                 break
 
+        _cancel_pending(scrape_futures)
         print(f"--- DEBUG (search_and_qualify_leads): Finished. Returning {len(qualified_leads_data)} qualified leads after attempting to scrape {leads_attempted_to_scrape} search results. ---")
         return qualified_leads_data
     except ValueError as ve:
@@ -217,6 +306,248 @@ def search_and_qualify_leads(query: str, max_search_results_to_scrape: int) -> L
         return [{"error": f"Um erro inesperado ocorreu na ferramenta composta: {e}"}]
 
 
+# Padrões comuns de Regex para e-mails, telefones e sites (pode ser refinado para mais variações)
+EMAIL_REGEX = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
+# Regex para telefone (brasileiro com e sem DDI/DDD, com ou sem formatação)
+PHONE_REGEX = r'\b(?:\+?\d{1,3}\s?)?(?:\(?\d{2}\)?\s?)?\d{4,5}[-\s]?\d{4}\b'
+WEBSITE_REGEX = r'(?:https?:\/\/)?(?:www\.)?([a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+\.[a-zA-Z]{2,})(?:\/\S*)?'
+
+
+def _extract_structured_lead(model, result: Dict[str, Any], scrape_future, subpages: List[Tuple[str, Any]],
+                             query: str, stop_event: threading.Event) -> Optional[Dict[str, Any]]:
+    """
+    Aguarda a raspagem de um candidato e extrai o lead estruturado (Regex + Gemini); executado nas
+    threads do agendador de iter_structured_leads. Retorna None se o candidato não virou lead.
+    """
+    url_to_scrape = result.get('url')
+    scraped_data = scrape_future.result()
+    if not scraped_data.get('error') and subpages:
+        scraped_data = _merge_subpages(scraped_data, subpages)
+    if scraped_data.get('error') or not scraped_data.get('content'):
+        print(f"--- DEBUG (iter_structured_leads): Falha ao raspar '{url_to_scrape}': {scraped_data.get('error', 'Conteúdo vazio/erro desconhecido')} ---")
+        return None
+    full_content = scraped_data.get('content')
+    print(f"--- DEBUG (iter_structured_leads): Successfully scraped {len(full_content)} chars from {url_to_scrape}. ---")
+
+    # 0. Pré-qualificação barata: páginas que claramente não são de empresas não chegam ao Gemini
+    if LEAD_PREFILTER_ENABLED:
+        decision = _lead_prefilter.check_page(
+            url_to_scrape, scraped_data.get('title', ''), scraped_data.get('main_content') or full_content, query
+        )
+        if not decision.accept:
+            print(f"--- DEBUG (iter_structured_leads): Pré-filtro descartou {url_to_scrape} ({decision.reason}) ---")
+            return None
+
+    # 1. Extração com Regex (passagem inicial para padrões comuns)
+    emails = list(set(re.findall(EMAIL_REGEX, full_content)))
+    phones = list(set(re.findall(PHONE_REGEX, full_content)))
+
+    # Tenta obter um site mais robusto do conteúdo raspado se diferente da URL
+    websites_found_in_content = list(set(re.findall(WEBSITE_REGEX, full_content)))
+    final_website = url_to_scrape
+    if websites_found_in_content:
+        # Heurística simples: pega o site que parece mais completo
+        temp_website = max(websites_found_in_content, key=len)
+        final_website = f"http://{temp_website}" if not temp_website.startswith('http') else temp_website
+
+    # 2. Extração com Gemini para dados mais complexos/nuançados
+    prompt_extract = (
+        f"Extraia as seguintes informações sobre a empresa/organização deste texto. "
+        f"Responda APENAS com um objeto JSON válido. Se uma informação não for encontrada, use null. "
+        f"Campos: company_name (string), website (string, preferencialmente o principal), "
+        f"contact_emails (lista de strings), contact_phones (lista de strings), "
+        f"industry (string, ex: 'Tecnologia', 'Saúde'), description (string, breve resumo), "
+        f"size (string, ex: '1-10 funcionários', 'PME', 'Grande Empresa', 'Não informado').\n\n"
+        f"Conteúdo:\n{full_content[:MAX_GEMINI_INPUT_CHARS]}"
+    )
+
+    gemini_extracted_data = {}
+    response = None
+    try:
+        _gemini_rate_limiter.acquire()  # Respeita limites de taxa da API (compartilhado entre as threads)
+        if stop_event.is_set():
+            return None  # Cota atingida enquanto esperava a vez: não gasta a chamada
+        print(f"--- DEBUG (iter_structured_leads): Calling Gemini's model.generate_content for {url_to_scrape} ---")
+        response = model.generate_content(prompt_extract)
+        # Remove markdown code block if present
+        json_str = response.text.strip().replace('```json\n', '').replace('\n```', '')
+        gemini_extracted_data = json.loads(json_str)
+    except json.JSONDecodeError as jde:
+        print(f"--- DEBUG (iter_structured_leads): Erro ao decodificar JSON do Gemini para {url_to_scrape}: {jde}. Resposta bruta: {response.text[:200]}..." )
+    except Exception as gemini_err:
+        print(f"--- DEBUG (iter_structured_leads): Erro na chamada Gemini para {url_to_scrape}: {gemini_err} ---")
+
+    # Combina resultados de Regex e Gemini, priorizando Gemini e enriquecendo
+    final_emails = list(set((gemini_extracted_data.get('contact_emails') or []) + emails))
+    final_phones = list(set((gemini_extracted_data.get('contact_phones') or []) + phones))
+
+    # Atualiza o site se o Gemini encontrou um melhor
+    if gemini_extracted_data.get('website'):
+        final_website = gemini_extracted_data['website']
+
+    return {
+        "company_name": gemini_extracted_data.get('company_name', result.get('title', 'N/A')),
+        "website": final_website,
+        "contact_emails": final_emails,
+        "contact_phones": final_phones,
+        "industry": gemini_extracted_data.get('industry', 'N/A'),
+        "description": gemini_extracted_data.get('description', 'N/A'),
+        "size": gemini_extracted_data.get('size', 'N/A'),
+        "source_url": url_to_scrape,
+        "search_snippet": result.get('snippet', 'N/A')
+    }
+
+
+def _widen_search(query: str, widen_round: int, max_results: int, seen_domains: set) -> List[Dict[str, Any]]:
+    """
+    Busca ampliada: uma reformulação da query, excluindo os domínios já vistos, com apenas os domínios novos.
+    Repetir a mesma query traria os mesmos resultados (e o tamanho da busca já pode estar no limite da API).
+    """
+    widened_query = build_widening_query(query, widen_round)
+    print(f"--- DEBUG (iter_structured_leads): Rendimento baixo; ampliando a busca com '{widened_query}' ({max_results} resultados) ---")
+    try:
+        widened = _tavily_search_internal(query=widened_query, max_results=max_results,
+                                          exclude_domains=sorted(d for d in seen_domains if d))
+    except Exception as e:
+        print(f"--- DEBUG (iter_structured_leads): Falha na busca ampliada: {e} ---")
+        return []
+    widened = _dedupe_search_results(_prefilter_search_results(widened, "iter_structured_leads"), "iter_structured_leads")
+    return [r for r in widened if (r.get('domain') or registrable_domain(r.get('url') or '')) not in seen_domains]
+
+
+def iter_structured_leads(query: str, max_search_results_to_process: int,
+                          search_results: Optional[List[Dict[str, Any]]] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Versão em streaming de find_and_extract_structured_leads, guiada pela cota de leads.
+
+    Busca LEAD_OVERFETCH_FACTOR candidatos por lead pedido e os processa em ordem de relevância,
+    até LEAD_EXTRACTION_WORKERS ao mesmo tempo, mantendo em andamento só os candidatos que faltam
+    para a cota mais LEAD_SCHEDULER_LOOKAHEAD. Cada lead é produzido assim que sua extração termina
+    (fora de ordem); quando a cota de `max_search_results_to_process` leads é atingida, o trabalho
+    pendente é cancelado. Se os candidatos acabarem antes da cota, a busca é ampliada
+    (até LEAD_WIDEN_ROUNDS vezes).
+
+    Se search_results for informado (ex.: resultados já combinados de várias queries pelo
+    fan-out do orquestrador, no formato de search_company_sites), a busca na Tavily é pulada.
+
+    Em caso de erro, produz um único dicionário {"error": ...} e encerra. Fechar o gerador
+    antes do fim cancela as raspagens ainda pendentes.
+    """
+    print(f"--- DEBUG (iter_structured_leads): Called with query='{query}', max_search_results_to_process={max_search_results_to_process} ---")
+
+    scrape_futures: Dict[int, Any] = {}
+    subpage_futures: Dict[int, List[Tuple[str, Any]]] = {}
+    extraction_futures: Dict[Any, int] = {}
+    stop_event = threading.Event()
+    executor: Optional[ThreadPoolExecutor] = None
+    successfully_processed_leads = 0
+    leads_attempted_to_process = 0
+
+    try:
+        model = _initialize_gemini_model()
+        # Use default value if not provided
+        if max_search_results_to_process is None:
+            max_search_results_to_process = MAX_SCRAPE_RESULTS
+        search_size = min(max_search_results_to_process * LEAD_OVERFETCH_FACTOR, TAVILY_MAX_RESULTS_CAP)
+
+        if search_results is not None:
+            # Resultados já pré-filtrados e agrupados por domínio
+            print(f"--- DEBUG (iter_structured_leads): Using {len(search_results)} pre-computed search results ---")
+            if not search_results:
+                yield {"error": "Não foram encontrados resultados na busca inicial com a Tavily."}
+                return
+        else:
+            print(f"--- DEBUG (iter_structured_leads): Calling _tavily_search_internal with query='{query}', max_results={search_size} ---")
+            search_results = _tavily_search_internal(query=query, max_results=search_size)
+            print(f"--- DEBUG (iter_structured_leads): _tavily_search_internal returned {len(search_results)} results ---")
+
+            if not search_results:
+                print("--- DEBUG (iter_structured_leads): No search results from Tavily. ---")
+                yield {"error": "Não foram encontrados resultados na busca inicial com a Tavily."}
+                return
+
+            search_results = _prefilter_search_results(search_results, "iter_structured_leads")
+            if not search_results:
+                print("--- DEBUG (iter_structured_leads): All search results rejected by the pre-filter. ---")
+                yield {"error": "Nenhum resultado da busca parece ser o site de uma empresa."}
+                return
+            search_results = _dedupe_search_results(search_results, "iter_structured_leads")
+
+        # Candidatos em ordem de relevância (ordem da busca); a lista cresce se a busca for ampliada
+        candidates = list(search_results)
+        seen_domains = {r.get('domain') or registrable_domain(r.get('url') or '') for r in candidates}
+        next_candidate = 0
+        widen_rounds = 0
+        executor = ThreadPoolExecutor(max_workers=LEAD_EXTRACTION_WORKERS, thread_name_prefix="lead-extract")
+        started_at = time.monotonic()
+
+        while successfully_processed_leads < max_search_results_to_process:
+            # Completa a janela: candidatos que faltam para a cota mais uma folga
+            window = max_search_results_to_process - successfully_processed_leads + LEAD_SCHEDULER_LOOKAHEAD
+            if len(extraction_futures) < window and next_candidate < len(candidates):
+                window_end = min(next_candidate + window - len(extraction_futures), len(candidates))
+                scrape_futures.update(_submit_scrapes(candidates, window_end, start=next_candidate))
+                subpage_futures.update(_submit_subpage_scrapes(candidates, window_end, start=next_candidate))
+                for idx in range(next_candidate, window_end):
+                    if idx not in scrape_futures:
+                        print(f"--- DEBUG (iter_structured_leads): URL inválida ou vazia, pulando: '{candidates[idx].get('url')}' ---")
+                        continue
+                    leads_attempted_to_process += 1
+                    print(f"--- DEBUG (iter_structured_leads): [Candidate {idx + 1}/{len(candidates)}] Scheduling {candidates[idx].get('url')} ---")
+                    future = executor.submit(_extract_structured_lead, model, candidates[idx], scrape_futures[idx],
+                                             subpage_futures.get(idx, []), query, stop_event)
+                    extraction_futures[future] = idx
+                next_candidate = window_end
+
+            if not extraction_futures:
+                if next_candidate < len(candidates):
+                    continue
+                if widen_rounds >= LEAD_WIDEN_ROUNDS:
+                    break
+                widen_rounds += 1
+                widened = _widen_search(query, widen_rounds, min(search_size * 2 ** widen_rounds, TAVILY_MAX_RESULTS_CAP), seen_domains)
+                if not widened:
+                    break
+                print(f"--- DEBUG (iter_structured_leads): Busca ampliada trouxe {len(widened)} novos candidatos ---")
+                seen_domains.update(r.get('domain') or registrable_domain(r.get('url') or '') for r in widened)
+                candidates.extend(widened)
+                continue
+
+            done, _ = wait(list(extraction_futures), return_when=FIRST_COMPLETED)
+            for future in done:
+                idx = extraction_futures.pop(future)
+                scrape_futures.pop(idx, None)
+                subpage_futures.pop(idx, None)
+                try:
+                    lead_data = future.result()
+                except Exception as e:
+                    print(f"--- DEBUG (iter_structured_leads): Erro ao processar {candidates[idx].get('url')}: {e} ---")
+                    continue
+                if not lead_data or successfully_processed_leads >= max_search_results_to_process:
+                    continue
+                yield lead_data
+                successfully_processed_leads += 1
+                print(f"--- DEBUG (iter_structured_leads): Lead {successfully_processed_leads}/{max_search_results_to_process} de {lead_data['source_url']} após {time.monotonic() - started_at:.1f}s ---")
+
+        if successfully_processed_leads >= max_search_results_to_process:
+            print(f"--- DEBUG (iter_structured_leads): Cota de {max_search_results_to_process} leads atingida; cancelando {len(extraction_futures)} candidatos pendentes. ---")
+        print(f"--- DEBUG (iter_structured_leads): Finished. Extracted {successfully_processed_leads} leads after attempting to process {leads_attempted_to_process} search results. ---")
+
+    except ValueError as ve:
+        print(f"--- DEBUG (iter_structured_leads): Erro de configuração da API: {ve} ---")
+        yield {"error": f"Erro de configuração da API: {ve}"}
+    except Exception as e:
+        print(f"--- DEBUG (iter_structured_leads): Um erro inesperado ocorreu na ferramenta composta: {e} ---")
+        yield {"error": f"Um erro inesperado ocorreu na ferramenta composta: {e}"}
+    finally:
+        stop_event.set()
+        _cancel_pending({idx: future for future, idx in extraction_futures.items()})
+        _cancel_pending(scrape_futures)
+        _cancel_pending({url: future for subpages in subpage_futures.values() for url, future in subpages})
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
 def find_and_extract_structured_leads(query: str, max_search_results_to_process: int) -> List[Dict[str, Any]]:
     """
     Realiza uma busca profunda por leads, raspa o conteúdo e extrai informações estruturadas de leads
@@ -231,139 +562,127 @@ def find_and_extract_structured_leads(query: str, max_search_results_to_process:
         Retorna uma lista vazia se nenhum lead for encontrado ou se ocorrer um erro.
     """
     print(f"--- DEBUG (find_and_extract_structured_leads): Called with query='{query}', max_search_results_to_process={max_search_results_to_process} ---")
-    
-    # Padrões comuns de Regex para e-mails, telefones e sites (pode ser refinado para mais variações)
-    email_regex = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-    # Regex para telefone (brasileiro com e sem DDI/DDD, com ou sem formatação)
-    phone_regex = r'\b(?:\+?\d{1,3}\s?)?(?:\(?\d{2}\)?\s?)?\d{4,5}[-\s]?\d{4}\b'
-    website_regex = r'(?:https?:\/\/)?(?:www\.)?([a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+\.[a-zA-Z]{2,})(?:\/\S*)?'
-
-    extracted_leads: list[dict[str, Any]] = []
-    successfully_processed_leads = 0
-    leads_attempted_to_process = 0
+    extracted_leads = list(iter_structured_leads(query, max_search_results_to_process))
+    print(f"--- DEBUG (find_and_extract_structured_leads): Returning {len(extracted_leads)} items ---")
+    return extracted_leads
 
-    try:
-        model = _initialize_gemini_model()
-        # Use default value if not provided
-        if max_search_results_to_process is None:
-            max_search_results_to_process = MAX_SCRAPE_RESULTS
 
-        print(f"--- DEBUG (find_and_extract_structured_leads): Calling _tavily_search_internal with query='{query}', max_results={max_search_results_to_process * 2} ---")
-        search_results = _tavily_search_internal(query=query, max_results=max_search_results_to_process * 2)
-        print(f"--- DEBUG (find_and_extract_structured_leads): _tavily_search_internal returned {len(search_results)} results ---")
+def _batch_checkpoint_path(urls: List[str], lead_analysis_instruction: str) -> str:
+    """Arquivo de checkpoint de um lote: mesma lista + mesma instrução = mesmo arquivo."""
+    batch_key = hashlib.sha1(json.dumps([urls, lead_analysis_instruction]).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(URL_BATCH_CHECKPOINT_DIR, f"{batch_key}.jsonl")
 
-        if not search_results:
-            print("--- DEBUG (find_and_extract_structured_leads): No search results from Tavily. ---")
-            return [{"error": "Não foram encontrados resultados na busca inicial com a Tavily."}]
 
-        for result_idx, result in enumerate(search_results):
-            if leads_attempted_to_process >= max_search_results_to_process:
-                print(f"--- DEBUG (find_and_extract_structured_leads): Limite de {max_search_results_to_process} tentativas de processamento atingido. Parando loop principal.")
-                break
-            leads_attempted_to_process += 1
-            
-            url_to_scrape = result.get('url')
-            if url_to_scrape and url_to_scrape.startswith('http'):
-                print(f"--- DEBUG (find_and_extract_structured_leads): [Attempt {leads_attempted_to_process}/{max_search_results_to_process}] Processing result {result_idx+1}/{len(search_results)}: {url_to_scrape} ---")
+def _load_batch_checkpoint(checkpoint_path: str) -> Dict[int, Dict[str, Any]]:
+    """Lê os itens já concluídos (índice -> resultado); linhas truncadas por uma queda são ignoradas."""
+    done: Dict[int, Dict[str, Any]] = {}
+    if not os.path.exists(checkpoint_path):
+        return done
+    with open(checkpoint_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                item = json.loads(line)
+                done[item["index"]] = item
+            except (json.JSONDecodeError, KeyError):
+                continue
+    return done
+
+
+def _analyze_provided_url(model, index: int, url: str, scrape_future, lead_analysis_instruction: str) -> Dict[str, Any]:
+    """Aguarda a raspagem de uma URL e a analisa com o Gemini; executado nas threads do modo em lote."""
+    item_result: Dict[str, Any] = {
+        "index": index,
+        "url": url,
+        "title": "N/A",
+        "lead_data": {},
+        "error": None,
+        "timing": {"scrape_seconds": None, "rate_limit_wait_seconds": 0.0, "analysis_seconds": 0.0},
+    }
+    response = None
+    try:
+        scraped_data = scrape_future.result()
+        item_result["timing"]["scrape_seconds"] = scraped_data.get("fetch_seconds")  # Só a requisição desta URL, sem a fila
+        if scraped_data.get("error"):
+            item_result["error"] = f"Falha ao raspar: {scraped_data['error']}"
+            return item_result
+
+        content = scraped_data.get("content", "")
+        item_result["title"] = scraped_data.get("title", "No Title Found")
+
+        full_prompt = f"{lead_analysis_instruction}\n\nConteúdo:\n{content[:MAX_GEMINI_INPUT_CHARS]}"
+
+        item_result["timing"]["rate_limit_wait_seconds"] = round(_gemini_rate_limiter.acquire(), 3)  # Limite compartilhado entre as threads
+        analysis_started_at = time.monotonic()
+        response = model.generate_content(full_prompt)
+        item_result["timing"]["analysis_seconds"] = round(time.monotonic() - analysis_started_at, 3)
+        json_str = response.text.strip().replace('```json\n', '').replace('\n```', '')
+        item_result["lead_data"] = json.loads(json_str)
+
+    except json.JSONDecodeError as jde:
+        item_result["error"] = f"Erro ao decodificar JSON da análise Gemini para {url}: {jde}. Resposta bruta: {response.text[:200]}..."
+    except Exception as e:
+        item_result["error"] = f"Erro no processamento da URL {url}: {e}"
+    return item_result
 
-                if successfully_processed_leads >= max_search_results_to_process:
-                    print(f"--- DEBUG (find_and_extract_structured_leads): Successfully processed {successfully_processed_leads} leads, which meets or exceeds max_search_results_to_process ({max_search_results_to_process}). Stopping. ---")
-                    break
 
-                print(f"--- DEBUG (find_and_extract_structured_leads): [Attempt {leads_attempted_to_process}/{max_search_results_to_process}] Calling web_scraper for {url_to_scrape} ---")
-                scraped_data = web_scraper(url=url_to_scrape)
-                print(f"--- DEBUG (find_and_extract_structured_leads): [Attempt {leads_attempted_to_process}/{max_search_results_to_process}] web_scraper returned for {url_to_scrape} ---")
-                
-                if not scraped_data.get('error') and scraped_data.get('content'):
-                    full_content = scraped_data.get('content')
-                    print(f"--- DEBUG (find_and_extract_structured_leads): [Attempt {leads_attempted_to_process}/{max_search_results_to_process}] Successfully scraped {len(full_content)} chars from {url_to_scrape}. ---")
-                    
-                    # 1. Extração com Regex (passagem inicial para padrões comuns)
-                    emails = list(set(re.findall(email_regex, full_content)))
-                    phones = list(set(re.findall(phone_regex, full_content)))
-                    
-                    # Tenta obter um site mais robusto do conteúdo raspado se diferente da URL
-                    websites_found_in_content = list(set(re.findall(website_regex, full_content)))
-                    primary_website_from_search = result.get('url') 
-                    
-                    # Heurística simples: prioriza o domínio encontrado no conteúdo ou a URL da busca
-                    final_website = primary_website_from_search
-                    if websites_found_in_content:
-                        # Pega o primeiro site que parece mais completo
-                        temp_website = max(websites_found_in_content, key=len) 
-                        final_website = f"http://{temp_website}" if not temp_website.startswith('http') else temp_website
-
-
-                    # 2. Extração com Gemini para dados mais complexos/nuançados
-                    prompt_extract = (
-                        f"Extraia as seguintes informações sobre a empresa/organização deste texto. "
-                        f"Responda APENAS com um objeto JSON válido. Se uma informação não for encontrada, use null. "
-                        f"Campos: company_name (string), website (string, preferencialmente o principal), "
-                        f"contact_emails (lista de strings), contact_phones (lista de strings), "
-                        f"industry (string, ex: 'Tecnologia', 'Saúde'), description (string, breve resumo), "
-                        f"size (string, ex: '1-10 funcionários', 'PME', 'Grande Empresa', 'Não informado').\n\n"
-                        f"Conteúdo:\n{full_content[:MAX_GEMINI_INPUT_CHARS]}"
-                    )
-                    
-                    gemini_extracted_data = {}
-                    print(f"--- DEBUG (find_and_extract_structured_leads): [Attempt {leads_attempted_to_process}/{max_search_results_to_process}] Calling Gemini's model.generate_content for {url_to_scrape} ---")
-                    try:
-                        response = model.generate_content(prompt_extract)
-                        print(f"--- DEBUG (find_and_extract_structured_leads): [Attempt {leads_attempted_to_process}/{max_search_results_to_process}] Gemini's model.generate_content returned for {url_to_scrape} ---")
-                        # Remove markdown code block if present
-                        json_str = response.text.strip().replace('```json\n', '').replace('\n```', '')
-                        gemini_extracted_data = json.loads(json_str)
-                    except json.JSONDecodeError as jde:
-                        print(f"--- DEBUG (find_and_extract_structured_leads): [Attempt {leads_attempted_to_process}/{max_search_results_to_process}] Erro ao decodificar JSON do Gemini para {url_to_scrape}: {jde}. Resposta bruta: {response.text[:200]}..." )
-                    except Exception as gemini_err:
-                        print(f"--- DEBUG (find_and_extract_structured_leads): [Attempt {leads_attempted_to_process}/{max_search_results_to_process}] Erro na chamada Gemini para {url_to_scrape}: {gemini_err} ---")
-                    
-                    # Combina resultados de Regex e Gemini, priorizando Gemini e enriquecendo
-                    final_emails = list(set((gemini_extracted_data.get('contact_emails') or []) + emails))
-                    final_phones = list(set((gemini_extracted_data.get('contact_phones') or []) + phones))
-                    
-                    # Atualiza o site se o Gemini encontrou um melhor
-                    if gemini_extracted_data.get('website'):
-                        final_website = gemini_extracted_data['website']
-
-                    lead_data = {
-                        "company_name": gemini_extracted_data.get('company_name', result.get('title', 'N/A')),
-                        "website": final_website,
-                        "contact_emails": final_emails,
-                        "contact_phones": final_phones,
-                        "industry": gemini_extracted_data.get('industry', 'N/A'),
-                        "description": gemini_extracted_data.get('description', 'N/A'),
-                        "size": gemini_extracted_data.get('size', 'N/A'),
-                        "source_url": url_to_scrape,
-                        "search_snippet": result.get('snippet', 'N/A')
-                    }
-                    extracted_leads.append(lead_data)
-                    successfully_processed_leads += 1
-
-                    if successfully_processed_leads >= max_search_results_to_process:
-                        print(f"--- DEBUG (find_and_extract_structured_leads): [Attempt {leads_attempted_to_process}/{max_search_results_to_process}] Successfully processed leads limit ({max_search_results_to_process}) reached after processing a lead from {url_to_scrape}. ---")
-                        # This break will exit the inner loop for results from the current URL.
-                        # The outer loop condition `if successfully_processed_leads >= max_search_results_to_process:` will then break the main loop.
-
-                    time.sleep(DELAY_BETWEEN_GEMINI_CALLS_SECONDS)  # Pausa para gerenciar limites de taxa
-                else:
-                    print(f"--- DEBUG (find_and_extract_structured_leads): [Attempt {leads_attempted_to_process}/{max_search_results_to_process}] Falha ao raspar '{url_to_scrape}': {scraped_data.get('error', 'Conteúdo vazio/erro desconhecido')} ---")
-            else:
-                print(f"--- DEBUG (find_and_extract_structured_leads): [Attempt {leads_attempted_to_process}/{max_search_results_to_process}] URL inválida ou vazia, pulando: '{url_to_scrape}' ---")
-            
-            if successfully_processed_leads >= max_search_results_to_process: # Check after processing each URL's results
-                 print(f"--- DEBUG (find_and_extract_structured_leads): Successfully processed leads limit ({max_search_results_to_process}) reached within the outer loop for URL {url_to_scrape}. Stopping. ---")
-                 break
+def iter_provided_url_leads(urls: List[str], lead_analysis_instruction: Optional[str] = None,
+                            checkpoint_path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Modo em lote de process_provided_urls_for_leads: raspa todas as URLs em paralelo, analisa até
+    BULK_ANALYSIS_WORKERS páginas ao mesmo tempo (sob o limitador compartilhado do Gemini) e produz cada
+    resultado assim que fica pronto, fora de ordem; use o campo "index" para reordenar.
 
-        print(f"--- DEBUG (find_and_extract_structured_leads): Finished. Extracted {len(extracted_leads)} leads after attempting to process {leads_attempted_to_process} search results. ---")
-        return extracted_leads
+    Cada resultado concluído sem erro é gravado num checkpoint JSONL; se o processo cair, chamar de novo
+    com a mesma lista retoma de onde parou (os itens recuperados vêm com "from_checkpoint": True). O arquivo
+    é removido quando o lote termina. Em caso de erro de configuração, produz um único {"error": ...}.
+    """
+    if lead_analysis_instruction is None:
+        lead_analysis_instruction = DEFAULT_LEAD_ANALYSIS_INSTRUCTION
+    checkpoint_path = checkpoint_path or _batch_checkpoint_path(urls, lead_analysis_instruction)
+
+    completed = _load_batch_checkpoint(checkpoint_path)
+    if completed:
+        print(f"--- DEBUG (iter_provided_url_leads): Retomando lote: {len(completed)}/{len(urls)} URLs já concluídas em '{checkpoint_path}'. ---")
+    for index in sorted(completed):
+        yield {**completed[index], "from_checkpoint": True}
+    pending = [(i, url) for i, url in enumerate(urls) if i not in completed]
+    if not pending:
+        return
 
+    try:
+        model = _initialize_gemini_model()
     except ValueError as ve:
-        print(f"--- DEBUG (find_and_extract_structured_leads): Erro de configuração da API: {ve} ---")
-        return [{"error": f"Erro de configuração da API: {ve}"}]
-    except Exception as e:
-        print(f"--- DEBUG (find_and_extract_structured_leads): Um erro inesperado ocorreu na ferramenta composta: {e} ---")
-        return [{"error": f"Um erro inesperado ocorreu na ferramenta composta: {e}"}]
+        print(f"--- DEBUG (iter_provided_url_leads): Erro de configuração da API: {ve} ---")
+        yield {"error": f"Erro de configuração da API: {ve}"}
+        return
+
+    os.makedirs(os.path.dirname(checkpoint_path) or ".", exist_ok=True)
+    batch_started_at = time.monotonic()
+    # Todas as URLs pendentes são raspadas em paralelo; a análise começa assim que cada página chega
+    scrape_futures = get_async_scraper().submit_many([url for _, url in pending])
+
+    executor = ThreadPoolExecutor(max_workers=BULK_ANALYSIS_WORKERS, thread_name_prefix="url-batch")
+    analysis_futures = [
+        executor.submit(_analyze_provided_url, model, index, url, scrape_future, lead_analysis_instruction)
+        for (index, url), scrape_future in zip(pending, scrape_futures)
+    ]
+    finished = False
+    try:
+        with open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+            for future in as_completed(analysis_futures):
+                item_result = future.result()
+                if item_result["error"] is None:
+                    checkpoint.write(json.dumps(item_result, ensure_ascii=False) + "\n")
+                    checkpoint.flush()
+                yield item_result
+        finished = True
+    finally:
+        for future in analysis_futures + scrape_futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+    if finished:
+        print(f"--- DEBUG (iter_provided_url_leads): Lote de {len(urls)} URLs concluído em {time.monotonic() - batch_started_at:.1f}s. ---")
+        os.remove(checkpoint_path)
 
 
 def process_provided_urls_for_leads(urls: List[str], lead_analysis_instruction: str) -> List[Dict[str, Any]]:
@@ -376,57 +695,17 @@ def process_provided_urls_for_leads(urls: List[str], lead_analysis_instruction:
         lead_analysis_instruction: Um prompt/instrução para o Gemini aplicar a cada texto raspado para extração de leads.
 
     Returns:
-        Uma lista de dicionários, onde cada dicionário contém dados de lead estruturados para uma URL.
+        Uma lista de dicionários, onde cada dicionário contém dados de lead estruturados para uma URL,
+        na ordem das URLs, com os tempos de raspagem e análise em "timing".
         Retorna uma lista vazia se nenhum lead for encontrado ou se ocorrer um erro.
     """
     print(f"--- DEBUG (process_provided_urls_for_leads): Processando {len(urls)} URLs. ---")
-    
-    # Use default value if not provided
-    if lead_analysis_instruction is None:
-        lead_analysis_instruction = "Analise este conteúdo para identificar e extrair informações de leads como nome da empresa, site, e-mails de contato e números de telefone. Apresente como um objeto JSON com os campos: company_name, website, contact_emails (lista), contact_phones (lista), industry, description, size. Se uma informação não for encontrada, use null."
-    
-    results = []
     try:
-        model = _initialize_gemini_model()
-        for i, url in enumerate(urls):
-            item_result: Dict[str, Any] = {
-                "url": url,
-                "title": "N/A",
-                "lead_data": {},
-                "error": None
-            }
-            
-            try:
-                scraped_data = web_scraper(url)
-                if scraped_data.get("error"):
-                    item_result["error"] = f"Falha ao raspar: {scraped_data['error']}"
-                    results.append(item_result)
-                    continue
-                
-                content = scraped_data.get("content", "")
-                item_result["title"] = scraped_data.get("title", "No Title Found")
-
-                full_prompt = f"{lead_analysis_instruction}\n\nConteúdo:\n{content[:MAX_GEMINI_INPUT_CHARS]}"
-                
-                response = model.generate_content(full_prompt)
-                json_str = response.text.strip().replace('```json\n', '').replace('\n```', '')
-                item_result["lead_data"] = json.loads(json_str)
-
-            except json.JSONDecodeError as jde:
-                item_result["error"] = f"Erro ao decodificar JSON da análise Gemini para {url}: {jde}. Resposta bruta: {response.text[:200]}..."
-            except Exception as e:
-                item_result["error"] = f"Erro no processamento da URL {url}: {e}"
-            
-            results.append(item_result)
-            
-            if i < len(urls) - 1:
-                time.sleep(DELAY_BETWEEN_GEMINI_CALLS_SECONDS)  # Pausa para gerenciar limites de taxa
-                
+        # Modo em lote: raspagem e análise concorrentes, com checkpoint para retomar listas longas
+        results = list(iter_provided_url_leads(urls, lead_analysis_instruction))
+        results.sort(key=lambda item: item.get("index", -1))  # Erros de configuração não têm índice
         print(f"--- DEBUG (process_provided_urls_for_leads): Retornando {len(results)} resultados processados. ---")
         return results
-    except ValueError as ve:
-        print(f"--- DEBUG (process_provided_urls_for_leads): Erro de configuração da API: {ve} ---")
-        return [{"error": f"Erro de configuração da API: {ve}"}]
     except Exception as e:
         print(f"--- DEBUG (process_provided_urls_for_leads): Um erro inesperado ocorreu na ferramenta composta: {e} ---")
         return [{"error": f"Um erro inesperado ocorreu na ferramenta composta: {e}"}]
@@ -2,6 +2,7 @@
 Base agent class that provides common functionality for all agents in the pipeline.
 """
 
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Any, Dict, Optional, TypeVar, Generic
 from datetime import datetime
@@ -9,8 +10,10 @@ from loguru import logger
 from pydantic import BaseModel, ValidationError
 import traceback
 import json
+import hashlib
 
 from core_logic.llm_client import LLMClientBase, LLMClientFactory, LLMProvider
+from core_logic.semantic_cache import SemanticLLMCache, get_semantic_cache, is_semantic_cache_enabled
 
 
 # Type variables for input and output types
@@ -73,6 +76,11 @@ class BaseAgent(ABC, Generic[TInput, TOutput]):
         # Initialize metrics
         self.metrics = []
         
+        # Optional semantic cache for near-duplicate inputs (config "semantic_cache" or SEMANTIC_CACHE_AGENTS)
+        self.semantic_cache: Optional[SemanticLLMCache] = (
+            get_semantic_cache() if is_semantic_cache_enabled(self) else None
+        )
+        
         self.logger.info(f"Initialized agent: {self.name}")
     
     @abstractmethod
@@ -121,8 +129,8 @@ class BaseAgent(ABC, Generic[TInput, TOutput]):
             if not isinstance(input_data, BaseModel):
                 raise ValueError(f"Input must be a Pydantic model, got {type(input_data)}")
             
-            # Process the data
-            output = self.process(input_data)
+            # Process the data (served from the semantic cache when enabled)
+            output = self._process_with_semantic_cache(input_data)
             
             # Validate output
             if not isinstance(output, BaseModel):
@@ -177,8 +185,8 @@ class BaseAgent(ABC, Generic[TInput, TOutput]):
             if not isinstance(input_data, BaseModel):
                 raise ValueError(f"Input must be a Pydantic model, got {type(input_data)}")
 
-            # Await the async process method
-            output = await self.process_async(input_data)
+            # Await the async process method (served from the semantic cache when enabled)
+            output = await self._process_async_with_semantic_cache(input_data)
 
             if not isinstance(output, BaseModel):
                 raise ValueError(f"Output must be a Pydantic model, got {type(output)}")
@@ -218,6 +226,75 @@ class BaseAgent(ABC, Generic[TInput, TOutput]):
             
             self.metrics.append(metrics)
     
+    def semantic_cache_scope(self) -> str:
+        """
+        Fingerprint of the instance context that shapes this agent's prompts.
+        
+        The semantic cache is shared by the whole process; entries are only
+        reused between agent instances with the same config and the same
+        ``*_context`` attributes (e.g. product_service_context). Agents whose
+        prompts depend on other instance state should override this.
+        """
+        context = {key: value for key, value in vars(self).items() if key.endswith('_context')}
+        context['config'] = {key: value for key, value in self.config.items() if key != 'semantic_cache'}
+        payload = json.dumps(context, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+    
+    def _process_with_semantic_cache(self, input_data: TInput) -> TOutput:
+        """
+        Run process() behind the semantic cache.
+        
+        Hits return the cached output, except for audited hits which are
+        recomputed and compared so false hits can be measured.
+        """
+        if not self.semantic_cache:
+            return self.process(input_data)
+        
+        try:
+            lookup = self.semantic_cache.lookup(self.name, input_data, scope=self.semantic_cache_scope())
+        except Exception as e:
+            logger.warning(f"[{self.name}] Semantic cache lookup failed, processing normally: {e}")
+            return self.process(input_data)
+        
+        if lookup.hit and not lookup.audit:
+            logger.info(f"[{self.name}] Semantic cache hit (similarity {lookup.similarity:.3f})")
+            return lookup.output
+        
+        output = self.process(input_data)
+        self._update_semantic_cache(lookup, output)
+        return output
+
+    async def _process_async_with_semantic_cache(self, input_data: TInput) -> TOutput:
+        """Async counterpart of _process_with_semantic_cache; embedding runs in a worker thread."""
+        if not self.semantic_cache:
+            return await self.process_async(input_data)
+        
+        try:
+            lookup = await asyncio.to_thread(
+                self.semantic_cache.lookup, self.name, input_data, scope=self.semantic_cache_scope()
+            )
+        except Exception as e:
+            logger.warning(f"[{self.name}] Semantic cache lookup failed, processing normally: {e}")
+            return await self.process_async(input_data)
+        
+        if lookup.hit and not lookup.audit:
+            logger.info(f"[{self.name}] Semantic cache hit (similarity {lookup.similarity:.3f})")
+            return lookup.output
+        
+        output = await self.process_async(input_data)
+        await asyncio.to_thread(self._update_semantic_cache, lookup, output)
+        return output
+
+    def _update_semantic_cache(self, lookup: Any, output: TOutput) -> None:
+        """Store a miss, or record the audit result of an audited hit."""
+        try:
+            if lookup.hit:
+                self.semantic_cache.record_audit(lookup, output)
+            else:
+                self.semantic_cache.store(lookup, output)
+        except Exception as e:
+            logger.warning(f"[{self.name}] Failed to update semantic cache: {e}")
+    
     def generate_llm_response(self, prompt: str) -> str:
         """
         Generate a response from the LLM with error handling.
@@ -352,7 +429,8 @@ class BaseAgent(ABC, Generic[TInput, TOutput]):
             "average_processing_time": avg_time,
             "total_processing_time": total_time,
             "total_llm_tokens": total_tokens,
-            "last_execution": self.metrics[-1].dict() if self.metrics else None
+            "last_execution": self.metrics[-1].dict() if self.metrics else None,
+            "semantic_cache": self.semantic_cache.get_stats(self.name) if self.semantic_cache else None
         }
     
     def reset_metrics(self):
@@ -328,8 +328,8 @@ class EnhancedLeadProcessor(BaseAgent[AnalyzedLead, ComprehensiveProspectPackage
                 # Create RAG vector store from enriched context
                 rag_vector_store = self._create_rag_vector_store(enriched_context, external_intel)
                 
-                # Generate advanced prospect profile using RAG
-                ai_prospect_profile = prospect_profiler.create_advanced_prospect_profile(
+                # Generate advanced prospect profile using RAG (per-lead store, so no batch_key: runs immediately)
+                ai_prospect_profile = await prospect_profiler.create_advanced_prospect_profile_async(
                     lead_data=analyzed_lead.validated_lead.model_dump(),
                     enriched_context=enriched_context,
                     rag_vector_store=rag_vector_store
@@ -991,11 +991,11 @@ class EnhancedLeadProcessor(BaseAgent[AnalyzedLead, ComprehensiveProspectPackage
             
             # Create simple vector store (basic implementation)
             try:
-                from sentence_transformers import SentenceTransformer
+                from core_logic.embeddings import get_embedding_model
                 import faiss
                 
-                # Initialize embedding model
-                model = SentenceTransformer('all-MiniLM-L6-v2')
+                # Shared embedding model (loaded once per process)
+                model = get_embedding_model()
                 
                 # Generate embeddings
                 embeddings = model.encode(chunks)
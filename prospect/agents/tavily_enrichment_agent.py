@@ -1,7 +1,5 @@
 import os
 import json
-import requests
-import time
 import re
 import traceback
 from typing import Optional, List
@@ -10,6 +8,8 @@ from pydantic import BaseModel
 
 from agents.base_agent import BaseAgent
 from core_logic.llm_client import LLMClientBase
+from core_logic.negative_cache import CONTENT_UNUSABLE, get_negative_cache
+from core_logic.tavily_client import TavilySearchError, get_tavily_client
 
 # Constants
 TAVILY_SEARCH_DEPTH = "advanced"  # Or "basic"
@@ -40,28 +40,24 @@ class TavilyEnrichmentAgent(BaseAgent[TavilyEnrichmentInput, TavilyEnrichmentOut
 
     def _search_with_tavily(self, query: str, search_depth: str = "advanced", max_results: int = 5) -> List[dict]:
         """
-        Performs a search using the Tavily API.
+        Performs a search using the shared Tavily client (pooled connection, cached results).
         """
         try:
-            response = requests.post(
-                "https://api.tavily.com/search",
-                json={
-                    "api_key": self.tavily_api_key,
-                    "query": query,
-                    "search_depth": search_depth,
-                    "include_answer": True,
-                    "max_results": max_results,
-                },
-                timeout=100  # segundos
+            return get_tavily_client(self.tavily_api_key).search_results(
+                query, search_depth=search_depth, max_results=max_results, include_answer=True
             )
-            response.raise_for_status()  # Raise an exception for bad status codes
-            return response.json().get("results", [])
-        except requests.exceptions.RequestException as e:
+        except (TavilySearchError, ValueError) as e:
             print(f"Tavily API request failed: {e}")
             return []
-        except json.JSONDecodeError:
-            print("Failed to decode Tavily API response.")
-            return []
+
+    def _search_many_with_tavily(self, queries: List[str], search_depth: str = "advanced", max_results: int = 5) -> List[List[dict]]:
+        """
+        Runs several Tavily searches concurrently; results keep the order of the queries.
+        """
+        return get_tavily_client(self.tavily_api_key).map(
+            lambda query: self._search_with_tavily(query, search_depth=search_depth, max_results=max_results),
+            queries
+        )
 
     def process(self, input_data: TavilyEnrichmentInput) -> TavilyEnrichmentOutput:
         tavily_api_called = False
@@ -135,6 +131,7 @@ class TavilyEnrichmentAgent(BaseAgent[TavilyEnrichmentInput, TavilyEnrichmentOut
                 tavily_api_called = True
                 self.logger.info(f"🌐 Starting Tavily API calls for {len(search_queries)} queries")
                 
+                queries_to_run = []
                 for query_count, query in enumerate(search_queries):
                     if query_count >= TAVILY_TOTAL_QUERIES_PER_LEAD:
                         self.logger.debug(f"⏭️  Stopping at query limit: {TAVILY_TOTAL_QUERIES_PER_LEAD}")
@@ -147,19 +144,27 @@ class TavilyEnrichmentAgent(BaseAgent[TavilyEnrichmentInput, TavilyEnrichmentOut
                     if input_data.company_name.lower() not in query.lower():
                         query = f"{query} ({input_data.company_name})"
 
-                    self.logger.debug(f"🔍 Query {query_count + 1}: {query}")
-                    
-                    tavily_results = self._search_with_tavily(
-                        query,
-                        search_depth=TAVILY_SEARCH_DEPTH,
-                        max_results=TAVILY_MAX_RESULTS_PER_QUERY
-                    )
-                    
+                    self.logger.debug(f"🔍 Query {len(queries_to_run) + 1}: {query}")
+                    queries_to_run.append(query)
+
+                # As consultas são disparadas em paralelo; o limite de taxa fica no cliente compartilhado
+                results_per_query = self._search_many_with_tavily(
+                    queries_to_run,
+                    search_depth=TAVILY_SEARCH_DEPTH,
+                    max_results=TAVILY_MAX_RESULTS_PER_QUERY
+                )
+
+                negative_cache = get_negative_cache()
+                for query_count, tavily_results in enumerate(results_per_query):
                     self.logger.debug(f"📊 Query {query_count + 1} returned {len(tavily_results)} results")
-                    time.sleep(1) # Respect API rate limits
 
                     if tavily_results:
                         for result in tavily_results:
+                            # Fontes de domínios mortos, páginas removidas ou de login conhecidas não entram no resumo
+                            known_failure = negative_cache.check(result['url']) if negative_cache and result.get('url') else None
+                            if known_failure and known_failure.failure_class in CONTENT_UNUSABLE:
+                                self.logger.debug(f"⏭️  Skipping known-bad source {result.get('url')} ({known_failure.failure_class})")
+                                continue
                             content_length = len(result.get('content', ''))
                             all_tavily_results_text += f"Fonte: {result.get('url', 'N/A')}\nConteúdo: {result.get('content', '')}\n\n"
                             self.logger.debug(f"📄 Added result from {result.get('url', 'N/A')}: {content_length} chars")
@@ -1,30 +1,47 @@
 # prospect/ai_prospect_intelligence.py
 
+import asyncio
 import json
 import math
 import os
-import re
 import traceback
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from loguru import logger
 
+from core_logic.embeddings import get_embedding_model
+from core_logic.signal_scoring import (
+    SignalScoreBatch,
+    SignalScorer,
+    get_keyword_set,
+    get_signal_scorer,
+    pain_keyword_set,
+    string_values,
+)
+
 # --- Imports para o Pipeline RAG ---
 # Verifica a disponibilidade das bibliotecas e define uma flag.
 try:
     import google.generativeai as genai
     import numpy as np
-    from sentence_transformers import SentenceTransformer
+    from core_logic.embeddings import EMBEDDING_LIBRARIES_AVAILABLE
+    if not EMBEDDING_LIBRARIES_AVAILABLE:
+        raise ImportError("nenhum backend de embeddings instalado (sentence-transformers ou onnxruntime)")
     RAG_LIBRARIES_AVAILABLE = True
 except ImportError as e:
     RAG_LIBRARIES_AVAILABLE = False
     logger.critical(f"Bibliotecas RAG essenciais não encontradas: {e}. Funcionalidades de IA serão desativadas.")
     # Define classes placeholder para que o type hinting não quebre durante a análise estática
-    SentenceTransformer = type('SentenceTransformer', (object,), {})
     genai = type('genai', (object,), {})
     np = type('np', (object,), {})
 
+# --- Configurações do processamento em lote ---
+RAG_TOP_K_CHUNKS = 3                 # Chunks de contexto recuperados por lead
+MAX_CONCURRENT_INSIGHT_CALLS = int(os.getenv("PROFILER_MAX_CONCURRENT_LLM_CALLS", "4"))
+PROFILE_BATCH_WINDOW_SECONDS = float(os.getenv("PROFILER_BATCH_WINDOW_SECONDS", "0.05"))
+PROFILE_MAX_BATCH_SIZE = int(os.getenv("PROFILER_MAX_BATCH_SIZE", "32"))
+
 
 class AdvancedProspectProfiler:
     """
@@ -48,8 +65,10 @@ class AdvancedProspectProfiler:
         if self._initialized:
             return
             
-        self.embedding_model: Optional[SentenceTransformer] = None
+        self.embedding_model: Optional[Any] = None # SentenceTransformer ou OnnxEmbeddingModel
         self.llm_client: Optional[genai.GenerativeModel] = None
+        self._pending_batches: Dict[Tuple[int, str], Dict[str, Any]] = {}
+        self._flush_tasks: Set[asyncio.Task] = set()  # Referências fortes: o loop só guarda referências fracas
 
         if not RAG_LIBRARIES_AVAILABLE:
             logger.warning("Bibliotecas RAG não encontradas. O AdvancedProspectProfiler não funcionará.")
@@ -58,11 +77,11 @@ class AdvancedProspectProfiler:
 
         # 1. Carregar Modelo de Embedding
         try:
-            logger.info("Profiler: Carregando modelo de embedding 'all-MiniLM-L6-v2'...")
-            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+            logger.info("Profiler: Carregando modelo de embedding compartilhado...")
+            self.embedding_model = get_embedding_model()
             logger.success("Profiler: Modelo de embedding carregado com sucesso.")
         except Exception as e:
-            logger.error(f"Profiler: Falha crítica ao carregar o modelo SentenceTransformer: {e}. Insights RAG estarão indisponíveis.")
+            logger.error(f"Profiler: Falha crítica ao carregar o modelo de embedding: {e}. Insights RAG estarão indisponíveis.")
 
         # 2. Configurar Cliente LLM (Google Gemini)
         try:
@@ -108,6 +127,111 @@ class AdvancedProspectProfiler:
             target_profile = enriched_context.get('prospect_targeting', {}).get('ideal_customer_profile', 'N/A')
             logger.info(f"Profiler: Usando contexto - Negócio: '{business_desc[:50]}...', Target: '{target_profile[:50]}...'")
         
+        predictive_insights = self._generate_predictive_insights(
+            lead_data, enriched_context, rag_vector_store
+        )
+        return self._assemble_profile(lead_data, enriched_context, rag_vector_store, predictive_insights)
+
+    async def create_advanced_prospect_profiles_batch(
+        self,
+        leads_data: List[Dict[str, Any]],
+        enriched_context: Dict[str, Any],
+        rag_vector_store: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Versão em lote de `create_advanced_prospect_profile` para todos os leads de um job.
+
+        Codifica todas as consultas em uma única matriz, executa uma única busca
+        multi-consulta no FAISS e dispara as chamadas de insight ao LLM de forma
+        concorrente. Nenhuma etapa bloqueia o event loop.
+        """
+        if not leads_data:
+            return []
+        contexts = [enriched_context] * len(leads_data)
+        return await self._create_profiles_for_items(leads_data, contexts, rag_vector_store)
+
+    async def create_advanced_prospect_profile_async(
+        self,
+        lead_data: Dict[str, Any],
+        enriched_context: Dict[str, Any],
+        rag_vector_store: Optional[Dict[str, Any]] = None,
+        batch_key: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Versão assíncrona de `create_advanced_prospect_profile`.
+
+        Com `batch_key` (ex.: o id do job dono do vector store compartilhado), chamadas
+        concorrentes com a mesma chave e o mesmo vector store são agrupadas em uma janela
+        curta e processadas juntas por `create_advanced_prospect_profiles_batch`.
+        Sem `batch_key` (ex.: vector store criado para um único lead) o perfil é criado
+        na hora, sem esperar a janela.
+        """
+        if batch_key is None:
+            return (await self._create_profiles_for_items([lead_data], [enriched_context], rag_vector_store))[0]
+
+        loop = asyncio.get_running_loop()
+        batch_key = (id(loop), f"{batch_key}:{id(rag_vector_store)}")
+        pending = self._pending_batches.get(batch_key)
+        if pending is None:
+            pending = {"items": [], "rag_vector_store": rag_vector_store}
+            self._pending_batches[batch_key] = pending
+            pending["flush_handle"] = loop.call_later(
+                PROFILE_BATCH_WINDOW_SECONDS, self._schedule_batch_flush, batch_key
+            )
+
+        future = loop.create_future()
+        pending["items"].append((lead_data, enriched_context, future))
+        if len(pending["items"]) >= PROFILE_MAX_BATCH_SIZE:
+            pending["flush_handle"].cancel()
+            self._schedule_batch_flush(batch_key)
+        return await future
+
+    def _schedule_batch_flush(self, batch_key: Tuple[int, str]) -> None:
+        """Retira o lote pendente e agenda seu processamento no event loop atual."""
+        pending = self._pending_batches.pop(batch_key, None)
+        if pending:
+            task = asyncio.ensure_future(self._flush_batch(pending))
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush_batch(self, pending: Dict[str, Any]) -> None:
+        items = pending["items"]
+        leads = [lead for lead, _, _ in items]
+        contexts = [context for _, context, _ in items]
+        logger.info(f"Profiler: Processando lote de {len(items)} lead(s).")
+        try:
+            profiles = await self._create_profiles_for_items(leads, contexts, pending["rag_vector_store"])
+            for (_, _, future), profile in zip(items, profiles):
+                if not future.done():
+                    future.set_result(profile)
+        except Exception as e:
+            for _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def _create_profiles_for_items(
+        self,
+        leads_data: List[Dict[str, Any]],
+        contexts: List[Dict[str, Any]],
+        rag_vector_store: Optional[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        insights_per_lead = await self._generate_predictive_insights_batch(leads_data, rag_vector_store)
+        return [
+            self._assemble_profile(lead, context, rag_vector_store, insights)
+            for lead, context, insights in zip(leads_data, contexts, insights_per_lead)
+        ]
+
+    def _assemble_profile(
+        self,
+        lead_data: Dict[str, Any],
+        enriched_context: Dict[str, Any],
+        rag_vector_store: Optional[Dict[str, Any]],
+        predictive_insights: List[str]
+    ) -> Dict[str, Any]:
+        """Calcula os scores de sinais e monta o dicionário final do perfil."""
+        company_name = lead_data.get('company_name', 'N/A')
+        enriched_context = enriched_context or {}
+
         text_content = self._extract_text_from_lead(lead_data)
         intent_score = self._analyze_buying_intent(text_content)
         pain_alignment = self._analyze_pain_alignment(text_content, enriched_context)
@@ -115,10 +239,6 @@ class AdvancedProspectProfiler:
         
         # Double check: Log dos scores calculados
         logger.info(f"Profiler: Scores para '{company_name}' - Intent: {intent_score}, Pain Alignment: {pain_alignment}, Urgency: {urgency_score}")
-        
-        predictive_insights = self._generate_predictive_insights(
-            lead_data, enriched_context, rag_vector_store
-        )
 
         overall_score = self._calculate_overall_prospect_score(intent_score, pain_alignment, urgency_score)
         
@@ -148,41 +268,19 @@ class AdvancedProspectProfiler:
         Executa o pipeline RAG completo para gerar insights preditivos e acionáveis.
         """
         company_name = lead_data.get('company_name', 'N/A')
-        fallback_insights = [f"Análise padrão indica que '{company_name}' se alinha com nosso público-alvo geral."]
+        fallback_insights = self._fallback_insights(company_name)
 
-        # --- Validação dos Componentes RAG ---
-        if not self.embedding_model:
-            logger.warning(f"RAG Abortado para '{company_name}': Modelo de embedding não está carregado.")
-            return fallback_insights
-        if not self.llm_client:
-            logger.warning(f"RAG Abortado para '{company_name}': Cliente LLM (Gemini) não está configurado.")
-            return fallback_insights
-        if not rag_vector_store:
-            logger.warning(f"RAG Abortado para '{company_name}': Vector Store não foi fornecido.")
+        if not self._rag_components_ready(company_name, rag_vector_store):
             return fallback_insights
 
         # --- Ciclo RAG ---
         try:
             # 1. Formular a Consulta (Query) a partir dos dados do lead
-            lead_snippet = self._extract_text_from_lead(lead_data, max_length=1200)
-            query = f"Para a empresa '{company_name}', que é descrita como '{lead_snippet}', quais são as principais dores, desafios e oportunidades de venda que nossa solução pode endereçar?"
+            lead_snippet, query = self._build_rag_query(lead_data)
             logger.info(f"RAG Query para '{company_name}': '{query[:100]}...'")
 
-            # 2. Gerar Embedding da Consulta
-            query_embedding = self.embedding_model.encode([query])[0].astype('float32')
-
-            # 3. Buscar no Vector Store (FAISS)
-            faiss_index = rag_vector_store.get("index")
-            stored_chunks = rag_vector_store.get("chunks", [])
-            retrieved_context = "Nenhum contexto específico foi recuperado."
-            
-            if faiss_index and stored_chunks:
-                k = min(3, len(stored_chunks))
-                distances, indices = faiss_index.search(np.expand_dims(query_embedding, axis=0), k)
-                
-                retrieved_chunks_texts = [stored_chunks[i] for i in indices[0] if i < len(stored_chunks)]
-                retrieved_context = "\n\n---\n\n".join(retrieved_chunks_texts)
-                logger.info(f"Profiler: {len(retrieved_chunks_texts)} chunks de contexto recuperados para '{company_name}'.")
+            # 2 e 3. Gerar Embedding da Consulta e buscar no Vector Store (FAISS)
+            retrieved_context = self._retrieve_contexts([query], rag_vector_store)[0]
             
             # 4. Construir o Prompt Aumentado para o LLM
             llm_prompt = self._build_rag_prompt(company_name, lead_snippet, retrieved_context)
@@ -200,6 +298,107 @@ class AdvancedProspectProfiler:
             logger.debug(traceback.format_exc())
             return fallback_insights
 
+    async def _generate_predictive_insights_batch(
+        self,
+        leads_data: List[Dict[str, Any]],
+        rag_vector_store: Optional[Dict[str, Any]] = None
+    ) -> List[List[str]]:
+        """
+        Executa o ciclo RAG para vários leads: uma codificação em matriz, uma busca
+        multi-consulta no FAISS e chamadas concorrentes ao LLM.
+        """
+        fallbacks = [self._fallback_insights(lead.get('company_name', 'N/A')) for lead in leads_data]
+        if not self._rag_components_ready(f"lote de {len(leads_data)} leads", rag_vector_store):
+            return fallbacks
+
+        snippets_and_queries = [self._build_rag_query(lead) for lead in leads_data]
+        queries = [query for _, query in snippets_and_queries]
+        try:
+            # Embedding e busca vetorial são CPU-bound: rodam fora do event loop.
+            retrieved_contexts = await asyncio.to_thread(self._retrieve_contexts, queries, rag_vector_store)
+        except Exception as e:
+            logger.error(f"Profiler: Falha na recuperação em lote do RAG: {e}")
+            logger.debug(traceback.format_exc())
+            return fallbacks
+
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_INSIGHT_CALLS)
+
+        async def generate_for(index: int) -> List[str]:
+            lead = leads_data[index]
+            company_name = lead.get('company_name', 'N/A')
+            lead_snippet = snippets_and_queries[index][0]
+            prompt = self._build_rag_prompt(company_name, lead_snippet, retrieved_contexts[index])
+            async with semaphore:
+                try:
+                    response_text = await self._generate_content_async(prompt)
+                except Exception as e:
+                    logger.error(f"Profiler: Falha no ciclo RAG para '{company_name}': {e}")
+                    return fallbacks[index]
+            insights = self._parse_llm_response(response_text)
+            return insights if insights else fallbacks[index]
+
+        return list(await asyncio.gather(*(generate_for(i) for i in range(len(leads_data)))))
+
+    async def _generate_content_async(self, prompt: str) -> str:
+        """Chama o Gemini sem bloquear o event loop."""
+        generate_async = getattr(self.llm_client, "generate_content_async", None)
+        if generate_async is not None:
+            response = await generate_async(prompt)
+        else:
+            response = await asyncio.to_thread(self.llm_client.generate_content, prompt)
+        return response.text
+
+    def _rag_components_ready(self, label: str, rag_vector_store: Optional[Dict[str, Any]]) -> bool:
+        """Valida os componentes do RAG, registrando o motivo quando o ciclo é abortado."""
+        if not self.embedding_model:
+            logger.warning(f"RAG Abortado para '{label}': Modelo de embedding não está carregado.")
+            return False
+        if not self.llm_client:
+            logger.warning(f"RAG Abortado para '{label}': Cliente LLM (Gemini) não está configurado.")
+            return False
+        if not rag_vector_store:
+            logger.warning(f"RAG Abortado para '{label}': Vector Store não foi fornecido.")
+            return False
+        return True
+
+    @staticmethod
+    def _fallback_insights(company_name: str) -> List[str]:
+        return [f"Análise padrão indica que '{company_name}' se alinha com nosso público-alvo geral."]
+
+    def _build_rag_query(self, lead_data: Dict[str, Any]) -> Tuple[str, str]:
+        """Retorna o snippet do lead e a consulta RAG derivada dele."""
+        company_name = lead_data.get('company_name', 'N/A')
+        lead_snippet = self._extract_text_from_lead(lead_data, max_length=1200)
+        query = f"Para a empresa '{company_name}', que é descrita como '{lead_snippet}', quais são as principais dores, desafios e oportunidades de venda que nossa solução pode endereçar?"
+        return lead_snippet, query
+
+    def _retrieve_contexts(self, queries: List[str], rag_vector_store: Dict[str, Any]) -> List[str]:
+        """
+        Codifica todas as consultas em uma única matriz e executa uma única busca
+        multi-consulta no FAISS, retornando o contexto recuperado para cada uma.
+        """
+        default_context = "Nenhum contexto específico foi recuperado."
+        faiss_index = rag_vector_store.get("index")
+        stored_chunks = rag_vector_store.get("chunks", [])
+        if not faiss_index or not stored_chunks:
+            return [default_context] * len(queries)
+
+        query_matrix = np.asarray(
+            self.embedding_model.encode(queries, show_progress_bar=False), dtype='float32'
+        )
+        if query_matrix.ndim == 1:
+            query_matrix = np.expand_dims(query_matrix, axis=0)
+
+        k = min(RAG_TOP_K_CHUNKS, len(stored_chunks))
+        _, indices = faiss_index.search(query_matrix, k)
+
+        contexts = []
+        for row in indices:
+            retrieved_chunks_texts = [stored_chunks[i] for i in row if 0 <= i < len(stored_chunks)]
+            contexts.append("\n\n---\n\n".join(retrieved_chunks_texts) if retrieved_chunks_texts else default_context)
+        logger.info(f"Profiler: Contexto recuperado para {len(queries)} consulta(s) em uma única busca vetorial.")
+        return contexts
+
     def _build_rag_prompt(self, company_name: str, lead_snippet: str, retrieved_context: str) -> str:
         """Constrói o prompt final a ser enviado para o modelo de linguagem."""
         return f"""
@@ -244,53 +443,62 @@ Formato da resposta: Uma lista com bullets.
         full_text = ' '.join(filter(None, text_parts)).lower()
         return full_text[:max_length]
 
+    def score_leads_batch(
+        self,
+        leads_data: List[Dict[str, Any]],
+        enriched_context: Optional[Dict[str, Any]] = None
+    ) -> SignalScoreBatch:
+        """
+        Calcula os scores de sinais de muitos leads de uma só vez, em arrays NumPy.
+        Não usa embeddings nem LLM, servindo para pré-ranquear leads antes do enriquecimento.
+        """
+        texts = [self._extract_text_from_lead(lead) for lead in leads_data]
+        return get_signal_scorer().score_batch(texts, enriched_context)
+
+    def pre_rank_leads(
+        self,
+        leads_data: List[Dict[str, Any]],
+        enriched_context: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        """Retorna os leads ordenados pelo score heurístico geral, do maior para o menor."""
+        scores = self.score_leads_batch(leads_data, enriched_context)
+        return [(leads_data[i], float(scores.overall[i])) for i in scores.ranking()]
+
     def _analyze_buying_intent(self, text_content: str) -> float:
         """Estima a intenção de compra com base em palavras-chave."""
-        keywords = ['hiring', 'expanding', 'funding', 'seeking', 'looking for', 'need', 'require', 'new solution']
-        score = sum(1 for k in keywords if k in text_content)
-        return round(min(score / 3.0, 1.0), 3) # Normalizado
+        return get_signal_scorer().buying_intent(text_content)
 
     def _analyze_pain_alignment(self, text_content: str, enriched_context: Dict[str, Any]) -> float:
         """Mede o alinhamento entre as dores do lead e as soluções que oferecemos."""
-        problems_we_solve = enriched_context.get('lead_qualification_criteria', {}).get('problems_we_solve', [])
-        if not problems_we_solve:
-            return 0.5 # Retorno neutro se não houver dores definidas
-        
-        # Simplifica as dores para palavras-chave
-        pain_keywords = set()
-        for problem in problems_we_solve:
-            pain_keywords.update(re.findall(r'\b\w+\b', str(problem).lower()))
-        
-        if not pain_keywords:
-            return 0.5
-
-        alignment_count = sum(1 for p_kw in pain_keywords if p_kw in text_content)
-        return round(min(alignment_count / len(pain_keywords), 1.0), 3)
+        # As dores são simplificadas para palavras-chave e compiladas uma única vez por contexto
+        return get_signal_scorer().pain_alignment(text_content, pain_keyword_set(enriched_context))
 
     def _calculate_urgency_score(self, text_content: str) -> float:
         """Estima a urgência com base em palavras-chave indicativas."""
-        keywords = ['urgent', 'asap', 'immediately', 'deadline', 'critical', 'priority', 'imminent']
-        score = sum(1 for k in keywords if k in text_content)
-        return round(min(score / 2.0, 1.0), 3) # Normalizado
+        return get_signal_scorer().urgency(text_content)
 
     def _calculate_overall_prospect_score(self, intent: float, alignment: float, urgency: float) -> float:
         """Calcula uma pontuação geral ponderada para o prospect."""
-        weights = {'intent': 0.4, 'alignment': 0.4, 'urgency': 0.2}
-        score = (intent * weights['intent'] + alignment * weights['alignment'] + urgency * weights['urgency'])
-        return round(score, 3)
+        return SignalScorer.overall(intent, alignment, urgency)
 
 
 class BuyingSignalPredictor:
     """
     Analisa texto para prever sinais de compra com base em padrões. (Complementar ao RAG)
     """
+    SIGNAL_RULES = (
+        ('Hiring/Growth', 0.8, ('hiring', 'job opening')),
+        ('Technology Shift', 0.7, ('digital transformation', 'new platform')),
+    )
+    _keyword_set = get_keyword_set(k for _, _, keywords in SIGNAL_RULES for k in keywords)
+
     def predict_buying_signals(self, lead_data: Dict[str, Any]) -> Dict[str, Any]:
-        text_content = ' '.join(str(v) for v in lead_data.values() if isinstance(v, str)).lower()
-        detected_signals = []
-        if 'hiring' in text_content or 'job opening' in text_content:
-            detected_signals.append({'signal_type': 'Hiring/Growth', 'confidence': 0.8})
-        if 'digital transformation' in text_content or 'new platform' in text_content:
-            detected_signals.append({'signal_type': 'Technology Shift', 'confidence': 0.7})
+        found = self._keyword_set.matches_any(string_values(lead_data))
+        detected_signals = [
+            {'signal_type': signal_type, 'confidence': confidence}
+            for signal_type, confidence, keywords in self.SIGNAL_RULES
+            if found.intersection(keywords)
+        ]
         return {'detected_signals': detected_signals}
 
 
@@ -298,11 +506,15 @@ class ProspectIntentScorer:
     """
     Calcula uma pontuação de intenção de compra. (Complementar ao RAG)
     """
+    STAGE_RULES = (
+        (0.9, 'decision', ('request a demo', 'contact sales')),
+        (0.6, 'consideration', ('evaluating', 'considering options')),
+    )
+    _keyword_set = get_keyword_set(k for _, _, keywords in STAGE_RULES for k in keywords)
+
     def calculate_intent_score(self, lead_data: Dict[str, Any]) -> Dict[str, Any]:
-        text_content = ' '.join(str(v) for v in lead_data.values() if isinstance(v, str)).lower()
-        score, stage = 0.0, 'awareness'
-        if any(k in text_content for k in ['request a demo', 'contact sales']):
-            score, stage = 0.9, 'decision'
-        elif any(k in text_content for k in ['evaluating', 'considering options']):
-            score, stage = 0.6, 'consideration'
-        return {'intent_score': score, 'intent_stage': stage}
+        found = self._keyword_set.matches_any(string_values(lead_data))
+        for score, stage, keywords in self.STAGE_RULES:
+            if found.intersection(keywords):
+                return {'intent_score': score, 'intent_stage': stage}
+        return {'intent_score': 0.0, 'intent_stage': 'awareness'}
@@ -0,0 +1,144 @@
+"""
+Benchmark of the page text extraction used by the scrapers.
+
+Compares the previous path (BeautifulSoup html.parser + get_text over the whole
+document) with core_logic.content_extraction (lxml, boilerplate removal,
+main-content detection, contact section) on parse time per page and on the
+size of the text that ends up in the LLM prompts.
+
+Pages come from a directory of .html files, from the on-disk fetch cache, or
+from a built-in synthetic company homepage:
+
+    python benchmarks/content_extraction.py --html-dir pages/
+    python benchmarks/content_extraction.py --fetch-cache .cache/fetch_cache.sqlite3 --limit 200
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Callable, List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from core_logic.content_extraction import extract_content  # noqa: E402
+
+MAX_GEMINI_INPUT_CHARS = 50000  # Mesmo limite de adk1.agent
+
+
+def count_tokens_factory() -> Callable[[str], int]:
+    try:
+        import tiktoken
+
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+    except Exception:
+        # Aproximação usual quando o tokenizer não está instalado
+        return lambda text: len(text) // 4
+
+
+def legacy_extract(html: str) -> str:
+    soup = BeautifulSoup(html, "html.parser")
+    for script_or_style in soup(["script", "style"]):
+        script_or_style.extract()
+    return soup.get_text(separator=" ", strip=True)
+
+
+def new_extract(html: str) -> str:
+    return extract_content(html).to_prompt_text()
+
+
+def synthetic_page(index: int) -> str:
+    menu = "".join(f"<li><a href='/secao-{i}'>Seção {i}</a></li>" for i in range(40))
+    posts = "".join(f"<li><a href='/blog/post-{i}'>Como escalar vendas B2B parte {i}</a></li>" for i in range(15))
+    paragraphs = "".join(
+        f"<p>A empresa {index} oferece soluções de gestão comercial e automação de vendas para o varejo, "
+        f"com integrações, relatórios e suporte dedicado. Diferencial {i}: implantação em até 30 dias.</p>"
+        for i in range(12)
+    )
+    scripts = "<script>" + "window.dataLayer.push({event: 'view'});" * 300 + "</script>"
+    return (
+        f"<html><head><title>Empresa {index}</title><style>{'.c{color:red}' * 500}</style>{scripts}</head><body>"
+        f"<div class='cookie-consent'>Este site usa cookies. <a href='#'>Aceitar</a> <a href='#'>Recusar</a></div>"
+        f"<header><nav><ul>{menu}</ul></nav></header>"
+        f"<main><h1>Empresa {index}</h1>{paragraphs}</main>"
+        f"<aside class='sidebar'><ul>{posts}</ul></aside>"
+        f"<footer><ul>{menu}</ul><p>contato@empresa{index}.com.br | (11) 4000-{index:04d}</p>"
+        f"<address>Rua Exemplo, {index} - São Paulo/SP</address><p>Política de privacidade | Termos de uso</p></footer>"
+        f"</body></html>"
+    )
+
+
+def load_pages(args) -> List[str]:
+    if args.html_dir:
+        files = sorted(Path(args.html_dir).glob("*.htm*"))[: args.limit]
+        return [path.read_text(encoding="utf-8", errors="replace") for path in files]
+    if args.fetch_cache:
+        connection = sqlite3.connect(args.fetch_cache)
+        rows = connection.execute(
+            "SELECT body FROM entries WHERE kind = 'http' AND body IS NOT NULL LIMIT ?", (args.limit,)
+        ).fetchall()
+        connection.close()
+        return [zlib.decompress(row[0]).decode("utf-8") for row in rows]
+    return [synthetic_page(i) for i in range(args.limit)]
+
+
+def run(name: str, extractor: Callable[[str], str], pages: List[str], count_tokens: Callable[[str], int]) -> dict:
+    timings, chars, tokens = [], [], []
+    for html in pages:
+        start = time.perf_counter()
+        text = extractor(html)
+        timings.append((time.perf_counter() - start) * 1000)
+        prompt_text = text[:MAX_GEMINI_INPUT_CHARS]
+        chars.append(len(prompt_text))
+        tokens.append(count_tokens(prompt_text))
+    return {
+        "name": name,
+        "median_ms": statistics.median(timings),
+        "mean_ms": statistics.mean(timings),
+        "mean_chars": statistics.mean(chars),
+        "mean_tokens": statistics.mean(tokens),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--html-dir", help="Directory with .html files")
+    source.add_argument("--fetch-cache", help="Path to a fetch cache SQLite file")
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    pages = load_pages(args)
+    if not pages:
+        print("No pages to benchmark")
+        return
+    count_tokens = count_tokens_factory()
+    for html in pages[:3]:  # warm-up
+        legacy_extract(html)
+        new_extract(html)
+
+    results = [
+        run("bs4 html.parser get_text", legacy_extract, pages, count_tokens),
+        run("lxml main content", new_extract, pages, count_tokens),
+    ]
+    print(f"{len(pages)} pages")
+    header = f"{'extractor':<28}{'median ms':>11}{'mean ms':>10}{'chars':>10}{'tokens':>10}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['name']:<28}{r['median_ms']:>11.2f}{r['mean_ms']:>10.2f}{r['mean_chars']:>10.0f}{r['mean_tokens']:>10.0f}")
+    legacy, new = results
+    print(f"\nspeedup: {legacy['mean_ms'] / new['mean_ms']:.1f}x, "
+          f"prompt tokens: -{100 * (1 - new['mean_tokens'] / max(legacy['mean_tokens'], 1)):.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark of the embedding backends (sentence-transformers vs ONNX vs ONNX int8).
+
+Each backend runs in a fresh subprocess so import time and peak RSS are not
+shared between them. Export the ONNX models first:
+
+    python -m core_logic.embeddings export --int8
+    python benchmarks/embedding_backends.py --sentences 2000
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+BACKENDS = ("sentence-transformers", "onnx", "onnx-int8")
+SAMPLE_TEXTS = [
+    "Empresa de software de gestão para clínicas médicas em São Paulo",
+    "Consultoria em automação de marketing e geração de leads B2B",
+    "Distribuidora de peças automotivas com 12 filiais no sul do Brasil",
+    "Startup de logística que oferece roteirização inteligente para e-commerce",
+    "Escritório de contabilidade especializado em pequenas e médias empresas",
+    "Rede de academias com planos corporativos e aplicativo próprio",
+]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_worker(backend: str, sentences: int, batch_size: int) -> dict:
+    start = time.perf_counter()
+    from core_logic.embeddings import load_embedding_model
+
+    model = load_embedding_model(backend)
+    load_seconds = time.perf_counter() - start
+
+    texts = [f"{SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]} #{i}" for i in range(sentences)]
+    model.encode(texts[:batch_size], batch_size=batch_size, show_progress_bar=False)  # warm-up
+    start = time.perf_counter()
+    model.encode(texts, batch_size=batch_size, show_progress_bar=False)
+    encode_seconds = time.perf_counter() - start
+
+    return {
+        "backend": backend,
+        "model_class": type(model).__name__,
+        "torch_imported": "torch" in sys.modules,
+        "load_seconds": round(load_seconds, 2),
+        "sentences_per_second": round(sentences / encode_seconds, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--sentences", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.sentences, args.batch_size)))
+        return
+
+    results = []
+    for backend in args.backends:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", backend,
+             "--sentences", str(args.sentences), "--batch-size", str(args.batch_size)],
+            capture_output=True, text=True, cwd=PROJECT_ROOT,
+        )
+        if completed.returncode != 0:
+            print(f"{backend}: failed\n{completed.stderr[-2000:]}")
+            continue
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    header = f"{'backend':<22}{'model':<22}{'torch':>6}{'load s':>9}{'sent/s':>10}{'peak RSS MB':>13}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['backend']:<22}{r['model_class']:<22}{str(r['torch_imported']):>6}"
+              f"{r['load_seconds']:>9}{r['sentences_per_second']:>10}{r['peak_rss_mb']:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark of the harvester resource policy (route interception).
+
+Loads each URL twice on the pooled headless browser, once with every resource
+allowed and once with core_logic.resource_policy blocking media, fonts and
+trackers. Both loads wait for network idle like the harvester does. Reports
+bytes received, requests and seconds per page:
+
+    python benchmarks/resource_blocking.py https://www.exemplo.com.br/ https://outra.com.br/
+    python benchmarks/resource_blocking.py --urls-file urls.txt --runs 2
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from playwright.sync_api import Error as PlaywrightError  # noqa: E402
+
+from core_logic.browser_pool import BrowserPool  # noqa: E402
+from core_logic.resource_policy import attach_resource_policy, detach_resource_policy  # noqa: E402
+
+NAVIGATION_TIMEOUT_MS = 60000
+NETWORKIDLE_TIMEOUT_MS = 30000  # Mesmo limite do harvester
+
+
+def load_page(pool: BrowserPool, url: str, blocking: bool) -> Dict[str, object]:
+    with pool.page() as page:
+        traffic = attach_resource_policy(page, url, enabled=blocking)
+        try:
+            page.goto(url, wait_until="domcontentloaded", timeout=NAVIGATION_TIMEOUT_MS)
+            try:
+                page.wait_for_load_state("networkidle", timeout=NETWORKIDLE_TIMEOUT_MS)
+            except PlaywrightError:
+                pass
+            text_chars = len(page.inner_text("body") or "")
+        finally:
+            detach_resource_policy(traffic)
+    return {**traffic.summary(), "text_chars": text_chars}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("urls", nargs="*")
+    parser.add_argument("--urls-file")
+    parser.add_argument("--runs", type=int, default=1)
+    args = parser.parse_args()
+
+    urls: List[str] = list(args.urls)
+    if args.urls_file:
+        with open(args.urls_file, encoding="utf-8") as f:
+            urls.extend(line.strip() for line in f if line.strip())
+    if not urls:
+        parser.error("informe ao menos uma URL")
+
+    pool = BrowserPool()
+    totals = {False: [], True: []}
+    try:
+        print(f"{'url':50} {'modo':10} {'KB':>9} {'req':>5} {'bloq':>5} {'s':>7} {'texto':>7}")
+        for url in urls:
+            for _ in range(args.runs):
+                for blocking in (False, True):
+                    try:
+                        result = load_page(pool, url, blocking)
+                    except Exception as e:
+                        print(f"{url[:50]:50} {'erro':10} {type(e).__name__}: {e}")
+                        continue
+                    totals[blocking].append(result)
+                    mode = "bloqueio" if blocking else "completo"
+                    print(f"{url[:50]:50} {mode:10} {result['bytes_received'] / 1024:9.0f} {result['requests']:5} "
+                          f"{result['blocked_requests']:5} {result['seconds']:7.2f} {result['text_chars']:7}")
+    finally:
+        pool.close()
+
+    print()
+    for blocking in (False, True):
+        results = totals[blocking]
+        if not results:
+            continue
+        mode = "bloqueio" if blocking else "completo"
+        print(f"{mode:10} média: {statistics.mean(r['bytes_received'] for r in results) / 1024:.0f} KB, "
+              f"{statistics.mean(r['seconds'] for r in results):.2f} s por página ({len(results)} cargas)")
+    if totals[False] and totals[True]:
+        saved = 1 - sum(r["bytes_received"] for r in totals[True]) / max(sum(r["bytes_received"] for r in totals[False]), 1)
+        print(f"Redução de bytes: {saved:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""
+Async Playwright harvester for Nellia Prospector
+Renders search results with playwright.async_api, several pages at a time, and
+yields SiteData as soon as each page is extracted, so the pipeline can start
+enriching the first companies while the others are still loading.
+
+Pages come from a shared AsyncBrowserPool. A global limit bounds the open
+pages, a per-domain limit and the politeness scheduler keep any single site
+from being hammered, and rendered text goes through the same fetch cache and
+main-content extraction as the other scrapers.
+"""
+
+import asyncio
+import os
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Dict, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from core_logic.browser_pool import AsyncBrowserPool, PolitenessScheduler
+from core_logic.content_extraction import extract_content
+from core_logic.domain_index import registrable_domain
+from core_logic.fetch_cache import KIND_RENDERED, FetchCache
+from core_logic.negative_cache import VIA_BROWSER, NegativeCache, skip_message
+from core_logic.page_readiness import ReadinessDetector, get_readiness_detector
+from core_logic.resource_policy import attach_resource_policy_async, detach_resource_policy_async
+from core_logic.tiered_fetch import TIERED_FETCH_ENABLED, TieredFetcher, get_tiered_fetcher
+from data_models.lead_structures import ExtractionStatus, GoogleSearchData, SiteData
+
+try:
+    from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+    PLAYWRIGHT_AVAILABLE = True
+except ImportError:
+    PlaywrightTimeoutError = asyncio.TimeoutError
+    PLAYWRIGHT_AVAILABLE = False
+
+HARVESTER_CONCURRENT_PAGES = int(os.getenv("HARVESTER_CONCURRENT_PAGES", "4"))
+HARVESTER_PER_DOMAIN_PAGES = int(os.getenv("HARVESTER_PER_DOMAIN_PAGES", "1"))
+HARVESTER_NAVIGATION_TIMEOUT_MS = int(os.getenv("HARVESTER_NAVIGATION_TIMEOUT_MS", "90000"))
+MAX_EXTRACTED_CHARS = 25000  # Mesmo limite do harvester síncrono
+
+
+def _navigation_error_message(error: Exception) -> str:
+    message = str(error).lower()
+    if "net::err_name_not_resolved" in message:
+        return "FALHA NA EXTRAÇÃO: ERRO DE DNS."
+    if "net::err_connection_refused" in message:
+        return "FALHA NA EXTRAÇÃO: CONEXÃO RECUSADA."
+    if isinstance(error, PlaywrightTimeoutError) or "timeout" in message:
+        return "FALHA NA EXTRAÇÃO: TIMEOUT NA NAVEGAÇÃO."
+    return f"FALHA NA EXTRAÇÃO: ERRO NA NAVEGAÇÃO ({type(error).__name__})."
+
+
+class AsyncHarvester:
+    """
+    Concurrent page renderer on a shared async browser pool.
+
+    Args:
+        pool: Browser pool to lease pages from (a private one is created and closed by aclose() if omitted)
+        concurrency: Maximum pages rendered at the same time
+        per_domain_concurrency: Maximum pages of the same registrable domain rendered at the same time
+        politeness: Spacing between visits to the same domain
+        cache: Optional FetchCache for rendered text
+        readiness: Detector deciding when a page is ready to extract
+        static_first: Try a plain HTTP fetch before rendering (browser only for JS-rendered pages)
+        tiered: Static tier and per-domain tier memory (global one if omitted)
+        negative_cache: Optional NegativeCache; recently failed domains and URLs are skipped
+    """
+
+    def __init__(
+        self,
+        pool: Optional[AsyncBrowserPool] = None,
+        concurrency: int = HARVESTER_CONCURRENT_PAGES,
+        per_domain_concurrency: int = HARVESTER_PER_DOMAIN_PAGES,
+        politeness: Optional[PolitenessScheduler] = None,
+        cache: Optional[FetchCache] = None,
+        readiness: Optional[ReadinessDetector] = None,
+        static_first: bool = TIERED_FETCH_ENABLED,
+        tiered: Optional[TieredFetcher] = None,
+        negative_cache: Optional[NegativeCache] = None,
+    ):
+        self._owns_pool = pool is None
+        self.pool = pool or AsyncBrowserPool()
+        self.concurrency = max(concurrency, 1)
+        self.per_domain_concurrency = max(per_domain_concurrency, 1)
+        self.politeness = politeness or PolitenessScheduler()
+        self.cache = cache
+        self.readiness = readiness or get_readiness_detector()
+        self.tiered = (tiered or get_tiered_fetcher()) if static_first else None
+        self.negative_cache = negative_cache
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._domain_gates: Dict[str, asyncio.Semaphore] = {}
+        self.stats = {"pages": 0, "cache_hits": 0, "errors": 0, "bytes": 0, "blocked_requests": 0, "static": 0, "known_failures": 0}
+
+    def _domain_gate(self, url: str) -> asyncio.Semaphore:
+        domain = registrable_domain(url) or url
+        gate = self._domain_gates.get(domain)
+        if gate is None:
+            gate = self._domain_gates[domain] = asyncio.Semaphore(self.per_domain_concurrency)
+        return gate
+
+    def _known_failure(self, url: str) -> Optional[str]:
+        """Status message if the URL failed recently and is not due for a re-probe."""
+        entry = self.negative_cache.check(url, via=VIA_BROWSER) if self.negative_cache else None
+        if entry is None:
+            return None
+        self.stats["known_failures"] += 1
+        return f"FALHA NA EXTRAÇÃO: {skip_message(entry)}"
+
+    async def _render(self, url: str) -> Tuple[Optional[int], Optional[str], str]:
+        """Render a page and return (HTTP status, html, final url); html is None for error statuses."""
+        async with self.pool.page() as page:
+            page.set_default_navigation_timeout(HARVESTER_NAVIGATION_TIMEOUT_MS)
+            traffic = await attach_resource_policy_async(page, url)
+            try:
+                response = await page.goto(url, wait_until="domcontentloaded")
+                if response and not response.ok and 400 <= response.status < 600:
+                    return response.status, None, page.url
+                readiness = await self.readiness.wait_until_ready_async(page, url)
+                logger.debug(f"Async harvester: {url} ready in {readiness.waited_ms}ms ({readiness.reason})")
+                return response.status if response else None, await page.content(), page.url
+            finally:
+                await detach_resource_policy_async(traffic)
+                self.stats["bytes"] += traffic.bytes_received
+                self.stats["blocked_requests"] += traffic.blocked_requests
+
+    async def extract(self, url: str) -> Tuple[str, str]:
+        """
+        Render and extract one URL; returns (text, status message).
+
+        Failures return the status message as the text, like the sync harvester.
+        """
+        if self.cache:
+            cached_page = await asyncio.to_thread(self.cache.get, url, kind=KIND_RENDERED)
+            if cached_page and (cached_page.is_fresh or self.cache.offline):
+                self.stats["cache_hits"] += 1
+                return cached_page.extracted_text or "", "SUCESSO NA EXTRAÇÃO (VIA CACHE)"
+
+        status = self._known_failure(url)
+        if status:
+            return status, status
+
+        if self.tiered:
+            attempt = await asyncio.to_thread(self.tiered.try_static, url)
+            if attempt.text:
+                self.stats["static"] += 1
+                text = attempt.text[:MAX_EXTRACTED_CHARS]
+                if self.cache:
+                    await asyncio.to_thread(
+                        self.cache.put, url, kind=KIND_RENDERED, final_url=url, title=attempt.title, extracted_text=text,
+                    )
+                return text, "SUCESSO NA EXTRAÇÃO (VIA HTTP)"
+            # Falha de DNS/conexão no fetch HTTP: o navegador falharia do mesmo jeito
+            status = self._known_failure(url)
+            if status:
+                return status, status
+            logger.debug(f"Async harvester: rendering {url} ({attempt.escalation_reason})")
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._domain_gate(url), self._semaphore:
+            await self.politeness.wait_async(url)
+            self.stats["pages"] += 1
+            try:
+                status_code, html, final_url = await self._render(url)
+            except Exception as e:
+                html, status = None, _navigation_error_message(e)
+            else:
+                status = f"FALHA NA EXTRAÇÃO: Página retornou status {status_code}." if html is None else None
+            if status:
+                self.stats["errors"] += 1
+                logger.warning(f"Async harvester: {url} -> {status}")
+                if self.negative_cache:
+                    await asyncio.to_thread(self.negative_cache.record_outcome, url, status, VIA_BROWSER)
+                return status, status
+            if self.tiered:
+                await asyncio.to_thread(self.tiered.record_render, url, True, attempt.escalation_reason)
+            if self.negative_cache:
+                await asyncio.to_thread(self.negative_cache.record_success, url)
+
+        extracted = await asyncio.to_thread(extract_content, html)
+        text = extracted.to_prompt_text()[:MAX_EXTRACTED_CHARS]
+        if not text.strip():
+            status = "FALHA NA EXTRAÇÃO: NENHUM TEXTO OBTIDO."
+            return status, status
+        if self.cache:
+            await asyncio.to_thread(
+                self.cache.put, url, kind=KIND_RENDERED, final_url=final_url, status_code=status_code,
+                title=extracted.title, extracted_text=text,
+            )
+        return text, ExtractionStatus.SUCCESS.value
+
+    async def _site_data(self, result: Dict[str, Any]) -> SiteData:
+        text, status = await self.extract(result["url"])
+        return SiteData(
+            url=result["url"],
+            google_search_data=GoogleSearchData(title=result.get("title") or "", snippet=result.get("snippet") or ""),
+            extracted_text_content=text,
+            extraction_status_message=status,
+        )
+
+    async def iter_results(self, results: Sequence[Dict[str, Any]]) -> AsyncIterator[Tuple[Dict[str, Any], SiteData]]:
+        """
+        Yield (search result, SiteData) pairs for search results ({"url", "title", "snippet"})
+        in completion order. Closing the iterator early cancels the pages still being rendered.
+        """
+        async def paired(result: Dict[str, Any]) -> Tuple[Dict[str, Any], SiteData]:
+            return result, await self._site_data(result)
+
+        tasks = [asyncio.create_task(paired(result)) for result in results if result.get("url")]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def iter_site_data(self, results: Sequence[Dict[str, Any]]) -> AsyncIterator[SiteData]:
+        """Yield SiteData for search results as soon as each page is extracted."""
+        async with aclosing(self.iter_results(results)) as stream:
+            async for _, site_data in stream:
+                yield site_data
+
+    async def aclose(self) -> None:
+        if self._owns_pool:
+            await self.pool.close()
+
+
+async def harvest_site_data(results: Sequence[Dict[str, Any]], **kwargs) -> AsyncIterator[SiteData]:
+    """Render search results with a temporary AsyncHarvester and yield SiteData as pages finish."""
+    harvester = AsyncHarvester(**kwargs)
+    try:
+        async with aclosing(harvester.iter_site_data(results)) as stream:
+            async for site_data in stream:
+                yield site_data
+    finally:
+        await harvester.aclose()
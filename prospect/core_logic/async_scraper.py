@@ -0,0 +1,362 @@
+"""
+Async scraping engine for Nellia Prospector
+Concurrent page fetching over a shared pooled HTTP client (keep-alive, HTTP/2),
+with bounded global concurrency, per-host politeness and response size caps.
+
+Synchronous callers (the ADK1 tools run in worker threads) submit work to a
+background event loop that owns the client, so connections are reused across
+calls and threads. An optional FetchCache serves repeated pages from disk and
+revalidates stale ones with conditional GETs; an optional NegativeCache skips
+domains and URLs that failed recently.
+"""
+
+import asyncio
+import concurrent.futures
+import importlib.util
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlparse
+
+import httpx
+from loguru import logger
+
+from core_logic.content_extraction import extract_content, split_prompt_text
+from core_logic.fetch_cache import CachedPage, FetchCache, get_fetch_cache
+from core_logic.negative_cache import NegativeCache, classify_error, classify_status, get_negative_cache
+
+SCRAPER_MAX_CONCURRENCY = int(os.getenv("SCRAPER_MAX_CONCURRENCY", "10"))
+SCRAPER_PER_HOST_CONCURRENCY = int(os.getenv("SCRAPER_PER_HOST_CONCURRENCY", "2"))
+SCRAPER_PER_HOST_DELAY_SECONDS = float(os.getenv("SCRAPER_PER_HOST_DELAY_SECONDS", "0.5"))
+SCRAPER_MAX_RESPONSE_BYTES = int(os.getenv("SCRAPER_MAX_RESPONSE_BYTES", str(3 * 1024 * 1024)))
+SCRAPER_TIMEOUT_SECONDS = float(os.getenv("SCRAPER_TIMEOUT_SECONDS", "10"))
+
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'pt-BR,pt;q=0.9,en;q=0.8',
+}
+TEXT_CONTENT_TYPES = ('text/', 'application/xhtml', 'application/xml')
+
+
+def clean_url(url: str) -> str:
+    """Strip whitespace and control characters that search results sometimes carry."""
+    return url.strip().replace('\t', '').replace('\n', '').replace('\r', '')
+
+
+def parse_html(html: str) -> Tuple[str, str]:
+    """Return (title, main text followed by the contact section) of an HTML document."""
+    extracted = extract_content(html)
+    return extracted.title, extracted.to_prompt_text()
+
+
+@dataclass
+class FetchResult:
+    """Raw outcome of a single fetch"""
+    url: str
+    final_url: Optional[str] = None
+    status_code: Optional[int] = None
+    content_type: Optional[str] = None
+    text: str = ""
+    bytes_read: int = 0
+    truncated: bool = False
+    elapsed_seconds: float = 0.0
+    # Parte de elapsed_seconds esperando a vez do host / o limite global de conexões
+    queued_seconds: float = 0.0
+    error: Optional[str] = None
+    from_cache: bool = False
+    # Título/texto já extraídos, disponíveis quando a resposta veio do cache
+    title: Optional[str] = None
+    extracted_text: Optional[str] = None
+
+
+class _HostGate:
+    """Per-host concurrency and minimum spacing between request starts"""
+
+    def __init__(self, concurrency: int, delay_seconds: float):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.delay_seconds = delay_seconds
+        self._next_slot = 0.0
+
+    async def wait_turn(self) -> None:
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + self.delay_seconds
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class AsyncScraper:
+    """
+    Shared async scraper.
+
+    All coroutines must run on the scraper's own event loop; use the
+    ``submit``/``scrape_sync`` helpers from other threads or loops.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = SCRAPER_MAX_CONCURRENCY,
+        per_host_concurrency: int = SCRAPER_PER_HOST_CONCURRENCY,
+        per_host_delay_seconds: float = SCRAPER_PER_HOST_DELAY_SECONDS,
+        max_response_bytes: int = SCRAPER_MAX_RESPONSE_BYTES,
+        timeout_seconds: float = SCRAPER_TIMEOUT_SECONDS,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        cache: Optional[FetchCache] = None,
+        negative_cache: Optional[NegativeCache] = None,
+    ):
+        self.max_concurrency = max_concurrency
+        self.per_host_concurrency = per_host_concurrency
+        self.per_host_delay_seconds = per_host_delay_seconds
+        self.max_response_bytes = max_response_bytes
+        self.timeout_seconds = timeout_seconds
+        self._transport = transport
+        self.cache = cache
+        self.negative_cache = negative_cache
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._hosts: Dict[str, _HostGate] = {}
+        self.stats = {"requests": 0, "errors": 0, "bytes": 0, "truncated": 0, "cache_hits": 0, "revalidated": 0, "known_failures": 0}
+
+    # --- Event loop management ---
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="async-scraper", daemon=True)
+                self._thread.start()
+        return self._loop
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE and self._transport is None,
+                headers=DEFAULT_HEADERS,
+                timeout=httpx.Timeout(self.timeout_seconds),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                    keepalive_expiry=30.0,
+                ),
+                follow_redirects=True,
+                transport=self._transport,
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    def _host_gate(self, url: str) -> _HostGate:
+        host = urlparse(url).netloc.lower()
+        gate = self._hosts.get(host)
+        if gate is None:
+            gate = self._hosts[host] = _HostGate(self.per_host_concurrency, self.per_host_delay_seconds)
+        return gate
+
+    # --- Coroutines (run on the scraper loop) ---
+
+    def _from_cache(self, result: FetchResult, cached: CachedPage) -> FetchResult:
+        result.final_url = cached.final_url
+        result.status_code = cached.status_code
+        result.content_type = cached.content_type
+        result.text = cached.body or ""
+        result.title = cached.title
+        result.extracted_text = cached.extracted_text
+        result.from_cache = True
+        self.stats["cache_hits"] += 1
+        return result
+
+    async def _read_body(self, response: httpx.Response, result: FetchResult) -> bytes:
+        if result.content_type and not result.content_type.lower().startswith(TEXT_CONTENT_TYPES):
+            raise ValueError(f"Tipo de conteúdo não suportado: {result.content_type}")
+
+        chunks: List[bytes] = []
+        async for chunk in response.aiter_bytes():
+            remaining = self.max_response_bytes - result.bytes_read
+            if len(chunk) > remaining:
+                chunks.append(chunk[:remaining])
+                result.bytes_read += remaining
+                result.truncated = True
+                break
+            chunks.append(chunk)
+            result.bytes_read += len(chunk)
+        return b"".join(chunks)
+
+    async def fetch(self, url: str) -> FetchResult:
+        """
+        Fetch a URL, reading at most max_response_bytes of the body.
+
+        With a cache, fresh entries are returned without a request and stale
+        ones are revalidated; in offline mode misses fail without a request.
+        Targets with a recent failure in the negative cache fail immediately.
+        """
+        url = clean_url(url)
+        result = FetchResult(url=url)
+        cached = await asyncio.to_thread(self.cache.get, url) if self.cache else None
+        if cached and (cached.is_fresh or self.cache.offline):
+            return self._from_cache(result, cached)
+        if self.cache and self.cache.offline:
+            result.error = "Modo offline: URL ausente do cache de fetch"
+            self.stats["errors"] += 1
+            return result
+        known_failure = self.negative_cache.check(url) if self.negative_cache else None
+        if known_failure:
+            result.error = f"Falha conhecida ({known_failure.failure_class}, {known_failure.failures}x); nova tentativa em {known_failure.retry_in_seconds / 60:.0f} min"
+            self.stats["known_failures"] += 1
+            return result
+        request_headers = cached.conditional_headers() if cached else {}
+        client = self._get_client()
+        gate = self._host_gate(url)
+        start = time.monotonic()
+        try:
+            async with gate.semaphore:
+                await gate.wait_turn()
+                async with self._semaphore:
+                    result.queued_seconds = time.monotonic() - start
+                    self.stats["requests"] += 1
+                    async with client.stream("GET", url, headers=request_headers) as response:
+                        result.final_url = str(response.url)
+                        result.status_code = response.status_code
+                        result.content_type = response.headers.get("content-type", "")
+                        not_modified = response.status_code == 304 and cached is not None
+                        if not not_modified:
+                            response.raise_for_status()
+                            body = await self._read_body(response, result)
+                            encoding = response.charset_encoding or "utf-8"
+                            validators = (response.headers.get("etag"), response.headers.get("last-modified"))
+            if not_modified:
+                await asyncio.to_thread(self.cache.mark_revalidated, url)
+                self.stats["revalidated"] += 1
+                self._from_cache(result, cached)
+            else:
+                try:
+                    result.text = body.decode(encoding, errors="replace")
+                except LookupError:
+                    result.text = body.decode("utf-8", errors="replace")
+                if self.cache:
+                    await asyncio.to_thread(
+                        self.cache.put, url, body=result.text, final_url=result.final_url,
+                        status_code=result.status_code, content_type=result.content_type,
+                        etag=validators[0], last_modified=validators[1],
+                    )
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+            self.stats["errors"] += 1
+        finally:
+            result.elapsed_seconds = time.monotonic() - start
+            self.stats["bytes"] += result.bytes_read
+            if result.truncated:
+                self.stats["truncated"] += 1
+                logger.debug(f"Scraper: resposta de {url} truncada em {self.max_response_bytes} bytes")
+        if self.negative_cache:
+            await asyncio.to_thread(self._record_outcome, result)
+        return result
+
+    def _record_outcome(self, result: FetchResult) -> None:
+        """Feed the negative cache: classified failures (and login redirects) are recorded, successes clear the target."""
+        if result.error:
+            failure_class = classify_status(result.status_code) or classify_error(result.error)
+        else:
+            failure_class = classify_status(None, result.final_url)
+        if failure_class:
+            self.negative_cache.record_failure(result.url, failure_class, detail=result.error or f"redirect: {result.final_url}")
+        elif not result.error:
+            self.negative_cache.record_success(result.url)
+
+    async def scrape(self, url: str) -> Dict[str, Any]:
+        """
+        Fetch and parse a page into {"title", "url", "content", "main_content", "contact_info"}
+        or {"error"}. "content" is the main text followed by the contact section.
+        """
+        fetched = await self.fetch(url)
+        fetch_seconds = round(fetched.elapsed_seconds - fetched.queued_seconds, 3)
+        if fetched.error:
+            return {"error": f"Falha ao buscar conteúdo de {url} (limpa para '{fetched.url}'): {fetched.error}",
+                    "fetch_seconds": fetch_seconds}
+        if fetched.extracted_text is not None:
+            title, content = fetched.title, fetched.extracted_text
+        else:
+            try:
+                title, content = await asyncio.to_thread(parse_html, fetched.text)
+            except Exception as e:
+                return {"error": f"Um erro inesperado ocorreu ao raspar {url} (limpa para '{fetched.url}'): {e}"}
+            if self.cache:
+                await asyncio.to_thread(self.cache.set_extraction, fetched.url, title, content)
+        main_content, contact_info = split_prompt_text(content)
+        return {
+            "title": title, "url": url, "content": content, "main_content": main_content,
+            "contact_info": contact_info, "final_url": fetched.final_url, "fetch_seconds": fetch_seconds,
+        }
+
+    async def scrape_many(self, urls: Sequence[str]) -> List[Dict[str, Any]]:
+        """Scrape URLs concurrently; results keep the input order."""
+        return list(await asyncio.gather(*(self.scrape(url) for url in urls)))
+
+    async def iter_scrape(self, urls: Sequence[str]) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """Yield (index, result) pairs as soon as each scrape completes."""
+        async def indexed(index: int, url: str) -> Tuple[int, Dict[str, Any]]:
+            return index, await self.scrape(url)
+
+        for next_done in asyncio.as_completed([indexed(i, url) for i, url in enumerate(urls)]):
+            yield await next_done
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # --- Thread-safe entry points ---
+
+    def submit(self, url: str) -> concurrent.futures.Future:
+        """Schedule a scrape on the scraper loop and return a thread-safe future."""
+        return asyncio.run_coroutine_threadsafe(self.scrape(url), self._ensure_loop())
+
+    def submit_many(self, urls: Sequence[str]) -> List[concurrent.futures.Future]:
+        """Schedule scrapes for all URLs at once (they run concurrently within the limits)."""
+        return [self.submit(url) for url in urls]
+
+    def scrape_sync(self, url: str) -> Dict[str, Any]:
+        """Blocking scrape for synchronous callers."""
+        return self.submit(url).result()
+
+    def fetch_sync(self, url: str) -> FetchResult:
+        """Blocking raw fetch (body not parsed) for synchronous callers."""
+        return asyncio.run_coroutine_threadsafe(self.fetch(url), self._ensure_loop()).result()
+
+    def scrape_many_sync(self, urls: Sequence[str]) -> List[Dict[str, Any]]:
+        """Blocking concurrent scrape for synchronous callers."""
+        return [future.result() for future in self.submit_many(urls)]
+
+    async def scrape_from_any_loop(self, url: str) -> Dict[str, Any]:
+        """Await a scrape from a different event loop (e.g. the pipeline's)."""
+        return await asyncio.wrap_future(self.submit(url))
+
+    def close(self) -> None:
+        """Close the client and stop the background loop."""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop = None
+        self._thread = None
+
+
+# Global scraper instance
+_scraper_instance: Optional[AsyncScraper] = None
+_scraper_lock = threading.Lock()
+
+def get_async_scraper() -> AsyncScraper:
+    """Get the global async scraper"""
+    global _scraper_instance
+    with _scraper_lock:
+        if _scraper_instance is None:
+            _scraper_instance = AsyncScraper(cache=get_fetch_cache(), negative_cache=get_negative_cache())
+        return _scraper_instance
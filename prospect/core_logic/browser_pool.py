@@ -0,0 +1,383 @@
+"""
+Browser pool for the Playwright harvester
+Keeps a few long-lived headless Chromium instances and recycles their
+contexts/pages across URLs instead of launching a browser per page. Browsers
+are health-checked on every lease and restarted after a number of pages or
+when they crash; pages are recycled a bounded number of times.
+
+Also provides the politeness scheduler that spaces requests to the same
+domain while letting different domains proceed immediately.
+
+The sync Playwright API is bound to the thread that started it, so a
+BrowserPool must be used from a single thread. AsyncBrowserPool is the
+playwright.async_api counterpart, shared by concurrent tasks on one event loop.
+"""
+
+import asyncio
+import os
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from loguru import logger
+
+from core_logic.domain_index import registrable_domain
+from core_logic.rate_limiter import IntervalRateLimiter, PerKeyRateLimiter
+
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "1"))
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "true").lower() in ("1", "true", "yes")
+BROWSER_RESTART_AFTER_PAGES = int(os.getenv("BROWSER_RESTART_AFTER_PAGES", "100"))
+BROWSER_PAGE_MAX_USES = int(os.getenv("BROWSER_PAGE_MAX_USES", "20"))
+BROWSER_LAUNCH_TIMEOUT_MS = int(os.getenv("BROWSER_LAUNCH_TIMEOUT_MS", "75000"))
+# Intervalo mínimo entre visitas ao mesmo domínio registrável (e entre quaisquer visitas, se > 0)
+POLITENESS_PER_DOMAIN_SECONDS = float(os.getenv("POLITENESS_PER_DOMAIN_SECONDS", "2.0"))
+POLITENESS_GLOBAL_SECONDS = float(os.getenv("POLITENESS_GLOBAL_SECONDS", "0.0"))
+
+DEFAULT_CONTEXT_OPTIONS = {
+    "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
+    "java_script_enabled": True,
+    "ignore_https_errors": True,
+    "accept_downloads": False,
+    "viewport": {"width": 1280, "height": 900},
+}
+
+
+class PolitenessScheduler:
+    """Spaces visits per registrable domain; different domains do not wait on each other."""
+
+    def __init__(self, per_domain_seconds: float = POLITENESS_PER_DOMAIN_SECONDS, global_seconds: float = POLITENESS_GLOBAL_SECONDS):
+        self._per_domain = PerKeyRateLimiter(per_domain_seconds)
+        self._global = IntervalRateLimiter(global_seconds)
+
+    def wait(self, url: str) -> float:
+        """Block until ``url`` may be visited; returns the seconds waited."""
+        return self._global.acquire() + self._per_domain.acquire(registrable_domain(url) or url)
+
+    async def wait_async(self, url: str) -> float:
+        """Async counterpart of wait()."""
+        return await self._global.acquire_async() + await self._per_domain.acquire_async(registrable_domain(url) or url)
+
+
+@dataclass
+class PooledPage:
+    """A page leased from the pool, with its own browser context"""
+    page: Any
+    context: Any
+    slot: "_BrowserSlot"
+    uses: int = 0
+
+
+@dataclass
+class _BrowserSlot:
+    browser: Any = None
+    pages_served: int = 0
+    leased: int = 0
+    idle: List[PooledPage] = field(default_factory=list)
+    retired: bool = False
+
+
+def _is_healthy(slot: _BrowserSlot) -> bool:
+    try:
+        return slot.browser is not None and slot.browser.is_connected()
+    except Exception:
+        return False
+
+
+def _default_launcher(headless: bool) -> Callable[[], Any]:
+    state: Dict[str, Any] = {}
+
+    def launch():
+        if "playwright" not in state:
+            from playwright.sync_api import sync_playwright
+
+            state["playwright"] = sync_playwright().start()
+        return state["playwright"].chromium.launch(headless=headless, timeout=BROWSER_LAUNCH_TIMEOUT_MS)
+
+    def stop():
+        if "playwright" in state:
+            state.pop("playwright").stop()
+
+    launch.stop = stop  # type: ignore[attr-defined]
+    return launch
+
+
+class BrowserPool:
+    """
+    Pool of long-lived browsers with recycled pages (sync Playwright API).
+
+    Args:
+        size: Number of browsers; leases are spread round-robin
+        launcher: Callable returning a new browser (defaults to headless Chromium)
+        restart_after_pages: Restart a browser after serving this many pages
+        page_max_uses: Close a page (and its context) after this many leases
+        context_options: Options for ``browser.new_context``
+    """
+
+    def __init__(
+        self,
+        size: int = BROWSER_POOL_SIZE,
+        launcher: Optional[Callable[[], Any]] = None,
+        headless: bool = BROWSER_HEADLESS,
+        restart_after_pages: int = BROWSER_RESTART_AFTER_PAGES,
+        page_max_uses: int = BROWSER_PAGE_MAX_USES,
+        context_options: Optional[Dict[str, Any]] = None,
+    ):
+        self.launcher = launcher or _default_launcher(headless)
+        self.restart_after_pages = restart_after_pages
+        self.page_max_uses = page_max_uses
+        self.context_options = context_options or DEFAULT_CONTEXT_OPTIONS
+        self._slots = [_BrowserSlot() for _ in range(max(size, 1))]
+        self._next_slot = 0
+        self.stats = {"launches": 0, "restarts": 0, "pages_created": 0, "pages_reused": 0, "pages_discarded": 0}
+
+    def _close_page(self, pooled: PooledPage) -> None:
+        self.stats["pages_discarded"] += 1
+        try:
+            pooled.context.close()
+        except Exception:
+            pass
+
+    def _restart(self, slot: _BrowserSlot, reason: str) -> None:
+        if slot.browser is not None:
+            logger.info(f"Browser pool: restarting browser ({reason})")
+            self.stats["restarts"] += 1
+            for pooled in slot.idle:
+                self._close_page(pooled)
+            try:
+                slot.browser.close()
+            except Exception:
+                pass
+        slot.idle.clear()
+        slot.pages_served = 0
+        slot.browser = self.launcher()
+        self.stats["launches"] += 1
+
+    def _pick_slot(self) -> _BrowserSlot:
+        slot = self._slots[self._next_slot]
+        self._next_slot = (self._next_slot + 1) % len(self._slots)
+        if not _is_healthy(slot):
+            self._restart(slot, "not running" if slot.browser is None else "crashed")
+        elif slot.pages_served >= self.restart_after_pages and slot.leased == 0:
+            self._restart(slot, f"{slot.pages_served} pages served")
+        return slot
+
+    def acquire(self) -> PooledPage:
+        """Lease a page; return it with release()."""
+        slot = self._pick_slot()
+        while slot.idle:
+            pooled = slot.idle.pop()
+            if not pooled.page.is_closed():
+                self.stats["pages_reused"] += 1
+                break
+            self._close_page(pooled)
+        else:
+            context = slot.browser.new_context(**self.context_options)
+            pooled = PooledPage(page=context.new_page(), context=context, slot=slot)
+            self.stats["pages_created"] += 1
+        slot.leased += 1
+        return pooled
+
+    def release(self, pooled: PooledPage, discard: bool = False) -> None:
+        """Return a leased page; broken or worn-out pages are closed instead of recycled."""
+        slot = pooled.slot
+        slot.leased -= 1
+        slot.pages_served += 1
+        pooled.uses += 1
+        if discard or pooled.uses >= self.page_max_uses or not _is_healthy(slot) or pooled.page.is_closed():
+            self._close_page(pooled)
+            return
+        try:
+            pooled.page.goto("about:blank")  # Libera a memória da página anterior antes de reutilizá-la
+        except Exception:
+            self._close_page(pooled)
+            return
+        slot.idle.append(pooled)
+
+    @contextmanager
+    def page(self) -> Iterator[Any]:
+        """Lease a page for the duration of a ``with`` block; it is discarded if the block raises."""
+        pooled = self.acquire()
+        try:
+            yield pooled.page
+        except BaseException:
+            self.release(pooled, discard=True)
+            raise
+        self.release(pooled)
+
+    def close(self) -> None:
+        for slot in self._slots:
+            for pooled in slot.idle:
+                self._close_page(pooled)
+            slot.idle.clear()
+            if slot.browser is not None:
+                try:
+                    slot.browser.close()
+                except Exception:
+                    pass
+                slot.browser = None
+        stop = getattr(self.launcher, "stop", None)
+        if stop:
+            stop()
+
+
+def _default_async_launcher(headless: bool) -> Callable[[], Awaitable[Any]]:
+    state: Dict[str, Any] = {}
+
+    async def launch():
+        if "playwright" not in state:
+            from playwright.async_api import async_playwright
+
+            state["playwright"] = await async_playwright().start()
+        return await state["playwright"].chromium.launch(headless=headless, timeout=BROWSER_LAUNCH_TIMEOUT_MS)
+
+    async def stop():
+        if "playwright" in state:
+            await state.pop("playwright").stop()
+
+    launch.stop = stop  # type: ignore[attr-defined]
+    return launch
+
+
+class AsyncBrowserPool:
+    """
+    Async counterpart of BrowserPool (playwright.async_api).
+
+    Pages are leased concurrently, so a browser due for a restart is retired
+    instead of closed: new leases go to a fresh browser and the old one is
+    closed when its last page is returned.
+    """
+
+    def __init__(
+        self,
+        size: int = BROWSER_POOL_SIZE,
+        launcher: Optional[Callable[[], Awaitable[Any]]] = None,
+        headless: bool = BROWSER_HEADLESS,
+        restart_after_pages: int = BROWSER_RESTART_AFTER_PAGES,
+        page_max_uses: int = BROWSER_PAGE_MAX_USES,
+        context_options: Optional[Dict[str, Any]] = None,
+    ):
+        self.launcher = launcher or _default_async_launcher(headless)
+        self.restart_after_pages = restart_after_pages
+        self.page_max_uses = page_max_uses
+        self.context_options = context_options or DEFAULT_CONTEXT_OPTIONS
+        self._slots = [_BrowserSlot() for _ in range(max(size, 1))]
+        self._next_slot = 0
+        self._lock = asyncio.Lock()
+        self.stats = {"launches": 0, "restarts": 0, "pages_created": 0, "pages_reused": 0, "pages_discarded": 0}
+
+    async def _close_page(self, pooled: PooledPage) -> None:
+        self.stats["pages_discarded"] += 1
+        try:
+            await pooled.context.close()
+        except Exception:
+            pass
+
+    async def _close_slot(self, slot: _BrowserSlot) -> None:
+        for pooled in slot.idle:
+            await self._close_page(pooled)
+        slot.idle.clear()
+        if slot.browser is not None:
+            try:
+                await slot.browser.close()
+            except Exception:
+                pass
+            slot.browser = None
+
+    async def _pick_slot(self) -> _BrowserSlot:
+        async with self._lock:
+            index = self._next_slot
+            self._next_slot = (self._next_slot + 1) % len(self._slots)
+            slot = self._slots[index]
+            healthy = _is_healthy(slot)
+            if healthy and slot.pages_served < self.restart_after_pages:
+                return slot
+            if slot.browser is not None:
+                reason = "crashed" if not healthy else f"{slot.pages_served} pages served"
+                logger.info(f"Browser pool: restarting browser ({reason})")
+                self.stats["restarts"] += 1
+                slot.retired = True
+                if slot.leased == 0:
+                    await self._close_slot(slot)
+            slot = self._slots[index] = _BrowserSlot(browser=await self.launcher())
+            self.stats["launches"] += 1
+            return slot
+
+    async def acquire(self) -> PooledPage:
+        """Lease a page; return it with release()."""
+        slot = await self._pick_slot()
+        slot.leased += 1
+        try:
+            while slot.idle:
+                pooled = slot.idle.pop()
+                if not pooled.page.is_closed():
+                    self.stats["pages_reused"] += 1
+                    return pooled
+                await self._close_page(pooled)
+            context = await slot.browser.new_context(**self.context_options)
+            self.stats["pages_created"] += 1
+            return PooledPage(page=await context.new_page(), context=context, slot=slot)
+        except BaseException:
+            slot.leased -= 1
+            raise
+
+    async def release(self, pooled: PooledPage, discard: bool = False) -> None:
+        """Return a leased page; broken or worn-out pages are closed instead of recycled."""
+        slot = pooled.slot
+        slot.leased -= 1
+        slot.pages_served += 1
+        pooled.uses += 1
+        if slot.retired:
+            await self._close_page(pooled)
+            if slot.leased == 0:
+                await self._close_slot(slot)
+            return
+        if discard or pooled.uses >= self.page_max_uses or not _is_healthy(slot) or pooled.page.is_closed():
+            await self._close_page(pooled)
+            return
+        try:
+            await pooled.page.goto("about:blank")
+        except Exception:
+            await self._close_page(pooled)
+            return
+        slot.idle.append(pooled)
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Any]:
+        """Lease a page for the duration of an ``async with`` block; it is discarded if the block raises."""
+        pooled = await self.acquire()
+        try:
+            yield pooled.page
+        except BaseException:
+            await self.release(pooled, discard=True)
+            raise
+        await self.release(pooled)
+
+    async def close(self) -> None:
+        for slot in self._slots:
+            await self._close_slot(slot)
+        stop = getattr(self.launcher, "stop", None)
+        if stop:
+            await stop()
+
+
+# Global pool instance (harvester main thread)
+_pool_instance: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+def get_browser_pool() -> BrowserPool:
+    """Get the global browser pool"""
+    global _pool_instance
+    with _pool_lock:
+        if _pool_instance is None:
+            _pool_instance = BrowserPool()
+        return _pool_instance
+
+
+def close_browser_pool() -> None:
+    """Close the global browser pool and its browsers"""
+    global _pool_instance
+    with _pool_lock:
+        if _pool_instance is not None:
+            _pool_instance.close()
+            _pool_instance = None
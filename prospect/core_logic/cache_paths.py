@@ -0,0 +1,18 @@
+"""
+Default locations of the on-disk caches
+Every cache lives under the project's .cache directory, resolved from this
+file rather than from the working directory, so runs started from another
+directory (cron, the CLI, tests) find the same fetch cache, negative cache,
+learned waits and checkpoints. CACHE_DIR moves all of them at once; each
+cache's own *_PATH variable still overrides its file.
+"""
+
+import os
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.abspath(os.getenv("CACHE_DIR", os.path.join(PROJECT_DIR, ".cache")))
+
+
+def cache_path(*parts: str) -> str:
+    """Absolute path of a file or directory inside the project cache directory."""
+    return os.path.join(CACHE_DIR, *parts)
@@ -0,0 +1,261 @@
+"""
+Main-content extraction for Nellia Prospector
+Turns raw HTML into the text that is sent to the LLMs: boilerplate (scripts,
+navigation, cookie banners, link-heavy menus) is removed, the main content
+region is detected, and contact-bearing sections (footer e-mails, phones,
+addresses) are kept separately so they survive the cleanup.
+
+Uses lxml; falls back to BeautifulSoup ``get_text`` when lxml is missing.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from loguru import logger
+
+try:
+    import lxml.etree
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# Marker between main content and contact section in the prompt text
+CONTACT_SECTION_HEADER = "--- Contatos ---"
+MIN_MAIN_CONTENT_CHARS = 200
+MAX_LINK_DENSITY = 0.6
+# Um bloco com mais do que esta fração do texto da página nunca é tratado como boilerplate
+MAX_BOILERPLATE_SHARE = 0.5
+
+_NOISE_TAGS = (
+    "script", "style", "noscript", "svg", "iframe", "template", "canvas", "object", "embed",
+    "button", "input", "select", "textarea", "option", "link", "meta", "head",
+)
+_BOILERPLATE_TAGS = ("nav", "header", "footer", "aside", "menu")
+_BOILERPLATE_ROLES = {"navigation", "banner", "contentinfo", "complementary", "search", "menu", "menubar", "dialog"}
+_BOILERPLATE_PATTERN = re.compile(
+    r"(^|[\s_-])(nav|navbar|menu|breadcrumbs?|footer|rodape|sidebar|cookies?|consent|gdpr|lgpd|modal|popup|"
+    r"newsletter|subscribe|share|social|sharing|banner-ads?|advert|ads|widget|skip-link|sr-only|visually-hidden)($|[\s_-])",
+    re.IGNORECASE,
+)
+_CONTACT_PATTERN = re.compile(r"(contact|contato|fale-?conosco|endereco|address|atendimento)", re.IGNORECASE)
+_LINK_HEAVY_TAGS = ("ul", "ol", "div", "section", "table", "dl")
+_BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "fieldset", "figcaption",
+    "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav",
+    "ol", "p", "pre", "section", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "ul",
+}
+_MAIN_SELECTORS = ("//main", "//*[@role='main']", "//article")
+
+EMAIL_PATTERN = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b")
+PHONE_PATTERN = re.compile(r"(?:\+?55\s?)?(?:\(?\d{2}\)?\s?)?(?:9\s?)?\d{4}[-\s]?\d{4}\b")
+_ADDRESS_PATTERN = re.compile(r"\b(rua|av|avenida|alameda|rodovia|estrada|praça|cep|bairro|cnpj)\b\.?", re.IGNORECASE)
+_WHITESPACE_PATTERN = re.compile(r"[ \t\r\f\v\u00a0\u200b-\u200d\ufeff]+")
+
+
+@dataclass
+class ExtractedContent:
+    """Main text of a page plus its contact-bearing sections"""
+    title: str
+    main_text: str
+    contact_text: str = ""
+    emails: List[str] = field(default_factory=list)
+    phones: List[str] = field(default_factory=list)
+    method: str = "body"  # "landmark", "body" or "fallback"
+
+    def to_prompt_text(self) -> str:
+        """Main text followed by the contact section, the format stored as scraped content."""
+        if not self.contact_text:
+            return self.main_text
+        return f"{self.main_text}\n\n{CONTACT_SECTION_HEADER}\n{self.contact_text}"
+
+
+def split_prompt_text(text: str) -> Tuple[str, str]:
+    """Inverse of ExtractedContent.to_prompt_text: return (main text, contact text)."""
+    main_text, _, contact_text = text.partition(f"\n\n{CONTACT_SECTION_HEADER}\n")
+    return main_text, contact_text
+
+
+def _attr_text(el) -> str:
+    return f"{el.get('class', '')} {el.get('id', '')}"
+
+
+def _is_hidden(el) -> bool:
+    style = (el.get("style") or "").replace(" ", "").lower()
+    return (
+        el.get("hidden") is not None
+        or el.get("aria-hidden") == "true"
+        or "display:none" in style
+        or "visibility:hidden" in style
+    )
+
+
+def _is_boilerplate(el) -> bool:
+    if el.tag == "header" and el.find(".//h1") is not None:
+        return False  # Cabeçalhos "hero" costumam trazer o nome e a proposta da empresa
+    return (
+        el.tag in _BOILERPLATE_TAGS
+        or el.get("role") in _BOILERPLATE_ROLES
+        or bool(_BOILERPLATE_PATTERN.search(_attr_text(el)))
+    )
+
+
+def _is_contact_bearing(el) -> bool:
+    if el.tag == "address" or _CONTACT_PATTERN.search(_attr_text(el)):
+        return True
+    if el.xpath(".//a[starts-with(@href, 'mailto:') or starts-with(@href, 'tel:')]"):
+        return True
+    text = el.text_content()
+    return bool(EMAIL_PATTERN.search(text) or PHONE_PATTERN.search(text))
+
+
+def _collect_text(root) -> str:
+    """Text of an element with line breaks at block boundaries, whitespace collapsed."""
+    parts: List[str] = []
+
+    def walk(el):
+        is_element = isinstance(el.tag, str)
+        is_block = is_element and el.tag in _BLOCK_TAGS
+        if is_block:
+            parts.append("\n")
+        if is_element and el.text:
+            parts.append(el.text)
+        for child in el:
+            walk(child)
+            if child.tail:
+                parts.append(child.tail)
+        if is_block:
+            parts.append("\n")
+
+    walk(root)
+    lines: List[str] = []
+    for line in "".join(parts).split("\n"):
+        line = _WHITESPACE_PATTERN.sub(" ", line).strip()
+        if line and (not lines or lines[-1] != line):
+            lines.append(line)
+    return "\n".join(lines)
+
+
+def _contact_texts(el) -> List[str]:
+    """Contact lines of a boilerplate block: address/contact elements plus lines with e-mails, phones or addresses."""
+    texts = [
+        _collect_text(node) for node in el.iter()
+        if isinstance(node.tag, str) and (node.tag == "address" or _CONTACT_PATTERN.search(_attr_text(node)))
+    ]
+    texts.extend(
+        line for line in _collect_text(el).split("\n")
+        if EMAIL_PATTERN.search(line) or PHONE_PATTERN.search(line) or _ADDRESS_PATTERN.search(line)
+    )
+    return texts
+
+
+def _link_density(el) -> float:
+    text_length = len(el.text_content().strip())
+    if not text_length:
+        return 0.0
+    link_length = sum(len(a.text_content().strip()) for a in el.iter("a"))
+    return link_length / text_length
+
+
+def _drop(el) -> None:
+    parent = el.getparent()
+    if parent is not None:
+        el.drop_tree()
+
+
+def _dedupe_lines(texts: List[str]) -> str:
+    seen = set()
+    lines = []
+    for text in texts:
+        for line in text.split("\n"):
+            if line not in seen:
+                seen.add(line)
+                lines.append(line)
+    return "\n".join(lines)
+
+
+def _fallback_extract(html: str) -> ExtractedContent:
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    title = soup.title.string.strip() if soup.title and soup.title.string else "No Title Found"
+    for element in soup(["script", "style"]):
+        element.extract()
+    return ExtractedContent(title=title, main_text=soup.get_text(separator=" ", strip=True), method="fallback")
+
+
+def extract_content(html: str) -> ExtractedContent:
+    """
+    Extract title, main text and contact sections from an HTML document.
+
+    Args:
+        html: Raw HTML
+
+    Returns:
+        ExtractedContent; ``method`` tells whether a main landmark was used
+    """
+    if not LXML_AVAILABLE:
+        return _fallback_extract(html)
+    if not html or not html.strip():
+        return ExtractedContent(title="No Title Found", main_text="")
+    try:
+        # Sem a declaração de encoding, o lxml recusa strings com <?xml encoding=...?>
+        root = lxml.html.document_fromstring(re.sub(r"^\s*<\?xml[^>]*\?>", "", html))
+    except (lxml.etree.ParserError, ValueError) as e:
+        logger.debug(f"Content extraction: lxml failed ({e}), using fallback parser")
+        return _fallback_extract(html)
+
+    title_nodes = root.xpath("//title/text()") or root.xpath("//meta[@property='og:title']/@content")
+    title = _WHITESPACE_PATTERN.sub(" ", title_nodes[0]).strip() if title_nodes else ""
+    title = title or "No Title Found"
+
+    lxml.etree.strip_elements(root, lxml.etree.Comment, *_NOISE_TAGS, with_tail=False)
+    for el in list(root.iter()):
+        if isinstance(el.tag, str) and _is_hidden(el):
+            _drop(el)
+
+    page_length = len(root.text_content()) or 1
+    def is_minor(el) -> bool:
+        return len(el.text_content()) <= page_length * MAX_BOILERPLATE_SHARE
+
+    # Seções de contato dentro do boilerplate são preservadas antes da limpeza
+    contact_texts: List[str] = []
+    emails = {href[7:].split("?")[0] for href in root.xpath("//a[starts-with(@href, 'mailto:')]/@href")}
+    phones = {href[4:].strip() for href in root.xpath("//a[starts-with(@href, 'tel:')]/@href")}
+    boilerplate = [el for el in root.iter() if isinstance(el.tag, str) and el.tag not in ("html", "body") and _is_boilerplate(el)]
+    for el in boilerplate:
+        if el.getparent() is None or not is_minor(el):
+            continue  # Já removido junto com um ancestral, ou é o próprio conteúdo da página
+        if _is_contact_bearing(el):
+            contact_texts.extend(_contact_texts(el))
+        _drop(el)
+    for el in root.xpath("//address | //*[contains(@class, 'contato') or contains(@id, 'contato') or contains(@class, 'contact') or contains(@id, 'contact')]"):
+        if el.getparent() is not None:
+            contact_texts.append(_collect_text(el))
+
+    # Menus não marcados como nav: blocos curtos dominados por links
+    for el in list(root.iter(*_LINK_HEAVY_TAGS)):
+        if el.getparent() is not None and is_minor(el) and _link_density(el) > MAX_LINK_DENSITY:
+            _drop(el)
+
+    method = "body"
+    main_root = root.find("body") if root.find("body") is not None else root
+    for selector in _MAIN_SELECTORS:
+        candidates = root.xpath(selector)
+        if len(candidates) == 1 and len(candidates[0].text_content().strip()) >= MIN_MAIN_CONTENT_CHARS:
+            main_root, method = candidates[0], "landmark"
+            break
+
+    main_text = _collect_text(main_root)
+    contact_text = _dedupe_lines([text for text in contact_texts if text])
+    emails.update(EMAIL_PATTERN.findall(contact_text))
+    phones.update(match.strip() for match in PHONE_PATTERN.findall(contact_text))
+    return ExtractedContent(
+        title=title,
+        main_text=main_text,
+        contact_text=contact_text,
+        emails=sorted(emails),
+        phones=sorted(phones),
+        method=method,
+    )
@@ -0,0 +1,138 @@
+"""
+Per-tenant context profile cache for the pipeline preamble
+Every job used to turn the business context into a search query with a fresh
+ADK runner (one LLM round trip), build the enriched RAG context and write it
+to disk and read it back. For a tenant that runs job after job with the same
+business context all of that produces the same result.
+
+A profile holds what the preamble produces (search query, query variants,
+enriched context dict and the serialized RAG text), keyed by a fingerprint of
+the business context. Each tenant keeps only its latest profile: a job with a
+changed context misses, regenerates and replaces it. Profiles are persisted
+to a JSON file so they survive restarts.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from loguru import logger
+
+from core_logic.cache_paths import cache_path
+
+CONTEXT_PROFILE_CACHE_ENABLED = os.getenv("CONTEXT_PROFILE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CONTEXT_PROFILE_CACHE_PATH = os.path.abspath(os.getenv("CONTEXT_PROFILE_CACHE_PATH", cache_path("context_profiles.json")))
+CONTEXT_PROFILE_TTL_HOURS = float(os.getenv("CONTEXT_PROFILE_TTL_HOURS", str(7 * 24)))
+CONTEXT_PROFILE_MAX_TENANTS = int(os.getenv("CONTEXT_PROFILE_MAX_TENANTS", "5000"))
+# Incrementar quando a geração de query ou o formato do contexto enriquecido mudar
+PROFILE_VERSION = 1
+
+# Campos do contexto que variam por job sem mudar a query nem o contexto RAG
+VOLATILE_CONTEXT_KEYS = frozenset({"max_leads_to_generate"})
+
+
+def context_fingerprint(business_context: Dict[str, Any]) -> str:
+    """Stable hash of the parts of a business context that shape the preamble."""
+    relevant = {key: value for key, value in business_context.items() if key not in VOLATILE_CONTEXT_KEYS}
+    payload = json.dumps({"v": PROFILE_VERSION, "context": relevant}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class ContextProfile:
+    """Everything the pipeline preamble derives from one business context"""
+    context_hash: str
+    search_query: str
+    enriched_context: Dict[str, Any]
+    rag_context_text: str
+    query_variants: List[str] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+
+
+class ContextProfileCache:
+    """
+    Latest context profile of each tenant (user), persisted to a JSON file.
+
+    Args:
+        path: JSON file the profiles are persisted to (None keeps them in memory)
+        ttl_hours: Age after which a profile is regenerated even if the context is unchanged
+        max_tenants: Profiles kept; the oldest are dropped first
+    """
+
+    def __init__(self, path: Optional[str] = CONTEXT_PROFILE_CACHE_PATH, ttl_hours: float = CONTEXT_PROFILE_TTL_HOURS,
+                 max_tenants: int = CONTEXT_PROFILE_MAX_TENANTS):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_tenants = max_tenants
+        self._lock = threading.Lock()
+        self._profiles: Dict[str, ContextProfile] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._profiles = {tenant: ContextProfile(**data) for tenant, data in json.load(f).items()}
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning(f"Context profile cache: ignoring unreadable cache file '{path}': {e}")
+
+    def get(self, tenant_id: str, business_context: Dict[str, Any]) -> Optional[ContextProfile]:
+        """The tenant's profile if it was built from this same context and is still fresh."""
+        with self._lock:
+            profile = self._profiles.get(tenant_id)
+        if profile is None:
+            return None
+        if profile.context_hash != context_fingerprint(business_context):
+            logger.info(f"Context profile cache: business context of tenant {tenant_id} changed; regenerating")
+            return None
+        if time.time() - profile.created_at > self.ttl_seconds:
+            return None
+        return profile
+
+    def put(self, tenant_id: str, business_context: Dict[str, Any], search_query: str, enriched_context: Dict[str, Any],
+            rag_context_text: str, query_variants: Optional[List[str]] = None) -> ContextProfile:
+        profile = ContextProfile(
+            context_hash=context_fingerprint(business_context),
+            search_query=search_query,
+            enriched_context=enriched_context,
+            rag_context_text=rag_context_text,
+            query_variants=list(query_variants or []),
+        )
+        with self._lock:
+            self._profiles.pop(tenant_id, None)
+            self._profiles[tenant_id] = profile  # Reinserido no fim: a ordem do dict é a de atualização
+            while len(self._profiles) > self.max_tenants:
+                self._profiles.pop(next(iter(self._profiles)))
+            self._persist()
+        return profile
+
+    def invalidate(self, tenant_id: str) -> None:
+        with self._lock:
+            if self._profiles.pop(tenant_id, None) is not None:
+                self._persist()
+
+    def _persist(self) -> None:
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({tenant: asdict(profile) for tenant, profile in self._profiles.items()}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except (OSError, TypeError) as e:
+            logger.debug(f"Context profile cache: failed to persist cache: {e}")
+
+
+# Global cache instance
+_context_profile_cache_instance: Optional[ContextProfileCache] = None
+_context_profile_cache_lock = threading.Lock()
+
+def get_context_profile_cache() -> ContextProfileCache:
+    """Get the global context profile cache"""
+    global _context_profile_cache_instance
+    with _context_profile_cache_lock:
+        if _context_profile_cache_instance is None:
+            _context_profile_cache_instance = ContextProfileCache()
+        return _context_profile_cache_instance
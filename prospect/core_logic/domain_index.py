@@ -0,0 +1,218 @@
+"""
+Domain canonicalization and URL dedup for Nellia Prospector
+Search engines often return several URLs of the same company (www and bare
+domain, /contato, /sobre, tracking parameters). DomainIndex collapses search
+results to one entry per registrable domain, so each company is scraped,
+extracted and enriched once; the other URLs are kept as its subpages.
+
+Registrable domains follow the Public Suffix List including its private
+section, so each site on a shared host (padariaboa.wixsite.com,
+loja.lojaintegrada.com.br, x.blogspot.com) is its own company. tldextract's
+bundled list is used when installed; the built-in suffix lists below cover
+the markets we prospect and the common site builders either way.
+"""
+
+import ipaddress
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from loguru import logger
+
+from core_logic.fetch_cache import normalize_url
+
+try:
+    import tldextract
+    TLDEXTRACT_AVAILABLE = True
+except ImportError:
+    TLDEXTRACT_AVAILABLE = False
+
+# Sufixos públicos com mais de um rótulo (o domínio registrável tem um rótulo a mais)
+MULTI_PART_SUFFIXES = frozenset({
+    # Brasil (registro.br)
+    "com.br", "net.br", "org.br", "gov.br", "edu.br", "mil.br", "art.br", "adv.br", "arq.br", "eng.br",
+    "ind.br", "inf.br", "med.br", "odo.br", "psi.br", "srv.br", "tec.br", "tur.br", "eco.br", "emp.br",
+    "app.br", "dev.br", "log.br", "agr.br", "coop.br", "esp.br", "etc.br", "far.br", "imb.br", "jor.br",
+    "leg.br", "mus.br", "not.br", "ntr.br", "rec.br", "seg.br", "slg.br", "tmp.br", "tv.br", "vet.br",
+    "blog.br", "wiki.br", "ong.br", "jus.br", "mp.br", "b.br", "def.br", "fm.br", "g12.br", "am.br",
+    # América Latina
+    "com.ar", "gob.ar", "org.ar", "net.ar", "com.mx", "gob.mx", "org.mx", "com.co", "gov.co", "org.co",
+    "com.pe", "gob.pe", "com.uy", "gub.uy", "com.py", "gov.py", "com.bo", "com.ec", "gob.ec", "cl.cl",
+    "com.ve", "com.pa",
+    # Outros mercados frequentes
+    "co.uk", "org.uk", "ac.uk", "gov.uk", "ltd.uk", "plc.uk", "com.pt", "gov.pt", "org.pt",
+    "com.au", "net.au", "org.au", "gov.au", "co.nz", "co.jp", "co.in", "co.za", "com.cn", "com.es",
+    "com.sg", "com.hk", "com.tr", "co.il",
+})
+
+# Sufixos privados de hospedagem / construtores de sites: cada subdomínio é um site (e uma empresa) diferente
+HOSTED_SITE_SUFFIXES = frozenset({
+    "wixsite.com", "blogspot.com", "blogspot.com.br", "lojaintegrada.com.br", "webnode.com.br", "webnode.page",
+    "negocio.site", "business.site", "myshopify.com", "weebly.com", "godaddysites.com", "webflow.io",
+    "github.io", "gitlab.io", "netlify.app", "vercel.app", "pages.dev", "herokuapp.com", "web.app",
+    "firebaseapp.com", "appspot.com", "azurewebsites.net", "wordpress.com", "tumblr.com", "carrd.co",
+    "mercadoshops.com.br", "nuvemshop.com.br", "lojavirtualnuvem.com.br",
+})
+_KNOWN_SUFFIXES = MULTI_PART_SUFFIXES | HOSTED_SITE_SUFFIXES
+_MAX_SUFFIX_LABELS = max(suffix.count(".") + 1 for suffix in _KNOWN_SUFFIXES)
+
+_tld_extractor = None
+
+
+_HOST_PATTERN = re.compile(r"^[\w.-]+$")  # Inclui domínios internacionalizados (ex.: açaí.com.br)
+
+
+def _host(url: str) -> str:
+    parts = urlsplit(url.strip() if "://" in url else f"http://{url.strip()}")
+    host = (parts.hostname or "").lower().rstrip(".")
+    return host if _HOST_PATTERN.match(host) else ""
+
+
+def registrable_domain(url: str) -> str:
+    """
+    Registrable domain of a URL or host: 'https://www.loja.acme.com.br/x' -> 'acme.com.br'.
+
+    IP addresses and single-label hosts are returned unchanged; '' for invalid input.
+    """
+    host = _host(url)
+    if not host:
+        return ""
+    try:
+        ipaddress.ip_address(host)
+        return host
+    except ValueError:
+        pass
+    return _registrable_host(host)
+
+
+@lru_cache(maxsize=50000)
+def _registrable_host(host: str) -> str:
+    labels = host.split(".")
+    suffix_labels = 1
+    for count in range(min(_MAX_SUFFIX_LABELS, len(labels)), 1, -1):
+        if ".".join(labels[-count:]) in _KNOWN_SUFFIXES:
+            suffix_labels = count
+            break
+    builtin = ".".join(labels[-(suffix_labels + 1):])
+    # A lista pública (com a seção privada) pode conhecer um sufixo mais específico que as nossas
+    psl = _psl_registrable_domain(host)
+    return psl if psl and psl.count(".") > builtin.count(".") else builtin
+
+
+def _psl_registrable_domain(host: str) -> str:
+    global _tld_extractor
+    if not TLDEXTRACT_AVAILABLE:
+        return ""
+    try:
+        if _tld_extractor is None:
+            # Somente a cópia da lista embutida no pacote: nenhuma requisição de rede
+            _tld_extractor = tldextract.TLDExtract(suffix_list_urls=(), include_psl_private_domains=True)
+        return _tld_extractor(host).registered_domain
+    except Exception as e:
+        logger.debug(f"Domain index: tldextract failed for '{host}': {e}")
+        return ""
+
+
+def canonical_url(url: str) -> str:
+    """
+    Canonical form used for URL-level dedup: normalize_url without the 'www.' prefix.
+    """
+    normalized = normalize_url(url)
+    parts = urlsplit(normalized)
+    if parts.netloc.startswith("www."):
+        normalized = normalized.replace(parts.netloc, parts.netloc[4:], 1)
+    return normalized
+
+
+def _path_depth(url: str) -> Tuple[int, int]:
+    parts = urlsplit(canonical_url(url))
+    segments = [segment for segment in parts.path.split("/") if segment]
+    return len(segments) + (1 if parts.query else 0), len(parts.path)
+
+
+@dataclass
+class DomainEntry:
+    """All search results seen for one registrable domain"""
+    domain: str
+    results: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def primary(self) -> Dict[str, Any]:
+        """The result to scrape: the shallowest URL (homepage first), ties broken by search rank."""
+        return min(self.results, key=lambda result: _path_depth(result["url"]))
+
+    @property
+    def subpage_urls(self) -> List[str]:
+        primary_url = self.primary["url"]
+        return [result["url"] for result in self.results if result["url"] != primary_url]
+
+
+class DomainIndex:
+    """
+    One entry per registrable domain, in first-seen order.
+
+    Shared by the ADK1 tools (Tavily results) and the harvester (Google results);
+    an index can be fed from several searches to dedup across sources.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, DomainEntry] = {}
+        self._canonical_urls = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, url: str) -> bool:
+        return registrable_domain(url) in self._entries
+
+    def add(self, result: Dict[str, Any]) -> bool:
+        """
+        Add a search result; returns True if it is the first result of its domain.
+
+        Results without a valid http(s) URL and exact duplicates (after
+        canonicalization) are ignored and return False.
+        """
+        url = result.get("url") or ""
+        domain = registrable_domain(url)
+        if not domain or not url.startswith("http"):
+            return False
+        canonical = canonical_url(url)
+        if canonical in self._canonical_urls:
+            return False
+        self._canonical_urls.add(canonical)
+
+        entry = self._entries.get(domain)
+        is_new = entry is None
+        if is_new:
+            entry = self._entries[domain] = DomainEntry(domain=domain)
+        entry.results.append(result)
+        return is_new
+
+    def add_many(self, results: Iterable[Dict[str, Any]]) -> int:
+        """Add several results; returns how many new domains were found."""
+        return sum(self.add(result) for result in results)
+
+    def entry(self, url: str) -> Optional[DomainEntry]:
+        return self._entries.get(registrable_domain(url))
+
+    def entries(self) -> List[DomainEntry]:
+        return list(self._entries.values())
+
+    def results(self) -> List[Dict[str, Any]]:
+        """
+        One result per domain (its primary), annotated with ``domain`` and
+        ``duplicate_urls`` (the other URLs of the same company).
+        """
+        return [
+            {**entry.primary, "domain": entry.domain, "duplicate_urls": entry.subpage_urls}
+            for entry in self._entries.values()
+        ]
+
+
+def dedupe_by_domain(results: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Collapse search results to one per registrable domain (see DomainIndex.results)."""
+    index = DomainIndex()
+    index.add_many(results)
+    return index.results()
@@ -0,0 +1,278 @@
+"""
+Shared embedding model for Nellia Prospector
+Loads the sentence embedding model once per process so the RAG pipeline,
+the prospect profiler and the semantic cache all reuse the same instance.
+
+Two backends are available, selected by EMBEDDING_BACKEND:
+- "sentence-transformers" (default): full-precision PyTorch model
+- "onnx" / "onnx-int8": exported ONNX model run through onnxruntime, without
+  importing torch. Export once with ``python -m core_logic.embeddings export [--int8]``.
+"""
+
+import argparse
+import importlib.util
+import inspect
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, List, Optional, Sequence
+
+from loguru import logger
+
+from core_logic.cache_paths import cache_path
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+EMBEDDING_ONNX_DIR = os.path.abspath(os.getenv("EMBEDDING_ONNX_DIR", cache_path("onnx", EMBEDDING_MODEL_NAME)))
+EMBEDDING_ONNX_THREADS = int(os.getenv("EMBEDDING_ONNX_THREADS", "0"))  # 0 = onnxruntime default
+EMBEDDING_BATCH_SIZE = 32
+
+ONNX_BACKENDS = ("onnx", "onnx-int8")
+ONNX_MODEL_FILE = "model.onnx"
+ONNX_INT8_MODEL_FILE = "model_int8.onnx"
+ONNX_CONFIG_FILE = "embedding_config.json"
+
+SENTENCE_TRANSFORMERS_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+ONNX_RUNTIME_AVAILABLE = (
+    importlib.util.find_spec("onnxruntime") is not None and importlib.util.find_spec("tokenizers") is not None
+)
+EMBEDDING_LIBRARIES_AVAILABLE = np is not None and (SENTENCE_TRANSFORMERS_AVAILABLE or ONNX_RUNTIME_AVAILABLE)
+
+_model_instance: Optional[Any] = None
+_model_lock = threading.Lock()
+
+
+class OnnxEmbeddingModel:
+    """
+    MiniLM sentence embeddings through onnxruntime.
+
+    Reproduces the sentence-transformers pipeline (tokenize, transformer,
+    mean pooling over the attention mask, optional L2 normalization) and
+    exposes the subset of the SentenceTransformer API used in this project.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = False):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_path = Path(model_dir)
+        config = json.loads((model_path / ONNX_CONFIG_FILE).read_text(encoding="utf-8"))
+        self.max_seq_length = config["max_seq_length"]
+        self.normalize = config["normalize"]
+        self.dimension = config["dimension"]
+
+        self.tokenizer = Tokenizer.from_file(str(model_path / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding(pad_id=config["pad_token_id"], pad_token=config["pad_token"])
+
+        options = onnxruntime.SessionOptions()
+        if EMBEDDING_ONNX_THREADS:
+            options.intra_op_num_threads = EMBEDDING_ONNX_THREADS
+        model_file = ONNX_INT8_MODEL_FILE if quantized else ONNX_MODEL_FILE
+        self.session = onnxruntime.InferenceSession(
+            str(model_path / model_file), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+
+    def encode(
+        self,
+        sentences: Any,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        show_progress_bar: bool = False,
+        normalize_embeddings: bool = False,
+        **_,
+    ) -> "np.ndarray":
+        """Encode a string or list of strings into a float32 matrix (a vector for a single string)."""
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.dimension), dtype="float32")
+
+        # Lote por comprimento para minimizar padding; a ordem original é restaurada no final
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        embeddings = np.zeros((len(texts), self.dimension), dtype="float32")
+        for start in range(0, len(order), batch_size):
+            batch_ids = order[start:start + batch_size]
+            embeddings[batch_ids] = self._encode_batch([texts[i] for i in batch_ids])
+
+        if self.normalize or normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.maximum(norms, 1e-12)
+        return embeddings[0] if single else embeddings
+
+    def _encode_batch(self, texts: List[str]) -> "np.ndarray":
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        return summed / np.maximum(mask.sum(axis=1), 1e-9)
+
+
+def export_onnx_model(
+    output_dir: str = EMBEDDING_ONNX_DIR,
+    model_name_or_path: str = EMBEDDING_MODEL_NAME,
+    quantize: bool = False,
+) -> Path:
+    """
+    Export a sentence-transformers model to ONNX (and optionally a dynamic int8 copy).
+
+    Needs torch and sentence-transformers; run it at build time, not in the workers.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize
+
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    st_model = SentenceTransformer(model_name_or_path, device="cpu")
+    transformer = st_model[0]
+    tokenizer = transformer.tokenizer
+    pooling = st_model[1]
+    # sentence-transformers < 6 exposes pooling_mode_mean_tokens, >= 6 a pooling_mode string
+    mean_pooling = getattr(pooling, "pooling_mode_mean_tokens", None) or getattr(pooling, "pooling_mode", None) == "mean"
+    if not mean_pooling:
+        raise ValueError(f"Only mean pooling models can be exported, got {pooling}")
+
+    class _TransformerWrapper(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(
+                input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids
+            ).last_hidden_state
+
+    dummy = tokenizer(["export sample", "a second, longer export sample"], padding=True, return_tensors="pt")
+    token_type_ids = dummy.get("token_type_ids", torch.zeros_like(dummy["input_ids"]))
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in
+                    ("input_ids", "attention_mask", "token_type_ids", "last_hidden_state")}
+    model_file = output_path / ONNX_MODEL_FILE
+    # torch >= 2.5 defaults to the dynamo exporter; the TorchScript exporter handles dynamic_axes
+    export_options = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.no_grad():
+        torch.onnx.export(
+            _TransformerWrapper(transformer.auto_model.eval()),
+            (dummy["input_ids"], dummy["attention_mask"], token_type_ids),
+            str(model_file),
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            **export_options,
+        )
+
+    tokenizer.save_pretrained(str(output_path))
+    config = {
+        "model_name": model_name_or_path,
+        "max_seq_length": st_model.max_seq_length,
+        "normalize": any(isinstance(module, Normalize) for module in st_model),
+        "dimension": st_model.get_sentence_embedding_dimension(),
+        "pad_token": tokenizer.pad_token,
+        "pad_token_id": tokenizer.pad_token_id,
+    }
+    (output_path / ONNX_CONFIG_FILE).write_text(json.dumps(config, indent=2), encoding="utf-8")
+    logger.success(f"Exported '{model_name_or_path}' to {model_file}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(str(model_file), str(output_path / ONNX_INT8_MODEL_FILE), weight_type=QuantType.QInt8)
+        logger.success(f"Wrote int8 model to {output_path / ONNX_INT8_MODEL_FILE}")
+    return output_path
+
+
+def load_embedding_model(backend: str = EMBEDDING_BACKEND, onnx_dir: str = EMBEDDING_ONNX_DIR) -> Any:
+    """
+    Load an embedding model for the given backend.
+
+    ONNX backends fall back to sentence-transformers when onnxruntime or any
+    file of the exported model (config, tokenizer, the chosen model file) is missing.
+    """
+    if backend in ONNX_BACKENDS:
+        quantized = backend == "onnx-int8"
+        required = (ONNX_CONFIG_FILE, "tokenizer.json", ONNX_INT8_MODEL_FILE if quantized else ONNX_MODEL_FILE)
+        missing = [name for name in required if not Path(onnx_dir, name).exists()]
+        if ONNX_RUNTIME_AVAILABLE and not missing:
+            logger.info(f"Loading ONNX embedding model from '{onnx_dir}' (int8={quantized})...")
+            return OnnxEmbeddingModel(onnx_dir, quantized=quantized)
+        logger.warning(
+            f"Embedding backend '{backend}' unavailable (onnxruntime installed: {ONNX_RUNTIME_AVAILABLE}, "
+            f"model dir: '{onnx_dir}', missing files: {missing}); falling back to sentence-transformers"
+        )
+    elif backend != "sentence-transformers":
+        logger.warning(f"Unknown embedding backend '{backend}', using sentence-transformers")
+
+    if not SENTENCE_TRANSFORMERS_AVAILABLE:
+        raise ImportError("sentence-transformers is required for embeddings")
+    from sentence_transformers import SentenceTransformer
+
+    logger.info(f"Loading embedding model '{EMBEDDING_MODEL_NAME}'...")
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+
+def get_embedding_model() -> Any:
+    """
+    Get the process-wide embedding model, loading it on first use.
+
+    Raises:
+        ImportError: If no embedding backend is installed
+    """
+    global _model_instance
+    if _model_instance is None:
+        with _model_lock:
+            if _model_instance is None:
+                _model_instance = load_embedding_model()
+                logger.success(f"Embedding model ready ({type(_model_instance).__name__})")
+    return _model_instance
+
+
+def set_embedding_model(model: Any) -> None:
+    """Replace the shared embedding model (used by tests and custom backends)."""
+    global _model_instance
+    with _model_lock:
+        _model_instance = model
+
+
+def encode_texts(texts: Sequence[str], normalize: bool = False) -> "np.ndarray":
+    """
+    Encode texts with the shared model into a float32 matrix.
+
+    Args:
+        texts: Texts to embed
+        normalize: L2-normalize rows so inner product equals cosine similarity
+    """
+    embeddings = get_embedding_model().encode(list(texts), show_progress_bar=False)
+    embeddings = np.asarray(embeddings, dtype="float32")
+    if embeddings.ndim == 1:
+        embeddings = embeddings.reshape(1, -1)
+    if normalize:
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.maximum(norms, 1e-12)
+    return embeddings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embedding model utilities")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="Export the embedding model to ONNX")
+    export_parser.add_argument("--model", default=EMBEDDING_MODEL_NAME)
+    export_parser.add_argument("--output-dir", default=EMBEDDING_ONNX_DIR)
+    export_parser.add_argument("--int8", action="store_true", help="Also write a dynamic int8 quantized model")
+    args = parser.parse_args()
+    export_onnx_model(args.output_dir, args.model, quantize=args.int8)
@@ -0,0 +1,313 @@
+"""
+On-disk HTTP fetch cache for Nellia Prospector
+Company pages are fetched again and again across jobs and users; this cache
+keeps their compressed bodies and extracted text in a SQLite file keyed by
+normalized URL, so repeated scrapes are served locally or revalidated with a
+conditional GET (ETag / Last-Modified) instead of downloaded again.
+
+Entries expire after a per-domain TTL and the file is bounded in size by
+evicting the least recently used entries. With FETCH_CACHE_OFFLINE=1 the cache
+acts as a local stand-in for the network: stale entries are served and misses
+fail without any request, which keeps test runs deterministic.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from loguru import logger
+
+from core_logic.cache_paths import cache_path
+
+FETCH_CACHE_ENABLED = os.getenv("FETCH_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+FETCH_CACHE_PATH = os.path.abspath(os.getenv("FETCH_CACHE_PATH", cache_path("fetch_cache.sqlite3")))
+FETCH_CACHE_MAX_BYTES = int(os.getenv("FETCH_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+FETCH_CACHE_TTL_SECONDS = float(os.getenv("FETCH_CACHE_TTL_SECONDS", str(24 * 3600)))
+# Per-domain TTL overrides in seconds, e.g. "linkedin.com=3600,gov.br=604800" (subdomains included)
+FETCH_CACHE_DOMAIN_TTLS = os.getenv("FETCH_CACHE_DOMAIN_TTLS", "")
+FETCH_CACHE_OFFLINE = os.getenv("FETCH_CACHE_OFFLINE", "false").lower() in ("1", "true", "yes")
+
+# Kind of entry: raw HTTP responses (with validators), text extracted from a rendered browser page,
+# or search-engine result pages (results serialized as JSON in extracted_text)
+KIND_HTTP = "http"
+KIND_RENDERED = "rendered"
+KIND_SERP = "serp"
+
+_TRACKING_PARAM_PREFIXES = ("utm_",)
+_TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "_ga", "ref", "srsltid"}
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    cache_key TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    url TEXT NOT NULL,
+    final_url TEXT,
+    status_code INTEGER,
+    content_type TEXT,
+    etag TEXT,
+    last_modified TEXT,
+    body BLOB,
+    title TEXT,
+    extracted_text BLOB,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    last_access REAL NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (cache_key, kind)
+);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+"""
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL into a cache key.
+
+    Lowercases scheme and host, drops default ports, fragments, tracking
+    parameters and trailing slashes, and sorts the query string.
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "http").lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    path = parts.path or "/"
+    if len(path) > 1:
+        path = path.rstrip("/") or "/"
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in _TRACKING_PARAMS and not key.lower().startswith(_TRACKING_PARAM_PREFIXES)
+    )
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def _parse_domain_ttls(spec: str) -> Dict[str, float]:
+    ttls = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        domain, _, value = item.partition('=')
+        try:
+            ttls[domain.strip().lower().lstrip('.')] = float(value)
+        except ValueError:
+            logger.warning(f"Fetch cache: ignoring invalid TTL '{item}'")
+    return ttls
+
+
+def _compress(text: Optional[str]) -> Optional[bytes]:
+    return zlib.compress(text.encode("utf-8"), 6) if text is not None else None
+
+
+def _decompress(blob: Optional[bytes]) -> Optional[str]:
+    return zlib.decompress(blob).decode("utf-8") if blob is not None else None
+
+
+@dataclass
+class CachedPage:
+    """A cache entry with its body and extracted text decompressed"""
+    url: str
+    kind: str
+    final_url: Optional[str]
+    status_code: Optional[int]
+    content_type: Optional[str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body: Optional[str]
+    title: Optional[str]
+    extracted_text: Optional[str]
+    fetched_at: float
+    expires_at: float
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    @property
+    def can_revalidate(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Headers for a conditional GET against this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class FetchCache:
+    """
+    SQLite-backed fetch cache shared by the scrapers.
+
+    Safe to use from several threads; several processes can share the same
+    file (WAL journal).
+    """
+
+    def __init__(
+        self,
+        path: str = FETCH_CACHE_PATH,
+        max_bytes: int = FETCH_CACHE_MAX_BYTES,
+        default_ttl_seconds: float = FETCH_CACHE_TTL_SECONDS,
+        domain_ttls: Optional[Dict[str, float]] = None,
+        offline: bool = FETCH_CACHE_OFFLINE,
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.default_ttl_seconds = default_ttl_seconds
+        self.domain_ttls = domain_ttls if domain_ttls is not None else _parse_domain_ttls(FETCH_CACHE_DOMAIN_TTLS)
+        self.offline = offline
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "revalidated": 0, "stores": 0, "evictions": 0}
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def ttl_for(self, url: str) -> float:
+        """TTL of a URL: the most specific matching domain override, else the default."""
+        host = (urlsplit(url.strip()).hostname or "").lower()
+        labels = host.split(".")
+        for i in range(len(labels)):
+            ttl = self.domain_ttls.get(".".join(labels[i:]))
+            if ttl is not None:
+                return ttl
+        return self.default_ttl_seconds
+
+    def get(self, url: str, kind: str = KIND_HTTP) -> Optional[CachedPage]:
+        """Return the entry for a URL (fresh or stale), or None on a miss."""
+        key = normalize_url(url)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, final_url, status_code, content_type, etag, last_modified, body, title, "
+                "extracted_text, fetched_at, expires_at FROM entries WHERE cache_key = ? AND kind = ?",
+                (key, kind),
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute(
+                "UPDATE entries SET last_access = ? WHERE cache_key = ? AND kind = ?", (time.time(), key, kind)
+            )
+            self._conn.commit()
+
+        page = CachedPage(
+            url=row[0], kind=kind, final_url=row[1], status_code=row[2], content_type=row[3],
+            etag=row[4], last_modified=row[5], body=_decompress(row[6]), title=row[7],
+            extracted_text=_decompress(row[8]), fetched_at=row[9], expires_at=row[10],
+        )
+        self.stats["hits" if page.is_fresh else "stale_hits"] += 1
+        return page
+
+    def put(
+        self,
+        url: str,
+        kind: str = KIND_HTTP,
+        body: Optional[str] = None,
+        final_url: Optional[str] = None,
+        status_code: Optional[int] = None,
+        content_type: Optional[str] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        title: Optional[str] = None,
+        extracted_text: Optional[str] = None,
+        ttl_seconds: Optional[float] = None,
+    ) -> None:
+        """
+        Store (or replace) the entry for a URL and evict old entries if over the size bound.
+
+        ttl_seconds overrides the per-domain TTL for this entry.
+        """
+        body_blob = _compress(body)
+        text_blob = _compress(extracted_text)
+        size = len(body_blob or b"") + len(text_blob or b"") + len(url)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (cache_key, kind, url, final_url, status_code, content_type, etag, "
+                "last_modified, body, title, extracted_text, fetched_at, expires_at, last_access, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (normalize_url(url), kind, url, final_url, status_code, content_type, etag, last_modified,
+                 body_blob, title, text_blob, now, now + (ttl_seconds if ttl_seconds is not None else self.ttl_for(url)), now, size),
+            )
+            self.stats["stores"] += 1
+            self._evict_locked()
+            self._conn.commit()
+
+    def set_extraction(self, url: str, title: Optional[str], extracted_text: Optional[str], kind: str = KIND_HTTP) -> None:
+        """Attach extracted title/text to an existing entry so the next hit skips parsing."""
+        text_blob = _compress(extracted_text)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE entries SET title = ?, extracted_text = ?, size = size - COALESCE(LENGTH(extracted_text), 0) + ? "
+                "WHERE cache_key = ? AND kind = ?",
+                (title, text_blob, len(text_blob or b""), normalize_url(url), kind),
+            )
+            self._evict_locked()
+            self._conn.commit()
+
+    def mark_revalidated(self, url: str, kind: str = KIND_HTTP) -> None:
+        """The origin answered 304 Not Modified: extend the entry's expiry."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE entries SET fetched_at = ?, expires_at = ?, last_access = ? WHERE cache_key = ? AND kind = ?",
+                (now, now + self.ttl_for(url), now, normalize_url(url), kind),
+            )
+            self._conn.commit()
+        self.stats["revalidated"] += 1
+
+    def invalidate(self, url: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE cache_key = ?", (normalize_url(url),))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    def total_bytes(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def _evict_locked(self) -> None:
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT cache_key, kind, size FROM entries ORDER BY last_access ASC").fetchall()
+        evicted = []
+        for cache_key, kind, size in rows:
+            if total <= self.max_bytes:
+                break
+            evicted.append((cache_key, kind))
+            total -= size
+        self._conn.executemany("DELETE FROM entries WHERE cache_key = ? AND kind = ?", evicted)
+        self.stats["evictions"] += len(evicted)
+        logger.debug(f"Fetch cache: evicted {len(evicted)} entries to stay under {self.max_bytes} bytes")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+# Global cache instance
+_cache_instance: Optional[FetchCache] = None
+_cache_lock = threading.Lock()
+
+def get_fetch_cache() -> Optional[FetchCache]:
+    """Get the global fetch cache, or None when FETCH_CACHE_ENABLED is off"""
+    global _cache_instance
+    if not FETCH_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache_instance is None:
+            _cache_instance = FetchCache()
+            logger.info(f"Fetch cache at '{FETCH_CACHE_PATH}' (offline={FETCH_CACHE_OFFLINE})")
+        return _cache_instance
@@ -0,0 +1,298 @@
+"""
+Incremental harvester output (JSONL) and resumable checkpoints
+The harvester appends one JSON line per site as soon as it is extracted,
+framed by a header line (query, timestamp, sites targeted) and a footer line
+written when the run finishes. A crash loses at most the site in flight, and
+downstream loaders can read or tail the file while the harvest is running.
+
+A small checkpoint file next to the output keeps the Google results and the
+URLs already harvested, so ``harvester.py --resume`` continues the same file
+without searching again or revisiting finished URLs.
+"""
+
+import asyncio
+import datetime
+import json
+import os
+import re
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set, Tuple, TypeVar, Union
+
+from loguru import logger
+
+RECORD_HEADER = "header"
+RECORD_SITE = "site"
+RECORD_FOOTER = "footer"
+# Modo follow: encerra depois desse tempo sem linhas novas (harvester morto não deixa o loader preso)
+HARVEST_FOLLOW_IDLE_TIMEOUT_SECONDS = float(os.getenv("HARVEST_FOLLOW_IDLE_TIMEOUT_SECONDS", "600"))
+
+T = TypeVar("T")
+
+
+def checkpoint_path_for(query: str, output_folder: str) -> str:
+    """Checkpoint location for a query (one resumable run per query and output folder)."""
+    safe_query = re.sub(r"[-\s]+", "-", re.sub(r"[^\w\s-]", "", query).strip())[:30] or "query"
+    return os.path.join(output_folder, f"harvest_checkpoint_{safe_query}.json")
+
+
+class HarvestStreamWriter:
+    """
+    Appends harvested site payloads to a JSONL file, one flushed line per site.
+
+    Args:
+        path: JSONL output file
+        original_query: Search query of the run (written in the header)
+        total_targeted: Number of search results targeted
+        resume: Keep appending to an existing file instead of starting a new one
+    """
+
+    def __init__(self, path: str, original_query: str, total_targeted: int, resume: bool = False):
+        self.path = path
+        self.sites_written = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        has_header = resume and os.path.exists(path) and os.path.getsize(path) > 0
+        if has_header:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                ends_mid_line = f.read(1) != b"\n"
+        self._file = open(path, "a" if has_header else "w", encoding="utf-8")
+        if has_header and ends_mid_line:
+            self._file.write("\n")  # Isola a linha cortada pela interrupção anterior
+        if not has_header:
+            self._write({
+                "record": RECORD_HEADER,
+                "original_query": original_query,
+                "collection_timestamp": datetime.datetime.now().isoformat(),
+                "total_sites_targeted_for_processing": total_targeted,
+            })
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def append(self, payload: Dict[str, Any]) -> None:
+        self._write({"record": RECORD_SITE, **payload})
+        self.sites_written += 1
+
+    def close(self, completed: bool = True) -> None:
+        if self._file.closed:
+            return
+        if completed:
+            self._write({"record": RECORD_FOOTER, "completed_timestamp": datetime.datetime.now().isoformat()})
+        self._file.close()
+
+    def __enter__(self) -> "HarvestStreamWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close(completed=exc_type is None)
+
+
+class HarvestCheckpoint:
+    """Search results and finished URLs of a run, saved atomically after every site"""
+
+    def __init__(self, path: str, query: str, output_path: str, results: List[Dict[str, Any]],
+                 completed_urls: Optional[Set[str]] = None):
+        self.path = path
+        self.query = query
+        self.output_path = output_path
+        self.results = results
+        self.completed_urls: Set[str] = set(completed_urls or ())
+
+    @classmethod
+    def load(cls, path: str) -> Optional["HarvestCheckpoint"]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(path, data["query"], data["output_path"], data["results"], set(data.get("completed_urls", [])))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Harvest checkpoint: ignoring unreadable checkpoint '{path}': {e}")
+            return None
+
+    @property
+    def pending_results(self) -> List[Dict[str, Any]]:
+        return [result for result in self.results if result["url"] not in self.completed_urls]
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"query": self.query, "output_path": self.output_path, "results": self.results,
+                       "completed_urls": sorted(self.completed_urls)}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def mark_done(self, url: str) -> None:
+        self.completed_urls.add(url)
+        self.save()
+
+    def remove(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _parse_line(line: str) -> Optional[Dict[str, Any]]:
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return None  # Linha parcial (escrita em andamento) ou corrompida
+    return record if isinstance(record, dict) else None
+
+
+def read_harvest_jsonl(path: str) -> Dict[str, Any]:
+    """
+    Read a (possibly still growing) harvest JSONL file into the HarvesterOutput shape.
+
+    A site harvested twice (run interrupted before its checkpoint was saved) keeps its last payload.
+    """
+    header: Dict[str, Any] = {}
+    sites: Dict[str, Dict[str, Any]] = {}
+    completed = False
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            record = _parse_line(line)
+            if not record:
+                continue
+            kind = record.pop("record", RECORD_SITE)
+            if kind == RECORD_HEADER:
+                header = record
+            elif kind == RECORD_FOOTER:
+                completed = True
+            else:
+                sites[record["url"]] = record
+    return {
+        "original_query": header.get("original_query", ""),
+        "collection_timestamp": header.get("collection_timestamp", datetime.datetime.now().isoformat()),
+        "total_sites_targeted_for_processing": header.get("total_sites_targeted_for_processing", len(sites)),
+        "total_sites_processed_in_extraction_phase": len(sites),
+        "sites_data": list(sites.values()),
+        "completed": completed,
+    }
+
+
+def _read_new_records(path: str, position: int) -> Tuple[List[Dict[str, Any]], int, bool]:
+    """
+    Site records appended after `position`; returns (records, new position, footer reached).
+
+    A partial last line (still being written) is left for the next read.
+    """
+    records: List[Dict[str, Any]] = []
+    if not os.path.exists(path):
+        return records, position, False
+    with open(path, encoding="utf-8") as f:
+        f.seek(position)
+        while True:
+            line = f.readline()
+            if not line.endswith("\n"):
+                return records, position, False
+            position = f.tell()
+            record = _parse_line(line)
+            if not record:
+                continue
+            kind = record.pop("record", RECORD_SITE)
+            if kind == RECORD_FOOTER:
+                return records, position, True
+            if kind == RECORD_SITE:
+                records.append(record)
+
+
+def follow_harvest_jsonl(path: str, poll_interval: float = 1.0,
+                         idle_timeout: Optional[float] = HARVEST_FOLLOW_IDLE_TIMEOUT_SECONDS) -> Iterator[Dict[str, Any]]:
+    """
+    Tail a harvest JSONL file, yielding site payloads as the harvester appends them.
+
+    Stops at the footer line, or after `idle_timeout` seconds without new lines (None waits forever).
+    """
+    position = 0
+    last_activity = time.monotonic()
+    while True:
+        records, new_position, finished = _read_new_records(path, position)
+        if new_position != position:
+            position, last_activity = new_position, time.monotonic()
+        yield from records
+        if finished or (idle_timeout is not None and time.monotonic() - last_activity > idle_timeout):
+            return
+        time.sleep(poll_interval)
+
+
+async def follow_harvest_jsonl_async(path: str, poll_interval: float = 1.0,
+                                     idle_timeout: Optional[float] = HARVEST_FOLLOW_IDLE_TIMEOUT_SECONDS) -> AsyncIterator[Dict[str, Any]]:
+    """Async counterpart of follow_harvest_jsonl(): waits with asyncio.sleep instead of blocking the event loop."""
+    position = 0
+    last_activity = time.monotonic()
+    while True:
+        records, new_position, finished = _read_new_records(path, position)
+        if new_position != position:
+            position, last_activity = new_position, time.monotonic()
+        for record in records:
+            yield record
+        if finished or (idle_timeout is not None and time.monotonic() - last_activity > idle_timeout):
+            return
+        await asyncio.sleep(poll_interval)
+
+
+def _check_follow_path(path: str) -> None:
+    if not path.endswith(".jsonl"):
+        raise ValueError(f"Follow mode needs the streaming JSONL harvest file, got '{path}'")
+
+
+def follow_harvest_sites(path: str, poll_interval: float = 1.0,
+                         idle_timeout: Optional[float] = HARVEST_FOLLOW_IDLE_TIMEOUT_SECONDS) -> Iterator[Dict[str, Any]]:
+    """
+    Follow mode for the downstream loaders: tail a harvest JSONL file (see follow_harvest_jsonl),
+    yielding each site once even if a resumed run harvested it again.
+    """
+    _check_follow_path(path)
+    seen_urls: Set[str] = set()
+    for record in follow_harvest_jsonl(path, poll_interval=poll_interval, idle_timeout=idle_timeout):
+        if record.get("url") in seen_urls:
+            continue
+        seen_urls.add(record.get("url"))
+        yield record
+
+
+async def follow_harvest_sites_async(path: str, poll_interval: float = 1.0,
+                                     idle_timeout: Optional[float] = HARVEST_FOLLOW_IDLE_TIMEOUT_SECONDS) -> AsyncIterator[Dict[str, Any]]:
+    """Async counterpart of follow_harvest_sites(), for loaders running inside an event loop."""
+    _check_follow_path(path)
+    seen_urls: Set[str] = set()
+    async for record in follow_harvest_jsonl_async(path, poll_interval=poll_interval, idle_timeout=idle_timeout):
+        if record.get("url") in seen_urls:
+            continue
+        seen_urls.add(record.get("url"))
+        yield record
+
+
+async def iterate_limited(items: Union[Iterable[T], AsyncIterator[T]], limit: Optional[int] = None) -> AsyncIterator[T]:
+    """Iterate a list or an async stream (follow mode) in an async loop, stopping after `limit` items."""
+    if limit is not None and limit <= 0:
+        return
+    count = 0
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+            count += 1
+            if limit is not None and count >= limit:
+                return
+    else:
+        for item in items:
+            yield item
+            count += 1
+            if limit is not None and count >= limit:
+                return
+
+
+def load_harvest_file(path: str) -> Dict[str, Any]:
+    """Load harvester output from either the final JSON file or the streaming JSONL file."""
+    if path.endswith(".jsonl"):
+        data = read_harvest_jsonl(path)
+        if not data["completed"]:
+            logger.info(f"Harvest file '{path}' is still being written; using the {len(data['sites_data'])} sites available so far")
+        data.pop("completed")
+        return data
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
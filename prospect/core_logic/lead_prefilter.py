@@ -0,0 +1,254 @@
+"""
+Lead pre-qualification filter for Nellia Prospector
+Cheap checks that reject search results which are obviously not company pages
+(news articles, encyclopedia entries, job boards, marketplace listings) before
+a Gemini extraction call is spent on them.
+
+Two stages:
+- check_url: domain and path rules, applied to search results before scraping;
+  a path rule only says the page is not the company's own page, so the
+  decision carries the site's homepage for the search stage to use instead
+- check_page: page-type heuristics on the scraped title and text, plus an
+  optional embedding similarity between the page and the search query
+
+``evaluate`` measures precision and recall against labeled samples:
+
+    python -m core_logic.lead_prefilter tests/fixtures/prefilter_samples.jsonl
+"""
+
+import argparse
+import json
+import os
+import re
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+from loguru import logger
+
+from core_logic.signal_scoring import KeywordSet
+
+LEAD_PREFILTER_ENABLED = os.getenv("LEAD_PREFILTER_ENABLED", "true").lower() in ("1", "true", "yes")
+LEAD_PREFILTER_USE_EMBEDDINGS = os.getenv("LEAD_PREFILTER_USE_EMBEDDINGS", "false").lower() in ("1", "true", "yes")
+LEAD_PREFILTER_MIN_SIMILARITY = float(os.getenv("LEAD_PREFILTER_MIN_SIMILARITY", "0.15"))
+MIN_PAGE_CHARS = 100
+# Número mínimo de sinais de um tipo de página não-empresa para rejeitar
+MIN_PAGE_TYPE_SIGNALS = 2
+SIMILARITY_TEXT_CHARS = 2000
+
+# Domínios (e subdomínios) que nunca são o site de uma empresa prospectável
+NON_COMPANY_DOMAINS: Dict[str, str] = {
+    **dict.fromkeys((
+        "wikipedia.org", "wikiwand.com", "wikidata.org", "dicio.com.br", "significados.com.br",
+    ), "reference"),
+    **dict.fromkeys((
+        "globo.com", "uol.com.br", "estadao.com.br", "folha.uol.com.br", "terra.com.br", "r7.com",
+        "cnnbrasil.com.br", "exame.com", "infomoney.com.br", "valor.globo.com", "forbes.com.br",
+        "istoedinheiro.com.br", "bbc.com", "reuters.com", "nytimes.com", "techcrunch.com",
+        "medium.com", "startse.com", "tecmundo.com.br", "olhardigital.com.br", "metropoles.com",
+    ), "news"),
+    **dict.fromkeys((
+        "indeed.com", "indeed.com.br", "glassdoor.com", "glassdoor.com.br", "vagas.com.br", "catho.com.br",
+        "infojobs.com.br", "gupy.io", "trabalhabrasil.com.br", "empregos.com.br", "solides.jobs",
+    ), "jobs"),
+    **dict.fromkeys((
+        "mercadolivre.com.br", "mercadolibre.com", "amazon.com", "amazon.com.br", "shopee.com.br",
+        "magazineluiza.com.br", "americanas.com.br", "olx.com.br", "aliexpress.com", "elo7.com.br",
+        "casasbahia.com.br", "submarino.com.br", "enjoei.com.br",
+    ), "marketplace"),
+    **dict.fromkeys((
+        "youtube.com", "reddit.com", "quora.com", "twitter.com", "x.com", "tiktok.com", "pinterest.com",
+        "reclameaqui.com.br", "scribd.com", "slideshare.net", "jusbrasil.com.br",
+    ), "aggregator"),
+}
+
+# Caminhos de páginas que não descrevem a empresa; caminhos como /produtos/erp ou /blog/... ficam de fora:
+# em sites de empresas eles costumam ser justamente as páginas de produtos e conteúdo da empresa
+_NON_COMPANY_PATHS = (
+    ("news", re.compile(r"/(noticias?|news|materias?|colunas?)(/|$)|/20\d{2}/\d{2}/", re.IGNORECASE)),
+    ("jobs", re.compile(r"/(vagas?|jobs?|job-openings?|trabalhe-conosco/vaga)/.+", re.IGNORECASE)),
+    ("marketplace", re.compile(r"/MLB-?\d+", re.IGNORECASE)),
+    ("reference", re.compile(r"/wiki/", re.IGNORECASE)),
+)
+_DOCUMENT_EXTENSIONS = (".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".zip")
+
+PAGE_TYPE_KEYWORDS: Dict[str, KeywordSet] = {
+    "news": KeywordSet((
+        "publicado em", "atualizado em", "por redação", "leia também", "leia mais", "min de leitura",
+        "minutos de leitura", "compartilhe esta notícia", "reportagem", "colunista", "newsletter do dia",
+        "published on", "min read", "related articles",
+    )),
+    "jobs": KeywordSet((
+        "candidate-se", "candidatar-se", "vaga de", "vagas abertas", "requisitos da vaga", "regime de contratação",
+        "salário", "faixa salarial", "apply now", "job description", "responsabilidades e atribuições",
+    )),
+    "marketplace": KeywordSet((
+        "adicionar ao carrinho", "comprar agora", "frete grátis", "vendido por", "parcelas sem juros",
+        "avaliações do produto", "calcular frete", "add to cart", "buy now", "mais vendidos",
+    )),
+    "reference": KeywordSet((
+        "origem: wikipédia", "enciclopédia livre", "[editar]", "from wikipedia", "the free encyclopedia",
+        "significado de", "definição de",
+    )),
+}
+COMPANY_KEYWORDS = KeywordSet((
+    "sobre nós", "quem somos", "nossa empresa", "nossos serviços", "nossas soluções", "nossos produtos",
+    "fale conosco", "entre em contato", "solicite um orçamento", "solicite uma demonstração",
+    "agende uma demonstração", "nossos clientes", "cnpj", "missão, visão", "trabalhe conosco",
+    "about us", "our services", "contact us", "request a demo",
+))
+
+
+@dataclass
+class PrefilterDecision:
+    """
+    Outcome of a pre-filter check; ``reason`` names the rule that rejected the page.
+    ``homepage_url`` is set when only the path was rejected: the site itself may be a company.
+    """
+    accept: bool
+    reason: str = "ok"
+    page_type: str = "company"
+    similarity: Optional[float] = None
+    homepage_url: Optional[str] = None
+
+
+def _domain_rule(host: str) -> Optional[str]:
+    labels = host.split(".")
+    for i in range(len(labels) - 1):
+        page_type = NON_COMPANY_DOMAINS.get(".".join(labels[i:]))
+        if page_type:
+            return page_type
+    return None
+
+
+def embedding_similarity(query: str, text: str) -> float:
+    """Cosine similarity between the query and the page text using the shared embedding model."""
+    from core_logic.embeddings import encode_texts
+
+    embeddings = encode_texts([query, text[:SIMILARITY_TEXT_CHARS]], normalize=True)
+    return float(embeddings[0] @ embeddings[1])
+
+
+class LeadPrefilter:
+    """
+    Rejects non-company pages before the LLM extraction.
+
+    Args:
+        similarity_fn: Optional ``(query, text) -> float`` scorer; pages below
+            ``min_similarity`` are rejected. Defaults to ``embedding_similarity``
+            when LEAD_PREFILTER_USE_EMBEDDINGS is set.
+        min_similarity: Threshold for ``similarity_fn``
+    """
+
+    def __init__(
+        self,
+        similarity_fn: Optional[Callable[[str, str], float]] = None,
+        min_similarity: float = LEAD_PREFILTER_MIN_SIMILARITY,
+    ):
+        if similarity_fn is None and LEAD_PREFILTER_USE_EMBEDDINGS:
+            from core_logic.embeddings import EMBEDDING_LIBRARIES_AVAILABLE
+
+            if EMBEDDING_LIBRARIES_AVAILABLE:
+                similarity_fn = embedding_similarity
+            else:
+                logger.warning("Lead prefilter: embeddings requested but no embedding backend is installed")
+        self.similarity_fn = similarity_fn
+        self.min_similarity = min_similarity
+        self.stats: Dict[str, int] = {"accepted": 0, "rejected": 0}
+
+    def _record(self, decision: PrefilterDecision) -> PrefilterDecision:
+        key = "accepted" if decision.accept else "rejected"
+        self.stats[key] += 1
+        if not decision.accept:
+            self.stats[decision.reason] = self.stats.get(decision.reason, 0) + 1
+        return decision
+
+    def _url_rejection(self, url: str) -> Optional[PrefilterDecision]:
+        parts = urlsplit((url or "").strip())
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            return PrefilterDecision(False, "invalid_url", "unknown")
+        if parts.path.lower().endswith(_DOCUMENT_EXTENSIONS):
+            return PrefilterDecision(False, "document_url", "document")
+        page_type = _domain_rule(parts.hostname.lower())
+        if page_type:
+            return PrefilterDecision(False, f"domain:{page_type}", page_type)
+        for page_type, pattern in _NON_COMPANY_PATHS:
+            if pattern.search(parts.path):
+                return PrefilterDecision(False, f"path:{page_type}", page_type,
+                                         homepage_url=f"{parts.scheme}://{parts.netloc}/")
+        return None
+
+    def check_url(self, url: str) -> PrefilterDecision:
+        """Domain and path rules; needs no network access."""
+        return self._record(self._url_rejection(url) or PrefilterDecision(True))
+
+    def check_page(self, url: str, title: str, content: str, query: Optional[str] = None) -> PrefilterDecision:
+        """
+        Full check of a scraped page: URL rules, page-type heuristics and optional query similarity.
+
+        A page is rejected as a non-company type when it shows at least
+        MIN_PAGE_TYPE_SIGNALS cues of that type and more of them than company cues.
+        """
+        url_rejection = self._url_rejection(url)
+        if url_rejection:
+            return self._record(url_rejection)
+        if len((content or "").strip()) < MIN_PAGE_CHARS:
+            return self._record(PrefilterDecision(False, "too_short", "unknown"))
+
+        text = f"{title or ''}\n{content}".lower()
+        company_signals = COMPANY_KEYWORDS.count(text)
+        type_signals = {page_type: keywords.count(text) for page_type, keywords in PAGE_TYPE_KEYWORDS.items()}
+        page_type, signals = max(type_signals.items(), key=lambda item: item[1])
+        if signals >= MIN_PAGE_TYPE_SIGNALS and signals > company_signals:
+            return self._record(PrefilterDecision(False, f"page:{page_type}", page_type))
+
+        similarity = None
+        if query and self.similarity_fn is not None:
+            try:
+                similarity = self.similarity_fn(query, content)
+            except Exception as e:
+                logger.warning(f"Lead prefilter: similarity check failed ({e}); skipping it")
+            if similarity is not None and similarity < self.min_similarity:
+                return self._record(PrefilterDecision(False, "low_similarity", "company", similarity))
+        return self._record(PrefilterDecision(True, similarity=similarity))
+
+
+def evaluate(prefilter: LeadPrefilter, samples: Iterable[Dict]) -> Dict[str, float]:
+    """
+    Precision and recall of the filter on labeled samples.
+
+    Each sample has ``url``, ``title``, ``content``, optionally ``query`` and
+    ``is_company`` (the label). Positives are company pages: precision is the
+    share of accepted pages that are companies, recall the share of company
+    pages that were accepted.
+    """
+    true_positives = false_positives = false_negatives = true_negatives = 0
+    for sample in samples:
+        accepted = prefilter.check_page(sample["url"], sample.get("title", ""), sample.get("content", ""), sample.get("query")).accept
+        if sample["is_company"]:
+            true_positives += accepted
+            false_negatives += not accepted
+        else:
+            false_positives += accepted
+            true_negatives += not accepted
+    return {
+        "precision": true_positives / max(true_positives + false_positives, 1),
+        "recall": true_positives / max(true_positives + false_negatives, 1),
+        "true_positives": true_positives,
+        "false_positives": false_positives,
+        "false_negatives": false_negatives,
+        "true_negatives": true_negatives,
+    }
+
+
+def load_samples(path: str) -> List[Dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluate the lead pre-filter on labeled samples (JSONL)")
+    parser.add_argument("samples")
+    args = parser.parse_args()
+    report = evaluate(LeadPrefilter(), load_samples(args.samples))
+    print(json.dumps(report, indent=2))
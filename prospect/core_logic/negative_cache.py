@@ -0,0 +1,316 @@
+"""
+Negative-result cache for failing domains and URLs
+Dead domains, DNS failures, 403 walls, login pages and timeouts used to be
+retried on every job, each costing up to a full navigation timeout in the
+browser harvesters or an HTTP timeout in the scraper.
+
+Failures are recorded with their class and time, either for the whole
+registrable domain (DNS, refused connections) or for the single URL
+(timeouts, rate limits, 404, login redirect, server errors): one slow page
+must not take down the rest of its site. Blocks (401/403/451) start on the
+URL and are extended to the domain only when its homepage is blocked or
+several distinct URLs of it are. A known-bad target is skipped until
+its re-probe time; each failed re-probe doubles the wait, and a success
+clears the record. The file is rewritten at most once per persist interval
+(and on exit), never on every failure.
+
+Blocks, rate limits and timeouts seen by the plain HTTP client do not stop
+the browser from trying: bot walls often answer differently to a real browser.
+"""
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from loguru import logger
+
+from core_logic.cache_paths import cache_path
+from core_logic.domain_index import canonical_url, registrable_domain
+
+NEGATIVE_CACHE_ENABLED = os.getenv("NEGATIVE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+NEGATIVE_CACHE_PATH = os.path.abspath(os.getenv("NEGATIVE_CACHE_PATH", cache_path("negative_cache.json")))
+NEGATIVE_CACHE_MAX_BACKOFF_HOURS = float(os.getenv("NEGATIVE_CACHE_MAX_BACKOFF_HOURS", str(7 * 24)))
+NEGATIVE_CACHE_MAX_ENTRIES = int(os.getenv("NEGATIVE_CACHE_MAX_ENTRIES", "20000"))
+# URLs bloqueadas distintas do mesmo domínio a partir das quais o domínio inteiro é considerado bloqueado
+NEGATIVE_CACHE_DOMAIN_BLOCK_URLS = int(os.getenv("NEGATIVE_CACHE_DOMAIN_BLOCK_URLS", "3"))
+NEGATIVE_CACHE_PERSIST_INTERVAL_SECONDS = float(os.getenv("NEGATIVE_CACHE_PERSIST_INTERVAL_SECONDS", "30"))
+
+# Classes de falha
+FAILURE_DNS = "dns"
+FAILURE_CONNECTION = "connection"
+FAILURE_TIMEOUT = "timeout"
+FAILURE_BLOCKED = "blocked"
+FAILURE_RATE_LIMITED = "rate_limited"
+FAILURE_LOGIN = "login"
+FAILURE_NOT_FOUND = "not_found"
+FAILURE_SERVER_ERROR = "server_error"
+
+# Espera antes da primeira nova tentativa, por classe (dobra a cada falha repetida)
+BASE_BACKOFF_SECONDS = {
+    FAILURE_DNS: 6 * 3600,
+    FAILURE_CONNECTION: 3600,
+    FAILURE_TIMEOUT: 1800,
+    FAILURE_BLOCKED: 12 * 3600,
+    FAILURE_RATE_LIMITED: 300,
+    FAILURE_LOGIN: 24 * 3600,
+    FAILURE_NOT_FOUND: 24 * 3600,
+    FAILURE_SERVER_ERROR: 900,
+}
+# Falhas que valem para o domínio inteiro; timeouts e 429 ficam na URL (uma página lenta não derruba o site)
+DOMAIN_SCOPED = frozenset({FAILURE_DNS, FAILURE_CONNECTION})
+# Falhas registradas na URL que passam ao domínio quando a home ou várias URLs dele falham
+DOMAIN_ESCALATING = frozenset({FAILURE_BLOCKED})
+# Falhas vistas pelo cliente HTTP que não valem para o navegador
+BROWSER_MAY_PASS = frozenset({FAILURE_TIMEOUT, FAILURE_BLOCKED, FAILURE_RATE_LIMITED})
+
+# Falhas que tornam inútil até o conteúdo obtido por terceiros (ex.: resultados da Tavily)
+CONTENT_UNUSABLE = frozenset({FAILURE_DNS, FAILURE_LOGIN, FAILURE_NOT_FOUND})
+
+VIA_HTTP = "http"
+VIA_BROWSER = "browser"
+
+_LOGIN_PATH_PATTERN = re.compile(r"/(login|signin|sign-in|entrar|auth|wp-login\.php)(/|$)", re.IGNORECASE)
+_STATUS_PATTERN = re.compile(r"\b(?:status|error)\s*'?(\d{3})\b", re.IGNORECASE)
+_ERROR_PATTERNS = (
+    (FAILURE_DNS, ("err_name_not_resolved", "name or service not known", "nodename nor servname", "getaddrinfo",
+                   "name resolution", "erro de dns", "nxdomain")),
+    (FAILURE_CONNECTION, ("err_connection_refused", "err_connection_reset", "err_ssl", "err_cert", "connection refused",
+                          "connecterror", "conexão recusada", "ssl:", "certificate verify failed")),
+    (FAILURE_TIMEOUT, ("timeout", "timed out")),
+)
+
+
+def classify_status(status_code: Optional[int], final_url: Optional[str] = None) -> Optional[str]:
+    """Failure class of an HTTP response, or None if it is not a known-bad answer."""
+    if final_url and _LOGIN_PATH_PATTERN.search(urlsplit(final_url).path):
+        return FAILURE_LOGIN
+    if status_code is None:
+        return None
+    if status_code in (401, 403, 451):
+        return FAILURE_BLOCKED
+    if status_code == 429:
+        return FAILURE_RATE_LIMITED
+    if status_code in (404, 410):
+        return FAILURE_NOT_FOUND
+    if 500 <= status_code < 600:
+        return FAILURE_SERVER_ERROR
+    return None
+
+
+def classify_error(message: str) -> Optional[str]:
+    """
+    Failure class of an error or status message (Playwright, httpx or the
+    harvesters' "FALHA NA EXTRAÇÃO" messages), or None for unknown errors.
+    """
+    lowered = (message or "").lower()
+    status_match = _STATUS_PATTERN.search(lowered)
+    if status_match:
+        return classify_status(int(status_match.group(1)))
+    for failure_class, needles in _ERROR_PATTERNS:
+        if any(needle in lowered for needle in needles):
+            return failure_class
+    return None
+
+
+@dataclass
+class NegativeEntry:
+    """A recorded failure of a domain or URL"""
+    failure_class: str
+    failures: int
+    first_failed_at: float
+    last_failed_at: float
+    retry_at: float
+    via: str = VIA_HTTP
+    detail: str = ""
+
+    @property
+    def retry_in_seconds(self) -> float:
+        return max(self.retry_at - time.time(), 0.0)
+
+
+class NegativeCache:
+    """
+    Failures per registrable domain and per URL, with exponential re-probe backoff.
+
+    Args:
+        path: JSON file the entries are persisted to (None keeps them in memory)
+        max_backoff_hours: Upper bound of the wait between re-probes
+        max_entries: Entries kept; the least recently failed are dropped first
+        domain_block_urls: Distinct blocked URLs of a domain after which the whole domain is blocked
+        persist_interval_seconds: Minimum time between two rewrites of the file (see flush)
+    """
+
+    def __init__(self, path: Optional[str] = NEGATIVE_CACHE_PATH, max_backoff_hours: float = NEGATIVE_CACHE_MAX_BACKOFF_HOURS,
+                 max_entries: int = NEGATIVE_CACHE_MAX_ENTRIES,
+                 persist_interval_seconds: float = NEGATIVE_CACHE_PERSIST_INTERVAL_SECONDS,
+                 domain_block_urls: int = NEGATIVE_CACHE_DOMAIN_BLOCK_URLS):
+        self.path = path
+        self.max_backoff_seconds = max_backoff_hours * 3600
+        self.max_entries = max_entries
+        self.domain_block_urls = domain_block_urls
+        self.persist_interval_seconds = persist_interval_seconds
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._dirty = False
+        self._last_persisted_at = 0.0
+        self._snapshot_seq = 0
+        self._written_seq = 0
+        self._entries: Dict[str, NegativeEntry] = {}
+        self.stats = {"skipped": 0, "recorded": 0, "cleared": 0}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._entries = {key: NegativeEntry(**data) for key, data in json.load(f).items()}
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning(f"Negative cache: ignoring unreadable cache file '{path}': {e}")
+
+    @staticmethod
+    def _keys(url: str):
+        domain = registrable_domain(url)
+        return (f"domain:{domain}" if domain else None), f"url:{canonical_url(url)}"
+
+    def check(self, url: str, via: str = VIA_HTTP) -> Optional[NegativeEntry]:
+        """The failure that makes this URL not worth trying right now, or None."""
+        now = time.time()
+        with self._lock:
+            for key in filter(None, self._keys(url)):
+                entry = self._entries.get(key)
+                if entry is None or entry.retry_at <= now:
+                    continue
+                if via == VIA_BROWSER and entry.via == VIA_HTTP and entry.failure_class in BROWSER_MAY_PASS:
+                    continue
+                self.stats["skipped"] += 1
+                return entry
+        return None
+
+    def record_failure(self, url: str, failure_class: str, via: str = VIA_HTTP, detail: str = "") -> NegativeEntry:
+        domain_key, url_key = self._keys(url)
+        key = domain_key if failure_class in DOMAIN_SCOPED and domain_key else url_key
+        now = time.time()
+        with self._lock:
+            entry = self._put(key, failure_class, via, detail, now)
+            if failure_class in DOMAIN_ESCALATING and domain_key and self._escalates(url, domain_key, failure_class, now):
+                entry = self._put(domain_key, failure_class, via, detail, now)
+                key = domain_key
+            while len(self._entries) > self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self.stats["recorded"] += 1
+            self._dirty = True
+            snapshot = self._snapshot_if_due()
+        self._write(snapshot)
+        logger.debug(f"Negative cache: {key} failed ({failure_class}, #{entry.failures}); next probe in {entry.retry_in_seconds / 3600:.1f}h")
+        return entry
+
+    def _put(self, key: str, failure_class: str, via: str, detail: str, now: float) -> NegativeEntry:
+        previous = self._entries.pop(key, None)
+        repeated = previous is not None and previous.failure_class == failure_class
+        failures = previous.failures + 1 if repeated else 1
+        backoff = min(BASE_BACKOFF_SECONDS.get(failure_class, 900) * 2 ** (failures - 1), self.max_backoff_seconds)
+        entry = self._entries[key] = NegativeEntry(
+            failure_class=failure_class,
+            failures=failures,
+            first_failed_at=previous.first_failed_at if repeated else now,
+            last_failed_at=now,
+            retry_at=now + backoff,
+            via=via,
+            detail=detail[:200],
+        )
+        return entry
+
+    def _escalates(self, url: str, domain_key: str, failure_class: str, now: float) -> bool:
+        """Under the lock: whether a URL-level failure should block the whole domain."""
+        parts = urlsplit(canonical_url(url))
+        if parts.path in ("", "/") and not parts.query:
+            return True  # A própria home falhou
+        domain = domain_key[len("domain:"):]
+        blocked_urls = sum(
+            1 for key, entry in self._entries.items()
+            if key.startswith("url:") and entry.failure_class == failure_class and entry.retry_at > now
+            and registrable_domain(key[len("url:"):]) == domain
+        )
+        return blocked_urls >= self.domain_block_urls
+
+    def record_success(self, url: str) -> None:
+        """A target answered again: forget its failures."""
+        snapshot = None
+        with self._lock:
+            removed = [key for key in filter(None, self._keys(url)) if self._entries.pop(key, None) is not None]
+            if removed:
+                self.stats["cleared"] += len(removed)
+                self._dirty = True
+                snapshot = self._snapshot_if_due()
+        self._write(snapshot)
+
+    def record_outcome(self, url: str, message: str, via: str = VIA_HTTP) -> Optional[str]:
+        """Record a harvester status message: known failure classes are cached, successes clear the URL."""
+        if message.startswith("SUCESSO"):
+            self.record_success(url)
+            return None
+        if "FALHA CONHECIDA" in message:
+            return None  # Alvo pulado pelo próprio cache: não conta como nova falha
+        failure_class = classify_error(message)
+        if failure_class:
+            self.record_failure(url, failure_class, via=via, detail=message)
+        return failure_class
+
+    def flush(self) -> None:
+        """Write pending changes to the file now (called at exit for the global cache)."""
+        with self._lock:
+            snapshot = self._snapshot_if_due(force=True)
+        self._write(snapshot)
+
+    def _snapshot_if_due(self, force: bool = False) -> Optional[Tuple[int, Dict[str, Dict]]]:
+        """Under the lock: copy the entries if they changed and a write is due; the file is written outside the lock."""
+        now = time.monotonic()
+        if not self.path or not self._dirty:
+            return None
+        if not force and now - self._last_persisted_at < self.persist_interval_seconds:
+            return None
+        self._dirty = False
+        self._last_persisted_at = now
+        self._snapshot_seq += 1
+        return self._snapshot_seq, {key: asdict(entry) for key, entry in self._entries.items()}
+
+    def _write(self, snapshot: Optional[Tuple[int, Dict[str, Dict]]]) -> None:
+        if snapshot is None:
+            return
+        seq, entries = snapshot
+        try:
+            with self._write_lock:
+                if seq < self._written_seq:
+                    return  # Uma cópia mais nova já foi gravada
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(entries, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+                self._written_seq = seq
+        except OSError as e:
+            logger.debug(f"Negative cache: failed to persist cache: {e}")
+
+
+def skip_message(entry: NegativeEntry) -> str:
+    """Description of a target skipped because of a recorded failure (not re-recorded by record_outcome)."""
+    return f"FALHA CONHECIDA ({entry.failure_class.upper()}, {entry.failures}x), NOVA TENTATIVA EM {entry.retry_in_seconds / 60:.0f} MIN."
+
+
+# Global cache instance
+_negative_cache_instance: Optional[NegativeCache] = None
+_negative_cache_lock = threading.Lock()
+
+def get_negative_cache() -> Optional[NegativeCache]:
+    """Get the global negative cache (None when disabled)"""
+    global _negative_cache_instance
+    if not NEGATIVE_CACHE_ENABLED:
+        return None
+    with _negative_cache_lock:
+        if _negative_cache_instance is None:
+            _negative_cache_instance = NegativeCache()
+            atexit.register(_negative_cache_instance.flush)
+        return _negative_cache_instance
@@ -0,0 +1,292 @@
+"""
+Adaptive page-readiness detection for the Playwright harvesters
+Instead of waiting for network idle and then a fixed pause, the page is polled
+and extraction starts as soon as the main content is stable: either the DOM
+has had no mutations for a short quiet window, or the body text length has
+stopped changing (within a tolerance, so carousels and tickers do not keep the
+page "busy") after reaching a minimum size.
+
+The time each registrable domain took to become ready is learned (moving
+average, persisted to a small JSON file written on an interval and at exit,
+keeping the most recently seen domains). Repeat visits get a wait budget of a
+few times the learned value instead of the global maximum, so pages that never
+settle stop costing the full timeout every time.
+"""
+
+import asyncio
+import atexit
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from loguru import logger
+
+from core_logic.cache_paths import cache_path
+from core_logic.domain_index import registrable_domain
+
+READINESS_POLL_INTERVAL_MS = int(os.getenv("READINESS_POLL_INTERVAL_MS", "250"))
+READINESS_QUIET_WINDOW_MS = int(os.getenv("READINESS_QUIET_WINDOW_MS", "750"))
+READINESS_MIN_TEXT_CHARS = int(os.getenv("READINESS_MIN_TEXT_CHARS", "200"))
+READINESS_STABLE_DELTA = float(os.getenv("READINESS_STABLE_DELTA", "0.02"))
+READINESS_MAX_WAIT_MS = int(os.getenv("READINESS_MAX_WAIT_MS", "15000"))
+# Orçamento em visitas repetidas: múltiplo do tempo aprendido para o domínio
+READINESS_LEARNED_BUDGET_FACTOR = float(os.getenv("READINESS_LEARNED_BUDGET_FACTOR", "2.0"))
+READINESS_STATS_PATH = os.path.abspath(os.getenv("READINESS_STATS_PATH", cache_path("readiness_waits.json")))
+READINESS_STATS_MAX_DOMAINS = int(os.getenv("READINESS_STATS_MAX_DOMAINS", "5000"))
+# Intervalo mínimo entre duas regravações do arquivo (o restante é gravado na saída)
+READINESS_STATS_PERSIST_INTERVAL_SECONDS = float(os.getenv("READINESS_STATS_PERSIST_INTERVAL_SECONDS", "30"))
+_LEARNING_RATE = 0.3
+
+# Instala (uma vez por documento) um MutationObserver e devolve o sinal de estabilidade
+READINESS_PROBE_JS = r"""
+() => {
+    if (!window.__nelliaReadiness) {
+        const state = { lastMutation: performance.now() };
+        try {
+            new MutationObserver(() => { state.lastMutation = performance.now(); })
+                .observe(document.documentElement || document, { childList: true, subtree: true, characterData: true });
+        } catch (e) { /* documento sem raiz observável */ }
+        window.__nelliaReadiness = state;
+    }
+    const body = document.body;
+    return {
+        textLength: body ? (body.innerText || "").length : 0,
+        quietMs: performance.now() - window.__nelliaReadiness.lastMutation,
+        readyState: document.readyState,
+    };
+}
+"""
+
+
+@dataclass
+class ReadinessResult:
+    """Outcome of one readiness wait"""
+    ready: bool
+    reason: str  # "dom_quiet", "text_stable", "timeout" ou "probe_failed"
+    waited_ms: int
+    text_chars: int = 0
+    budget_ms: int = 0
+
+
+class ReadinessTracker:
+    """Decides readiness from successive probe samples (pure logic, shared by the sync and async loops)."""
+
+    def __init__(self, quiet_window_ms: int = READINESS_QUIET_WINDOW_MS, min_text_chars: int = READINESS_MIN_TEXT_CHARS,
+                 stable_delta: float = READINESS_STABLE_DELTA):
+        self.quiet_window_ms = quiet_window_ms
+        self.min_text_chars = min_text_chars
+        self.stable_delta = stable_delta
+        self._reference_length: Optional[int] = None
+        self._stable_since_ms: Optional[float] = None
+
+    def observe(self, elapsed_ms: float, sample: Dict[str, Any]) -> Optional[str]:
+        """Feed a probe sample; returns the readiness reason once the page is ready, else None."""
+        text_length = int(sample.get("textLength") or 0)
+        if sample.get("readyState") == "complete" and (sample.get("quietMs") or 0) >= self.quiet_window_ms:
+            return "dom_quiet"
+        if text_length < self.min_text_chars:
+            self._reference_length = self._stable_since_ms = None
+            return None
+        reference = self._reference_length
+        if reference is None or abs(text_length - reference) > reference * self.stable_delta:
+            self._reference_length, self._stable_since_ms = text_length, elapsed_ms
+            return None
+        if elapsed_ms - self._stable_since_ms >= self.quiet_window_ms:
+            return "text_stable"
+        return None
+
+
+class DomainWaitStats:
+    """
+    Learned time-to-ready per registrable domain, persisted as JSON.
+
+    Args:
+        path: JSON file the waits are persisted to (None keeps them in memory)
+        max_domains: Domains kept; the least recently recorded are dropped first
+        persist_interval_seconds: Minimum time between two rewrites of the file (see flush)
+    """
+
+    def __init__(self, path: Optional[str] = READINESS_STATS_PATH, max_domains: int = READINESS_STATS_MAX_DOMAINS,
+                 persist_interval_seconds: float = READINESS_STATS_PERSIST_INTERVAL_SECONDS):
+        self.path = path
+        self.max_domains = max_domains
+        self.persist_interval_seconds = persist_interval_seconds
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._dirty = False
+        self._last_persisted_at = 0.0
+        self._snapshot_seq = 0
+        self._written_seq = 0
+        self._waits: Dict[str, float] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._waits = {str(k): float(v) for k, v in json.load(f).items()}
+            except (OSError, ValueError) as e:
+                logger.warning(f"Readiness: ignoring unreadable stats file '{path}': {e}")
+
+    def learned_ms(self, url: str) -> Optional[float]:
+        with self._lock:
+            return self._waits.get(registrable_domain(url) or url)
+
+    def record(self, url: str, waited_ms: float) -> None:
+        domain = registrable_domain(url) or url
+        with self._lock:
+            # Reinsere no fim: a ordem do dicionário é a da gravação mais recente
+            previous = self._waits.pop(domain, None)
+            self._waits[domain] = waited_ms if previous is None else previous + _LEARNING_RATE * (waited_ms - previous)
+            while len(self._waits) > self.max_domains:
+                self._waits.pop(next(iter(self._waits)))
+            self._dirty = True
+            snapshot = self._snapshot_if_due()
+        self._write(snapshot)
+
+    def flush(self) -> None:
+        """Write pending changes to the file now (called at exit for the global stats)."""
+        with self._lock:
+            snapshot = self._snapshot_if_due(force=True)
+        self._write(snapshot)
+
+    def _snapshot_if_due(self, force: bool = False) -> Optional[Tuple[int, Dict[str, float]]]:
+        """Under the lock: copy the waits if they changed and a write is due; the file is written outside the lock."""
+        now = time.monotonic()
+        if not self.path or not self._dirty:
+            return None
+        if not force and now - self._last_persisted_at < self.persist_interval_seconds:
+            return None
+        self._dirty = False
+        self._last_persisted_at = now
+        self._snapshot_seq += 1
+        return self._snapshot_seq, dict(self._waits)
+
+    def _write(self, snapshot: Optional[Tuple[int, Dict[str, float]]]) -> None:
+        if snapshot is None:
+            return
+        seq, waits = snapshot
+        try:
+            with self._write_lock:
+                if seq < self._written_seq:
+                    return  # Uma cópia mais nova já foi gravada
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(waits, f)
+                os.replace(tmp_path, self.path)
+                self._written_seq = seq
+        except OSError as e:
+            logger.debug(f"Readiness: failed to persist stats: {e}")
+
+
+class ReadinessDetector:
+    """
+    Waits until a Playwright page's main content is stable.
+
+    Args:
+        stats: Learned per-domain waits (None disables learning)
+        poll_interval_ms: Time between probes
+        quiet_window_ms: Quiet/stable period required before proceeding
+        min_text_chars: Minimum body text for the text-stability signal
+        max_wait_ms: Wait budget for domains without a learned value
+    """
+
+    def __init__(
+        self,
+        stats: Optional[DomainWaitStats] = None,
+        poll_interval_ms: int = READINESS_POLL_INTERVAL_MS,
+        quiet_window_ms: int = READINESS_QUIET_WINDOW_MS,
+        min_text_chars: int = READINESS_MIN_TEXT_CHARS,
+        max_wait_ms: int = READINESS_MAX_WAIT_MS,
+    ):
+        self.stats = stats
+        self.poll_interval_ms = poll_interval_ms
+        self.quiet_window_ms = quiet_window_ms
+        self.min_text_chars = min_text_chars
+        self.max_wait_ms = max_wait_ms
+
+    def budget_ms(self, url: str) -> int:
+        """Wait budget for a URL: a multiple of the learned time, bounded by max_wait_ms."""
+        learned = self.stats.learned_ms(url) if self.stats else None
+        if learned is None:
+            return self.max_wait_ms
+        floor = self.quiet_window_ms + 2 * self.poll_interval_ms
+        return int(min(max(learned * READINESS_LEARNED_BUDGET_FACTOR, floor), self.max_wait_ms))
+
+    def _tracker(self) -> ReadinessTracker:
+        return ReadinessTracker(self.quiet_window_ms, self.min_text_chars)
+
+    def _should_learn(self, reason: str, learn: bool) -> bool:
+        return bool(learn and self.stats and reason != "probe_failed")
+
+    def _result(self, reason: str, waited_ms: float, text_chars: int, budget: int) -> ReadinessResult:
+        ready = reason in ("dom_quiet", "text_stable")
+        return ReadinessResult(ready=ready, reason=reason, waited_ms=int(waited_ms), text_chars=text_chars, budget_ms=budget)
+
+    def _finish(self, url: str, reason: str, waited_ms: float, text_chars: int, budget: int, learn: bool) -> ReadinessResult:
+        if self._should_learn(reason, learn):
+            self.stats.record(url, waited_ms)
+        return self._result(reason, waited_ms, text_chars, budget)
+
+    async def _finish_async(self, url: str, reason: str, waited_ms: float, text_chars: int, budget: int,
+                            learn: bool) -> ReadinessResult:
+        # A gravação periódica do arquivo não pode bloquear o event loop
+        if self._should_learn(reason, learn):
+            await asyncio.to_thread(self.stats.record, url, waited_ms)
+        return self._result(reason, waited_ms, text_chars, budget)
+
+    def wait_until_ready(self, page, url: str, learn: bool = True) -> ReadinessResult:
+        """Poll a sync Playwright page until it is ready or the budget runs out."""
+        budget = self.budget_ms(url)
+        tracker = self._tracker()
+        start = time.monotonic()
+        sample: Dict[str, Any] = {}
+        while True:
+            elapsed_ms = (time.monotonic() - start) * 1000
+            try:
+                sample = page.evaluate(READINESS_PROBE_JS) or {}
+            except Exception as e:
+                # Ex.: contexto destruído por um redirecionamento; tenta de novo na próxima rodada
+                logger.debug(f"Readiness probe failed for {url}: {e}")
+                if page.is_closed():
+                    return self._finish(url, "probe_failed", elapsed_ms, 0, budget, learn)
+                sample = {}
+            reason = tracker.observe(elapsed_ms, sample)
+            if reason or elapsed_ms >= budget:
+                return self._finish(url, reason or "timeout", elapsed_ms, int(sample.get("textLength") or 0), budget, learn)
+            time.sleep(self.poll_interval_ms / 1000)
+
+    async def wait_until_ready_async(self, page, url: str, learn: bool = True) -> ReadinessResult:
+        """Async counterpart of wait_until_ready() (playwright.async_api pages)."""
+        budget = self.budget_ms(url)
+        tracker = self._tracker()
+        start = time.monotonic()
+        sample: Dict[str, Any] = {}
+        while True:
+            elapsed_ms = (time.monotonic() - start) * 1000
+            try:
+                sample = await page.evaluate(READINESS_PROBE_JS) or {}
+            except Exception as e:
+                logger.debug(f"Readiness probe failed for {url}: {e}")
+                if page.is_closed():
+                    return await self._finish_async(url, "probe_failed", elapsed_ms, 0, budget, learn)
+                sample = {}
+            reason = tracker.observe(elapsed_ms, sample)
+            if reason or elapsed_ms >= budget:
+                return await self._finish_async(url, reason or "timeout", elapsed_ms, int(sample.get("textLength") or 0), budget, learn)
+            await asyncio.sleep(self.poll_interval_ms / 1000)
+
+
+# Global detector instance
+_detector_instance: Optional[ReadinessDetector] = None
+_detector_lock = threading.Lock()
+
+def get_readiness_detector() -> ReadinessDetector:
+    """Get the global readiness detector (with persisted per-domain stats)"""
+    global _detector_instance
+    with _detector_lock:
+        if _detector_instance is None:
+            _detector_instance = ReadinessDetector(stats=DomainWaitStats())
+            atexit.register(_detector_instance.stats.flush)
+        return _detector_instance
@@ -0,0 +1,116 @@
+"""
+Multi-query search fan-out for lead discovery
+A single search query misses companies that describe themselves with other
+words. The job's main query is complemented with a few variants derived from
+the business context (industry, location, pain points, growth and buying
+signals); each variant is searched concurrently and the result lists are
+fused into one list with one entry per registrable domain.
+
+Ranking uses reciprocal rank fusion: a domain scores sum(1 / (k + rank)) over
+the queries that returned it, so companies found by several queries and
+ranked high by the search engine come first.
+"""
+
+import os
+import re
+from typing import Any, Dict, Iterable, List, Sequence
+
+from core_logic.domain_index import DomainIndex, registrable_domain
+
+QUERY_FANOUT_VARIANTS = int(os.getenv("QUERY_FANOUT_VARIANTS", "3"))  # 1 desliga o fan-out
+# Candidatos pedidos à busca (e aceitos antes de parar cedo) por lead desejado
+QUERY_FANOUT_OVERSAMPLE = float(os.getenv("QUERY_FANOUT_OVERSAMPLE", "2.0"))
+RRF_K = 60
+# Reformulações da query para ampliar uma busca cujos candidatos acabaram
+WIDENING_TEMPLATES = ("empresas de {query}", "{query} fornecedores", "{query} empresas no Brasil")
+
+
+def _as_list(value: Any) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(",") if part.strip()]
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def build_query_variants(primary_query: str, business_context: Dict[str, Any], k: int = QUERY_FANOUT_VARIANTS) -> List[str]:
+    """
+    The primary query followed by up to k-1 distinct variants built from the business context.
+    """
+    industries = _as_list(business_context.get("industry_focus"))
+    locations = _as_list(business_context.get("geographic_focus")) or _as_list(business_context.get("location"))
+    pain_points = _as_list(business_context.get("pain_points"))
+    industry = industries[0] if industries else ""
+    location = locations[-1] if locations else ""  # O recorte geográfico mais específico
+    where = f" em {location}" if location else ""
+
+    candidates = [primary_query]
+    if industry:
+        candidates.append(f"empresas de {industry}{where}")
+        candidates.append(f"empresas de {industry} em expansão{where}")
+    if pain_points:
+        candidates.append(f"{industry or 'empresas'} {pain_points[0]}{where}")
+    for extra_industry in industries[1:]:
+        candidates.append(f"empresas de {extra_industry}{where}")
+
+    variants: List[str] = []
+    seen = set()
+    for candidate in candidates:
+        candidate = re.sub(r"\s+", " ", candidate).strip()
+        key = candidate.lower()
+        if candidate and key not in seen:
+            seen.add(key)
+            variants.append(candidate)
+    return variants[:max(k, 1)]
+
+
+def build_widening_query(primary_query: str, round_number: int) -> str:
+    """
+    A reformulation of the primary query for a widening round (1-based), cycling through WIDENING_TEMPLATES.
+    """
+    primary_query = re.sub(r"\s+", " ", primary_query).strip()
+    reformulations = [
+        template.format(query=primary_query) for template in WIDENING_TEMPLATES
+        # Não repete "empresas" quando a query já fala em empresas
+        if not (template.startswith("empresas") and primary_query.lower().startswith("empresas"))
+    ]
+    return reformulations[(max(round_number, 1) - 1) % len(reformulations)]
+
+
+def fuse_search_results(result_lists: Sequence[Sequence[Dict[str, Any]]], rrf_k: int = RRF_K) -> List[Dict[str, Any]]:
+    """
+    Merge per-query result lists into one per-domain list ranked by reciprocal rank fusion.
+
+    Each result keeps the fields of its shallowest URL (see DomainIndex) and gains
+    'query_hits' (how many queries returned the domain) and 'fusion_score'.
+    """
+    index = DomainIndex()
+    scores: Dict[str, float] = {}
+    hits: Dict[str, int] = {}
+    for results in result_lists:
+        seen_in_query = set()
+        for rank, result in enumerate(results, start=1):
+            domain = registrable_domain(result.get("url") or "")
+            if not domain:
+                continue
+            # Subpáginas da mesma empresa vindas do mesmo resultado da busca também são agrupadas
+            index.add(result)
+            for url in result.get("duplicate_urls") or []:
+                index.add({**result, "url": url})
+            if domain in seen_in_query:
+                continue
+            seen_in_query.add(domain)
+            scores[domain] = scores.get(domain, 0.0) + 1.0 / (rrf_k + rank)
+            hits[domain] = hits.get(domain, 0) + 1
+
+    fused = []
+    for result in index.results():
+        domain = registrable_domain(result["url"])
+        fused.append({**result, "query_hits": hits.get(domain, 0), "fusion_score": round(scores.get(domain, 0.0), 6)})
+    fused.sort(key=lambda r: (r["fusion_score"], r["query_hits"]), reverse=True)
+    return fused
+
+
+def count_candidates(result_lists: Iterable[Sequence[Dict[str, Any]]]) -> int:
+    """Distinct registrable domains across result lists."""
+    return len({registrable_domain(r.get("url") or "") for results in result_lists for r in results} - {""})
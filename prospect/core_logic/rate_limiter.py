@@ -0,0 +1,88 @@
+"""
+Rate limiting helpers for Nellia Prospector
+Minimum-interval limiters shared across threads, used to pace LLM API calls
+without sleeping a fixed amount after every call.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Dict, Optional
+
+
+class IntervalRateLimiter:
+    """
+    Enforces a minimum interval between operations across all callers.
+
+    Each caller reserves the next free slot and only sleeps for the time
+    remaining until it, so work done between calls (scraping, parsing)
+    counts toward the interval instead of being added to it.
+    """
+
+    def __init__(self, min_interval_seconds: float):
+        self.min_interval_seconds = min_interval_seconds
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval_seconds
+            return slot - now
+
+    def acquire(self) -> float:
+        """Block until the caller may proceed; returns the seconds waited."""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self) -> float:
+        """Async counterpart of acquire()."""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+class PerKeyRateLimiter:
+    """
+    One IntervalRateLimiter per key (e.g. per domain): calls for different
+    keys never wait on each other, calls for the same key are spaced by
+    ``min_interval_seconds``.
+    """
+
+    def __init__(self, min_interval_seconds: float):
+        self.min_interval_seconds = min_interval_seconds
+        self._limiters: Dict[str, IntervalRateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def _limiter(self, key: str) -> IntervalRateLimiter:
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = self._limiters[key] = IntervalRateLimiter(self.min_interval_seconds)
+            return limiter
+
+    def acquire(self, key: str) -> float:
+        """Block until a call for ``key`` may proceed; returns the seconds waited."""
+        return self._limiter(key).acquire()
+
+    async def acquire_async(self, key: str) -> float:
+        """Async counterpart of acquire()."""
+        return await self._limiter(key).acquire_async()
+
+
+_limiters: Dict[str, IntervalRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_rate_limiter(name: str, min_interval_seconds: Optional[float] = None) -> IntervalRateLimiter:
+    """Get (or create) a named limiter shared by the whole process."""
+    with _limiters_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = _limiters[name] = IntervalRateLimiter(min_interval_seconds or 0.0)
+        elif min_interval_seconds is not None:
+            limiter.min_interval_seconds = min_interval_seconds
+        return limiter
@@ -0,0 +1,190 @@
+"""
+Resource policy for Playwright page loads
+The harvester only needs the DOM text, so images, media, fonts and tracker or
+ad scripts are aborted through route interception before they are downloaded.
+This cuts the bytes transferred per page and lets the network go idle sooner.
+
+Domains on the allowlist load everything. When the DOM text is too weak and
+the harvester falls back to image analysis, the policy of that page can be
+relaxed so the screenshot shows the real page (trackers stay blocked).
+
+PageTraffic also measures requests, blocked requests and bytes received per
+page, for the harvester logs and benchmarks/resource_blocking.py.
+"""
+
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, Optional
+from urllib.parse import urlsplit
+
+from loguru import logger
+
+RESOURCE_POLICY_ENABLED = os.getenv("RESOURCE_POLICY_ENABLED", "true").lower() in ("1", "true", "yes")
+
+
+def _env_set(name: str, default: str) -> FrozenSet[str]:
+    return frozenset(item.strip().lower() for item in os.getenv(name, default).split(",") if item.strip())
+
+
+# Tipos de recurso do Playwright (request.resource_type)
+BLOCKED_RESOURCE_TYPES = _env_set("RESOURCE_POLICY_BLOCKED_TYPES", "image,media,font")
+TRACKER_DOMAINS = frozenset({
+    "google-analytics.com", "googletagmanager.com", "googlesyndication.com", "googleadservices.com",
+    "doubleclick.net", "adservice.google.com", "facebook.net", "connect.facebook.net", "hotjar.com",
+    "clarity.ms", "segment.io", "cdn.segment.com", "mixpanel.com", "cdn.amplitude.com",
+    "hs-analytics.net", "hs-scripts.com", "rdstation.com.br", "rd.services", "criteo.com", "criteo.net",
+    "taboola.com", "outbrain.com", "adnxs.com", "scorecardresearch.com", "quantserve.com", "newrelic.com",
+    "nr-data.net", "analytics.tiktok.com", "snap.licdn.com", "ads.linkedin.com",
+    "bat.bing.com", "static.ads-twitter.com", "mc.yandex.ru", "widget.intercom.io", "static.zdassets.com",
+})
+TRACKER_DOMAINS = TRACKER_DOMAINS | _env_set("RESOURCE_POLICY_EXTRA_TRACKERS", "")
+# Domínios onde nada é bloqueado (ex.: redes sociais, em que as imagens são o conteúdo)
+ALLOWED_DOMAINS = _env_set("RESOURCE_POLICY_ALLOWED_DOMAINS", "instagram.com,linkedin.com")
+
+
+def _host_matches(host: str, domains: Iterable[str]) -> bool:
+    labels = host.split(".")
+    return any(".".join(labels[i:]) in domains for i in range(len(labels)))
+
+
+@dataclass
+class ResourcePolicy:
+    """What to abort while loading a page"""
+    blocked_types: FrozenSet[str] = BLOCKED_RESOURCE_TYPES
+    tracker_domains: FrozenSet[str] = TRACKER_DOMAINS
+    allowed_domains: FrozenSet[str] = ALLOWED_DOMAINS
+
+    def allows_everything_on(self, page_url: str) -> bool:
+        """True if the page's domain is allowlisted (nothing is blocked there)."""
+        return _host_matches((urlsplit(page_url).hostname or "").lower(), self.allowed_domains)
+
+    def block_reason(self, resource_type: str, url: str, relaxed: bool = False) -> Optional[str]:
+        """
+        Reason to abort a request ("tracker" or "type:<resource type>"), or None to let it through.
+        A relaxed policy only blocks trackers; documents (the page itself, frames) are never blocked.
+        """
+        if resource_type == "document":
+            return None
+        host = (urlsplit(url).hostname or "").lower()
+        if host and _host_matches(host, self.tracker_domains):
+            return "tracker"
+        if not relaxed and resource_type in self.blocked_types:
+            return f"type:{resource_type}"
+        return None
+
+
+@dataclass
+class PageTraffic:
+    """Requests and bytes of one page load, plus the hooks installed on the page"""
+    requests: int = 0
+    bytes_received: int = 0
+    blocked: Dict[str, int] = field(default_factory=dict)
+    relaxed: bool = False
+    started_at: float = field(default_factory=time.monotonic)
+    _page: object = None
+    _route_handler: object = None
+    _finished_handler: object = None
+
+    @property
+    def blocked_requests(self) -> int:
+        return sum(self.blocked.values())
+
+    @property
+    def blocked_images(self) -> bool:
+        return any(reason in self.blocked for reason in ("type:image", "type:media"))
+
+    def relax(self) -> None:
+        """Let images/media/fonts through from now on (used before the image-analysis fallback)."""
+        self.relaxed = True
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "requests": self.requests,
+            "blocked_requests": self.blocked_requests,
+            "blocked": dict(self.blocked),
+            "bytes_received": self.bytes_received,
+            "seconds": round(time.monotonic() - self.started_at, 3),
+        }
+
+    def _decide(self, policy: ResourcePolicy, request) -> Optional[str]:
+        self.requests += 1
+        reason = policy.block_reason(request.resource_type, request.url, relaxed=self.relaxed)
+        if reason:
+            self.blocked[reason] = self.blocked.get(reason, 0) + 1
+        return reason
+
+    def _count_bytes(self, request) -> None:
+        try:
+            sizes = request.sizes()
+            self.bytes_received += sizes.get("responseBodySize", 0) + sizes.get("responseHeadersSize", 0)
+        except Exception:
+            pass  # Requisição sem resposta (ex.: abortada durante a navegação)
+
+
+def attach_resource_policy(page, url: str, policy: Optional[ResourcePolicy] = None, enabled: bool = RESOURCE_POLICY_ENABLED) -> PageTraffic:
+    """
+    Install the policy on a sync Playwright page about to load ``url`` and start measuring its traffic.
+    Call detach_resource_policy() before the page is reused (pooled pages).
+    """
+    policy = policy or ResourcePolicy()
+    traffic = PageTraffic(_page=page, _finished_handler=lambda request: traffic._count_bytes(request))
+    page.on("requestfinished", traffic._finished_handler)
+    if not enabled or policy.allows_everything_on(url):
+        return traffic
+
+    def handle_route(route):
+        if traffic._decide(policy, route.request):
+            route.abort()
+        else:
+            route.continue_()
+
+    traffic._route_handler = handle_route
+    page.route("**/*", handle_route)
+    return traffic
+
+
+async def attach_resource_policy_async(page, url: str, policy: Optional[ResourcePolicy] = None, enabled: bool = RESOURCE_POLICY_ENABLED) -> PageTraffic:
+    """Async counterpart of attach_resource_policy() (playwright.async_api pages)."""
+    policy = policy or ResourcePolicy()
+    traffic = PageTraffic(_page=page, _finished_handler=lambda request: traffic._count_bytes(request))
+    page.on("requestfinished", traffic._finished_handler)
+    if not enabled or policy.allows_everything_on(url):
+        return traffic
+
+    async def handle_route(route):
+        if traffic._decide(policy, route.request):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    traffic._route_handler = handle_route
+    await page.route("**/*", handle_route)
+    return traffic
+
+
+def _detach_listener(traffic: PageTraffic):
+    page, traffic._page = traffic._page, None
+    if page is not None:
+        page.remove_listener("requestfinished", traffic._finished_handler)
+    return page
+
+
+def detach_resource_policy(traffic: PageTraffic) -> None:
+    """Remove the hooks installed by attach_resource_policy()."""
+    try:
+        page = _detach_listener(traffic)
+        if page is not None and traffic._route_handler is not None:
+            page.unroute("**/*", traffic._route_handler)
+    except Exception as e:
+        logger.debug(f"Resource policy: failed to detach from page: {e}")
+
+
+async def detach_resource_policy_async(traffic: PageTraffic) -> None:
+    """Async counterpart of detach_resource_policy()."""
+    try:
+        page = _detach_listener(traffic)
+        if page is not None and traffic._route_handler is not None:
+            await page.unroute("**/*", traffic._route_handler)
+    except Exception as e:
+        logger.debug(f"Resource policy: failed to detach from page: {e}")
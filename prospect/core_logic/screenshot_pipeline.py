@@ -0,0 +1,201 @@
+"""
+Screenshot pipeline for the harvester's vision fallback
+Full-page PNG screenshots of long landing pages are large and mostly
+irrelevant to the vision prompt. Before calling the multimodal model the
+screenshot is cut into viewport-sized tiles, only the tiles that matter are
+kept (the top of the page and the footer, where contact details usually are),
+downscaled and encoded as WebP (JPEG when the Pillow build lacks WebP).
+
+Vision responses are cached by perceptual hash (dHash) per registrable
+domain, so a near-identical screenshot analysed recently is answered from the
+cache instead of a new model call. Pillow is optional: without it the original
+PNG is sent and only byte-identical screenshots hit the cache.
+"""
+
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from loguru import logger
+
+from core_logic.cache_paths import cache_path
+from core_logic.domain_index import registrable_domain
+
+try:
+    from PIL import Image, features
+    PIL_AVAILABLE = True
+except ImportError:
+    Image = None
+    features = None
+    PIL_AVAILABLE = False
+
+SCREENSHOT_VIEWPORT_HEIGHT = int(os.getenv("SCREENSHOT_VIEWPORT_HEIGHT", "900"))
+SCREENSHOT_MAX_TILES = int(os.getenv("SCREENSHOT_MAX_TILES", "3"))
+SCREENSHOT_MAX_WIDTH = int(os.getenv("SCREENSHOT_MAX_WIDTH", "768"))
+SCREENSHOT_QUALITY = int(os.getenv("SCREENSHOT_QUALITY", "70"))
+VISION_CACHE_PATH = os.path.abspath(os.getenv("VISION_CACHE_PATH", cache_path("vision_analyses.json")))
+VISION_CACHE_TTL_HOURS = float(os.getenv("VISION_CACHE_TTL_HOURS", "72"))
+# Distância de Hamming máxima (em 64 bits) para considerar dois screenshots "quase idênticos"
+VISION_CACHE_MAX_DISTANCE = int(os.getenv("VISION_CACHE_MAX_DISTANCE", "6"))
+VISION_CACHE_MAX_PER_DOMAIN = 20
+
+
+@dataclass
+class PreparedScreenshot:
+    """Compact image ready for the vision model, with the hash used as cache key"""
+    data: bytes
+    mime_type: str
+    image_hash: str  # "dhash:<16 hex>" com Pillow, "sha1:<hex>" sem
+    width: int = 0
+    height: int = 0
+    original_bytes: int = 0
+
+
+def select_tiles(page_height: int, viewport_height: int = SCREENSHOT_VIEWPORT_HEIGHT,
+                 max_tiles: int = SCREENSHOT_MAX_TILES) -> List[int]:
+    """Top offsets of the viewport tiles worth sending: the first ones plus the footer."""
+    tile_count = max(1, -(-page_height // viewport_height))
+    if tile_count <= max_tiles:
+        return [i * viewport_height for i in range(tile_count)]
+    offsets = [i * viewport_height for i in range(max(max_tiles - 1, 1))]
+    if max_tiles > 1:
+        offsets.append(max(page_height - viewport_height, 0))
+    return offsets
+
+
+def dhash(image, hash_size: int = 8) -> str:
+    """Difference hash: 64 bits comparing adjacent pixels of a tiny grayscale copy."""
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+
+def hash_distance(first: str, second: str) -> Optional[int]:
+    """Bit distance between two image hashes; None when they are not comparable."""
+    first_kind, _, first_value = first.partition(":")
+    second_kind, _, second_value = second.partition(":")
+    if first_kind != second_kind:
+        return None
+    if first_kind != "dhash":
+        return 0 if first_value == second_value else None
+    return bin(int(first_value, 16) ^ int(second_value, 16)).count("1")
+
+
+def prepare_screenshot(png_bytes: bytes, viewport_height: int = SCREENSHOT_VIEWPORT_HEIGHT,
+                       max_tiles: int = SCREENSHOT_MAX_TILES, max_width: int = SCREENSHOT_MAX_WIDTH,
+                       quality: int = SCREENSHOT_QUALITY) -> PreparedScreenshot:
+    """Crop a full-page screenshot to its relevant tiles, downscale and re-encode it."""
+    if not PIL_AVAILABLE:
+        return PreparedScreenshot(data=png_bytes, mime_type="image/png",
+                                  image_hash=f"sha1:{hashlib.sha1(png_bytes).hexdigest()}",
+                                  original_bytes=len(png_bytes))
+
+    with Image.open(io.BytesIO(png_bytes)) as source:
+        source = source.convert("RGB")
+        width, height = source.size
+        offsets = select_tiles(height, viewport_height, max_tiles)
+        tiles = [source.crop((0, top, width, min(top + viewport_height, height))) for top in offsets]
+        stacked = Image.new("RGB", (width, sum(tile.height for tile in tiles)))
+        top = 0
+        for tile in tiles:
+            stacked.paste(tile, (0, top))
+            top += tile.height
+
+    if stacked.width > max_width:
+        stacked = stacked.resize((max_width, max(1, round(stacked.height * max_width / stacked.width))), Image.LANCZOS)
+
+    buffer = io.BytesIO()
+    if features.check("webp"):
+        stacked.save(buffer, format="WEBP", quality=quality, method=4)
+        mime_type = "image/webp"
+    else:
+        stacked.save(buffer, format="JPEG", quality=quality, optimize=True)
+        mime_type = "image/jpeg"
+    return PreparedScreenshot(data=buffer.getvalue(), mime_type=mime_type, image_hash=f"dhash:{dhash(stacked)}",
+                              width=stacked.width, height=stacked.height, original_bytes=len(png_bytes))
+
+
+class VisionCache:
+    """
+    Recent vision-model answers per registrable domain, matched by image hash.
+
+    Args:
+        path: JSON file the cache is persisted to (None keeps it in memory)
+        ttl_hours: Age after which an analysis is no longer reused
+        max_distance: Maximum dHash distance for a screenshot to count as near-identical
+    """
+
+    def __init__(self, path: Optional[str] = VISION_CACHE_PATH, ttl_hours: float = VISION_CACHE_TTL_HOURS,
+                 max_distance: int = VISION_CACHE_MAX_DISTANCE):
+        self.path = path
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._entries: Dict[str, List[Dict[str, object]]] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Vision cache: ignoring unreadable cache file '{path}': {e}")
+
+    @staticmethod
+    def _prompt_key(prompt: str) -> str:
+        return hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:12]
+
+    def lookup(self, url: str, image_hash: str, prompt: str) -> Optional[str]:
+        """Answer of a recent analysis of a near-identical screenshot from the same domain, if any."""
+        domain = registrable_domain(url) or url
+        prompt_key = self._prompt_key(prompt)
+        now = time.time()
+        best = None
+        with self._lock:
+            for entry in self._entries.get(domain, []):
+                if entry["prompt"] != prompt_key or now - entry["at"] > self.ttl_seconds:
+                    continue
+                distance = hash_distance(image_hash, entry["hash"])
+                if distance is not None and distance <= self.max_distance and (best is None or distance < best[0]):
+                    best = (distance, entry["response"])
+        return best[1] if best else None
+
+    def store(self, url: str, image_hash: str, prompt: str, response: str) -> None:
+        domain = registrable_domain(url) or url
+        now = time.time()
+        with self._lock:
+            entries = [e for e in self._entries.get(domain, []) if now - e["at"] <= self.ttl_seconds]
+            entries.append({"hash": image_hash, "prompt": self._prompt_key(prompt), "response": response, "at": now})
+            self._entries[domain] = entries[-VISION_CACHE_MAX_PER_DOMAIN:]
+            snapshot = {key: list(value) for key, value in self._entries.items()}
+        if self.path:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.debug(f"Vision cache: failed to persist cache: {e}")
+
+
+# Global cache instance
+_vision_cache_instance: Optional[VisionCache] = None
+_vision_cache_lock = threading.Lock()
+
+def get_vision_cache() -> VisionCache:
+    """Get the global vision response cache"""
+    global _vision_cache_instance
+    with _vision_cache_lock:
+        if _vision_cache_instance is None:
+            _vision_cache_instance = VisionCache()
+        return _vision_cache_instance
@@ -0,0 +1,311 @@
+"""
+Semantic LLM cache for Nellia Prospector
+Reuses agent outputs for near-duplicate inputs (franchise branches, directory
+listings, agency subpages) by embedding a normalized version of the agent input
+and searching an inner-product index of previously seen inputs.
+
+Agents whose prompts carry instance context (e.g. the product/service being
+offered) look up with a scope fingerprint of that context: each scope gets
+its own index, so an output computed for one tenant or product is never
+served for another.
+"""
+
+import json
+import os
+import random
+import re
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from loguru import logger
+from pydantic import BaseModel
+
+from core_logic.embeddings import encode_texts
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import faiss
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+# Agents with the cache enabled: comma separated agent names or class names, "*" for all
+SEMANTIC_CACHE_AGENTS = os.getenv("SEMANTIC_CACHE_AGENTS", "")
+SEMANTIC_CACHE_DEFAULT_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_DEFAULT_THRESHOLD", "0.95"))
+# Per-agent overrides, e.g. "LeadAnalysisAgent=0.97,PersonaDefinitionAgent=0.93"
+SEMANTIC_CACHE_THRESHOLDS = os.getenv("SEMANTIC_CACHE_THRESHOLDS", "")
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+# Fraction of hits that are re-computed to measure false hits
+SEMANTIC_CACHE_AUDIT_RATE = float(os.getenv("SEMANTIC_CACHE_AUDIT_RATE", "0.05"))
+# Output similarity below which an audited hit is counted as a false hit
+SEMANTIC_CACHE_AUDIT_MIN_SIMILARITY = float(os.getenv("SEMANTIC_CACHE_AUDIT_MIN_SIMILARITY", "0.85"))
+AUDIT_LOG_SIZE = 200
+
+_URL_SCHEME_PATTERN = re.compile(r'https?://(www\.)?')
+_DIGITS_PATTERN = re.compile(r'\d+')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_agent_input(input_data: Any) -> str:
+    """
+    Normalize an agent input into the text that gets embedded.
+
+    Fields are serialized with sorted keys, lowercased, URL schemes dropped and
+    digit runs collapsed so that phone numbers, addresses and IDs of sibling
+    pages do not dominate the similarity.
+    """
+    if isinstance(input_data, BaseModel):
+        payload = json.dumps(input_data.model_dump(mode="json"), sort_keys=True, ensure_ascii=False)
+    else:
+        payload = str(input_data)
+    text = _URL_SCHEME_PATTERN.sub('', payload.lower())
+    text = _DIGITS_PATTERN.sub('0', text)
+    return _WHITESPACE_PATTERN.sub(' ', text).strip()
+
+
+def _parse_thresholds(spec: str) -> Dict[str, float]:
+    thresholds = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, value = item.partition('=')
+        try:
+            thresholds[name.strip()] = float(value)
+        except ValueError:
+            logger.warning(f"Semantic cache: ignoring invalid threshold '{item}'")
+    return thresholds
+
+
+def is_semantic_cache_enabled(agent: Any) -> bool:
+    """Whether the semantic cache should be used for the given agent."""
+    config = getattr(agent, 'config', None) or {}
+    if 'semantic_cache' in config:
+        return bool(config['semantic_cache'])
+    enabled = {name.strip() for name in SEMANTIC_CACHE_AGENTS.split(',') if name.strip()}
+    return '*' in enabled or agent.name in enabled or type(agent).__name__ in enabled
+
+
+@dataclass
+class SemanticCacheLookup:
+    """Result of a cache lookup; carries the embedding so a miss can be stored without re-encoding"""
+    agent_name: str
+    normalized_input: str
+    embedding: Any
+    scope: str = ""
+    output: Optional[BaseModel] = None
+    similarity: float = 0.0
+    cached_input: Optional[str] = None
+    audit: bool = False
+
+    @property
+    def hit(self) -> bool:
+        return self.output is not None
+
+
+@dataclass
+class SemanticCacheStats:
+    """Counters for a single agent"""
+    lookups: int = 0
+    hits: int = 0
+    stores: int = 0
+    audits: int = 0
+    false_hits: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "misses": self.lookups - self.hits,
+            "stores": self.stores,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "audits": self.audits,
+            "false_hits": self.false_hits,
+            "false_hit_rate": self.false_hits / self.audits if self.audits else 0.0,
+        }
+
+
+@dataclass
+class _AgentIndex:
+    """Vectors, inputs and outputs cached for a single agent and scope"""
+    dimension: int
+    vectors: Any = None
+    inputs: List[str] = field(default_factory=list)
+    outputs: List[BaseModel] = field(default_factory=list)
+    index: Any = None
+
+    def rebuild(self) -> None:
+        if FAISS_AVAILABLE:
+            self.index = faiss.IndexFlatIP(self.dimension)
+            if len(self.inputs):
+                self.index.add(self.vectors)
+
+    def add(self, vector: Any, normalized_input: str, output: BaseModel) -> None:
+        row = vector.reshape(1, -1)
+        self.vectors = row if self.vectors is None else np.vstack([self.vectors, row])
+        self.inputs.append(normalized_input)
+        self.outputs.append(output)
+        if FAISS_AVAILABLE:
+            if self.index is None:
+                self.index = faiss.IndexFlatIP(self.dimension)
+            self.index.add(row)
+
+    def search(self, vector: Any) -> Optional[tuple]:
+        if not self.inputs:
+            return None
+        if FAISS_AVAILABLE:
+            scores, ids = self.index.search(vector.reshape(1, -1), 1)
+            return float(scores[0][0]), int(ids[0][0])
+        scores = self.vectors @ vector
+        best = int(np.argmax(scores))
+        return float(scores[best]), best
+
+    def evict_oldest(self, count: int) -> None:
+        self.vectors = self.vectors[count:]
+        self.inputs = self.inputs[count:]
+        self.outputs = self.outputs[count:]
+        self.rebuild()
+
+
+class SemanticLLMCache:
+    """
+    Per-agent (and per-scope) semantic cache of agent outputs.
+
+    Inputs are embedded (normalized) with the shared MiniLM model so inner
+    product equals cosine similarity; a lookup returns the cached output of the
+    nearest previous input when it is above the agent's threshold. A sample of
+    hits is flagged for audit: the caller recomputes the output and reports it
+    back via ``record_audit`` so false hits can be measured.
+    """
+
+    def __init__(
+        self,
+        default_threshold: float = SEMANTIC_CACHE_DEFAULT_THRESHOLD,
+        thresholds: Optional[Dict[str, float]] = None,
+        max_entries_per_agent: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        audit_rate: float = SEMANTIC_CACHE_AUDIT_RATE,
+        audit_min_similarity: float = SEMANTIC_CACHE_AUDIT_MIN_SIMILARITY,
+        encoder: Optional[Callable[[List[str]], Any]] = None,
+    ):
+        self.default_threshold = default_threshold
+        self.thresholds = thresholds if thresholds is not None else _parse_thresholds(SEMANTIC_CACHE_THRESHOLDS)
+        self.max_entries_per_agent = max_entries_per_agent
+        self.audit_rate = audit_rate
+        self.audit_min_similarity = audit_min_similarity
+        self._encode = encoder or (lambda texts: encode_texts(texts, normalize=True))
+        self._indexes: Dict[Tuple[str, str], _AgentIndex] = {}
+        self._stats: Dict[str, SemanticCacheStats] = {}
+        self._audit_log: Deque[Dict[str, Any]] = deque(maxlen=AUDIT_LOG_SIZE)
+        self._lock = threading.Lock()
+
+    def threshold_for(self, agent_name: str) -> float:
+        return self.thresholds.get(agent_name, self.default_threshold)
+
+    def lookup(self, agent_name: str, input_data: Any, scope: str = "") -> SemanticCacheLookup:
+        """
+        Embed the normalized input and return the nearest cached output above threshold, if any.
+        Only entries stored under the same scope (fingerprint of the agent's context) are searched.
+        """
+        normalized_input = normalize_agent_input(input_data)
+        embedding = np.asarray(self._encode([normalized_input]), dtype="float32")[0]
+        result = SemanticCacheLookup(agent_name, normalized_input, embedding, scope=scope)
+
+        with self._lock:
+            stats = self._stats.setdefault(agent_name, SemanticCacheStats())
+            stats.lookups += 1
+            agent_index = self._indexes.get((agent_name, scope))
+            nearest = agent_index.search(embedding) if agent_index else None
+            if nearest and nearest[0] >= self.threshold_for(agent_name):
+                similarity, entry_id = nearest
+                stats.hits += 1
+                result.output = agent_index.outputs[entry_id].model_copy(deep=True)
+                result.similarity = similarity
+                result.cached_input = agent_index.inputs[entry_id]
+                result.audit = random.random() < self.audit_rate
+
+        if result.hit:
+            logger.debug(f"Semantic cache hit for {agent_name} (similarity {result.similarity:.3f}, audit={result.audit})")
+        return result
+
+    def store(self, lookup: SemanticCacheLookup, output: BaseModel) -> None:
+        """Cache an output for the input of a previous lookup. Outputs carrying an error are skipped."""
+        if not isinstance(output, BaseModel) or getattr(output, 'error_message', None):
+            return
+        with self._lock:
+            key = (lookup.agent_name, lookup.scope)
+            agent_index = self._indexes.get(key)
+            if agent_index is None:
+                agent_index = self._indexes[key] = _AgentIndex(dimension=lookup.embedding.shape[0])
+            if len(agent_index.inputs) >= self.max_entries_per_agent:
+                agent_index.evict_oldest(max(1, self.max_entries_per_agent // 4))
+            agent_index.add(lookup.embedding, lookup.normalized_input, output.model_copy(deep=True))
+            self._stats.setdefault(lookup.agent_name, SemanticCacheStats()).stores += 1
+
+    def record_audit(self, lookup: SemanticCacheLookup, fresh_output: BaseModel) -> Dict[str, Any]:
+        """Compare an audited hit against the freshly computed output and log the result."""
+        cached_text = normalize_agent_input(lookup.output)
+        fresh_text = normalize_agent_input(fresh_output)
+        if cached_text == fresh_text:
+            output_similarity = 1.0
+        else:
+            vectors = np.asarray(self._encode([cached_text, fresh_text]), dtype="float32")
+            output_similarity = float(vectors[0] @ vectors[1])
+        false_hit = output_similarity < self.audit_min_similarity
+
+        entry = {
+            "agent": lookup.agent_name,
+            "input_similarity": round(lookup.similarity, 4),
+            "output_similarity": round(output_similarity, 4),
+            "false_hit": false_hit,
+            "input_preview": lookup.normalized_input[:200],
+            "cached_input_preview": (lookup.cached_input or "")[:200],
+        }
+        with self._lock:
+            stats = self._stats.setdefault(lookup.agent_name, SemanticCacheStats())
+            stats.audits += 1
+            if false_hit:
+                stats.false_hits += 1
+            self._audit_log.append(entry)
+
+        if false_hit:
+            logger.warning(
+                f"Semantic cache false hit for {lookup.agent_name}: input similarity "
+                f"{lookup.similarity:.3f}, output similarity {output_similarity:.3f}"
+            )
+            self.store(lookup, fresh_output)
+        return entry
+
+    def get_stats(self, agent_name: Optional[str] = None) -> Dict[str, Any]:
+        """Hit/audit counters per agent (or for a single agent)."""
+        with self._lock:
+            if agent_name is not None:
+                stats = self._stats.get(agent_name, SemanticCacheStats()).to_dict()
+                stats["entries"] = sum(len(index.inputs) for (name, _), index in self._indexes.items() if name == agent_name)
+                stats["threshold"] = self.threshold_for(agent_name)
+                return stats
+        return {name: self.get_stats(name) for name in list(self._stats)}
+
+    def get_audit_log(self, agent_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Most recent audit results, optionally filtered by agent."""
+        with self._lock:
+            return [entry for entry in self._audit_log if agent_name is None or entry["agent"] == agent_name]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._indexes.clear()
+            self._stats.clear()
+            self._audit_log.clear()
+
+
+# Global semantic cache instance
+_cache_instance: Optional[SemanticLLMCache] = None
+
+def get_semantic_cache() -> SemanticLLMCache:
+    """Get the global semantic cache"""
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = SemanticLLMCache()
+    return _cache_instance
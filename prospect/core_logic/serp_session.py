@@ -0,0 +1,140 @@
+"""
+Google SERP session reuse, result cache and next-page prefetch for the harvester
+The harvester's Google search used to start every run from a blank browser
+profile (consent banner again) and walk the result pages one after another.
+
+- The context's storage state (consent cookies, preferences) is saved to a
+  JSON file and restored on the next run.
+- The results extracted from each (query, page) are kept in the fetch cache
+  (kind "serp") with their own TTL, so a repeated query replays the cached
+  pages and only opens the browser for the pages it is missing.
+- While a result page is being parsed, the next one is already loading in a
+  second tab of the same context.
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlencode, urljoin
+
+from loguru import logger
+
+from core_logic.cache_paths import cache_path
+from core_logic.fetch_cache import KIND_SERP, FetchCache
+
+# Cookies de sessão do Google: ficam fora do controle de versão (.cache/ no .gitignore)
+GOOGLE_STORAGE_STATE_PATH = os.path.abspath(os.getenv("GOOGLE_STORAGE_STATE_PATH", cache_path("google_storage_state.json")))
+SERP_CACHE_TTL_SECONDS = float(os.getenv("SERP_CACHE_TTL_SECONDS", str(6 * 3600)))
+SERP_PREFETCH_ENABLED = os.getenv("SERP_PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+SERP_RESULTS_PER_PAGE = 10
+NEXT_PAGE_LINK_SELECTOR = "a#pnnext"
+
+
+def google_serp_url(query: str, page_num: int) -> str:
+    """Canonical URL of a Google result page (also the cache key of the page)."""
+    params = {"q": query}
+    if page_num > 1:
+        params["start"] = (page_num - 1) * SERP_RESULTS_PER_PAGE
+    return f"https://www.google.com/search?{urlencode(params)}"
+
+
+def load_storage_state(path: Optional[str] = GOOGLE_STORAGE_STATE_PATH) -> Optional[str]:
+    """Path of a saved storage state to pass to new_context(), or None if there is no usable one."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"SERP session: ignoring unreadable storage state '{path}': {e}")
+        return None
+    return path
+
+
+def save_storage_state(context, path: Optional[str] = GOOGLE_STORAGE_STATE_PATH) -> bool:
+    """Persist the context's cookies/local storage for the next run."""
+    if not path:
+        return False
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        context.storage_state(path=tmp_path)
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        logger.debug(f"SERP session: failed to save storage state: {e}")
+        return False
+
+
+class SerpCache:
+    """Extracted results per (query, page) stored in the fetch cache with their own TTL"""
+
+    def __init__(self, cache: Optional[FetchCache], ttl_seconds: float = SERP_CACHE_TTL_SECONDS):
+        self.cache = cache
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, query: str, page_num: int) -> Optional[List[Dict[str, Any]]]:
+        """Cached results of a page ([] marks the end of the results), or None on a miss."""
+        if not self.cache:
+            return None
+        entry = self.cache.get(google_serp_url(query, page_num), kind=KIND_SERP)
+        if not entry or not (entry.is_fresh or self.cache.offline) or entry.extracted_text is None:
+            return None
+        try:
+            return json.loads(entry.extracted_text)
+        except ValueError:
+            return None
+
+    def put(self, query: str, page_num: int, results: List[Dict[str, Any]]) -> None:
+        if self.cache:
+            self.cache.put(google_serp_url(query, page_num), kind=KIND_SERP, extracted_text=json.dumps(results, ensure_ascii=False),
+                           ttl_seconds=self.ttl_seconds)
+
+
+class SerpPrefetcher:
+    """
+    Loads the next result page in a second tab while the current one is parsed.
+
+    Navigation is started with wait_until="commit", so start() returns as soon
+    as Google answers and the page keeps loading in the browser in parallel.
+    """
+
+    def __init__(self, context, enabled: bool = SERP_PREFETCH_ENABLED, timeout_ms: int = 30000):
+        self.context = context
+        self.enabled = enabled
+        self.timeout_ms = timeout_ms
+        self._page = None
+        self.target_url: Optional[str] = None
+
+    def start_from(self, page) -> bool:
+        """Start loading the page behind the current page's "next" link; False when there is none."""
+        if not self.enabled or self._page is not None:
+            return False
+        try:
+            href = page.locator(NEXT_PAGE_LINK_SELECTOR).first.get_attribute("href", timeout=1000)
+        except Exception:
+            href = None
+        if not href:
+            return False
+        self.target_url = urljoin(page.url, href)
+        try:
+            self._page = self.context.new_page()
+            self._page.goto(self.target_url, wait_until="commit", timeout=self.timeout_ms)
+            return True
+        except Exception as e:
+            logger.debug(f"SERP prefetch of {self.target_url} failed: {e}")
+            self.cancel()
+            return False
+
+    def take(self):
+        """Hand over the prefetched page (caller owns it from now on), or None."""
+        page, self._page = self._page, None
+        return page
+
+    def cancel(self) -> None:
+        page, self._page = self._page, None
+        if page is not None:
+            try:
+                page.close()
+            except Exception:
+                pass
@@ -0,0 +1,203 @@
+"""
+Signal Scoring Engine for Nellia Prospector
+Compiled keyword matching for the prospect profiler heuristics, with a
+batch mode that scores many leads at once into NumPy arrays.
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Keyword sets used by AdvancedProspectProfiler
+BUYING_INTENT_KEYWORDS = ('hiring', 'expanding', 'funding', 'seeking', 'looking for', 'need', 'require', 'new solution')
+URGENCY_KEYWORDS = ('urgent', 'asap', 'immediately', 'deadline', 'critical', 'priority', 'imminent')
+
+# Normalization divisors and weights for the overall prospect score
+INTENT_NORMALIZER = 3.0
+URGENCY_NORMALIZER = 2.0
+NEUTRAL_PAIN_ALIGNMENT = 0.5
+SCORE_WEIGHTS = {'intent': 0.4, 'alignment': 0.4, 'urgency': 0.2}
+
+
+class KeywordSet:
+    """
+    A set of keywords compiled into a single regex that is applied once per text.
+
+    Matching follows plain substring semantics (``keyword in text``): the
+    lookahead alternation finds the longest keyword starting at every position,
+    and each hit is expanded to all keywords it contains.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: Tuple[str, ...] = tuple(dict.fromkeys(str(k).lower() for k in keywords if k))
+        self._contained: Dict[str, FrozenSet[str]] = {
+            keyword: frozenset(other for other in self.keywords if other in keyword)
+            for keyword in self.keywords
+        }
+        if self.keywords:
+            alternation = '|'.join(re.escape(k) for k in sorted(self.keywords, key=len, reverse=True))
+            self._pattern: Optional[re.Pattern] = re.compile(f'(?=({alternation}))')
+        else:
+            self._pattern = None
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def matches(self, text: str) -> FrozenSet[str]:
+        """Return the keywords found in ``text`` (expected to be lowercased)."""
+        if self._pattern is None or not text:
+            return frozenset()
+        found = set()
+        for hit in set(self._pattern.findall(text)):
+            found.update(self._contained[hit])
+        return frozenset(found)
+
+    def matches_any(self, values: Iterable[str]) -> FrozenSet[str]:
+        """Union of matches over several texts, without concatenating them."""
+        found = set()
+        for value in values:
+            found.update(self.matches(value))
+        return frozenset(found)
+
+    def count(self, text: str) -> int:
+        """Number of distinct keywords found in ``text``."""
+        return len(self.matches(text))
+
+
+@lru_cache(maxsize=256)
+def _compile_keyword_set(keywords: Tuple[str, ...]) -> KeywordSet:
+    return KeywordSet(keywords)
+
+
+def get_keyword_set(keywords: Iterable[str]) -> KeywordSet:
+    """Return a cached compiled KeywordSet for the given keywords."""
+    return _compile_keyword_set(tuple(sorted(set(str(k).lower() for k in keywords if k))))
+
+
+@lru_cache(maxsize=256)
+def _pain_keywords_for(problems: Tuple[str, ...]) -> KeywordSet:
+    pain_keywords = set()
+    for problem in problems:
+        pain_keywords.update(re.findall(r'\b\w+\b', problem.lower()))
+    return get_keyword_set(pain_keywords)
+
+
+def pain_keyword_set(enriched_context: Optional[Dict[str, Any]]) -> KeywordSet:
+    """Build (and cache) the pain keyword set from the enriched context's problems_we_solve."""
+    problems = ((enriched_context or {}).get('lead_qualification_criteria', {}) or {}).get('problems_we_solve', []) or []
+    return _pain_keywords_for(tuple(str(problem) for problem in problems))
+
+
+def string_values(data: Dict[str, Any]) -> List[str]:
+    """Lowercased string values of a lead dict, as scanned by the signal rules."""
+    return [value.lower() for value in data.values() if isinstance(value, str)]
+
+
+@dataclass
+class SignalScores:
+    """Heuristic scores for a single lead"""
+    buying_intent: float
+    pain_alignment: float
+    urgency: float
+    overall: float
+
+
+@dataclass
+class SignalScoreBatch:
+    """Heuristic scores for many leads, one NumPy array per score"""
+    buying_intent: np.ndarray
+    pain_alignment: np.ndarray
+    urgency: np.ndarray
+    overall: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.overall)
+
+    def ranking(self) -> np.ndarray:
+        """Indices ordered by overall score, best first (stable for ties)."""
+        return np.argsort(-self.overall, kind='stable')
+
+    def row(self, index: int) -> SignalScores:
+        return SignalScores(
+            buying_intent=float(self.buying_intent[index]),
+            pain_alignment=float(self.pain_alignment[index]),
+            urgency=float(self.urgency[index]),
+            overall=float(self.overall[index]),
+        )
+
+
+class SignalScorer:
+    """Scores lead texts for buying intent, pain alignment and urgency."""
+
+    def __init__(
+        self,
+        intent_keywords: Sequence[str] = BUYING_INTENT_KEYWORDS,
+        urgency_keywords: Sequence[str] = URGENCY_KEYWORDS,
+    ):
+        self.intent_set = get_keyword_set(intent_keywords)
+        self.urgency_set = get_keyword_set(urgency_keywords)
+
+    def buying_intent(self, text: str) -> float:
+        return round(min(self.intent_set.count(text) / INTENT_NORMALIZER, 1.0), 3)
+
+    def urgency(self, text: str) -> float:
+        return round(min(self.urgency_set.count(text) / URGENCY_NORMALIZER, 1.0), 3)
+
+    def pain_alignment(self, text: str, pain_set: KeywordSet) -> float:
+        if not len(pain_set):
+            return NEUTRAL_PAIN_ALIGNMENT
+        return round(min(pain_set.count(text) / len(pain_set), 1.0), 3)
+
+    @staticmethod
+    def overall(intent: float, alignment: float, urgency: float) -> float:
+        score = (intent * SCORE_WEIGHTS['intent'] + alignment * SCORE_WEIGHTS['alignment']
+                 + urgency * SCORE_WEIGHTS['urgency'])
+        return round(score, 3)
+
+    def score_text(self, text: str, enriched_context: Optional[Dict[str, Any]] = None) -> SignalScores:
+        """Score a single (lowercased) lead text."""
+        intent = self.buying_intent(text)
+        alignment = self.pain_alignment(text, pain_keyword_set(enriched_context))
+        urgency = self.urgency(text)
+        return SignalScores(intent, alignment, urgency, self.overall(intent, alignment, urgency))
+
+    def score_batch(self, texts: Sequence[str], enriched_context: Optional[Dict[str, Any]] = None) -> SignalScoreBatch:
+        """
+        Score many lowercased lead texts at once.
+
+        Each keyword set is applied once per text; normalization, weighting and
+        rounding are done on the resulting count arrays.
+        """
+        pain_set = pain_keyword_set(enriched_context)
+        n = len(texts)
+        intent_counts = np.fromiter((self.intent_set.count(t) for t in texts), dtype=np.float64, count=n)
+        urgency_counts = np.fromiter((self.urgency_set.count(t) for t in texts), dtype=np.float64, count=n)
+
+        intent = np.round(np.minimum(intent_counts / INTENT_NORMALIZER, 1.0), 3)
+        urgency = np.round(np.minimum(urgency_counts / URGENCY_NORMALIZER, 1.0), 3)
+        if len(pain_set):
+            pain_counts = np.fromiter((pain_set.count(t) for t in texts), dtype=np.float64, count=n)
+            alignment = np.round(np.minimum(pain_counts / len(pain_set), 1.0), 3)
+        else:
+            alignment = np.full(n, NEUTRAL_PAIN_ALIGNMENT)
+
+        overall = np.round(
+            intent * SCORE_WEIGHTS['intent'] + alignment * SCORE_WEIGHTS['alignment']
+            + urgency * SCORE_WEIGHTS['urgency'],
+            3,
+        )
+        return SignalScoreBatch(intent, alignment, urgency, overall)
+
+
+# Global scorer instance
+_scorer_instance: Optional[SignalScorer] = None
+
+def get_signal_scorer() -> SignalScorer:
+    """Get the global signal scorer"""
+    global _scorer_instance
+    if _scorer_instance is None:
+        _scorer_instance = SignalScorer()
+    return _scorer_instance
@@ -0,0 +1,346 @@
+"""
+Shared Tavily search client for Nellia Prospector
+One pooled HTTP client for every Tavily search path (ADK1 tools, the
+TavilyEnrichmentAgent and the cw.py scripts), with concurrent fan-out of
+query lists, a persistent result cache keyed by (query, depth, max_results,
+include_answer) with TTL, and a local stand-in server for offline tests.
+
+Point TAVILY_API_URL at the stand-in to run without the real API:
+
+    python -m core_logic.tavily_client serve --port 8765 --fixtures tavily_fixtures.json
+    TAVILY_API_URL=http://127.0.0.1:8765 TAVILY_API_KEY=local python run.py
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from urllib.parse import urlparse
+
+import httpx
+from loguru import logger
+
+from core_logic.cache_paths import cache_path
+from core_logic.rate_limiter import get_rate_limiter
+
+TAVILY_API_URL = os.getenv("TAVILY_API_URL", "https://api.tavily.com")
+TAVILY_TIMEOUT_SECONDS = float(os.getenv("TAVILY_TIMEOUT_SECONDS", "30"))
+TAVILY_MAX_CONCURRENCY = int(os.getenv("TAVILY_MAX_CONCURRENCY", "4"))
+# Intervalo mínimo entre inícios de requisição (limite de taxa da API)
+TAVILY_MIN_INTERVAL_SECONDS = float(os.getenv("TAVILY_MIN_INTERVAL_SECONDS", "0.2"))
+TAVILY_CACHE_ENABLED = os.getenv("TAVILY_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+TAVILY_CACHE_PATH = os.path.abspath(os.getenv("TAVILY_CACHE_PATH", cache_path("tavily_cache.sqlite3")))
+TAVILY_CACHE_TTL_SECONDS = float(os.getenv("TAVILY_CACHE_TTL_SECONDS", str(24 * 3600)))
+
+
+class TavilySearchError(Exception):
+    """Raised when a Tavily search fails"""
+
+
+def cache_key(query: str, search_depth: str, max_results: int, include_answer: bool,
+              exclude_domains: Optional[Sequence[str]] = None) -> str:
+    normalized_query = " ".join(query.lower().split())
+    parts: List[Any] = [normalized_query, search_depth, max_results, include_answer]
+    if exclude_domains:
+        parts.append(sorted(exclude_domains))
+    raw = json.dumps(parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TavilyResultCache:
+    """Persistent TTL cache of Tavily responses (SQLite, compressed JSON)"""
+
+    def __init__(self, path: str = TAVILY_CACHE_PATH, ttl_seconds: float = TAVILY_CACHE_TTL_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS searches (cache_key TEXT PRIMARY KEY, query TEXT, "
+            "response BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, expires_at FROM searches WHERE cache_key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return json.loads(zlib.decompress(row[0]).decode("utf-8"))
+
+    def put(self, key: str, query: str, response: Dict[str, Any]) -> None:
+        blob = zlib.compress(json.dumps(response, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO searches (cache_key, query, response, expires_at) VALUES (?, ?, ?, ?)",
+                (key, query, blob, time.time() + self.ttl_seconds),
+            )
+            self._conn.execute("DELETE FROM searches WHERE expires_at < ?", (time.time(),))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM searches")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class TavilySearchClient:
+    """
+    Tavily client with a pooled keep-alive connection and an optional result cache.
+
+    Thread-safe: the ADK1 tools and the agents call it from worker threads.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: str = TAVILY_API_URL,
+        cache: Optional[TavilyResultCache] = None,
+        timeout_seconds: float = TAVILY_TIMEOUT_SECONDS,
+        max_concurrency: int = TAVILY_MAX_CONCURRENCY,
+        min_interval_seconds: float = TAVILY_MIN_INTERVAL_SECONDS,
+        transport: Optional[httpx.BaseTransport] = None,
+    ):
+        self.api_key = api_key or os.getenv("TAVILY_API_KEY")
+        self.base_url = base_url.rstrip("/")
+        self.cache = cache
+        self.max_concurrency = max_concurrency
+        self._rate_limiter = get_rate_limiter("tavily", min_interval_seconds)
+        self._client = httpx.Client(
+            timeout=httpx.Timeout(timeout_seconds),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            transport=transport,
+        )
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="tavily")
+        self.stats = {"requests": 0, "cache_hits": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, stat: str) -> None:
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def search(
+        self,
+        query: str,
+        search_depth: str = "basic",
+        max_results: int = 5,
+        include_answer: bool = False,
+        include_raw_content: bool = False,
+        exclude_domains: Optional[Sequence[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run a Tavily search and return the raw response ({"results": [...], "answer": ...}).
+
+        Raises:
+            ValueError: If no API key is configured
+            TavilySearchError: If the request fails
+        """
+        if not self.api_key:
+            raise ValueError("TAVILY_API_KEY não está configurada nas variáveis de ambiente.")
+
+        key = cache_key(query, search_depth, max_results, include_answer, exclude_domains)
+        if self.cache and not include_raw_content:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self._count("cache_hits")
+                return cached
+
+        payload = {
+            "api_key": self.api_key,
+            "query": query,
+            "search_depth": search_depth,
+            "max_results": max_results,
+            "include_answer": include_answer,
+            "include_raw_content": include_raw_content,
+        }
+        if exclude_domains:
+            payload["exclude_domains"] = list(exclude_domains)
+        self._rate_limiter.acquire()
+        self._count("requests")
+        try:
+            response = self._client.post(f"{self.base_url}/search", json=payload)
+            response.raise_for_status()
+            data = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            self._count("errors")
+            raise TavilySearchError(f"Falha na busca Tavily para '{query}': {e}") from e
+
+        if self.cache and not include_raw_content:
+            self.cache.put(key, query, data)
+        return data
+
+    def search_results(self, query: str, **params) -> List[Dict[str, Any]]:
+        """Like search(), returning only the result list."""
+        return self.search(query, **params).get("results", [])
+
+    def search_many(self, queries: Sequence[str], **params) -> List[Dict[str, Any]]:
+        """
+        Run several searches concurrently; responses keep the input order.
+
+        A failed query yields {"results": [], "error": "..."} instead of raising.
+        """
+        def safe_search(query: str) -> Dict[str, Any]:
+            try:
+                return self.search(query, **params)
+            except (TavilySearchError, ValueError) as e:
+                logger.warning(f"Tavily: {e}")
+                return {"results": [], "error": str(e)}
+
+        return self.map(safe_search, queries)
+
+    def map(self, fn: Callable[[Any], Any], items: Sequence[Any]) -> List[Any]:
+        """Apply a search callable to items on the client's worker pool, keeping order."""
+        return list(self._executor.map(fn, items))
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+        self._client.close()
+
+
+# Global instances, one per API key
+_clients: Dict[str, TavilySearchClient] = {}
+_shared_cache: Optional[TavilyResultCache] = None
+_clients_lock = threading.Lock()
+
+def get_tavily_client(api_key: Optional[str] = None) -> TavilySearchClient:
+    """Get the shared Tavily client for an API key (default: TAVILY_API_KEY)"""
+    global _shared_cache
+    api_key = api_key or os.getenv("TAVILY_API_KEY") or ""
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            if TAVILY_CACHE_ENABLED and _shared_cache is None:
+                _shared_cache = TavilyResultCache()
+            client = _clients[api_key] = TavilySearchClient(api_key=api_key or None, cache=_shared_cache)
+        return client
+
+
+# --- Stand-in local da API para testes e execuções offline ---
+
+def _default_results(query: str, max_results: int) -> List[Dict[str, Any]]:
+    slug = "-".join(query.lower().split())[:40] or "empresa"
+    return [
+        {
+            "title": f"Resultado {i + 1} para {query}",
+            "url": f"https://www.{slug}-{i + 1}.com.br/",
+            "content": f"Conteúdo de exemplo {i + 1} sobre {query}.",
+            "score": round(1.0 - i * 0.1, 2),
+        }
+        for i in range(max_results)
+    ]
+
+
+def _host_in(url: str, domains: Sequence[str]) -> bool:
+    host = (urlparse(url).hostname or "").lower()
+    return any(host == domain or host.endswith(f".{domain}") for domain in domains)
+
+
+class LocalTavilyServer:
+    """
+    Minimal HTTP server implementing POST /search with canned results.
+
+    ``fixtures`` maps a query (case-insensitive) to a result list; other
+    queries get generated results. Received payloads are kept in ``requests``.
+    Usable as a context manager; ``url`` is the value for TAVILY_API_URL.
+    """
+
+    def __init__(
+        self,
+        fixtures: Optional[Dict[str, List[Dict[str, Any]]]] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        results_factory: Callable[[str, int], List[Dict[str, Any]]] = _default_results,
+    ):
+        self.fixtures = {query.lower(): results for query, results in (fixtures or {}).items()}
+        self.results_factory = results_factory
+        self.requests: List[Dict[str, Any]] = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                server.requests.append(payload)
+                if self.path.rstrip("/") != "/search":
+                    return self._reply(404, {"detail": "Not Found"})
+                if not payload.get("api_key"):
+                    return self._reply(401, {"detail": "Missing API key"})
+                query = payload.get("query", "")
+                max_results = int(payload.get("max_results", 5))
+                results = server.fixtures.get(query.lower())
+                if results is None:
+                    results = server.results_factory(query, max_results)
+                excluded = tuple(domain.lower() for domain in payload.get("exclude_domains") or [])
+                if excluded:
+                    results = [r for r in results if not _host_in(r.get("url", ""), excluded)]
+                body = {"query": query, "results": results[:max_results], "response_time": 0.01}
+                if payload.get("include_answer"):
+                    body["answer"] = f"Resposta de exemplo para {query}."
+                self._reply(200, body)
+
+            def _reply(self, status: int, body: Dict[str, Any]) -> None:
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "LocalTavilyServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="local-tavily", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "LocalTavilyServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tavily client utilities")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    serve_parser = subparsers.add_parser("serve", help="Run the local Tavily stand-in server")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8765)
+    serve_parser.add_argument("--fixtures", help="JSON file mapping queries to result lists")
+    args = parser.parse_args()
+
+    fixtures = json.loads(open(args.fixtures, encoding="utf-8").read()) if args.fixtures else None
+    stand_in = LocalTavilyServer(fixtures=fixtures, host=args.host, port=args.port)
+    logger.info(f"Local Tavily stand-in listening on {stand_in.url} (set TAVILY_API_URL to use it)")
+    try:
+        stand_in._httpd.serve_forever()
+    except KeyboardInterrupt:
+        stand_in.stop()
@@ -0,0 +1,194 @@
+"""
+Static-first tiered fetching for the harvesters
+Most company sites are server-rendered HTML, so a plain HTTP fetch plus the
+lxml main-content extraction gets the same text as a Chromium render for a
+fraction of the cost. The browser is used only when the static tier fails:
+HTTP error, a JavaScript shell (empty app root, "enable JavaScript" notice,
+script-only document) or too little text.
+
+A per-domain memory (persisted as JSON) records which tier worked, so domains
+known to need rendering go straight to the browser on later visits and
+domains that render fine statically never open a page. Only JavaScript shells
+mark a domain as render-only (a render after an HTTP error or a short page
+says nothing about the site), and entries expire so static is retried.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from loguru import logger
+
+from core_logic.async_scraper import AsyncScraper, get_async_scraper
+from core_logic.cache_paths import cache_path
+from core_logic.content_extraction import extract_content
+from core_logic.domain_index import registrable_domain
+
+TIERED_FETCH_ENABLED = os.getenv("TIERED_FETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+STATIC_MIN_TEXT_CHARS = int(os.getenv("STATIC_MIN_TEXT_CHARS", "300"))
+FETCH_TIER_MEMORY_PATH = os.path.abspath(os.getenv("FETCH_TIER_MEMORY_PATH", cache_path("fetch_tiers.json")))
+# Depois desse prazo o domínio volta a tentar o fetch estático
+FETCH_TIER_TTL_DAYS = float(os.getenv("FETCH_TIER_TTL_DAYS", "7"))
+# Domínios cujo conteúdo só existe após renderização (redes sociais)
+ALWAYS_RENDER_DOMAINS = frozenset({"instagram.com", "linkedin.com", "facebook.com", "x.com", "twitter.com"})
+
+TIER_STATIC = "static"
+TIER_RENDER = "render"
+# Motivos de escalonamento que indicam que o site depende de JavaScript
+JS_SHELL_REASONS = frozenset({"empty_app_root", "noscript_warning", "script_heavy"})
+
+_NOSCRIPT_WARNING = re.compile(
+    r"<noscript[^>]*>[^<]*(?:<[^>]+>[^<]*)*?(enable javascript|javascript (is )?(required|disabled)|"
+    r"habilite o javascript|ative o javascript|javascript (está )?desativado)",
+    re.IGNORECASE,
+)
+_EMPTY_APP_ROOT = re.compile(
+    r"<(div|main)[^>]+id=[\"'](root|app|__next|__nuxt|___gatsby|svelte|main-app)[\"'][^>]*>\s*</\1>", re.IGNORECASE
+)
+_SCRIPT_BLOCK = re.compile(r"<script\b[^>]*>.*?</script>", re.IGNORECASE | re.DOTALL)
+MAX_SCRIPT_SHARE = 0.7
+
+
+def detect_js_shell(html: str, text: str, min_text_chars: int = STATIC_MIN_TEXT_CHARS) -> Optional[str]:
+    """
+    Reason why a statically fetched page must be rendered, or None if its text is usable.
+    """
+    if len(text.strip()) >= min_text_chars:
+        return None
+    if _EMPTY_APP_ROOT.search(html):
+        return "empty_app_root"
+    if _NOSCRIPT_WARNING.search(html):
+        return "noscript_warning"
+    script_chars = sum(len(block) for block in _SCRIPT_BLOCK.findall(html))
+    if html and script_chars / len(html) > MAX_SCRIPT_SHARE:
+        return "script_heavy"
+    return "too_short"
+
+
+class TierMemory:
+    """Which fetch tier worked last for each registrable domain, persisted as JSON with a TTL"""
+
+    def __init__(self, path: Optional[str] = FETCH_TIER_MEMORY_PATH, ttl_seconds: float = FETCH_TIER_TTL_DAYS * 86400):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._tiers: Dict[str, Tuple[str, float]] = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    for domain, entry in json.load(f).items():
+                        # Formato antigo (só o tier, sem data) conta como expirado
+                        if isinstance(entry, dict):
+                            self._tiers[str(domain)] = (str(entry["tier"]), float(entry["at"]))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Tiered fetch: ignoring unreadable tier memory '{path}': {e}")
+
+    def _is_fresh(self, recorded_at: float, now: float) -> bool:
+        return now - recorded_at < self.ttl_seconds
+
+    def tier_for(self, url: str) -> Optional[str]:
+        """Tier that worked for the URL's domain, or None if unknown or expired."""
+        with self._lock:
+            entry = self._tiers.get(registrable_domain(url) or url)
+        if entry and self._is_fresh(entry[1], time.time()):
+            return entry[0]
+        return None
+
+    def record(self, url: str, tier: str) -> None:
+        domain = registrable_domain(url) or url
+        now = time.time()
+        with self._lock:
+            entry = self._tiers.get(domain)
+            # Só regrava quando o tier muda ou o registro passou da metade do TTL
+            if entry and entry[0] == tier and self._is_fresh(entry[1], now - self.ttl_seconds / 2):
+                return
+            self._tiers[domain] = (tier, now)
+            snapshot = {d: {"tier": t, "at": at} for d, (t, at) in self._tiers.items() if self._is_fresh(at, now)}
+        if self.path:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.debug(f"Tiered fetch: failed to persist tier memory: {e}")
+
+
+@dataclass
+class StaticAttempt:
+    """Outcome of the static tier: text when usable, otherwise why the browser is needed"""
+    text: Optional[str] = None
+    title: Optional[str] = None
+    escalation_reason: Optional[str] = None
+    elapsed_seconds: float = 0.0
+
+
+class TieredFetcher:
+    """
+    Static HTTP tier in front of the browser tier.
+
+    Callers try ``try_static`` first; when it returns an escalation reason they
+    render the page and report the outcome (and the escalation reason) with
+    ``record_render``.
+    """
+
+    def __init__(self, scraper: Optional[AsyncScraper] = None, memory: Optional[TierMemory] = None,
+                 min_text_chars: int = STATIC_MIN_TEXT_CHARS):
+        self._scraper = scraper
+        self.memory = memory if memory is not None else TierMemory(None)
+        self.min_text_chars = min_text_chars
+        self.stats = {"static": 0, "escalated": 0, "skipped_static": 0}
+
+    @property
+    def scraper(self) -> AsyncScraper:
+        return self._scraper or get_async_scraper()
+
+    def try_static(self, url: str) -> StaticAttempt:
+        """Fetch a page over plain HTTP and extract its text, unless the domain needs rendering."""
+        domain = registrable_domain(url)
+        if domain in ALWAYS_RENDER_DOMAINS:
+            self.stats["skipped_static"] += 1
+            return StaticAttempt(escalation_reason="render_only_domain")
+        if self.memory.tier_for(url) == TIER_RENDER:
+            self.stats["skipped_static"] += 1
+            return StaticAttempt(escalation_reason="domain_needs_render")
+
+        fetched = self.scraper.fetch_sync(url)
+        if fetched.error:
+            self.stats["escalated"] += 1
+            return StaticAttempt(escalation_reason=f"http_error: {fetched.error}", elapsed_seconds=fetched.elapsed_seconds)
+        if fetched.extracted_text is not None:
+            title, text = fetched.title, fetched.extracted_text
+        else:
+            extracted = extract_content(fetched.text)
+            title, text = extracted.title, extracted.to_prompt_text()
+        reason = detect_js_shell(fetched.text, text, self.min_text_chars)
+        if reason:
+            self.stats["escalated"] += 1
+            return StaticAttempt(title=title, escalation_reason=reason, elapsed_seconds=fetched.elapsed_seconds)
+        self.stats["static"] += 1
+        self.memory.record(url, TIER_STATIC)
+        return StaticAttempt(text=text, title=title, elapsed_seconds=fetched.elapsed_seconds)
+
+    def record_render(self, url: str, succeeded: bool, reason: Optional[str] = None) -> None:
+        """Remember that a domain needed the browser, when it escalated as a JS shell and the render worked."""
+        if succeeded and reason in JS_SHELL_REASONS and registrable_domain(url) not in ALWAYS_RENDER_DOMAINS:
+            self.memory.record(url, TIER_RENDER)
+
+
+# Global fetcher instance
+_fetcher_instance: Optional[TieredFetcher] = None
+_fetcher_lock = threading.Lock()
+
+def get_tiered_fetcher() -> TieredFetcher:
+    """Get the global tiered fetcher (with persisted per-domain tier memory)"""
+    global _fetcher_instance
+    with _fetcher_lock:
+        if _fetcher_instance is None:
+            _fetcher_instance = TieredFetcher(memory=TierMemory())
+        return _fetcher_instance
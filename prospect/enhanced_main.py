@@ -11,7 +11,7 @@ import time
 # import asyncio # Not currently used
 import argparse
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, Iterable, List, Optional, Union
 from datetime import datetime
 from dataclasses import dataclass, field
 from enum import Enum
@@ -28,6 +28,12 @@ from rich import print as rprint
 
 # Core imports
 from core_logic.llm_client import LLMClientFactory, LLMClientBase
+from core_logic.harvest_stream import (
+    HARVEST_FOLLOW_IDLE_TIMEOUT_SECONDS,
+    follow_harvest_sites_async,
+    iterate_limited,
+    load_harvest_file,
+)
 from data_models.lead_structures import (
     HarvesterOutput, 
     AnalyzedLead,
@@ -130,20 +136,29 @@ class EnhancedNelliaProspector:
 
     async def process_leads( # Made async
         self, 
-        harvester_data: HarvesterOutput, 
-        limit: Optional[int] = None
+        harvester_data: Optional[HarvesterOutput], 
+        limit: Optional[int] = None,
+        sites_stream: Optional[AsyncIterator[SiteData]] = None
     ) -> ProcessingResults:
+        """Process the harvested sites, or with `sites_stream` (follow mode) each site as the harvester writes it."""
         start_time_run_processing = time.time()
         run_id = str(uuid.uuid4())
 
-        leads_to_process = harvester_data.sites_data
-        if limit:
-            leads_to_process = leads_to_process[:limit]
+        if sites_stream is not None:
+            leads_to_process = iterate_limited(sites_stream, limit)
+            if self.processing_mode == ProcessingMode.HYBRID:
+                # O modo híbrido percorre os leads duas vezes: espera o fim do harvest
+                logger.info("Hybrid mode needs the whole harvest; waiting for the harvester to finish")
+                leads_to_process = [site_data async for site_data in leads_to_process]
+        else:
+            leads_to_process = harvester_data.sites_data
+            if limit:
+                leads_to_process = leads_to_process[:limit]
         
         self.console.print(Panel(
             f"🚀 Enhanced Nellia Prospector (Run ID: {run_id})\n"
             f"Mode: {self.processing_mode.value.upper()}\n"
-            f"Leads to process: {len(leads_to_process)}\n"
+            f"Leads to process: {len(leads_to_process) if isinstance(leads_to_process, list) else 'streaming (follow mode)'}\n"
             f"MCP Reporting: {'ENABLED' if self.ENABLE_MCP_REPORTING else 'DISABLED'}\n" # Use instance variable
             f"Product/Service: {self.product_service_context[:100]}{'...' if len(self.product_service_context) > 100 else ''}",
             title="Processing Configuration",
@@ -183,15 +198,17 @@ class EnhancedNelliaProspector:
         else:
             return await self._standard_processing(leads_to_process, run_id, overall_start_time=start_time_run_processing) # await
 
-    async def _standard_processing(self, leads_to_process: List[SiteData], run_id: str, is_hybrid_component: bool = False, overall_start_time: Optional[float] = None) -> ProcessingResults: # Made async
+    async def _standard_processing(self, leads_to_process: Union[Iterable[SiteData], AsyncIterator[SiteData]], run_id: str, is_hybrid_component: bool = False, overall_start_time: Optional[float] = None) -> ProcessingResults: # Made async
         results = []
         successful = 0
         failed = 0
         processing_start_time = time.time()
+        total_leads = 0
         
         with Progress(console=self.console, transient=not is_hybrid_component) as progress:
-            task = progress.add_task("[blue]Standard Processing...", total=len(leads_to_process))
-            for site_data in leads_to_process:
+            task = progress.add_task("[blue]Standard Processing...", total=len(leads_to_process) if isinstance(leads_to_process, list) else None)
+            async for site_data in iterate_limited(leads_to_process):
+                total_leads += 1
                 lead_id = str(uuid.uuid4())
                 self._report_lead_start_to_mcp(lead_id, run_id, str(site_data.url), "LeadIntakeAgent (Standard)")
 
@@ -222,23 +239,25 @@ class EnhancedNelliaProspector:
         
         current_run_time = time.time() - processing_start_time
         return ProcessingResults(
-            mode=ProcessingMode.STANDARD, total_leads=len(leads_to_process),
+            mode=ProcessingMode.STANDARD, total_leads=total_leads,
             successful_leads=successful, failed_leads=failed,
             processing_time=current_run_time, results=results,
-            metrics={"avg_processing_time": current_run_time / max(1,len(leads_to_process)),
-                     "success_rate": successful / max(1,len(leads_to_process)),
+            metrics={"avg_processing_time": current_run_time / max(1,total_leads),
+                     "success_rate": successful / max(1,total_leads),
                      "total_tokens_used": self.llm_client.get_usage_stats()["total_tokens"]}
         )
 
-    async def _enhanced_processing(self, leads_to_process: List[SiteData], run_id: str, is_hybrid_component: bool = False, overall_start_time: Optional[float] = None) -> ProcessingResults: # Made async
+    async def _enhanced_processing(self, leads_to_process: Union[Iterable[SiteData], AsyncIterator[SiteData]], run_id: str, is_hybrid_component: bool = False, overall_start_time: Optional[float] = None) -> ProcessingResults: # Made async
         results = []
         successful = 0
         failed = 0
         processing_start_time = time.time()
+        total_leads = 0
         
         with Progress(console=self.console, transient=not is_hybrid_component) as progress:
-            task = progress.add_task("[green]Enhanced Processing...", total=len(leads_to_process))
-            for site_data in leads_to_process:
+            task = progress.add_task("[green]Enhanced Processing...", total=len(leads_to_process) if isinstance(leads_to_process, list) else None)
+            async for site_data in iterate_limited(leads_to_process):
+                total_leads += 1
                 lead_id = str(uuid.uuid4())
                 self._report_lead_start_to_mcp(lead_id, run_id, str(site_data.url), "LeadIntakeAgent (Enhanced)")
 
@@ -306,12 +325,12 @@ class EnhancedNelliaProspector:
 
         current_run_time = time.time() - processing_start_time # Use processing_start_time as run_start_time is not defined here
         return ProcessingResults(
-            mode=ProcessingMode.ENHANCED, total_leads=len(leads_to_process),
+            mode=ProcessingMode.ENHANCED, total_leads=total_leads,
             successful_leads=successful, failed_leads=failed,
             processing_time=current_run_time, results=results,
             metrics={
-                "avg_processing_time": current_run_time / max(1,len(leads_to_process)),
-                "success_rate": successful / max(1,len(leads_to_process)),
+                "avg_processing_time": current_run_time / max(1,total_leads),
+                "success_rate": successful / max(1,total_leads),
                 "total_tokens_used": self.llm_client.get_usage_stats()["total_tokens"],
                 "avg_overall_confidence_score": sum(r.get("overall_confidence_score", 0) for r in results if r.get("overall_confidence_score") is not None) / max(1, successful),
                 "avg_roi_potential": sum(r.get("roi_potential_score", 0) for r in results if r.get("roi_potential_score") is not None) / max(1, successful),
@@ -445,20 +464,32 @@ class EnhancedNelliaProspector:
 
 def load_harvester_data(file_path: str) -> HarvesterOutput:
     try:
-        with open(file_path, 'r', encoding='utf-8') as f: data = json.load(f)
+        data = load_harvest_file(file_path)
         return HarvesterOutput(**data)
     except Exception as e:
         logger.error(f"Failed to load harvester data from {file_path}: {e}")
         raise
 
+async def follow_harvester_data(file_path: str,
+                                idle_timeout: Optional[float] = HARVEST_FOLLOW_IDLE_TIMEOUT_SECONDS) -> AsyncIterator[SiteData]:
+    """Yield sites from a streaming JSONL harvest as the harvester appends them (until its footer line or idle timeout)"""
+    async for record in follow_harvest_sites_async(file_path, idle_timeout=idle_timeout):
+        try:
+            yield SiteData(**record)
+        except Exception as e:
+            logger.warning(f"Skipping invalid site record in {file_path}: {e}")
+
 def main():
     parser = argparse.ArgumentParser(description="Enhanced Nellia Prospector - Multi-mode AI lead processing")
-    parser.add_argument("harvester_file", help="Path to harvester output JSON file")
+    parser.add_argument("harvester_file", help="Path to harvester output JSON (or streaming JSONL) file")
     parser.add_argument("-p", "--product", required=True, help="Product/service context for analysis")
     parser.add_argument("-m", "--mode", choices=[mode.value for mode in ProcessingMode], default=ProcessingMode.ENHANCED.value, help="Processing mode")
     parser.add_argument("-c", "--competitors", default="", help="Known competitors list")
     parser.add_argument("-n", "--limit", type=int, help="Limit number of leads to process")
     parser.add_argument("-o", "--output", help="Output file path (default: auto-generated)")
+    parser.add_argument("-f", "--follow", action="store_true", help="Tail a streaming JSONL harvest, processing sites while the harvester runs")
+    parser.add_argument("--idle-timeout", type=float, default=HARVEST_FOLLOW_IDLE_TIMEOUT_SECONDS,
+                        help="With --follow, stop after this many seconds without new sites (default: %(default)s)")
     parser.add_argument("-l", "--log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default="INFO", help="Logging level")
     args = parser.parse_args()
     
@@ -469,12 +500,13 @@ def main():
     import asyncio
 
     async def async_main(): # Wrap main logic in async function
-        harvester_data = load_harvester_data(args.harvester_file)
+        harvester_data = None if args.follow else load_harvester_data(args.harvester_file)
+        sites_stream = follow_harvester_data(args.harvester_file, args.idle_timeout) if args.follow else None
         processor = EnhancedNelliaProspector(
             product_service_context=args.product, competitors_list=args.competitors,
             processing_mode=ProcessingMode(args.mode), tavily_api_key=os.getenv("TAVILY_API_KEY")
         )
-        results = await processor.process_leads(harvester_data, args.limit) # await
+        results = await processor.process_leads(harvester_data, args.limit, sites_stream=sites_stream) # await
         processor.generate_report(results)
         if args.output: output_file = args.output
         else:
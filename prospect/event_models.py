@@ -172,6 +172,8 @@ class LeadGeneratedEvent(BaseEvent):
     lead_data: Dict[str, Any]
     source_url: str
     agent_name: str
+    relevance_score: Optional[float] = None # Similarity to the job's RAG context (pre-ranking)
+    relevance_rank: Optional[int] = None # 1-based position in the enrichment order
     
     
     def to_dict(self) -> Dict[str, Any]:
@@ -180,7 +182,9 @@ class LeadGeneratedEvent(BaseEvent):
             "lead_id": self.lead_id,
             "lead_data": self.lead_data,
             "source_url": self.source_url,
-            "agent_name": self.agent_name
+            "agent_name": self.agent_name,
+            "relevance_score": self.relevance_score,
+            "relevance_rank": self.relevance_rank
         })
         return data
 
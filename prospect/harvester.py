@@ -1,3 +1,4 @@
+import asyncio
 import os
 import sys
 from dotenv import load_dotenv
@@ -10,6 +11,18 @@ import re
 import traceback
 from urllib.parse import urlparse
 
+from core_logic.async_harvester import AsyncHarvester
+from core_logic.browser_pool import PolitenessScheduler, PooledPage, close_browser_pool, get_browser_pool
+from core_logic.domain_index import DomainIndex
+from core_logic.fetch_cache import KIND_RENDERED, get_fetch_cache
+from core_logic.harvest_stream import HarvestCheckpoint, HarvestStreamWriter, checkpoint_path_for, read_harvest_jsonl
+from core_logic.negative_cache import VIA_BROWSER, get_negative_cache, skip_message
+from core_logic.page_readiness import get_readiness_detector
+from core_logic.resource_policy import PageTraffic, attach_resource_policy, detach_resource_policy
+from core_logic.screenshot_pipeline import get_vision_cache, prepare_screenshot
+from core_logic.serp_session import SerpCache, SerpPrefetcher, google_serp_url, load_storage_state, save_storage_state
+from core_logic.tiered_fetch import TIERED_FETCH_ENABLED, get_tiered_fetcher
+
 # --- Configuração Inicial ---
 load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
@@ -19,11 +32,10 @@ MAX_PAGES_TO_SCRAPE_GOOGLE = 5
 MAX_RESULTS_PER_GOOGLE_PAGE_APPROX = 10
 
 BROWSER_LAUNCH_TIMEOUT = 240000
-EXTRACTION_BROWSER_LAUNCH_TIMEOUT = 75000
 EXTRACTION_PAGE_NAVIGATION_TIMEOUT = 90000
 EXTRACTION_NETWORKIDLE_TIMEOUT = 30000
 EXTRACTION_DEFAULT_OPERATION_TIMEOUT = 60000
-SOCIAL_MEDIA_EXTRACTION_PAUSE = 8000
+SOCIAL_MEDIA_SCROLL_STEPS = 3
 
 GOOGLE_GOTO_TIMEOUT = 90000
 GOOGLE_NETWORKIDLE_TIMEOUT = 120000
@@ -75,7 +87,7 @@ def get_screenshot_bytes(page: Page, full_page: bool = False) -> bytes | None:
         print(f"  Aviso: Falha ao obter screenshot: {e}")
         return None
 
-def ask_gemini_about_image(image_bytes: bytes, prompt_text: str, attempt: int = 1) -> str | None:
+def ask_gemini_about_image(image_bytes: bytes, prompt_text: str, attempt: int = 1, mime_type: str = "image/png") -> str | None:
     if not gemini_model_multimodal:
         print("  [IA Imagem] Modelo Gemini para imagem não configurado. Pulando análise.")
         return "FALHA IA IMAGEM: Modelo não configurado."
@@ -84,7 +96,7 @@ def ask_gemini_about_image(image_bytes: bytes, prompt_text: str, attempt: int =
         return None
     print(f"  [IA Imagem, Tentativa {attempt}] Enviando imagem e prompt para Gemini ({MODEL_NAME_FOR_IMAGE_ANALYSIS})...")
     try:
-        image_part = {"mime_type": "image/png", "data": image_bytes}
+        image_part = {"mime_type": mime_type, "data": image_bytes}
         # A API generate_content para modelos de texto puro não aceita 'image_part' desta forma.
         # Isso provavelmente causará um erro na chamada da API.
         content_parts = [prompt_text, image_part]
@@ -319,23 +331,57 @@ def extract_links_from_google_page(page: Page, num_links_target: int, collected_
 def search_google_and_get_top_n_links(query: str, num_links_target: int = 25) -> list[dict]:
     all_collected_results_data = []
     processed_urls_set = set()
+    # Um resultado por empresa (domínio registrável): www/sem www, /contato, /sobre etc. viram subpáginas
+    domain_index = DomainIndex()
+    serp_cache = SerpCache(get_fetch_cache())
+
+    def add_page_results(page_results: list[dict]) -> int:
+        added_count = 0
+        for res_data in page_results:
+            if res_data["url"] not in processed_urls_set:
+                processed_urls_set.add(res_data["url"])
+                if domain_index.add(res_data):
+                    all_collected_results_data.append(res_data)
+                    added_count += 1
+            if len(all_collected_results_data) >= num_links_target: break
+        return added_count
 
     print(f"\nBuscando no Google por: '{query}' para obter até {num_links_target} resultados.")
     print(f"  (Máximo {MAX_SEARCH_RETRIES_PER_GOOGLE_PAGE} tentativas por página, até {MAX_PAGES_TO_SCRAPE_GOOGLE} páginas do Google)")
 
+    # Páginas desta busca ainda válidas no cache de SERP são reaproveitadas sem abrir o navegador
+    first_page_to_fetch = 1
+    while first_page_to_fetch <= MAX_PAGES_TO_SCRAPE_GOOGLE and len(all_collected_results_data) < num_links_target:
+        cached_page_results = serp_cache.get(query, first_page_to_fetch)
+        if cached_page_results is None: break
+        print(f"  Página {first_page_to_fetch} do Google servida do cache ({add_page_results(cached_page_results)} resultados novos).")
+        if not cached_page_results:
+            first_page_to_fetch = MAX_PAGES_TO_SCRAPE_GOOGLE + 1  # Fim dos resultados já registrado
+            break
+        first_page_to_fetch += 1
+    if len(all_collected_results_data) >= num_links_target or first_page_to_fetch > MAX_PAGES_TO_SCRAPE_GOOGLE:
+        print(f"\nBusca no Google atendida pelo cache. Total de {len(all_collected_results_data)} resultados coletados.")
+        return domain_index.results()[:num_links_target]
+
     with sync_playwright() as p_instance:
         browser: Browser | None = None
         context: BrowserContext | None = None
         page: Page | None = None
+        prefetcher: SerpPrefetcher | None = None
         try:
             print(f"  Iniciando navegador para busca Google (timeout: {BROWSER_LAUNCH_TIMEOUT / 1000}s)...")
             browser = p_instance.chromium.launch(headless=False, timeout=BROWSER_LAUNCH_TIMEOUT)
             print("  Navegador para busca Google iniciado.")
+            # Cookies de consentimento/preferências da execução anterior evitam o banner de cookies
+            storage_state = load_storage_state()
             context = browser.new_context(
                 user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
                 java_script_enabled=True, ignore_https_errors=True, accept_downloads=False,
-                viewport={'width': 1366, 'height': 768}
+                viewport={'width': 1366, 'height': 768}, storage_state=storage_state
             )
+            if storage_state:
+                print(f"  Sessão do Google restaurada de '{storage_state}'.")
+            prefetcher = SerpPrefetcher(context)
             page = context.new_page()
             print("  Contexto e página para busca Google criados.")
 
@@ -375,7 +421,7 @@ def search_google_and_get_top_n_links(query: str, num_links_target: int = 25) ->
             for sel_idx, sel in enumerate(cookie_selectors):
                 if page.is_closed(): break
                 try:
-                    timeout_cookie = GOOGLE_COOKIE_CLICK_TIMEOUT if sel_idx == 0 else 2000
+                    timeout_cookie = GOOGLE_COOKIE_CLICK_TIMEOUT if sel_idx == 0 and not storage_state else 2000
                     cookie_button = page.locator(sel).first
                     if cookie_button.is_visible(timeout=timeout_cookie):
                         print(f"    Clicando no botão de cookies (seletor {sel_idx+1}): '{sel}'");
@@ -388,22 +434,27 @@ def search_google_and_get_top_n_links(query: str, num_links_target: int = 25) ->
             if page.is_closed(): print("  ERRO: Página fechada após cookies."); return []
 
 
-            print(f"  Digitando termo de busca: '{query}'")
-            search_box_interaction_sel = 'textarea[name="q"][role="combobox"], input[name="q"]:not([type="hidden"])'
-            try:
-                search_box_locator = page.locator(search_box_interaction_sel).first
-                search_box_locator.wait_for(state="visible", timeout=GOOGLE_SEARCHBOX_TIMEOUT)
-                search_box_locator.fill(query)
-                page.wait_for_timeout(1000)
-                search_box_locator.press("Enter")
-                print("  Termo de busca enviado.")
-            except PlaywrightError as e_searchbox:
-                print(f"    ERRO: Não foi possível interagir com a caixa de busca (seletor: {search_box_interaction_sel}). {e_searchbox}")
-                if page and not page.is_closed(): page.screenshot(path=os.path.join(OUTPUT_FOLDER, f"debug_google_searchbox_fail.png"))
-                raise
+            if first_page_to_fetch > 1:
+                # As páginas anteriores vieram do cache: vai direto para a primeira que falta
+                print(f"  Abrindo diretamente a página {first_page_to_fetch} do Google...")
+                page.goto(google_serp_url(query, first_page_to_fetch), timeout=GOOGLE_GOTO_TIMEOUT, wait_until="domcontentloaded")
+            else:
+                print(f"  Digitando termo de busca: '{query}'")
+                search_box_interaction_sel = 'textarea[name="q"][role="combobox"], input[name="q"]:not([type="hidden"])'
+                try:
+                    search_box_locator = page.locator(search_box_interaction_sel).first
+                    search_box_locator.wait_for(state="visible", timeout=GOOGLE_SEARCHBOX_TIMEOUT)
+                    search_box_locator.fill(query)
+                    page.wait_for_timeout(1000)
+                    search_box_locator.press("Enter")
+                    print("  Termo de busca enviado.")
+                except PlaywrightError as e_searchbox:
+                    print(f"    ERRO: Não foi possível interagir com a caixa de busca (seletor: {search_box_interaction_sel}). {e_searchbox}")
+                    if page and not page.is_closed(): page.screenshot(path=os.path.join(OUTPUT_FOLDER, f"debug_google_searchbox_fail.png"))
+                    raise
 
             page_content_issue_screenshot_taken_this_serp = False
-            for page_num in range(1, MAX_PAGES_TO_SCRAPE_GOOGLE + 1):
+            for page_num in range(first_page_to_fetch, MAX_PAGES_TO_SCRAPE_GOOGLE + 1):
                 if page.is_closed() or len(all_collected_results_data) >= num_links_target: break
                 print(f"\n  --- Processando Página {page_num} do Google ---")
                 current_page_had_results = False
@@ -422,6 +473,9 @@ def search_google_and_get_top_n_links(query: str, num_links_target: int = 25) ->
                     try:
                         page.locator(wait_for_content_or_end_selector).first.wait_for(state="visible", timeout=GOOGLE_RESULTS_WAIT_TIMEOUT)
                         print(f"      Contêiner de resultados/fim da página {page_num} visível.")
+                        # A próxima página carrega numa segunda aba enquanto esta é analisada
+                        if page_num < MAX_PAGES_TO_SCRAPE_GOOGLE and prefetcher.start_from(page):
+                            print(f"      Pré-carregando a página {page_num + 1} em segundo plano: {prefetcher.target_url}")
                         page.wait_for_timeout(2000 + (700 * attempt)) # Aumentado
 
                         if page.is_closed(): raise PlaywrightError("Página fechada inesperadamente")
@@ -446,22 +500,19 @@ def search_google_and_get_top_n_links(query: str, num_links_target: int = 25) ->
                             if attempt < MAX_SEARCH_RETRIES_PER_GOOGLE_PAGE: continue
                             else: current_page_had_results = False; break
 
-                        new_results_data = extract_links_from_google_page(page, num_links_target, processed_urls_set)
+                        # Extrai a página inteira (não só o que falta para a meta) para que ela possa ir para o cache
+                        new_results_data = extract_links_from_google_page(page, MAX_RESULTS_PER_GOOGLE_PAGE_APPROX * 3, set())
 
                         if new_results_data:
                             current_page_had_results = True
-                            added_count_this_page = 0
-                            for res_data in new_results_data:
-                                if res_data["url"] not in processed_urls_set:
-                                    processed_urls_set.add(res_data["url"])
-                                    all_collected_results_data.append(res_data)
-                                    added_count_this_page +=1
-                                if len(all_collected_results_data) >= num_links_target: break
+                            serp_cache.put(query, page_num, new_results_data)
+                            added_count_this_page = add_page_results(new_results_data)
                             print(f"      Adicionados {added_count_this_page} resultados novos. Total: {len(all_collected_results_data)}.")
                             if len(all_collected_results_data) >= num_links_target: break
                             break
                         elif is_explicit_no_results_message:
                             print(f"      Fim dos resultados do Google confirmado por mensagem na página {page_num}.")
+                            serp_cache.put(query, page_num, [])
                             current_page_had_results = False; break
                         else:
                             print(f"      Nenhum resultado novo qualificado extraído na tentativa {attempt} da página {page_num}.")
@@ -515,6 +566,18 @@ def search_google_and_get_top_n_links(query: str, num_links_target: int = 25) ->
                 if page_num < MAX_PAGES_TO_SCRAPE_GOOGLE:
                     print(f"    Tentando navegar para a próxima página...")
                     navigated_to_next_page_sel = False
+                    prefetched_page = prefetcher.take()
+                    if prefetched_page:
+                        try:
+                            prefetched_page.wait_for_load_state("domcontentloaded", timeout=GOOGLE_PAGINATION_CLICK_TIMEOUT + 5000)
+                            page.close()
+                            page = prefetched_page
+                            navigated_to_next_page_sel = True
+                            print("      Próxima página já carregada em segundo plano.")
+                        except PlaywrightError as e_prefetch:
+                            print(f"      Aviso: pré-carregamento da próxima página falhou ({e_prefetch}). Usando o botão 'Próxima'.")
+                            try: prefetched_page.close()
+                            except Exception: pass
                     next_page_selectors = [
                         'a#pnnext', 'a[aria-label="Próxima página"]', 'a[aria-label="Next page"]',
                         'a[aria-label="Mais resultados"]', 'a[aria-label="More results"]',
@@ -523,7 +586,7 @@ def search_google_and_get_top_n_links(query: str, num_links_target: int = 25) ->
                         'a:has(span:text-matches("Próxima|Next", "i"))'
                     ]
                     for next_sel_idx, next_sel in enumerate(next_page_selectors):
-                        if page.is_closed(): break
+                        if page.is_closed() or navigated_to_next_page_sel: break
                         try:
                             next_button_candidate = page.locator(next_sel)
                             if next_button_candidate.count() > 0:
@@ -551,6 +614,10 @@ def search_google_and_get_top_n_links(query: str, num_links_target: int = 25) ->
                 page.screenshot(path=os.path.join(OUTPUT_FOLDER, f"debug_google_critical_error_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.png"))
         finally:
             print("  Finalizando sessão de busca Google...")
+            if prefetcher:
+                prefetcher.cancel()
+            if context and save_storage_state(context):
+                print("  Sessão do Google (cookies de consentimento) salva para as próximas execuções.")
             if page and not page.is_closed():
                 try: page.close()
                 except Exception: pass
@@ -563,10 +630,56 @@ def search_google_and_get_top_n_links(query: str, num_links_target: int = 25) ->
             print("  Sessão de busca Google finalizada.")
 
     print(f"\nBusca no Google concluída. Total de {len(all_collected_results_data)} resultados (URL, título, snippet) coletados.")
-    return all_collected_results_data[:num_links_target]
+    # Para cada empresa, a URL mais rasa (página inicial) é a processada; as demais vão em 'duplicate_urls'
+    return domain_index.results()[:num_links_target]
 
 # --- extract_text_from_url (sem alterações aqui, o modelo já foi definido no início) ---
 def extract_text_from_url(url: str) -> tuple[str | None, str | None, str | None]:
+    # Páginas renderizadas recentemente são servidas do cache de fetch, sem abrir o navegador
+    fetch_cache = get_fetch_cache()
+    if fetch_cache:
+        cached_page = fetch_cache.get(url, kind=KIND_RENDERED)
+        if cached_page and (cached_page.is_fresh or fetch_cache.offline):
+            print(f"\n[Extração] Texto de {url} servido do cache de fetch ({len(cached_page.extracted_text or '')} chars).")
+            return cached_page.extracted_text, None, "SUCESSO NA EXTRAÇÃO (VIA CACHE)"
+        if fetch_cache.offline:
+            offline_message = "FALHA NA EXTRAÇÃO: MODO OFFLINE, URL AUSENTE DO CACHE."
+            return offline_message, None, offline_message
+
+    # Domínios mortos, bloqueios e timeouts recentes são pulados sem abrir conexão
+    negative_cache = get_negative_cache()
+    known_failure = negative_cache.check(url, via=VIA_BROWSER) if negative_cache else None
+    if known_failure:
+        skipped_message = f"FALHA NA EXTRAÇÃO: {skip_message(known_failure)}"
+        print(f"\n[Extração] {url} ignorada: {skipped_message}")
+        return skipped_message, None, skipped_message
+
+    # Primeiro um fetch HTTP simples; o navegador só entra para páginas que dependem de JavaScript
+    tiered_fetcher = get_tiered_fetcher() if TIERED_FETCH_ENABLED else None
+    static_attempt = tiered_fetcher.try_static(url) if tiered_fetcher else None
+    if static_attempt and static_attempt.text:
+        print(f"\n[Extração] Texto de {url} obtido via HTTP em {static_attempt.elapsed_seconds:.2f}s ({len(static_attempt.text)} chars), sem navegador.")
+        final_text, screenshot_path, status_message = static_attempt.text[:GEMINI_MAX_TEXT_INPUT_CHARS], None, "SUCESSO NA EXTRAÇÃO (VIA HTTP)"
+    else:
+        # Uma falha de DNS/conexão no fetch HTTP também vale para o navegador: evita o timeout de navegação
+        known_failure = negative_cache.check(url, via=VIA_BROWSER) if negative_cache and static_attempt else None
+        if known_failure:
+            skipped_message = f"FALHA NA EXTRAÇÃO: {skip_message(known_failure)}"
+            print(f"\n[Extração] {url} não será renderizada: {skipped_message}")
+            return skipped_message, None, skipped_message
+        if static_attempt:
+            print(f"\n[Extração] Escalando {url} para o navegador (motivo: {static_attempt.escalation_reason}).")
+        final_text, screenshot_path, status_message = _render_and_extract_text(url)
+        if tiered_fetcher:
+            tiered_fetcher.record_render(url, status_message.startswith("SUCESSO NA EXTRAÇÃO"),
+                                          static_attempt.escalation_reason if static_attempt else None)
+        if negative_cache:
+            negative_cache.record_outcome(url, status_message, via=VIA_BROWSER)
+    if fetch_cache and status_message.startswith("SUCESSO NA EXTRAÇÃO"):
+        fetch_cache.put(url, kind=KIND_RENDERED, final_url=url, extracted_text=final_text)
+    return final_text, screenshot_path, status_message
+
+def _render_and_extract_text(url: str) -> tuple[str | None, str | None, str | None]:
     extracted_text_dom = None
     final_screenshot_path = None
     print(f"\n[Extração] Iniciando para URL: {url}")
@@ -578,229 +691,243 @@ def extract_text_from_url(url: str) -> tuple[str | None, str | None, str | None]
     page_screenshot_filename = f"screenshot_extract_{make_safe_filename(domain)}_{timestamp_url_part}_{datetime.datetime.now().strftime('%H%M%S')}.png"
     page_screenshot_path_candidate = os.path.join(OUTPUT_FOLDER, page_screenshot_filename)
 
-    with sync_playwright() as p_instance:
-        browser_extract: Browser | None = None
-        context_extract: BrowserContext | None = None
-        page_extract: Page | None = None
+    # Página reaproveitada do pool de navegadores (sem lançar um Chromium por URL)
+    browser_pool = get_browser_pool()
+    pooled_page: PooledPage | None = None
+    discard_page = False
+    page_traffic: PageTraffic | None = None
+    try:
+        print("  [Extração] Obtendo página do pool de navegadores...")
+        pooled_page = browser_pool.acquire()
+        page_extract = pooled_page.page
+        # Bloqueia imagens, mídia, fontes e rastreadores: só o texto do DOM é necessário
+        page_traffic = attach_resource_policy(page_extract, url)
+        page_extract.set_default_navigation_timeout(EXTRACTION_PAGE_NAVIGATION_TIMEOUT)
+        page_extract.set_default_timeout(EXTRACTION_DEFAULT_OPERATION_TIMEOUT)
+
+        print(f"  [Extração] Navegando para: {url}...")
+        nav_error_message = None
         try:
-            print(f"  [Extração] Lançando navegador (timeout: {EXTRACTION_BROWSER_LAUNCH_TIMEOUT/1000}s)...")
-            browser_extract = p_instance.chromium.launch(headless=False, timeout=EXTRACTION_BROWSER_LAUNCH_TIMEOUT)
-            print("  [Extração] Navegador lançado.")
-            context_extract = browser_extract.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
-                java_script_enabled=True, ignore_https_errors=True, accept_downloads=False,
-                viewport={'width': 1280, 'height': 900}
-            )
-            page_extract = context_extract.new_page()
-            page_extract.set_default_navigation_timeout(EXTRACTION_PAGE_NAVIGATION_TIMEOUT)
-            page_extract.set_default_timeout(EXTRACTION_DEFAULT_OPERATION_TIMEOUT)
+            response = page_extract.goto(url, wait_until="domcontentloaded")
+            if response and not response.ok:
+                 print(f"  [Extração] Aviso: Página retornou status não OK: {response.status} para {url}")
+                 if 400 <= response.status < 600 :
+                     nav_error_message = f"FALHA NA EXTRAÇÃO: Página retornou status {response.status}."
+        except PlaywrightError as e_goto:
+            error_msg = str(e_goto).lower()
+            if "net::err_name_not_resolved" in error_msg: nav_error_message = "FALHA NA EXTRAÇÃO: ERRO DE DNS."
+            elif "net::err_connection_refused" in error_msg: nav_error_message = "FALHA NA EXTRAÇÃO: CONEXÃO RECUSADA."
+            elif "net::err_aborted" in error_msg and is_social_media:
+                print(f"  [Extração] Aviso: Navegação abortada (comum em SMedia). Tentando prosseguir. {url}")
+            elif "timeout" in error_msg:
+                nav_error_message = "FALHA NA EXTRAÇÃO: TIMEOUT NA NAVEGAÇÃO."
+            else:
+                print(f"  [Extração] Erro Playwright durante goto para {url}: {type(e_goto).__name__} - {e_goto}")
+                try:
+                    print(f"    Tentando recarregar a página {url} uma vez...")
+                    page_extract.reload(wait_until="domcontentloaded") # type: ignore
+                    print(f"    Página recarregada.")
+                except Exception as e_reload:
+                    print(f"    Falha ao recarregar a página: {e_reload}")
+                    nav_error_message = f"FALHA NA EXTRAÇÃO: ERRO GOTO SEGUIDO DE FALHA NO RELOAD ({type(e_goto).__name__})."
+        
+        if nav_error_message:
+            return nav_error_message, None, nav_error_message
+
+        print(f"  [Extração] Página '{url}' DOM carregado (ou tentativa continuada).")
+
+        # Espera adaptativa: segue assim que o conteúdo principal estabiliza (em vez de networkidle + pausa fixa)
+        readiness_detector = get_readiness_detector()
+        print(f"    Esperando o conteúdo estabilizar (max {readiness_detector.budget_ms(url)/1000}s)...")
+        readiness = readiness_detector.wait_until_ready(page_extract, url)
+        print(f"    Página pronta em {readiness.waited_ms/1000:.1f}s ({readiness.reason}, {readiness.text_chars} chars).")
+        if is_social_media:
+            print(f"    Rede social detectada. Scroll para carregar mais conteúdo...")
+            for i in range(SOCIAL_MEDIA_SCROLL_STEPS):
+                if page_extract.is_closed(): break
+                page_extract.evaluate("window.scrollBy(0, window.innerHeight * 0.8)")
+                readiness_detector.wait_until_ready(page_extract, url, learn=False)
+
+        if page_extract.is_closed(): return "FALHA NA EXTRAÇÃO: Página fechada inesperadamente.", None, "FALHA NA EXTRAÇÃO: Página fechada inesperadamente."
+
+        page_img_bytes_for_ia = get_screenshot_bytes(page_extract, full_page=True)
+        if page_img_bytes_for_ia:
+             try:
+                with open(page_screenshot_path_candidate, "wb") as f_img: f_img.write(page_img_bytes_for_ia)
+                final_screenshot_path = page_screenshot_path_candidate
+                print(f"  [Extração] Screenshot salvo em: {os.path.basename(final_screenshot_path)}")
+             except Exception as e_save_ss:
+                print(f"  [Extração] Aviso: Falha ao salvar screenshot em {page_screenshot_path_candidate}: {e_save_ss}")
+                final_screenshot_path = None
+        else:
+             print(f"  [Extração] Não foi possível obter screenshot principal para {url}.")
+
+
+        print(f"  [Extração] Executando script JS para extrair texto de {url}...")
+        extraction_js_script = r"""
+            () => {
+                const removeElements = (root, selectors) => {
+                    try { root.querySelectorAll(selectors.join(',')).forEach(el => el.remove()); }
+                    catch (e) { /* console.warn('JS Warn: Error removing selectors:', e.message, selectors); */ }
+                };
+                let contentRoot = document.body ? document.body.cloneNode(true) : (document.documentElement ? document.documentElement.cloneNode(true) : null);
+                if (!contentRoot) return "ERRO INTERNO JS: contentRoot (body/documentElement) não encontrado.";
+
+                const selectorsToRemove = [
+                    'script', 'style', 'noscript', 'svg', 'iframe', 'link', 'meta', 'button', 'input', 'select', 'textarea', 'form',
+                    'nav', 'header', 'footer', 'aside', '[role="navigation"]', '[role="banner"]', '[role="contentinfo"]',
+                    '[role="search"]', '[role="complementary"]', '[role="form"]', '[role="application"]', '[role="menu"]',
+                    '[aria-hidden="true"]', '[hidden]', '[style*="display:none"]', '[style*="visibility:hidden"]',
+                    '.cookie-banner', '.cookie-consent', '#cookie-banner', '#cookie-consent', '[class*="cookie"]', '[id*="cookie"]',
+                    '.modal', '.popup', '[role="dialog"]', '[class*="modal"]', '[class*="popup"]', '[id*="modal"]', '[id*="popup"]',
+                    '.advertisement', '.ad', '[class*="ad-"]', '[id*="ad-"]', '[class*="sponsor"]',
+                    '.sidebar', '.widget', '.related-posts', '.comments', '.share-buttons', '.social-media-links', '.pagination',
+                    'figure:not(:has(figcaption))', 'img:not([alt])', 'picture:not(:has(img[alt]))',
+                    'video:not([aria-label])', 'audio:not([aria-label])',
+                    '[data-nosnippet]', '.visually-hidden', '.sr-only',
+                    '[id*="chat"], [class*="chat"], [id*="intercom"], [class*="intercom"], [id*="drift"], [class*="drift"]',
+                    '[id*="livezilla"], [class*="livezilla"], [id*="tawk"], [class*="tawk"]',
+                    '[class*="optin"], [class*="subscribe"], [class*="newsletter"]'
+                ];
+                removeElements(contentRoot, selectorsToRemove);
+
+                const mainContentSelectors = [
+                    'article[class*="body"]', 'div[class*="article-body"]', 'main[role="main"]', 'div[role="main"]',
+                    'main', 'article', '.content', '.entry-content', '.post-content', '.page-content',
+                    '#content', '#main-content', '#main',
+                    'div[data-testid="UserDescription"]', 'h1',
+                    'section#profile-summary', 'section.pv-profile-section--summary',
+                    'div.feed-shared-update-v2__description-wrapper', 'div[role="article"]', '.prose',
+                    'div.main', 'div.container', 'section.content', 'div.page__content',
+                    'div[itemprop="articleBody"]'
+                ];
+
+                let extractedTexts = []; let mainContentFound = false;
+                for (const selector of mainContentSelectors) {
+                    try {
+                        const elements = contentRoot.querySelectorAll(selector);
+                        if (elements.length > 0) {
+                            elements.forEach(el => {
+                                const text = el.innerText || "";
+                                if (text.trim()) extractedTexts.push(text.trim());
+                            });
+                            mainContentFound = true;
+                            if (!document.domain.includes("instagram.com") && !document.domain.includes("linkedin.com")) break;
+                        }
+                    } catch (e) { /* console.warn('JS Warn: Error querying main selector:', e.message, selector); */ }
+                }
 
-            print(f"  [Extração] Navegando para: {url}...")
-            nav_error_message = None
-            try:
-                response = page_extract.goto(url, wait_until="domcontentloaded")
-                if response and not response.ok:
-                     print(f"  [Extração] Aviso: Página retornou status não OK: {response.status} para {url}")
-                     if 400 <= response.status < 600 :
-                         nav_error_message = f"FALHA NA EXTRAÇÃO: Página retornou status {response.status}."
-            except PlaywrightError as e_goto:
-                error_msg = str(e_goto).lower()
-                if "net::err_name_not_resolved" in error_msg: nav_error_message = "FALHA NA EXTRAÇÃO: ERRO DE DNS."
-                elif "net::err_connection_refused" in error_msg: nav_error_message = "FALHA NA EXTRAÇÃO: CONEXÃO RECUSADA."
-                elif "net::err_aborted" in error_msg and is_social_media:
-                    print(f"  [Extração] Aviso: Navegação abortada (comum em SMedia). Tentando prosseguir. {url}")
-                elif "timeout" in error_msg:
-                    nav_error_message = "FALHA NA EXTRAÇÃO: TIMEOUT NA NAVEGAÇÃO."
-                else:
-                    print(f"  [Extração] Erro Playwright durante goto para {url}: {type(e_goto).__name__} - {e_goto}")
-                    try:
-                        print(f"    Tentando recarregar a página {url} uma vez...")
-                        page_extract.reload(wait_until="domcontentloaded") # type: ignore
-                        print(f"    Página recarregada.")
-                    except Exception as e_reload:
-                        print(f"    Falha ao recarregar a página: {e_reload}")
-                        nav_error_message = f"FALHA NA EXTRAÇÃO: ERRO GOTO SEGUIDO DE FALHA NO RELOAD ({type(e_goto).__name__})."
-            
-            if nav_error_message:
-                return nav_error_message, None, nav_error_message
+                if (!mainContentFound || document.domain.includes("instagram.com") || document.domain.includes("linkedin.com")) {
+                    try {
+                        const bodyText = contentRoot.innerText || "";
+                        if (bodyText.trim()) extractedTexts.push(bodyText.trim());
+                    } catch (e) { /* console.warn('JS Warn: Error getting innerText of contentRoot:', e.message); */ }
+                }
 
-            print(f"  [Extração] Página '{url}' DOM carregado (ou tentativa continuada).")
+                if (extractedTexts.length === 0) return "";
+                let combinedText = extractedTexts.join("\n\n");
+                let cleanedText = combinedText
+                    .replace(/[ \t\u00A0\u200B-\u200D\uFEFF]+/g, ' ')
+                    .replace(/(\r\n|\r|\n){3,}/g, '\n\n')
+                    .replace(/^[\s\n]+|[\s\n]+$/g, '');
+                cleanedText = cleanedText.split('\n').map(line => line.trim()).filter(line => {
+                    if (line.length === 0) return false;
+                    if (document.domain.includes("instagram.com") || document.domain.includes("linkedin.com")) return line.length > 1;
+                    const alphaNumericCount = (line.match(/[a-zA-Z0-9À-ÖØ-öø-ÿ]/g) || []).length;
+                    if (line.length < 30 && alphaNumericCount < line.length * 0.35) return false;
+                    if (line.length < 8 && alphaNumericCount < 3) return false;
+                    if (/^https?:\/\/\S+$/.test(line) && line.length < 30) return false;
+                    if (/^\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4}$/.test(line)) return false;
+                    return true;
+                }).join('\n');
+                return cleanedText.trim();
+            }
+        """
+        js_error_message = None
+        try:
+            extracted_text_dom = page_extract.evaluate(extraction_js_script)
+            print(f"  [Extração DOM] Texto extraído (bruto: {len(extracted_text_dom or '')} chars).")
+            if extracted_text_dom == "ERRO INTERNO JS: contentRoot (body/documentElement) não encontrado.":
+                js_error_message = extracted_text_dom
+        except PlaywrightError as e_eval:
+            error_str_eval = str(e_eval).lower()
+            if "execution context was destroyed" in error_str_eval: js_error_message = "FALHA NA EXTRAÇÃO DOM: CONTEXTO DESTRUÍDO."
+            elif "timeout" in error_str_eval and "page.evaluate" in error_str_eval: js_error_message = "FALHA NA EXTRAÇÃO DOM: TIMEOUT SCRIPT JS."
+            else: js_error_message = f"FALHA NA EXTRAÇÃO DOM: ERRO PLAYWRIGHT SCRIPT JS - {type(e_eval).__name__}."
+            print(f"  [Extração DOM] Erro Playwright ao executar script JS: {js_error_message} - {e_eval}")
+        except Exception as e_eval_general:
+            js_error_message = f"FALHA NA EXTRAÇÃO DOM: ERRO GERAL SCRIPT JS - {type(e_eval_general).__name__}."
+            print(f"  [Extração DOM] Erro GERAL ao executar script JS: {js_error_message} - {e_eval_general}")
+        
+        if js_error_message: extracted_text_dom = js_error_message
+
+        extraction_via_dom_successful = extracted_text_dom and "FALHA NA EXTRAÇÃO DOM" not in extracted_text_dom and "ERRO INTERNO JS" not in extracted_text_dom and len(extracted_text_dom) >= 150
 
+        if not extraction_via_dom_successful and page_traffic.blocked_images and not page_extract.is_closed():
+            # A análise de imagem precisa da página com imagens: libera os recursos e recarrega
+            print(f"  [Extração] Recarregando {url} com imagens liberadas para a análise visual...")
+            page_traffic.relax()
             try:
-                print(f"    Esperando networkidle (max {EXTRACTION_NETWORKIDLE_TIMEOUT/1000}s)...")
+                page_extract.reload(wait_until="domcontentloaded")
                 page_extract.wait_for_load_state("networkidle", timeout=EXTRACTION_NETWORKIDLE_TIMEOUT)
-                print("    Networkidle concluído.")
-            except PlaywrightTimeoutError:
-                print("    Timeout esperando networkidle, continuando mesmo assim...")
-
-            pause_duration = SOCIAL_MEDIA_EXTRACTION_PAUSE if is_social_media else 2500
-            if is_social_media:
-                print(f"    Rede social detectada. Pausa ({pause_duration/1000}s) e scroll...")
-                page_extract.wait_for_timeout(pause_duration / 2)
-                for i in range(3):
-                    if page_extract.is_closed(): break
-                    page_extract.evaluate("window.scrollBy(0, window.innerHeight * 0.8)")
-                    time.sleep(0.8 + i * 0.2)
-                page_extract.wait_for_timeout(pause_duration / 2)
-            else:
-                page_extract.wait_for_timeout(pause_duration)
-
-            if page_extract.is_closed(): return "FALHA NA EXTRAÇÃO: Página fechada inesperadamente.", None, "FALHA NA EXTRAÇÃO: Página fechada inesperadamente."
-
-            page_img_bytes_for_ia = get_screenshot_bytes(page_extract, full_page=True)
-            if page_img_bytes_for_ia:
-                 try:
-                    with open(page_screenshot_path_candidate, "wb") as f_img: f_img.write(page_img_bytes_for_ia)
-                    final_screenshot_path = page_screenshot_path_candidate
-                    print(f"  [Extração] Screenshot salvo em: {os.path.basename(final_screenshot_path)}")
-                 except Exception as e_save_ss:
-                    print(f"  [Extração] Aviso: Falha ao salvar screenshot em {page_screenshot_path_candidate}: {e_save_ss}")
-                    final_screenshot_path = None
+            except PlaywrightError as e_relaxed_reload:
+                print(f"    Aviso: recarga com imagens incompleta: {e_relaxed_reload}")
+            relaxed_img_bytes = get_screenshot_bytes(page_extract, full_page=True)
+            if relaxed_img_bytes:
+                page_img_bytes_for_ia = relaxed_img_bytes
+                if final_screenshot_path:
+                    with open(final_screenshot_path, "wb") as f_img: f_img.write(relaxed_img_bytes)
+
+        if page_img_bytes_for_ia and not extraction_via_dom_successful:
+            print(f"  [Extração Multimodal] Extração DOM fraca/falhou ('{extracted_text_dom[:50] if extracted_text_dom else ''}...'). Tentando análise de imagem para {url}...")
+            multimodal_prompt = (
+                "Analise a imagem desta página web. Descreva o conteúdo principal, o tipo de página (ex: blog, loja, perfil social), "
+                "e qualquer texto proeminente ou informação chave visível. Se for um erro, página de login, ou conteúdo irrelevante, mencione isso."
+            )
+            # Recorta/reduz o screenshot e reaproveita análises recentes de screenshots quase idênticos
+            prepared_image = prepare_screenshot(page_img_bytes_for_ia)
+            vision_cache = get_vision_cache()
+            ia_vision_text = vision_cache.lookup(url, prepared_image.image_hash, multimodal_prompt)
+            if ia_vision_text:
+                print(f"    [Extração Multimodal] Análise visual reaproveitada do cache ({prepared_image.image_hash}).")
             else:
-                 print(f"  [Extração] Não foi possível obter screenshot principal para {url}.")
-
-
-            print(f"  [Extração] Executando script JS para extrair texto de {url}...")
-            extraction_js_script = r"""
-                () => {
-                    const removeElements = (root, selectors) => {
-                        try { root.querySelectorAll(selectors.join(',')).forEach(el => el.remove()); }
-                        catch (e) { /* console.warn('JS Warn: Error removing selectors:', e.message, selectors); */ }
-                    };
-                    let contentRoot = document.body ? document.body.cloneNode(true) : (document.documentElement ? document.documentElement.cloneNode(true) : null);
-                    if (!contentRoot) return "ERRO INTERNO JS: contentRoot (body/documentElement) não encontrado.";
-
-                    const selectorsToRemove = [
-                        'script', 'style', 'noscript', 'svg', 'iframe', 'link', 'meta', 'button', 'input', 'select', 'textarea', 'form',
-                        'nav', 'header', 'footer', 'aside', '[role="navigation"]', '[role="banner"]', '[role="contentinfo"]',
-                        '[role="search"]', '[role="complementary"]', '[role="form"]', '[role="application"]', '[role="menu"]',
-                        '[aria-hidden="true"]', '[hidden]', '[style*="display:none"]', '[style*="visibility:hidden"]',
-                        '.cookie-banner', '.cookie-consent', '#cookie-banner', '#cookie-consent', '[class*="cookie"]', '[id*="cookie"]',
-                        '.modal', '.popup', '[role="dialog"]', '[class*="modal"]', '[class*="popup"]', '[id*="modal"]', '[id*="popup"]',
-                        '.advertisement', '.ad', '[class*="ad-"]', '[id*="ad-"]', '[class*="sponsor"]',
-                        '.sidebar', '.widget', '.related-posts', '.comments', '.share-buttons', '.social-media-links', '.pagination',
-                        'figure:not(:has(figcaption))', 'img:not([alt])', 'picture:not(:has(img[alt]))',
-                        'video:not([aria-label])', 'audio:not([aria-label])',
-                        '[data-nosnippet]', '.visually-hidden', '.sr-only',
-                        '[id*="chat"], [class*="chat"], [id*="intercom"], [class*="intercom"], [id*="drift"], [class*="drift"]',
-                        '[id*="livezilla"], [class*="livezilla"], [id*="tawk"], [class*="tawk"]',
-                        '[class*="optin"], [class*="subscribe"], [class*="newsletter"]'
-                    ];
-                    removeElements(contentRoot, selectorsToRemove);
-
-                    const mainContentSelectors = [
-                        'article[class*="body"]', 'div[class*="article-body"]', 'main[role="main"]', 'div[role="main"]',
-                        'main', 'article', '.content', '.entry-content', '.post-content', '.page-content',
-                        '#content', '#main-content', '#main',
-                        'div[data-testid="UserDescription"]', 'h1',
-                        'section#profile-summary', 'section.pv-profile-section--summary',
-                        'div.feed-shared-update-v2__description-wrapper', 'div[role="article"]', '.prose',
-                        'div.main', 'div.container', 'section.content', 'div.page__content',
-                        'div[itemprop="articleBody"]'
-                    ];
-
-                    let extractedTexts = []; let mainContentFound = false;
-                    for (const selector of mainContentSelectors) {
-                        try {
-                            const elements = contentRoot.querySelectorAll(selector);
-                            if (elements.length > 0) {
-                                elements.forEach(el => {
-                                    const text = el.innerText || "";
-                                    if (text.trim()) extractedTexts.push(text.trim());
-                                });
-                                mainContentFound = true;
-                                if (!document.domain.includes("instagram.com") && !document.domain.includes("linkedin.com")) break;
-                            }
-                        } catch (e) { /* console.warn('JS Warn: Error querying main selector:', e.message, selector); */ }
-                    }
-
-                    if (!mainContentFound || document.domain.includes("instagram.com") || document.domain.includes("linkedin.com")) {
-                        try {
-                            const bodyText = contentRoot.innerText || "";
-                            if (bodyText.trim()) extractedTexts.push(bodyText.trim());
-                        } catch (e) { /* console.warn('JS Warn: Error getting innerText of contentRoot:', e.message); */ }
-                    }
-
-                    if (extractedTexts.length === 0) return "";
-                    let combinedText = extractedTexts.join("\n\n");
-                    let cleanedText = combinedText
-                        .replace(/[ \t\u00A0\u200B-\u200D\uFEFF]+/g, ' ')
-                        .replace(/(\r\n|\r|\n){3,}/g, '\n\n')
-                        .replace(/^[\s\n]+|[\s\n]+$/g, '');
-                    cleanedText = cleanedText.split('\n').map(line => line.trim()).filter(line => {
-                        if (line.length === 0) return false;
-                        if (document.domain.includes("instagram.com") || document.domain.includes("linkedin.com")) return line.length > 1;
-                        const alphaNumericCount = (line.match(/[a-zA-Z0-9À-ÖØ-öø-ÿ]/g) || []).length;
-                        if (line.length < 30 && alphaNumericCount < line.length * 0.35) return false;
-                        if (line.length < 8 && alphaNumericCount < 3) return false;
-                        if (/^https?:\/\/\S+$/.test(line) && line.length < 30) return false;
-                        if (/^\d{1,2}[\/\-.]\d{1,2}[\/\-.]\d{2,4}$/.test(line)) return false;
-                        return true;
-                    }).join('\n');
-                    return cleanedText.trim();
-                }
-            """
-            js_error_message = None
-            try:
-                extracted_text_dom = page_extract.evaluate(extraction_js_script)
-                print(f"  [Extração DOM] Texto extraído (bruto: {len(extracted_text_dom or '')} chars).")
-                if extracted_text_dom == "ERRO INTERNO JS: contentRoot (body/documentElement) não encontrado.":
-                    js_error_message = extracted_text_dom
-            except PlaywrightError as e_eval:
-                error_str_eval = str(e_eval).lower()
-                if "execution context was destroyed" in error_str_eval: js_error_message = "FALHA NA EXTRAÇÃO DOM: CONTEXTO DESTRUÍDO."
-                elif "timeout" in error_str_eval and "page.evaluate" in error_str_eval: js_error_message = "FALHA NA EXTRAÇÃO DOM: TIMEOUT SCRIPT JS."
-                else: js_error_message = f"FALHA NA EXTRAÇÃO DOM: ERRO PLAYWRIGHT SCRIPT JS - {type(e_eval).__name__}."
-                print(f"  [Extração DOM] Erro Playwright ao executar script JS: {js_error_message} - {e_eval}")
-            except Exception as e_eval_general:
-                js_error_message = f"FALHA NA EXTRAÇÃO DOM: ERRO GERAL SCRIPT JS - {type(e_eval_general).__name__}."
-                print(f"  [Extração DOM] Erro GERAL ao executar script JS: {js_error_message} - {e_eval_general}")
-            
-            if js_error_message: extracted_text_dom = js_error_message
-
-            extraction_via_dom_successful = extracted_text_dom and "FALHA NA EXTRAÇÃO DOM" not in extracted_text_dom and "ERRO INTERNO JS" not in extracted_text_dom and len(extracted_text_dom) >= 150
-
-            if page_img_bytes_for_ia and not extraction_via_dom_successful:
-                print(f"  [Extração Multimodal] Extração DOM fraca/falhou ('{extracted_text_dom[:50] if extracted_text_dom else ''}...'). Tentando análise de imagem para {url}...")
-                multimodal_prompt = (
-                    "Analise a imagem desta página web. Descreva o conteúdo principal, o tipo de página (ex: blog, loja, perfil social), "
-                    "e qualquer texto proeminente ou informação chave visível. Se for um erro, página de login, ou conteúdo irrelevante, mencione isso."
-                )
-                ia_vision_text = ask_gemini_about_image(page_img_bytes_for_ia, multimodal_prompt)
+                print(f"    [Extração Multimodal] Imagem preparada: {prepared_image.original_bytes / 1024:.0f} KB PNG -> "
+                      f"{len(prepared_image.data) / 1024:.0f} KB {prepared_image.mime_type}.")
+                ia_vision_text = ask_gemini_about_image(prepared_image.data, multimodal_prompt, mime_type=prepared_image.mime_type)
                 if ia_vision_text and "FALHA IA IMAGEM" not in ia_vision_text:
-                    print(f"    [Extração Multimodal] Texto obtido da IA Visual: {ia_vision_text[:150]}...")
-                    if extracted_text_dom and "FALHA NA EXTRAÇÃO DOM" not in extracted_text_dom and "ERRO INTERNO JS" not in extracted_text_dom and len(extracted_text_dom) > 30:
-                        extracted_text_dom = f"TEXTO DO DOM (PARCIAL):\n{extracted_text_dom}\n\nANÁLISE COMPLEMENTAR DA IMAGEM PELA IA:\n{ia_vision_text}"
-                    else:
-                        extracted_text_dom = f"ANÁLISE DA IMAGEM PELA IA (EXTRAÇÃO DOM FRACA/FALHOU):\n{ia_vision_text}"
-                elif ia_vision_text:
-                     print(f"    [Extração Multimodal] Falha na análise visual da IA: {ia_vision_text}")
-                     if not extracted_text_dom or "FALHA NA EXTRAÇÃO DOM" in extracted_text_dom or "ERRO INTERNO JS" in extracted_text_dom:
-                         extracted_text_dom = f"FALHA NA EXTRAÇÃO: DOM FALHOU E {ia_vision_text}"
+                    vision_cache.store(url, prepared_image.image_hash, multimodal_prompt, ia_vision_text)
+            if ia_vision_text and "FALHA IA IMAGEM" not in ia_vision_text:
+                print(f"    [Extração Multimodal] Texto obtido da IA Visual: {ia_vision_text[:150]}...")
+                if extracted_text_dom and "FALHA NA EXTRAÇÃO DOM" not in extracted_text_dom and "ERRO INTERNO JS" not in extracted_text_dom and len(extracted_text_dom) > 30:
+                    extracted_text_dom = f"TEXTO DO DOM (PARCIAL):\n{extracted_text_dom}\n\nANÁLISE COMPLEMENTAR DA IMAGEM PELA IA:\n{ia_vision_text}"
                 else:
-                    print(f"    [Extração Multimodal] IA visual não retornou texto descritivo.")
-                    if not extracted_text_dom or "FALHA NA EXTRAÇÃO DOM" in extracted_text_dom or "ERRO INTERNO JS" in extracted_text_dom:
-                         extracted_text_dom = "FALHA NA EXTRAÇÃO: DOM FALHOU, IA VISUAL SEM RETORNO."
-            elif not page_img_bytes_for_ia and not extraction_via_dom_successful:
-                print(f"  [Extração] Extração DOM fraca/falhou e não foi possível obter screenshot para análise visual.")
+                    extracted_text_dom = f"ANÁLISE DA IMAGEM PELA IA (EXTRAÇÃO DOM FRACA/FALHOU):\n{ia_vision_text}"
+            elif ia_vision_text:
+                 print(f"    [Extração Multimodal] Falha na análise visual da IA: {ia_vision_text}")
+                 if not extracted_text_dom or "FALHA NA EXTRAÇÃO DOM" in extracted_text_dom or "ERRO INTERNO JS" in extracted_text_dom:
+                     extracted_text_dom = f"FALHA NA EXTRAÇÃO: DOM FALHOU E {ia_vision_text}"
+            else:
+                print(f"    [Extração Multimodal] IA visual não retornou texto descritivo.")
+                if not extracted_text_dom or "FALHA NA EXTRAÇÃO DOM" in extracted_text_dom or "ERRO INTERNO JS" in extracted_text_dom:
+                     extracted_text_dom = "FALHA NA EXTRAÇÃO: DOM FALHOU, IA VISUAL SEM RETORNO."
+        elif not page_img_bytes_for_ia and not extraction_via_dom_successful:
+            print(f"  [Extração] Extração DOM fraca/falhou e não foi possível obter screenshot para análise visual.")
 
 
-        except Exception as e_extract_setup:
-            print(f"  [Extração] Erro CRÍTICO no setup do Playwright para extração de {url}: {type(e_extract_setup).__name__} - {e_extract_setup}")
-            traceback.print_exc()
-            return f"FALHA NA EXTRAÇÃO: ERRO CRÍTICO NO PLAYWRIGHT SETUP - {type(e_extract_setup).__name__}.", None, f"FALHA NA EXTRAÇÃO: ERRO CRÍTICO NO PLAYWRIGHT SETUP - {type(e_extract_setup).__name__}."
-        finally:
-            print(f"  [Extração] Finalizando sessão de extração para {url}...")
-            if page_extract and not page_extract.is_closed():
-                try: page_extract.close()
-                except Exception: pass
-            if context_extract:
-                try: context_extract.close()
-                except Exception: pass
-            if browser_extract and browser_extract.is_connected():
-                try: browser_extract.close()
-                except Exception: pass
-            print(f"  [Extração] Sessão de extração para {url} finalizada.")
+    except Exception as e_extract_setup:
+        discard_page = True
+        print(f"  [Extração] Erro CRÍTICO no setup do Playwright para extração de {url}: {type(e_extract_setup).__name__} - {e_extract_setup}")
+        traceback.print_exc()
+        return f"FALHA NA EXTRAÇÃO: ERRO CRÍTICO NO PLAYWRIGHT SETUP - {type(e_extract_setup).__name__}.", None, f"FALHA NA EXTRAÇÃO: ERRO CRÍTICO NO PLAYWRIGHT SETUP - {type(e_extract_setup).__name__}."
+    finally:
+        if page_traffic:
+            detach_resource_policy(page_traffic)
+            traffic = page_traffic.summary()
+            print(f"  [Extração] Tráfego: {traffic['bytes_received'] / 1024:.0f} KB em {traffic['requests']} requisições "
+                  f"({traffic['blocked_requests']} bloqueadas), {traffic['seconds']}s.")
+        if pooled_page:
+            browser_pool.release(pooled_page, discard=discard_page)
+        print(f"  [Extração] Sessão de extração para {url} finalizada.")
 
     final_text_to_return = extracted_text_dom
     extraction_status_message = "SUCESSO NA EXTRAÇÃO"
@@ -824,6 +951,36 @@ def extract_text_from_url(url: str) -> tuple[str | None, str | None, str | None]
     return final_text_to_return, final_screenshot_path, extraction_status_message
 
 
+def harvest_results_concurrently(results: list[dict], concurrent_pages: int, on_payload=None) -> list[dict]:
+    """
+    Modo assíncrono (--concurrent-pages > 1): renderiza vários resultados em paralelo no pool
+    assíncrono de navegadores. Não gera screenshots nem faz análise de imagem.
+    on_payload é chamado com cada payload assim que o site é extraído (gravação incremental).
+    """
+    async def run() -> list[dict]:
+        payloads = []
+        async_harvester = AsyncHarvester(concurrency=concurrent_pages, cache=get_fetch_cache(), negative_cache=get_negative_cache())
+        try:
+            async for result_item, site_data in async_harvester.iter_results(results):
+                print(f"\n[Extração Assíncrona] {result_item['url']}: {site_data.extraction_status_message}")
+                payload = {
+                    "url": result_item["url"],
+                    "google_search_data": {"title": result_item["title"], "snippet": result_item["snippet"], "duplicate_urls": result_item.get("duplicate_urls", [])},
+                    "extracted_text_content": site_data.extracted_text_content,
+                    "extraction_status_message": site_data.extraction_status_message,
+                    "screenshot_filepath": None
+                }
+                payloads.append(payload)
+                if on_payload:
+                    on_payload(payload)
+        finally:
+            await async_harvester.aclose()
+        # Mantém a ordem dos resultados do Google no JSON final
+        order = {item["url"]: i for i, item in enumerate(results)}
+        return sorted(payloads, key=lambda payload: order[payload["url"]])
+
+    return asyncio.run(run())
+
 def parse_command_line_args():
     """Parse command line arguments for the harvester."""
     import argparse
@@ -835,6 +992,8 @@ def parse_command_line_args():
     parser.add_argument('--user-id', type=str, help='User ID for logging and context')
     parser.add_argument('--output-format', choices=['json', 'text'], default='json', help='Output format (default: json)')
     parser.add_argument('--interactive', action='store_true', help='Run in interactive mode (prompts for input)')
+    parser.add_argument('--concurrent-pages', type=int, default=1, help='Render this many pages at once with the async browser pool (default: 1, sequential)')
+    parser.add_argument('--resume', action='store_true', help='Resume the interrupted run for this query from its checkpoint (skips URLs already harvested)')
     
     return parser.parse_args()
 
@@ -878,6 +1037,7 @@ if __name__ == "__main__":
     main_start_time = time.time()
     results_filepath = ""
     user_search_query = ""
+    stream_writer = None
     user_id = None
     max_leads = None
 
@@ -913,25 +1073,50 @@ if __name__ == "__main__":
 
         print(f"Objetivo: Extrair dados de até {NUM_SITES_TO_PROCESS} sites.")
 
-        google_results_data = search_google_and_get_top_n_links(user_search_query, num_links_target=NUM_SITES_TO_PROCESS)
+        # Checkpoint por consulta: com --resume, reaproveita os resultados do Google e pula URLs já extraídas
+        checkpoint_path = checkpoint_path_for(user_search_query, OUTPUT_FOLDER)
+        checkpoint = HarvestCheckpoint.load(checkpoint_path) if not args.interactive and args.resume else None
+        if checkpoint:
+            google_results_data = checkpoint.results
+            print(f"Retomando execução anterior: {len(checkpoint.completed_urls)} de {len(google_results_data)} URLs já extraídas ({checkpoint.output_path}).")
+        else:
+            if not args.interactive and args.resume:
+                print(f"Nenhum checkpoint encontrado em '{checkpoint_path}'. Iniciando nova execução.")
+            google_results_data = search_google_and_get_top_n_links(user_search_query, num_links_target=NUM_SITES_TO_PROCESS)
+            stream_filename = f"harvested_data_{make_safe_filename(user_search_query, 30)}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+            checkpoint = HarvestCheckpoint(checkpoint_path, user_search_query, os.path.join(OUTPUT_FOLDER, stream_filename), google_results_data or [])
+            checkpoint.save()
 
         if not google_results_data:
             print(f"\nNenhum resultado do Google utilizável encontrado para a busca: '{user_search_query}'.")
         else:
             print(f"\n--- Iniciando Extração de Texto para {len(google_results_data)} Resultados do Google Coletados ---")
 
-        all_extracted_data = []
-        if google_results_data: # Só processa se houver resultados do Google
-            for i, result_item in enumerate(google_results_data):
+        # Cada site é gravado no JSONL assim que extraído (pode ser lido/acompanhado durante a execução)
+        stream_writer = HarvestStreamWriter(checkpoint.output_path, user_search_query, len(google_results_data or []), resume=bool(checkpoint.completed_urls))
+        print(f"Gravação incremental em: {checkpoint.output_path}")
+
+        def save_payload(payload: dict) -> None:
+            stream_writer.append(payload)
+            checkpoint.mark_done(payload["url"])
+
+        pending_results = checkpoint.pending_results
+        politeness = PolitenessScheduler()
+        concurrent_pages = 1 if args.interactive else args.concurrent_pages
+        if pending_results and concurrent_pages > 1:
+            print(f"Modo assíncrono: {concurrent_pages} páginas simultâneas.")
+            harvest_results_concurrently(pending_results, concurrent_pages, on_payload=save_payload)
+        elif pending_results: # Só processa se houver resultados do Google ainda não extraídos
+            for i, result_item in enumerate(pending_results):
                 current_url = result_item["url"]
                 google_title = result_item["title"]
                 google_snippet = result_item["snippet"]
 
-                print(f"\n--- Processando URL {i+1}/{len(google_results_data)}: {current_url} ---")
+                print(f"\n--- Processando URL {i+1}/{len(pending_results)}: {current_url} ---")
                 print(f"    Título Google: {google_title}")
                 print(f"    Snippet Google: {google_snippet[:100]}...")
 
-                if i > 0: time.sleep(2.0)
+                politeness.wait(current_url)
 
                 extracted_text, screenshot_file, extraction_status = extract_text_from_url(current_url)
 
@@ -949,35 +1134,31 @@ if __name__ == "__main__":
 
                 current_url_payload = {
                     "url": current_url,
-                    "google_search_data": {"title": google_title, "snippet": google_snippet},
+                    "google_search_data": {"title": google_title, "snippet": google_snippet, "duplicate_urls": result_item.get("duplicate_urls", [])},
                     "extracted_text_content": extracted_text,
                     "extraction_status_message": extraction_status,
                     "screenshot_filepath": relative_screenshot_path
                 }
 
-                all_extracted_data.append(current_url_payload)
+                save_payload(current_url_payload)
                 print(f"    Status da Extração: {extraction_status}")
                 if relative_screenshot_path:
                      print(f"    Caminho do Screenshot (relativo/absoluto): {relative_screenshot_path}")
                 print("----------------------------------------------------")
 
-        output_json = {
-            "original_query": user_search_query,
-            "collection_timestamp": datetime.datetime.now().isoformat(),
-            "total_sites_targeted_for_processing": len(google_results_data) if google_results_data else 0,
-            "total_sites_processed_in_extraction_phase": len(all_extracted_data),
-            "sites_data": all_extracted_data
-        }
+        stream_writer.close()
+        # JSON final consolidado a partir do JSONL (inclui os sites de execuções retomadas)
+        output_json = read_harvest_jsonl(checkpoint.output_path)
+        output_json.pop("completed")
+        all_extracted_data = output_json["sites_data"]
 
-        timestamp_str = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-        safe_query_filename = make_safe_filename(user_search_query, 30)
-        results_filename = f"harvested_data_{safe_query_filename}_{timestamp_str}.json"
-        results_filepath = os.path.join(OUTPUT_FOLDER, results_filename)
+        results_filepath = checkpoint.output_path[:-len(".jsonl")] + ".json"
 
         try:
             with open(results_filepath, "w", encoding="utf-8") as f:
                 json.dump(output_json, f, ensure_ascii=False, indent=2)
 
+            checkpoint.remove()
             successful_extractions = sum(1 for item in all_extracted_data if "SUCESSO" in item["extraction_status_message"])
             print(f"\nDados extraídos ({successful_extractions} com texto útil, de {len(all_extracted_data)} URLs processadas) salvos em: {results_filepath}")
         except Exception as e_save:
@@ -990,5 +1171,9 @@ if __name__ == "__main__":
         print(f"\nErro CRÍTICO INESPERADO no script principal: {type(e_main_script).__name__} - {e_main_script}")
         traceback.print_exc()
     finally:
+        if stream_writer:
+            # Execução interrompida: o JSONL fica sem rodapé e o checkpoint permite --resume
+            stream_writer.close(completed=False)
+        close_browser_pool()
         main_end_time = time.time()
         print(f"\nTempo total de execução do script Harvester: {main_end_time - main_start_time:.2f} segundos.")
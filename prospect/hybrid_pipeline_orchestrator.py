@@ -239,10 +239,11 @@ class HybridPipelineOrchestrator(PipelineOrchestrator):
             # Apply AI prospect intelligence using RAG
             if hasattr(self, 'prospect_profiler') and self.prospect_profiler:
                 try:
-                    ai_profile = self.prospect_profiler.create_advanced_prospect_profile(
+                    ai_profile = await self.prospect_profiler.create_advanced_prospect_profile_async(
                         lead_data=lead_data,
                         enriched_context=context_dict,
-                        rag_vector_store=rag_store
+                        rag_vector_store=rag_store,
+                        batch_key=self.job_id
                     )
                     
                     # Apply AI intelligence to the analyzed lead object
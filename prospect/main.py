@@ -10,7 +10,7 @@ import sys
 import uuid
 import asyncio # ### NOVO ###
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, AsyncIterator
 import click
 from datetime import datetime
 from loguru import logger
@@ -21,6 +21,12 @@ from dotenv import load_dotenv # ### NOVO ###
 
 # Importações de modelos e agentes existentes
 from data_models.lead_structures import HarvesterOutput, SiteData, FinalProspectPackage
+from core_logic.harvest_stream import (
+    HARVEST_FOLLOW_IDLE_TIMEOUT_SECONDS,
+    follow_harvest_sites_async,
+    iterate_limited,
+    load_harvest_file,
+)
 from agents.lead_intake_agent import LeadIntakeAgent
 from agents.lead_analysis_agent import LeadAnalysisAgent
 from agents.persona_creation_agent import PersonaCreationAgent
@@ -48,15 +54,24 @@ def setup_logging(log_level: str = "INFO", log_file: Optional[str] = None):
 
 
 def load_harvester_output(file_path: str) -> HarvesterOutput:
-    """Load and validate harvester output from JSON file"""
+    """Load and validate harvester output from JSON file (or the streaming JSONL file, even mid-run)"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_harvest_file(file_path)
         return HarvesterOutput.parse_obj(data)
     except Exception as e:
         logger.error(f"Error loading harvester output: {e}")
         raise
 
+
+async def follow_harvester_output(file_path: str,
+                                  idle_timeout: Optional[float] = HARVEST_FOLLOW_IDLE_TIMEOUT_SECONDS) -> AsyncIterator[SiteData]:
+    """Yield sites from a streaming JSONL harvest as the harvester appends them (until its footer line or idle timeout)"""
+    async for record in follow_harvest_sites_async(file_path, idle_timeout=idle_timeout):
+        try:
+            yield SiteData.parse_obj(record)
+        except Exception as e:
+            logger.warning(f"Skipping invalid site record in '{file_path}': {e}")
+
 # ### MODIFICADO ###
 # A função agora recebe o profiler e o contexto para o RAG
 def process_single_lead(
@@ -144,6 +159,9 @@ def process_single_lead(
 @click.option('--log-file', type=click.Path(), help='Log file path')
 @click.option('--skip-failed', is_flag=True, help='Skip leads with failed extraction')
 @click.option('--limit', '-n', type=int, help='Limit number of leads to process')
+@click.option('--follow', '-f', is_flag=True, help='Tail a streaming JSONL harvest, processing sites while the harvester runs')
+@click.option('--idle-timeout', type=float, default=HARVEST_FOLLOW_IDLE_TIMEOUT_SECONDS, show_default=True,
+              help='With --follow, stop after this many seconds without new sites')
 def main_cli(
     input_file: str,
     output: Optional[str],
@@ -151,7 +169,9 @@ def main_cli(
     log_level: str,
     log_file: Optional[str],
     skip_failed: bool,
-    limit: Optional[int]
+    limit: Optional[int],
+    follow: bool,
+    idle_timeout: Optional[float]
 ):
     """
     Nellia Prospector - Process leads from harvester output.
@@ -163,7 +183,7 @@ def main_cli(
         asyncio.run(
             execute_pipeline(
                 input_file, output, product_service, log_level,
-                log_file, skip_failed, limit
+                log_file, skip_failed, limit, follow, idle_timeout
             )
         )
     except Exception as e:
@@ -178,7 +198,9 @@ async def execute_pipeline(
     log_level: str,
     log_file: Optional[str],
     skip_failed: bool,
-    limit: Optional[int]
+    limit: Optional[int],
+    follow: bool = False,
+    idle_timeout: Optional[float] = None
 ):
     """Core async pipeline execution logic"""
     setup_logging(log_level, log_file)
@@ -246,7 +268,14 @@ async def execute_pipeline(
     
     # ### FIM DA CONFIGURAÇÃO DO RAG ###
 
-    leads_to_process = harvester_data.sites_data[:limit] if limit else harvester_data.sites_data
+    if follow:
+        # Sites são processados à medida que o harvester os grava (do início do arquivo até o rodapé)
+        console.print("👀 Following the harvest: sites are processed as they are written")
+        leads_to_process = follow_harvester_output(input_file, idle_timeout)
+        total_leads = limit
+    else:
+        leads_to_process = harvester_data.sites_data[:limit] if limit else harvester_data.sites_data
+        total_leads = len(leads_to_process)
     
     console.print("\n🤖 Initializing agents...")
     intake_agent = LeadIntakeAgent(skip_failed_extractions=skip_failed)
@@ -258,8 +287,8 @@ async def execute_pipeline(
     results = []
     
     with Progress(SpinnerColumn(), TextColumn("{task.description}"), BarColumn(), TaskProgressColumn(), console=console) as progress:
-        task = progress.add_task(f"[bold]Processing {len(leads_to_process)} leads...[/bold]", total=len(leads_to_process))
-        for site_data in leads_to_process:
+        task = progress.add_task(f"[bold]Processing {total_leads or 'incoming'} leads...[/bold]", total=total_leads)
+        async for site_data in iterate_limited(leads_to_process, limit if follow else None):
             if site_data.extraction_status_message == "FAILURE" and skip_failed:
                 progress.update(task, advance=1)
                 continue
@@ -317,7 +346,7 @@ async def execute_pipeline(
         "processing_timestamp": datetime.now().isoformat(),
         "original_query": harvester_data.original_query,
         "product_service_context": product_service,
-        "total_leads_in_file": len(harvester_data.sites_data),
+        "total_leads_in_file": len(load_harvester_output(input_file).sites_data) if follow else len(harvester_data.sites_data),
         "total_leads_processed": len(results),
         "successful_analyses": len(successful),
         "validation_failures": len(failed_validation),
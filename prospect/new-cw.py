@@ -3,10 +3,11 @@ import json
 from dotenv import load_dotenv
 import google.generativeai as genai
 import time
-import requests # Para Tavily API
 import traceback # Para melhor log de erros
 import re
 import datetime
+
+from core_logic.tavily_client import TavilySearchError, get_tavily_client
 # Carregar variáveis de ambiente do arquivo .env
 load_dotenv()
 
@@ -81,22 +82,13 @@ def search_with_tavily(query: str, search_depth: str = TAVILY_SEARCH_DEPTH, max_
         return []
     print(f"  [Tavily] Pesquisando por: '{query}' (depth: {search_depth}, max_results: {max_results})")
     try:
-        response = requests.post(
-            "https://api.tavily.com/search",
-            json={
-                "api_key": TAVILY_API_KEY,
-                "query": query,
-                "search_depth": search_depth,
-                "include_answer": False,
-                "max_results": max_results
-            },
-            timeout=20 # Timeout para a requisição Tavily
+        # Cliente compartilhado: conexão reutilizada e resultados em cache (ver core_logic/tavily_client.py)
+        results = get_tavily_client(TAVILY_API_KEY).search_results(
+            query, search_depth=search_depth, max_results=max_results, include_answer=False
         )
-        response.raise_for_status() # Levanta um erro para status HTTP 4xx/5xx
-        results = response.json().get("results", [])
         print(f"  [Tavily] Encontrados {len(results)} resultados.")
         return results
-    except requests.exceptions.RequestException as e:
+    except TavilySearchError as e:
         print(f"  [Tavily] Erro na API Tavily: {e}")
         return []
     except Exception as e_tav:
@@ -174,12 +166,11 @@ def agente_enriquecimento_tavily(company_name: str, texto_extraido_inicial: str)
     ][:TAVILY_TOTAL_QUERIES_PER_LEAD] # Limita o número de queries
 
     all_tavily_content_parts = []
-    for q_tav in queries_tavily:
-        tavily_results = search_with_tavily(q_tav)
+    # Queries em paralelo no pool do cliente; o limite de taxa é aplicado pelo próprio cliente
+    for tavily_results in get_tavily_client(TAVILY_API_KEY).map(search_with_tavily, queries_tavily):
         for res_tav in tavily_results:
             content_part = f"Fonte: {res_tav.get('url', 'N/A')}\nTítulo: {res_tav.get('title', 'N/A')}\nConteúdo: {truncate_text(res_tav.get('content', 'N/A'), 1000)}"
             all_tavily_content_parts.append(content_part)
-        time.sleep(0.5) # Pequena pausa entre queries Tavily
 
     if not all_tavily_content_parts:
         return "Enriquecimento com Tavily tentado, mas não retornou resultados."
@@ -5,9 +5,11 @@ import json
 import os
 import re
 import sys
+import threading
 import time
 import traceback
 import uuid
+from contextlib import aclosing, closing
 from datetime import datetime
 from typing import Any, AsyncIterator, Dict, List, Optional
 from urllib.parse import urlparse
@@ -69,10 +71,13 @@ if not os.getenv("HF_HOME") and not os.getenv("TRANSFORMERS_CACHE") and not os.g
         logger.warning(f"Proceeding without setting custom HF_HOME. Default HuggingFace cache paths will be used, which might lead to PermissionErrors if not writable by 'appuser'.")
 
 try:
-    from sentence_transformers import SentenceTransformer
     import faiss
     import numpy as np # Keep the import here for when it's available
     import google.generativeai as genai
+    # O backend de embeddings (sentence-transformers ou ONNX) é carregado sob demanda
+    from core_logic.embeddings import EMBEDDING_LIBRARIES_AVAILABLE, get_embedding_model
+    if not EMBEDDING_LIBRARIES_AVAILABLE:
+        raise ImportError("nenhum backend de embeddings instalado (sentence-transformers ou onnxruntime)")
     CORE_LIBRARIES_AVAILABLE = True
 except ImportError as e:
     CORE_LIBRARIES_AVAILABLE = False
@@ -100,7 +105,12 @@ try:
     )
     from core_logic.llm_client import LLMClientFactory
     from ai_prospect_intelligence import AdvancedProspectProfiler # Changed from prospect.ai_prospect_intelligence
-    from adk1.agent import find_and_extract_structured_leads, search_and_qualify_leads
+    from adk1.agent import find_and_extract_structured_leads, iter_structured_leads, search_and_qualify_leads, search_company_sites
+    from core_logic.async_harvester import harvest_site_data
+    from core_logic.fetch_cache import get_fetch_cache
+    from core_logic.negative_cache import get_negative_cache
+    from core_logic.context_profile_cache import CONTEXT_PROFILE_CACHE_ENABLED, get_context_profile_cache
+    from core_logic.query_fanout import QUERY_FANOUT_OVERSAMPLE, QUERY_FANOUT_VARIANTS, build_query_variants, count_candidates, fuse_search_results
     from agents.lead_analysis_generation_agent import LeadAnalysisGenerationAgent, LeadAnalysisGenerationInput # Phase 2
     from agents.b2b_persona_creation_agent import B2BPersonaCreationAgent, B2BPersonaCreationInput # Phase 2
     PROJECT_MODULES_AVAILABLE = True
@@ -114,9 +124,24 @@ except ImportError as import_error:
     def find_and_extract_structured_leads(*args, **kwargs):
         logger.error("find_and_extract_structured_leads called but not available")
         return []
+    def iter_structured_leads(*args, **kwargs):
+        logger.error("iter_structured_leads called but not available")
+        return iter(())
     def search_and_qualify_leads(*args, **kwargs):
         logger.error("search_and_qualify_leads called but not available")
         return []
+    def search_company_sites(*args, **kwargs):
+        logger.error("search_company_sites called but not available")
+        return []
+
+
+# --- Pré-ranqueamento de leads por relevância ao contexto RAG do job ---
+LEAD_RELEVANCE_THRESHOLD = float(os.getenv("LEAD_RELEVANCE_THRESHOLD", "0.15"))
+LEAD_RELEVANCE_MODE = os.getenv("LEAD_RELEVANCE_MODE", "deprioritize")  # "deprioritize" ou "drop"
+LEAD_RELEVANCE_TOP_K = 3  # Chunks do contexto considerados na média de similaridade
+
+# Fonte de leads: "adk1" (Tavily + raspagem HTTP + extração Gemini) ou "playwright" (renderização assíncrona)
+HARVESTER_MODE = os.getenv("HARVESTER_MODE", "adk1").lower()
 
 
 # --- Placeholders se os módulos do projeto não estiverem disponíveis ---
@@ -150,7 +175,7 @@ class PipelineOrchestrator:
             raise ImportError("Dependências críticas ( Sentence-Transformers, etc.) não estão instaladas.")
 
         # Carregamento de modelos para RAG
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.embedding_model = get_embedding_model()
         self.prospect_profiler = AdvancedProspectProfiler()
         logger.info("Modelos de IA para RAG e Profiling carregados.")
 
@@ -239,6 +264,8 @@ class PipelineOrchestrator:
             logger.error("[{job_id}] Falha ao gerar embeddings para o RAG."); return False
         
         try:
+            # Vetores unitários: a distância L2 ao quadrado equivale a 2 - 2 * cosseno
+            faiss.normalize_L2(embeddings)
             index = faiss.IndexFlatL2(embeddings.shape[1])
             index.add(embeddings)
             self.job_vector_stores[job_id] = {"index": index, "chunks": text_chunks, "embedding_dim": embeddings.shape[1]}
@@ -247,68 +274,173 @@ class PipelineOrchestrator:
         except Exception as e:
             logger.error(f"[{job_id}] Erro na criação do índice FAISS: {e}"); return False
 
+    # --- Pré-ranqueamento de Leads ---
+
+    @staticmethod
+    def _lead_relevance_text(lead_data: Dict[str, Any]) -> str:
+        """Texto curto do lead usado para medir relevância (nome + descrição/snippet)."""
+        adk1_enrichment = lead_data.get("adk1_enrichment") or {}
+        parts = [
+            lead_data.get("company_name"),
+            lead_data.get("description"),
+            adk1_enrichment.get("qualification_summary"),
+        ]
+        return " ".join(str(p) for p in parts if p and p != "N/A")[:1000]
+
+    async def _score_leads_relevance(self, job_id: str, leads: List[Dict[str, Any]]) -> List[Optional[float]]:
+        """
+        Similaridade de cosseno média entre cada lead e os chunks mais próximos do índice RAG do job.
+        Retorna None para todos os leads se o índice ou os embeddings não estiverem disponíveis.
+        """
+        vector_store = self.job_vector_stores.get(job_id)
+        if not leads or not vector_store or not vector_store.get("index"):
+            return [None] * len(leads)
+
+        embeddings = await self._generate_embeddings([self._lead_relevance_text(lead) for lead in leads])
+        if embeddings is None:
+            return [None] * len(leads)
+
+        try:
+            faiss.normalize_L2(embeddings)
+            index = vector_store["index"]
+            k = min(LEAD_RELEVANCE_TOP_K, index.ntotal)
+            distances, _ = await asyncio.to_thread(index.search, embeddings, k)
+            similarities = 1.0 - distances / 2.0
+            return [round(float(score), 4) for score in similarities.mean(axis=1)]
+        except Exception as e:
+            logger.error(f"[{job_id}] Falha no pré-ranqueamento de leads: {e}")
+            return [None] * len(leads)
+
+    def _rank_leads_by_relevance(
+        self, leads: List[Dict[str, Any]], scores: List[Optional[float]]
+    ) -> List[tuple]:
+        """
+        Ordena os leads por relevância decrescente. Leads abaixo de LEAD_RELEVANCE_THRESHOLD
+        vão para o fim da fila ("deprioritize") ou são descartados ("drop").
+        Sem scores, a ordem de chegada é mantida.
+        """
+        ranked = list(zip(leads, scores))
+        if all(score is not None for score in scores):
+            ranked.sort(key=lambda item: item[1], reverse=True)
+
+        relevant = [item for item in ranked if item[1] is None or item[1] >= LEAD_RELEVANCE_THRESHOLD]
+        below_threshold = [item for item in ranked if item[1] is not None and item[1] < LEAD_RELEVANCE_THRESHOLD]
+        if below_threshold:
+            names = [lead.get("company_name", "N/A") for lead, _ in below_threshold]
+            action = "descartados" if LEAD_RELEVANCE_MODE == "drop" else "despriorizados"
+            logger.info(f"[{self.job_id}] {len(below_threshold)} leads abaixo do limiar {LEAD_RELEVANCE_THRESHOLD} {action}: {names}")
+        if LEAD_RELEVANCE_MODE == "drop":
+            return relevant
+        return relevant + below_threshold
+
     # --- Lógica do Harvester Integrada com ADK1 ---
 
-    async def _search_with_adk1_agent(self, query: str, max_leads: int) -> AsyncIterator[Dict]:
+    async def _fan_out_search(self, queries: List[str], max_leads: int) -> List[Dict[str, Any]]:
+        """
+        Roda a busca de sites (Tavily) para cada variante de query em paralelo e combina os
+        resultados: um por domínio, ranqueados por frequência entre as queries e posição (RRF).
+        Para cedo quando já há candidatos suficientes (max_leads * QUERY_FANOUT_OVERSAMPLE);
+        as buscas ainda pendentes são abandonadas.
+        """
+        target = max(max_leads, int(max_leads * QUERY_FANOUT_OVERSAMPLE + 0.5))
+        started = time.monotonic()
+        tasks = [asyncio.ensure_future(asyncio.to_thread(search_company_sites, q, max_leads)) for q in queries]
+        result_lists: List[List[Dict[str, Any]]] = []
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                try:
+                    result_lists.append(await next_done or [])
+                except Exception as e:
+                    logger.warning(f"[_fan_out_search] Falha em uma das buscas: {e}")
+                    continue
+                if count_candidates(result_lists) >= target:
+                    logger.info(f"[_fan_out_search] {target} candidatos encontrados após {len(result_lists)}/{len(queries)} buscas; parando cedo")
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        fused = fuse_search_results(result_lists)[:target]
+        multi_hit = sum(1 for result in fused if result["query_hits"] > 1)
+        logger.info(f"[_fan_out_search] {len(fused)} candidatos de {len(result_lists)} buscas ({multi_hit} encontrados por mais de uma query) em {time.monotonic() - started:.1f}s")
+        return fused
+
+    async def _search_with_adk1_agent(self, query: str, max_leads: int, search_results: Optional[List[Dict[str, Any]]] = None) -> AsyncIterator[Dict]:
         """
         Busca leads usando o agente ADK1 mais sofisticado com Tavily API.
-        Wrapper assíncrono para as ferramentas síncronas do ADK1.
+        Wrapper assíncrono para as ferramentas síncronas do ADK1: o gerador iter_structured_leads
+        roda em uma thread e cada lead é entregue ao event loop assim que sua extração termina,
+        para que o enriquecimento do primeiro lead se sobreponha à raspagem dos demais.
+        search_results: resultados já combinados pelo fan-out (pula a busca do ADK1).
         """
         logger.info(f"[_search_with_adk1_agent] Iniciando harvester ADK1 para a query: '{query}' com max_leads: {max_leads}")
         
+        stop_event = threading.Event()
         try:
             # Verificar se as funções ADK1 estão disponíveis
             if not PROJECT_MODULES_AVAILABLE:
                 logger.error("[_search_with_adk1_agent] PROJECT_MODULES_AVAILABLE is False, ADK1 functions not available")
                 return
-                
-            # Executar em thread separada para não bloquear o event loop
-            import concurrent.futures
-            import threading
-            
+
+            loop = asyncio.get_running_loop()
+            results_queue: asyncio.Queue = asyncio.Queue()
+            end_of_stream = object()
+
+            def publish(item: Any) -> bool:
+                try:
+                    loop.call_soon_threadsafe(results_queue.put_nowait, item)
+                    return True
+                except RuntimeError:  # Event loop já encerrado; o consumidor desistiu
+                    return False
+
             def run_adk1_search():
                 logger.info(f"[run_adk1_search] Started execution in thread for query: '{query}', max_leads: {max_leads}")
+                streamed_count = 0
                 try:
-                    logger.info(f"[run_adk1_search] Executing find_and_extract_structured_leads with query: '{query}', max_leads: {max_leads}")
-                    # Usar find_and_extract_structured_leads para obter dados mais ricos
-                    results = find_and_extract_structured_leads(query, max_leads)
-                    logger.info(f"[run_adk1_search] ADK1 find_and_extract_structured_leads returned {len(results)} structured results")
+                    logger.info(f"[run_adk1_search] Streaming iter_structured_leads with query: '{query}', max_leads: {max_leads}")
+                    # Usar iter_structured_leads para obter dados mais ricos, lead a lead
+                    with closing(iter_structured_leads(query, max_leads, search_results=search_results)) as leads_stream:
+                        for result in leads_stream:
+                            if stop_event.is_set() or not publish(result):
+                                logger.info("[run_adk1_search] Consumer stopped; closing ADK1 stream")
+                                break
+                            streamed_count += 1
+                    logger.info(f"[run_adk1_search] ADK1 iter_structured_leads streamed {streamed_count} structured results")
                 except Exception as e:
-                    logger.error(f"[run_adk1_search] Error in ADK1 find_and_extract_structured_leads: {e}")
+                    logger.error(f"[run_adk1_search] Error in ADK1 iter_structured_leads: {e}")
                     traceback.print_exc()
-                    # Fallback para search_and_qualify_leads
-                    try:
-                        logger.info(f"[run_adk1_search] Attempting fallback with search_and_qualify_leads for query: '{query}', max_leads: {max_leads}")
-                        results = search_and_qualify_leads(query, max_leads)
-                        logger.info(f"[run_adk1_search] ADK1 fallback search_and_qualify_leads returned {len(results)} results")
-                    except Exception as e2:
-                        logger.error(f"[run_adk1_search] Error in ADK1 fallback search_and_qualify_leads: {e2}")
-                        traceback.print_exc()
-                        results = [] # Ensure results is always defined
-
-                logger.info(f"[run_adk1_search] Finished execution in thread. Returning {len(results)} results.")
-                return results
+                    # Fallback para search_and_qualify_leads, apenas se nada foi entregue ainda
+                    if streamed_count == 0 and not stop_event.is_set():
+                        try:
+                            logger.info(f"[run_adk1_search] Attempting fallback with search_and_qualify_leads for query: '{query}', max_leads: {max_leads}")
+                            fallback_results = search_and_qualify_leads(query, max_leads)
+                            logger.info(f"[run_adk1_search] ADK1 fallback search_and_qualify_leads returned {len(fallback_results)} results")
+                            for result in fallback_results:
+                                publish(result)
+                                streamed_count += 1
+                        except Exception as e2:
+                            logger.error(f"[run_adk1_search] Error in ADK1 fallback search_and_qualify_leads: {e2}")
+                            traceback.print_exc()
+                finally:
+                    publish(end_of_stream)
+                logger.info(f"[run_adk1_search] Finished execution in thread. Streamed {streamed_count} results.")
             
-            # Executar em thread pool para não bloquear o event loop
-            loop = asyncio.get_event_loop()
-            with concurrent.futures.ThreadPoolExecutor() as executor:
-                logger.info(f"[_search_with_adk1_agent] Preparing to call run_adk1_search via executor with query: '{query}' and max_leads: {max_leads}")
-                logger.info(f"[_search_with_adk1_agent] About to await loop.run_in_executor for run_adk1_search.")
-                results = await loop.run_in_executor(executor, run_adk1_search)
-                logger.info(f"[_search_with_adk1_agent] await loop.run_in_executor for run_adk1_search has returned. Number of results: {len(results)}")
+            # Executar em thread separada para não bloquear o event loop
+            logger.info(f"[_search_with_adk1_agent] Starting run_adk1_search in a worker thread with query: '{query}' and max_leads: {max_leads}")
+            worker = loop.run_in_executor(None, run_adk1_search)
             
-            # Verificar se temos resultados
-            if not results:
-                logger.warning(f"[_search_with_adk1_agent] Nenhum resultado retornado pelo ADK1")
-                return
-                
-            # Processar e padronizar os resultados
+            # Processar e padronizar os resultados à medida que chegam
+            received_count = 0
             yielded_count = 0
-            for i, result in enumerate(results):
-                logger.info(f"[_search_with_adk1_agent] Processando resultado {i+1}/{len(results)}: {result}")
+            while True:
+                result = await results_queue.get()
+                if result is end_of_stream:
+                    break
+                received_count += 1
+                logger.info(f"[_search_with_adk1_agent] Processando resultado {received_count}: {result}")
                 
                 if result.get('error'):
-                    logger.warning(f"[_search_with_adk1_agent] ADK1 retornou erro no resultado {i+1}: {result['error']}")
+                    logger.warning(f"[_search_with_adk1_agent] ADK1 retornou erro no resultado {received_count}: {result['error']}")
                     continue
                 
                 # Padronizar formato do resultado
@@ -346,25 +478,78 @@ class PipelineOrchestrator:
                 yield lead_data
                 yielded_count += 1
                 
+            await worker
             logger.info(f"[_search_with_adk1_agent] Total de leads yielded: {yielded_count}")
                 
         except Exception as e:
             logger.error(f"[_search_with_adk1_agent] Erro crítico no harvester ADK1: {e}")
             traceback.print_exc()
             # Não fazer return aqui, deixar o generator encerrar naturalmente
+        finally:
+            # Se o consumidor parou antes do fim (ex.: max_leads atingido), a thread encerra o gerador do ADK1
+            stop_event.set()
 
-    async def _search_leads(self, query: str, max_leads: int) -> AsyncIterator[Dict]:
+    async def _search_with_playwright_harvester(self, query: str, max_leads: int, search_results: Optional[List[Dict[str, Any]]] = None) -> AsyncIterator[Dict]:
+        """
+        Harvester Playwright assíncrono: busca os sites na Tavily (ou usa os resultados já
+        combinados pelo fan-out) e os renderiza com várias páginas em paralelo, entregando
+        cada lead assim que sua página é extraída.
+        """
+        logger.info(f"[_search_with_playwright_harvester] Iniciando para a query: '{query}' com max_leads: {max_leads}")
+        if not PROJECT_MODULES_AVAILABLE:
+            logger.error("[_search_with_playwright_harvester] PROJECT_MODULES_AVAILABLE is False, harvester not available")
+            return
+        if search_results is None:
+            try:
+                search_results = await asyncio.to_thread(search_company_sites, query, max_leads)
+            except Exception as e:
+                logger.error(f"[_search_with_playwright_harvester] Falha na busca: {e}")
+                return
+
+        async with aclosing(harvest_site_data(search_results, cache=get_fetch_cache(), negative_cache=get_negative_cache())) as sites_stream:
+            async for site_data in sites_stream:
+                if not site_data.extraction_status_message.startswith("SUCESSO"):
+                    logger.warning(f"[_search_with_playwright_harvester] {site_data.url}: {site_data.extraction_status_message}")
+                    continue
+                search_data = site_data.google_search_data
+                yield {
+                    "company_name": search_data.title or "N/A",
+                    "website": str(site_data.url),
+                    "description": search_data.snippet or "N/A",
+                    "source_url": str(site_data.url),
+                    "adk1_enrichment": {
+                        "industry": None,
+                        "company_size": None,
+                        "contact_emails": [],
+                        "contact_phones": [],
+                        "full_content": site_data.extracted_text_content,
+                        "qualification_summary": None,
+                    },
+                }
+
+    async def _search_leads(self, query: str, max_leads: int, query_variants: Optional[List[str]] = None) -> AsyncIterator[Dict]:
         """
         Método principal de busca que tenta ADK1 primeiro, com fallback se necessário.
+        Com mais de uma variante de query, as buscas são feitas em paralelo (fan-out) e os
+        resultados combinados alimentam a extração.
         """
         logger.info(f"[_search_leads] Iniciando busca de leads com query: '{query}', max_leads: {max_leads}")
         
         try:
+            search_results = None
+            if PROJECT_MODULES_AVAILABLE and query_variants and len(query_variants) > 1:
+                search_results = await self._fan_out_search(query_variants, max_leads)
+                if not search_results:
+                    logger.warning("[_search_leads] Fan-out não encontrou candidatos; usando apenas a query principal")
+                    search_results = None
+
+
             # Tentar ADK1 primeiro
             adk1_results_count = 0
             logger.info(f"[_search_leads] Chamando _search_with_adk1_agent")
             
-            async for lead_data in self._search_with_adk1_agent(query, max_leads):
+            search_source = self._search_with_playwright_harvester if HARVESTER_MODE == "playwright" else self._search_with_adk1_agent
+            async for lead_data in search_source(query, max_leads, search_results=search_results):
                 adk1_results_count += 1
                 logger.info(f"[_search_leads] Yielding lead #{adk1_results_count}: {lead_data.get('company_name', 'Unknown')}")
                 yield lead_data
@@ -480,14 +665,23 @@ class PipelineOrchestrator:
         
         # Check if user provided additional search query in business context
         user_search_input = self.business_context.get("user_search_query", "")
+
+        # Jobs repetidos do mesmo usuário com o mesmo contexto reaproveitam query e contexto RAG
+        context_profile = self._load_context_profile()
+        query_from_ai = False
         
         try:
-            # Use AI Prospect Intelligence to generate optimized search query
-            search_query = await self._generate_intelligent_search_query(
-                business_context=self.business_context,
-                user_input=user_search_input
-            )
-            logger.info(f"[PIPELINE_STEP] AI-generated search query: '{search_query}'")
+            if context_profile:
+                search_query = context_profile.search_query
+                logger.info(f"[PIPELINE_STEP] Reusing cached context profile for user {self.user_id}: query '{search_query}'")
+            else:
+                # Use AI Prospect Intelligence to generate optimized search query
+                search_query = await self._generate_intelligent_search_query(
+                    business_context=self.business_context,
+                    user_input=user_search_input
+                )
+                query_from_ai = True
+                logger.info(f"[PIPELINE_STEP] AI-generated search query: '{search_query}'")
         except Exception as e:
             logger.error(f"[PIPELINE_STEP] Failed to generate AI search query: {e}")
             # Fallback to basic query generation
@@ -525,12 +719,17 @@ class PipelineOrchestrator:
         # search_query and max_leads are already defined above
         
         # 2. Configurar RAG com contexto persistido
-        enriched_context_dict = self._create_enriched_search_context(self.business_context, search_query)
-        self.rag_context_text = json.dumps(enriched_context_dict, indent=2)
-        logger.info(f"[PIPELINE_STEP] Enriched context created for job {self.job_id}: Query: '{search_query}', Context: {self.rag_context_text[:100]}...")  # Log first 100 chars for brevity
+        if context_profile:
+            enriched_context_dict = context_profile.enriched_context
+            self.rag_context_text = context_profile.rag_context_text
+            context_filepath = ""  # Contexto já validado no job que gerou o perfil
+        else:
+            enriched_context_dict = self._create_enriched_search_context(self.business_context, search_query)
+            self.rag_context_text = json.dumps(enriched_context_dict, indent=2)
+            logger.info(f"[PIPELINE_STEP] Enriched context created for job {self.job_id}: Query: '{search_query}', Context: {self.rag_context_text[:100]}...")  # Log first 100 chars for brevity
         
-        # Serializar contexto para persistência
-        context_filepath = self._serialize_enriched_context(enriched_context_dict, self.job_id)
+            # Serializar contexto para persistência
+            context_filepath = self._serialize_enriched_context(enriched_context_dict, self.job_id)
         if context_filepath:
             logger.info(f"Contexto enriquecido persistido para job {self.job_id}")
             
@@ -546,36 +745,37 @@ class PipelineOrchestrator:
             else:
                 logger.warning(f"Falha na validação do contexto persistido para job {self.job_id}, usando contexto em memória")
 
+        if context_profile and context_profile.query_variants:
+            query_variants = context_profile.query_variants
+        else:
+            query_variants = build_query_variants(search_query, self.business_context, QUERY_FANOUT_VARIANTS) if PROJECT_MODULES_AVAILABLE else [search_query]
+        if query_from_ai:
+            # Só perfis com query gerada pela IA são guardados; os de fallback seriam reaproveitados sem nova tentativa
+            self._store_context_profile(search_query, enriched_context_dict, query_variants)
+
         # 3. Configurar o ambiente RAG em background
         rag_setup_task = asyncio.create_task(self._setup_rag_for_job(self.job_id, self.rag_context_text))
 
-        # 4. Iniciar o Harvester para coletar leads
+        # 4. Iniciar o Harvester: cada lead é pontuado e enviado ao enriquecimento assim que chega,
+        #    então o enriquecimento do primeiro lead se sobrepõe à raspagem dos seguintes
         enrichment_tasks = []
         leads_found_count = 0
+        deferred_leads: List[Dict[str, Any]] = []
+        deferred_scores: List[Optional[float]] = []
 
-        logger.info("[PIPELINE_STEP] Calling _search_leads")
-        logger.info(f"[PIPELINE_STEP] Search parameters - query: '{search_query}', max_leads: {max_leads}")
-        
-        search_loop_entered = False
-        async for lead_data in self._search_leads(query=search_query, max_leads=max_leads):
-            if not search_loop_entered:
-                logger.info("[PIPELINE_STEP] ✅ Entered _search_leads async for loop successfully!")
-                search_loop_entered = True
-                
+        def start_lead(lead_data: Dict[str, Any], relevance_score: Optional[float]) -> Dict[str, Any]:
+            nonlocal leads_found_count
             leads_found_count += 1
             lead_id = str(uuid.uuid4())
             lead_data['lead_id'] = lead_id # Persist lead_id in the dictionary
 
-            # FIX: Robust extraction of company_name
-            # If the top-level company_name is 'N/A', try to find a better one in the nested data.
-            if lead_data.get('company_name') == 'N/A' and 'adk1_enrichment' in lead_data:
-                nested_name = lead_data['adk1_enrichment'].get('company_name')
-                if nested_name:
-                    lead_data['company_name'] = nested_name
+            logger.info(f"[PIPELINE_STEP] Processing lead #{leads_found_count} ({lead_id}): {lead_data.get('company_name', 'Unknown')} - {lead_data.get('website', 'No website')} (relevância: {relevance_score})")
 
-            logger.info(f"[PIPELINE_STEP] Processing lead #{leads_found_count} ({lead_id}): {lead_data.get('company_name', 'Unknown')} - {lead_data.get('website', 'No website')}")
-            
-            yield LeadGeneratedEvent(
+            # Inicia o enriquecimento para o lead em uma tarefa separada
+            task = asyncio.create_task(self._enrich_lead_and_collect_events(lead_data, lead_id))
+            enrichment_tasks.append(task)
+
+            return LeadGeneratedEvent(
                 event_type="lead_generated",
                 timestamp=datetime.now().isoformat(),
                 job_id=self.job_id,
@@ -583,21 +783,55 @@ class PipelineOrchestrator:
                 lead_id=lead_id,
                 lead_data=lead_data,
                 source_url=lead_data.get("source_url", "N/A"),
-                agent_name="ADK1HarvesterAgent"
+                agent_name="ADK1HarvesterAgent",
+                relevance_score=relevance_score,
+                relevance_rank=leads_found_count
             ).to_dict()
 
-            # Aguarda a conclusão do setup do RAG se ainda não terminou
-            if not rag_setup_task.done():
-                logger.info("Aguardando a finalização da configuração do RAG antes de enriquecer o primeiro lead...")
-                await rag_setup_task
-            
-            # Inicia o enriquecimento para o lead em uma tarefa separada
-            task = asyncio.create_task(self._enrich_lead_and_collect_events(lead_data, lead_id))
-            enrichment_tasks.append(task)
+        logger.info("[PIPELINE_STEP] Calling _search_leads")
+        logger.info(f"[PIPELINE_STEP] Search parameters - query: '{search_query}', max_leads: {max_leads}")
+        
+        search_loop_entered = False
+        if len(query_variants) > 1:
+            logger.info(f"[PIPELINE_STEP] Query fan-out with {len(query_variants)} variants: {query_variants}")
+        async with aclosing(self._search_leads(query=search_query, max_leads=max_leads, query_variants=query_variants)) as leads_stream:
+            async for lead_data in leads_stream:
+                if not search_loop_entered:
+                    logger.info("[PIPELINE_STEP] ✅ Entered _search_leads async for loop successfully!")
+                    search_loop_entered = True
+
+                # FIX: Robust extraction of company_name
+                # If the top-level company_name is 'N/A', try to find a better one in the nested data.
+                if lead_data.get('company_name') == 'N/A' and 'adk1_enrichment' in lead_data:
+                    nested_name = lead_data['adk1_enrichment'].get('company_name')
+                    if nested_name:
+                        lead_data['company_name'] = nested_name
+
+                # Aguarda a conclusão do setup do RAG se ainda não terminou (necessário para o pré-ranqueamento)
+                if not rag_setup_task.done():
+                    logger.info("Aguardando a finalização da configuração do RAG antes de pontuar e enriquecer os leads...")
+                    await rag_setup_task
+
+                # 5. Pontua o lead pela relevância ao contexto do job; leads abaixo do limiar vão para o fim da fila
+                relevance_score = (await self._score_leads_relevance(self.job_id, [lead_data]))[0]
+                if relevance_score is not None and relevance_score < LEAD_RELEVANCE_THRESHOLD:
+                    deferred_leads.append(lead_data)
+                    deferred_scores.append(relevance_score)
+                    continue
+
+                yield start_lead(lead_data, relevance_score)
+
+                if leads_found_count >= max_leads:
+                    logger.info(f"[PIPELINE_STEP] Reached max_leads ({max_leads}). Stopping further lead processing.")
+                    break
 
-            if leads_found_count >= max_leads:
-                logger.info(f"[PIPELINE_STEP] Reached max_leads ({max_leads}). Stopping further lead generation and processing from harvester.")
-                break
+        # Leads pouco relevantes são enriquecidos por último, em ordem decrescente (ou descartados no modo "drop")
+        if deferred_leads and leads_found_count < max_leads:
+            for lead_data, relevance_score in self._rank_leads_by_relevance(deferred_leads, deferred_scores):
+                yield start_lead(lead_data, relevance_score)
+                if leads_found_count >= max_leads:
+                    logger.info(f"[PIPELINE_STEP] Reached max_leads ({max_leads}). Stopping further lead processing.")
+                    break
             
         if not search_loop_entered:
             logger.error("[PIPELINE_STEP] ❌ CRITICAL: Never entered the _search_leads async for loop! This means _search_leads yielded nothing.")
@@ -612,7 +846,7 @@ class PipelineOrchestrator:
             status_message=f"Harvester concluído. {leads_found_count} leads encontrados. Aguardando enriquecimento..."
         ).to_dict()
         
-        # 5. Coleta os resultados das tarefas de enriquecimento
+        # 6. Coleta os resultados das tarefas de enriquecimento
         for task_future in asyncio.as_completed(enrichment_tasks):
             events = await task_future
             for event in events:
@@ -657,6 +891,28 @@ class PipelineOrchestrator:
             }
         }
 
+    def _load_context_profile(self) -> Optional[Any]:
+        """
+        Perfil de contexto em cache do usuário (query, variantes e contexto RAG), se o
+        contexto de negócio não mudou desde o job que o gerou.
+        """
+        if not (PROJECT_MODULES_AVAILABLE and CONTEXT_PROFILE_CACHE_ENABLED and self.user_id):
+            return None
+        try:
+            return get_context_profile_cache().get(self.user_id, self.business_context)
+        except Exception as e:
+            logger.warning(f"[{self.job_id}] Falha ao ler o cache de perfis de contexto: {e}")
+            return None
+
+    def _store_context_profile(self, search_query: str, enriched_context: Dict[str, Any], query_variants: List[str]) -> None:
+        if not (PROJECT_MODULES_AVAILABLE and CONTEXT_PROFILE_CACHE_ENABLED and self.user_id):
+            return
+        try:
+            get_context_profile_cache().put(self.user_id, self.business_context, search_query, enriched_context,
+                                            self.rag_context_text, query_variants)
+        except Exception as e:
+            logger.warning(f"[{self.job_id}] Falha ao salvar o perfil de contexto: {e}")
+
     def _serialize_enriched_context(self, enriched_context: Dict[str, Any], job_id: str) -> str:
         """
         Serializa o contexto enriquecido em um arquivo JSON.
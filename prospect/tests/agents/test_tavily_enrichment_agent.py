@@ -4,6 +4,7 @@ import json
 
 from agents.tavily_enrichment_agent import TavilyEnrichmentAgent, TavilyEnrichmentInput, TavilyEnrichmentOutput
 from core_logic.llm_client import LLMClientBase, LLMResponse
+from core_logic.tavily_client import TavilySearchClient, TavilySearchError
 
 class TestTavilyEnrichmentAgent(unittest.TestCase):
 
@@ -111,10 +112,10 @@ class TestTavilyEnrichmentAgent(unittest.TestCase):
             mock_search.assert_called_once()
 
 
-    @patch('agents.tavily_enrichment_agent.requests.post') # Mock the actual requests.post call
-    def test_search_with_tavily_api_failure(self, mock_requests_post):
+    @patch.object(TavilySearchClient, 'search') # Mock the shared client's HTTP call
+    def test_search_with_tavily_api_failure(self, mock_client_search):
         # Simulate Tavily API returning an error
-        mock_requests_post.side_effect = requests.exceptions.RequestException("API Error")
+        mock_client_search.side_effect = TavilySearchError("API Error")
 
         # LLM for query generation
         mock_query_generation_response = json.dumps(["pesquisa Empresa Teste"])
@@ -132,7 +133,7 @@ class TestTavilyEnrichmentAgent(unittest.TestCase):
         self.assertIn("Tavily API was called but returned no results", result.error_message if result.error_message else "") # Error from _search_with_tavily is generic "no results"
         
         self.mock_llm_client.generate.assert_called_once()
-        mock_requests_post.assert_called_once()
+        mock_client_search.assert_called_once()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,200 @@
+"""
+Unit tests for the streaming ADK1 lead generator and its bridge into the pipeline
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import adk1.agent as adk1_agent
+import pipeline_orchestrator
+from pipeline_orchestrator import PipelineOrchestrator
+
+SEARCH_RESULTS = [
+    {"url": f"https://empresa{i}.com.br/", "title": f"Empresa {i}", "snippet": f"snippet {i}"} for i in range(4)
+]
+COMPANY_TEXT = "Quem somos: sistemas de gestão para o varejo, com implantação e suporte em todo o Brasil. Fale conosco."
+
+
+def done_future(value):
+    future = concurrent.futures.Future()
+    future.set_result(value)
+    return future
+
+
+@pytest.fixture
+def fake_tools():
+    model = MagicMock()
+    model.generate_content.side_effect = lambda prompt: MagicMock(text='{"company_name": "Acme", "industry": "Tecnologia"}')
+    scrapes = {i: done_future({"content": f"Empresa {i} contato@empresa{i}.com.br {COMPANY_TEXT}"}) for i in range(4)}
+    with patch.object(adk1_agent, "_initialize_gemini_model", return_value=model), \
+         patch.object(adk1_agent, "_tavily_search_internal", return_value=SEARCH_RESULTS), \
+         patch.object(adk1_agent, "_submit_scrapes", return_value=scrapes), \
+         patch.object(adk1_agent._gemini_rate_limiter, "min_interval_seconds", 0.0):
+        yield model, scrapes
+
+
+def test_iter_structured_leads_yields_before_remaining_extractions(fake_tools):
+    model, scrapes = fake_tools
+    for i in (1, 2, 3):
+        scrapes[i] = concurrent.futures.Future()
+    stream = adk1_agent.iter_structured_leads("crm", 3)
+    first = next(stream)
+    assert first["source_url"] == "https://empresa0.com.br/"
+    assert first["contact_emails"] == ["contato@empresa0.com.br"]
+    assert model.generate_content.call_count == 1
+    for i in (1, 2, 3):
+        scrapes[i].set_result({"content": f"Empresa {i} {COMPANY_TEXT}"})
+    assert len(list(stream)) == 2
+
+
+def test_iter_structured_leads_overfetches_and_stops_at_the_quota(fake_tools):
+    model, scrapes = fake_tools
+    pending = {i: concurrent.futures.Future() for i in (1, 2, 3)}
+    scrapes.update(pending)
+    with patch.object(adk1_agent, "_tavily_search_internal", return_value=SEARCH_RESULTS) as search:
+        leads = list(adk1_agent.iter_structured_leads("crm", 1))
+    assert search.call_args.kwargs["max_results"] == adk1_agent.LEAD_OVERFETCH_FACTOR
+    assert [lead["source_url"] for lead in leads] == ["https://empresa0.com.br/"]
+    # Candidatos que faltavam para a cota mais a folga foram cancelados; o último nem foi agendado
+    assert pending[1].cancelled() and pending[2].cancelled()
+    assert model.generate_content.call_count == 1
+
+
+def test_iter_structured_leads_widens_the_search_when_yield_is_low(fake_tools):
+    model, scrapes = fake_tools
+    scrapes[0] = done_future({"content": "Publicado em 10/03/2024. Por Redação. Leia também: " + "notícias " * 20})
+    with patch.object(adk1_agent, "_tavily_search_internal", side_effect=[SEARCH_RESULTS[:2], SEARCH_RESULTS]) as search:
+        leads = list(adk1_agent.iter_structured_leads("crm", 2))
+    assert search.call_count == 2 and search.call_args.kwargs["max_results"] == 12
+    assert search.call_args.kwargs["query"] == "empresas de crm"
+    assert search.call_args.kwargs["exclude_domains"] == ["empresa0.com.br", "empresa1.com.br"]
+    urls = [lead["source_url"] for lead in leads]
+    assert len(urls) == 2 and urls[0] == "https://empresa1.com.br/" and "https://empresa0.com.br/" not in urls
+
+
+def test_widening_at_the_search_cap_finds_new_domains(fake_tools):
+    model, scrapes = fake_tools
+
+    def search(query, max_results, exclude_domains=None):
+        # A mesma query repetida traria os mesmos dois sites
+        return SEARCH_RESULTS[:2] if query == "crm" else SEARCH_RESULTS[2:]
+
+    with patch.object(adk1_agent, "_tavily_search_internal", side_effect=search) as tavily:
+        leads = list(adk1_agent.iter_structured_leads("crm", 7))
+    first, widened = tavily.call_args_list
+    assert first.kwargs["max_results"] == widened.kwargs["max_results"] == adk1_agent.TAVILY_MAX_RESULTS_CAP
+    assert widened.kwargs["query"] != "crm"
+    assert sorted(lead["source_url"] for lead in leads) == [f"https://empresa{i}.com.br/" for i in range(4)]
+
+
+def test_closing_the_stream_cancels_pending_scrapes(fake_tools):
+    _, scrapes = fake_tools
+    pending = concurrent.futures.Future()
+    scrapes[2] = pending
+    stream = adk1_agent.iter_structured_leads("crm", 3)
+    next(stream)
+    stream.close()
+    assert pending.cancelled()
+
+
+def test_find_and_extract_structured_leads_keeps_list_contract(fake_tools):
+    leads = adk1_agent.find_and_extract_structured_leads("crm", 2)
+    assert [lead["company_name"] for lead in leads] == ["Acme", "Acme"]
+
+
+def test_prefilter_skips_non_company_pages_before_gemini(fake_tools):
+    model, scrapes = fake_tools
+    scrapes[0] = done_future({"content": "Publicado em 10/03/2024. Por Redação. Leia também: " + "notícias " * 20})
+    with patch.object(adk1_agent, "_tavily_search_internal", return_value=[
+        {"url": "https://pt.wikipedia.org/wiki/CRM", "title": "CRM", "snippet": ""}, *SEARCH_RESULTS
+    ]):
+        leads = adk1_agent.find_and_extract_structured_leads("crm", 2)
+    assert len(leads) == 2 and "https://empresa0.com.br/" not in [lead["source_url"] for lead in leads]
+    assert model.generate_content.call_count in (2, 3)
+
+
+def test_prefilter_swaps_company_subpages_for_the_homepage():
+    results = adk1_agent._prefilter_search_results([
+        {"url": "https://acme.com.br/vagas/vendedor", "title": "Vagas", "snippet": ""},
+        {"url": "https://acme.com.br/", "title": "Acme", "snippet": ""},
+        {"url": "https://pt.wikipedia.org/wiki/CRM", "title": "CRM", "snippet": ""},
+    ], "test")
+    assert [r["url"] for r in results] == ["https://acme.com.br/", "https://acme.com.br/"]
+    assert len(adk1_agent._dedupe_search_results(results, "test")) == 1
+
+
+def test_errors_are_yielded_as_single_item():
+    with patch.object(adk1_agent, "_initialize_gemini_model", side_effect=ValueError("sem chave")):
+        assert adk1_agent.find_and_extract_structured_leads("crm", 2) == [
+            {"error": "Erro de configuração da API: sem chave"}
+        ]
+
+
+class SlowStream:
+    """Sync generator factory that records when each lead is produced and whether it was closed"""
+
+    def __init__(self, count: int, delay: float):
+        self.count = count
+        self.delay = delay
+        self.produced = []
+        self.closed = threading.Event()
+
+    def __call__(self, query, max_leads, search_results=None):
+        try:
+            for i in range(self.count):
+                time.sleep(self.delay)
+                self.produced.append(time.monotonic())
+                yield {"company_name": f"Empresa {i}", "website": f"https://empresa{i}.com.br", "source_url": f"https://empresa{i}.com.br"}
+        finally:
+            self.closed.set()
+
+
+def collect(orchestrator, limit=None):
+    async def run():
+        received = []
+        stream = orchestrator._search_with_adk1_agent("crm", 5)
+        async for lead in stream:
+            received.append((time.monotonic(), lead))
+            if limit and len(received) >= limit:
+                break
+        await stream.aclose()
+        return received
+
+    return asyncio.run(run())
+
+
+def test_adk1_bridge_streams_leads_as_they_are_extracted():
+    stream = SlowStream(count=3, delay=0.05)
+    with patch.object(pipeline_orchestrator, "iter_structured_leads", stream):
+        received = collect(object.__new__(PipelineOrchestrator))
+    assert [lead["company_name"] for _, lead in received] == ["Empresa 0", "Empresa 1", "Empresa 2"]
+    # O primeiro lead chega ao consumidor antes de o último ser extraído
+    assert received[0][0] < stream.produced[-1]
+    assert received[0][1]["adk1_enrichment"]["contact_emails"] == []
+
+
+def test_adk1_bridge_stops_the_worker_when_consumer_stops_early():
+    stream = SlowStream(count=50, delay=0.01)
+    with patch.object(pipeline_orchestrator, "iter_structured_leads", stream):
+        received = collect(object.__new__(PipelineOrchestrator), limit=2)
+        assert stream.closed.wait(timeout=2)
+    assert len(received) == 2
+    assert len(stream.produced) < 50
+
+
+def test_adk1_bridge_falls_back_when_stream_fails_before_any_lead():
+    def failing_stream(query, max_leads):
+        raise RuntimeError("falha")
+        yield  # pragma: no cover
+
+    fallback = [{"title": "Acme", "url": "https://acme.com.br", "qualification_summary": "CRM"}]
+    with patch.object(pipeline_orchestrator, "iter_structured_leads", failing_stream), \
+         patch.object(pipeline_orchestrator, "search_and_qualify_leads", return_value=fallback):
+        received = collect(object.__new__(PipelineOrchestrator))
+    assert [lead["company_name"] for _, lead in received] == ["Acme"]
+    assert received[0][1]["description"] == "CRM"
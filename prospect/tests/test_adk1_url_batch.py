@@ -0,0 +1,85 @@
+"""
+Unit tests for the bulk mode of the ADK1 direct-URL tool
+"""
+
+import concurrent.futures
+import os
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import adk1.agent as adk1_agent
+
+URLS = [f"https://empresa{i}.com.br/" for i in range(6)]
+
+
+def done_future(value):
+    future = concurrent.futures.Future()
+    future.set_result(value)
+    return future
+
+
+@pytest.fixture
+def batch_env(tmp_path):
+    calls = {"active": 0, "max_active": 0, "prompts": []}
+    lock = threading.Lock()
+
+    def generate_content(prompt):
+        with lock:
+            calls["active"] += 1
+            calls["max_active"] = max(calls["max_active"], calls["active"])
+            calls["prompts"].append(prompt)
+        time.sleep(0.1)
+        with lock:
+            calls["active"] -= 1
+        return MagicMock(text='{"company_name": "Acme"}')
+
+    model = MagicMock()
+    model.generate_content.side_effect = generate_content
+    scraper = MagicMock()
+    scraper.submit_many.side_effect = lambda urls: [
+        done_future({"error": "HTTP 404"} if "empresa5" in url else {"title": url, "content": f"Conteúdo {url}", "fetch_seconds": 0.25})
+        for url in urls
+    ]
+    with patch.object(adk1_agent, "_initialize_gemini_model", return_value=model), \
+         patch.object(adk1_agent, "get_async_scraper", return_value=scraper), \
+         patch.object(adk1_agent, "URL_BATCH_CHECKPOINT_DIR", str(tmp_path)), \
+         patch.object(adk1_agent._gemini_rate_limiter, "min_interval_seconds", 0.0):
+        yield calls, scraper, tmp_path
+
+
+def test_bulk_mode_analyzes_concurrently_and_keeps_input_order(batch_env):
+    calls, _, tmp_path = batch_env
+    results = adk1_agent.process_provided_urls_for_leads(URLS, None)
+    assert [item["url"] for item in results] == URLS
+    assert calls["max_active"] > 1
+    assert results[0]["lead_data"] == {"company_name": "Acme"}
+    assert results[0]["timing"]["analysis_seconds"] >= 0.1
+    assert results[0]["timing"]["scrape_seconds"] == 0.25  # Tempo da própria URL, não desde o início do lote
+    assert results[5]["error"].startswith("Falha ao raspar") and len(calls["prompts"]) == 5
+    assert os.listdir(tmp_path) == []  # Checkpoint removido ao concluir o lote
+
+
+def test_interrupted_batch_resumes_from_checkpoint(batch_env):
+    calls, scraper, tmp_path = batch_env
+    stream = adk1_agent.iter_provided_url_leads(URLS, "Extraia o lead.")
+    first = [next(stream), next(stream)]
+    stream.close()  # Simula a queda do processo no meio do lote
+    assert len(os.listdir(tmp_path)) == 1
+
+    calls["prompts"].clear()
+    resumed = list(adk1_agent.iter_provided_url_leads(URLS, "Extraia o lead."))
+    recovered = [item for item in resumed if item.get("from_checkpoint")]
+    assert {item["index"] for item in recovered} == {item["index"] for item in first if item["error"] is None}
+    assert sorted(item["index"] for item in resumed) == list(range(6))
+    resubmitted = scraper.submit_many.call_args[0][0]
+    assert not set(resubmitted) & {item["url"] for item in recovered}
+    assert os.listdir(tmp_path) == []
+
+
+def test_configuration_error_is_reported_once(tmp_path):
+    with patch.object(adk1_agent, "_initialize_gemini_model", side_effect=ValueError("sem chave")), \
+         patch.object(adk1_agent, "URL_BATCH_CHECKPOINT_DIR", str(tmp_path)):
+        assert adk1_agent.process_provided_urls_for_leads(URLS, None) == [{"error": "Erro de configuração da API: sem chave"}]
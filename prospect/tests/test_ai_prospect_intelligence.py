@@ -0,0 +1,166 @@
+"""
+Unit tests for the AdvancedProspectProfiler batch RAG API
+"""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import numpy
+import pytest
+
+import ai_prospect_intelligence
+from ai_prospect_intelligence import AdvancedProspectProfiler
+
+
+class FakeEmbeddingModel:
+    """Deterministic stand-in for SentenceTransformer.encode"""
+
+    def __init__(self):
+        self.encode_calls = []
+
+    def encode(self, texts, show_progress_bar=False):
+        self.encode_calls.append(list(texts))
+        return numpy.array([[float(len(t)), 1.0, 0.0] for t in texts], dtype="float32")
+
+
+class FakeFaissIndex:
+    """Records every search call and returns the first k chunk ids"""
+
+    def __init__(self):
+        self.search_calls = []
+
+    def search(self, matrix, k):
+        self.search_calls.append(matrix.shape)
+        indices = numpy.tile(numpy.arange(k), (matrix.shape[0], 1))
+        return numpy.zeros_like(indices, dtype="float32"), indices
+
+
+class FakeAsyncLLM:
+    """Gemini-like client exposing generate_content_async"""
+
+    def __init__(self, delay: float = 0.01):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.prompts = []
+
+    async def generate_content_async(self, prompt):
+        self.prompts.append(prompt)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        return SimpleNamespace(text="- Oportunidade: expansão do time comercial\n- Ângulo: automação de follow-up")
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        return SimpleNamespace(text="- Oportunidade: insight síncrono de teste")
+
+
+@pytest.fixture
+def profiler():
+    instance = object.__new__(AdvancedProspectProfiler)
+    instance.embedding_model = FakeEmbeddingModel()
+    instance.llm_client = FakeAsyncLLM()
+    instance._pending_batches = {}
+    instance._flush_tasks = set()
+    with patch.object(ai_prospect_intelligence, "np", numpy):
+        yield instance
+
+
+@pytest.fixture
+def rag_store():
+    return {"index": FakeFaissIndex(), "chunks": ["chunk A", "chunk B", "chunk C", "chunk D"]}
+
+
+ENRICHED_CONTEXT = {
+    "lead_qualification_criteria": {"problems_we_solve": ["qualificação manual de leads"]}
+}
+
+LEADS = [
+    {"company_name": f"Empresa {i}", "description": "Empresa expanding e hiring vendedores"}
+    for i in range(5)
+]
+
+
+def test_batch_uses_single_encode_and_single_search(profiler, rag_store):
+    profiles = asyncio.run(
+        profiler.create_advanced_prospect_profiles_batch(LEADS, ENRICHED_CONTEXT, rag_store)
+    )
+
+    assert len(profiles) == len(LEADS)
+    assert len(profiler.embedding_model.encode_calls) == 1
+    assert len(profiler.embedding_model.encode_calls[0]) == len(LEADS)
+    assert rag_store["index"].search_calls == [(len(LEADS), 3)]
+    assert len(profiler.llm_client.prompts) == len(LEADS)
+    for profile in profiles:
+        assert profile["predictive_insights"][0].startswith("Oportunidade")
+        assert profile["context_usage_summary"]["rag_vector_store_used"] is True
+
+
+def test_batch_llm_calls_run_concurrently_with_bound(profiler, rag_store):
+    with patch.object(ai_prospect_intelligence, "MAX_CONCURRENT_INSIGHT_CALLS", 2):
+        asyncio.run(profiler.create_advanced_prospect_profiles_batch(LEADS, ENRICHED_CONTEXT, rag_store))
+    assert profiler.llm_client.max_in_flight == 2
+
+
+def test_batch_matches_single_lead_scores(profiler, rag_store):
+    single = profiler.create_advanced_prospect_profile(LEADS[0], ENRICHED_CONTEXT, rag_store)
+    batch = asyncio.run(
+        profiler.create_advanced_prospect_profiles_batch(LEADS[:1], ENRICHED_CONTEXT, rag_store)
+    )[0]
+    for key in ("prospect_score", "buying_intent_score", "pain_alignment_score", "urgency_score"):
+        assert single[key] == batch[key]
+
+
+def test_batch_without_vector_store_returns_fallback(profiler):
+    profiles = asyncio.run(profiler.create_advanced_prospect_profiles_batch(LEADS[:2], ENRICHED_CONTEXT, None))
+    assert [p["predictive_insights"][0] for p in profiles] == [
+        "Análise padrão indica que 'Empresa 0' se alinha com nosso público-alvo geral.",
+        "Análise padrão indica que 'Empresa 1' se alinha com nosso público-alvo geral.",
+    ]
+    assert profiler.llm_client.prompts == []
+
+
+def test_concurrent_async_calls_are_coalesced_into_one_batch(profiler, rag_store):
+    async def run_all():
+        return await asyncio.gather(*(
+            profiler.create_advanced_prospect_profile_async(lead, ENRICHED_CONTEXT, rag_store, batch_key="job-1")
+            for lead in LEADS
+        ))
+
+    profiles = asyncio.run(run_all())
+
+    assert len(profiles) == len(LEADS)
+    assert len(profiler.embedding_model.encode_calls) == 1
+    assert rag_store["index"].search_calls == [(len(LEADS), 3)]
+    assert profiler._pending_batches == {}
+    assert profiler._flush_tasks == set()
+
+
+def test_calls_without_batch_key_skip_the_batch_window(profiler):
+    # Vector store próprio de cada lead (como no EnhancedLeadProcessor): nada a agrupar
+    stores = [{"index": FakeFaissIndex(), "chunks": ["chunk A", "chunk B", "chunk C"]} for _ in LEADS[:2]]
+
+    async def run_all():
+        with patch.object(ai_prospect_intelligence, "PROFILE_BATCH_WINDOW_SECONDS", 60):
+            return await asyncio.wait_for(asyncio.gather(*(
+                profiler.create_advanced_prospect_profile_async(lead, ENRICHED_CONTEXT, store)
+                for lead, store in zip(LEADS, stores)
+            )), timeout=5)
+
+    assert len(asyncio.run(run_all())) == 2
+    assert [store["index"].search_calls for store in stores] == [[(1, 3)], [(1, 3)]]
+    assert profiler._pending_batches == {}
+
+
+def test_llm_failure_falls_back_per_lead(profiler, rag_store):
+    async def failing(prompt):
+        raise RuntimeError("quota exceeded")
+
+    profiler.llm_client.generate_content_async = failing
+    profiles = asyncio.run(profiler.create_advanced_prospect_profiles_batch(LEADS[:2], ENRICHED_CONTEXT, rag_store))
+    assert profiles[1]["predictive_insights"] == [
+        "Análise padrão indica que 'Empresa 1' se alinha com nosso público-alvo geral."
+    ]
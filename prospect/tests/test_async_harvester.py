@@ -0,0 +1,230 @@
+"""
+Unit tests for the async Playwright harvester and its browser pool
+"""
+
+import asyncio
+import time
+from unittest.mock import patch
+
+import pipeline_orchestrator
+from core_logic.async_harvester import AsyncHarvester
+from core_logic.browser_pool import AsyncBrowserPool, PolitenessScheduler
+from core_logic.negative_cache import NegativeCache
+from core_logic.page_readiness import ReadinessDetector
+from pipeline_orchestrator import PipelineOrchestrator
+
+COMPANY_HTML = (
+    "<html><head><title>{name}</title></head><body><main><h1>{name}</h1>"
+    "<p>A {name} desenvolve sistemas de gestão para o varejo. Quem somos: empresa de Campinas. "
+    "Nossos serviços incluem PDV, estoque e emissão fiscal.</p></main></body></html>"
+)
+
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+        self.ok = status < 400
+
+
+class FakePage:
+    """Async page that takes `delay` seconds to load and records concurrency"""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.url = "about:blank"
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    def set_default_navigation_timeout(self, timeout):
+        pass
+
+    def on(self, event, handler):
+        pass
+
+    def remove_listener(self, event, handler):
+        pass
+
+    async def route(self, pattern, handler):
+        pass
+
+    async def unroute(self, pattern, handler):
+        pass
+
+    async def goto(self, url, wait_until=None):
+        self.url = url
+        if url == "about:blank":
+            return None
+        stats = self.browser.stats
+        stats["active"] += 1
+        stats["max_active"] = max(stats["max_active"], stats["active"])
+        stats["visits"].append((url, time.monotonic()))
+        try:
+            await asyncio.sleep(self.browser.delay)
+        finally:
+            stats["active"] -= 1
+        if "erro404" in url:
+            return FakeResponse(404)
+        if "dns" in url:
+            raise RuntimeError("net::ERR_NAME_NOT_RESOLVED")
+        return FakeResponse(200)
+
+    async def evaluate(self, script):
+        return {"textLength": 500, "quietMs": 1000, "readyState": "complete"}
+
+    async def content(self):
+        return COMPANY_HTML.format(name=self.url.split("//")[1].split(".")[0].capitalize())
+
+
+class FakeContext:
+    def __init__(self, browser):
+        self.browser = browser
+        self.page = None
+
+    async def new_page(self):
+        self.page = FakePage(self.browser)
+        return self.page
+
+    async def close(self):
+        self.page.closed = True
+
+
+class FakeBrowser:
+    def __init__(self, stats, delay):
+        self.stats = stats
+        self.delay = delay
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self, **options):
+        return FakeContext(self)
+
+    async def close(self):
+        self.connected = False
+
+
+def make_pool(delay=0.05, **kwargs):
+    stats = {"active": 0, "max_active": 0, "visits": [], "browsers": []}
+
+    async def launcher():
+        stats["browsers"].append(FakeBrowser(stats, delay))
+        return stats["browsers"][-1]
+
+    return AsyncBrowserPool(launcher=launcher, **kwargs), stats
+
+
+def make_harvester(pool, **kwargs):
+    kwargs.setdefault("politeness", PolitenessScheduler(0.0))
+    kwargs.setdefault("static_first", False)
+    return AsyncHarvester(pool=pool, readiness=ReadinessDetector(poll_interval_ms=10, quiet_window_ms=20), **kwargs)
+
+
+def results_for(*names):
+    return [{"url": f"https://{name}.com.br/", "title": name.capitalize(), "snippet": f"Site da {name}"} for name in names]
+
+
+def harvest(harvester, results, limit=None):
+    async def run():
+        received = []
+        stream = harvester.iter_site_data(results)
+        async for site_data in stream:
+            received.append(site_data)
+            if limit and len(received) >= limit:
+                break
+        await stream.aclose()
+        await harvester.pool.close()
+        return received
+
+    return asyncio.run(run())
+
+
+def test_pages_render_concurrently_up_to_the_limit():
+    pool, stats = make_pool()
+    harvester = make_harvester(pool, concurrency=3)
+    sites = harvest(harvester, results_for("acme", "beta", "gama", "delta", "omega", "sigma"))
+    assert len(sites) == 6 and stats["max_active"] == 3
+    assert len(stats["browsers"]) == 1  # Um navegador compartilhado por todas as páginas
+    acme = next(site for site in sites if site.google_search_data.title == "Acme")
+    assert acme.extraction_status_message == "SUCESSO NA EXTRAÇÃO" and "varejo" in acme.extracted_text_content
+
+
+def test_same_domain_pages_are_serialized_and_spaced():
+    pool, stats = make_pool(delay=0.01)
+    harvester = make_harvester(pool, concurrency=4, per_domain_concurrency=1, politeness=PolitenessScheduler(0.1))
+    results = [{"url": f"https://acme.com.br/{path}", "title": "Acme", "snippet": ""} for path in ("", "sobre", "contato")]
+    harvest(harvester, results + results_for("beta"))
+    acme_visits = [at for url, at in stats["visits"] if "acme" in url]
+    assert stats["max_active"] <= 2
+    assert all(later - earlier >= 0.09 for earlier, later in zip(acme_visits, acme_visits[1:]))
+
+
+def test_failures_are_reported_as_extraction_status():
+    pool, _ = make_pool(delay=0.0)
+    harvester = make_harvester(pool)
+    sites = {site.google_search_data.title: site for site in harvest(harvester, results_for("erro404", "dns"))}
+    assert sites["Erro404"].extraction_status_message == "FALHA NA EXTRAÇÃO: Página retornou status 404."
+    assert sites["Dns"].extraction_status_message == "FALHA NA EXTRAÇÃO: ERRO DE DNS."
+
+
+def test_known_failures_are_skipped_without_rendering():
+    negative_cache = NegativeCache(path=None)
+    pool, stats = make_pool(delay=0.0)
+    harvest(make_harvester(pool, negative_cache=negative_cache), results_for("dns", "erro404", "acme"))
+    pool, stats = make_pool(delay=0.0)
+    harvester = make_harvester(pool, negative_cache=negative_cache)
+    sites = {site.google_search_data.title: site for site in harvest(harvester, results_for("dns", "erro404", "acme"))}
+    assert [url for url, _ in stats["visits"]] == ["https://acme.com.br/"]
+    assert sites["Dns"].extraction_status_message.startswith("FALHA NA EXTRAÇÃO: FALHA CONHECIDA (DNS, 1x)")
+    assert harvester.stats["known_failures"] == 2
+
+
+def test_async_pool_retires_browser_after_n_pages_without_breaking_leases():
+    pool, stats = make_pool(delay=0.01, restart_after_pages=2)
+    harvester = make_harvester(pool, concurrency=2)
+    sites = harvest(harvester, results_for("a1", "a2", "a3", "a4", "a5"))
+    assert all(site.extraction_status_message == "SUCESSO NA EXTRAÇÃO" for site in sites)
+    assert len(stats["browsers"]) >= 2 and not any(browser.connected for browser in stats["browsers"])
+
+
+def test_orchestrator_streams_playwright_leads():
+    pool, stats = make_pool(delay=0.02)
+    search_results = results_for("acme", "beta", "erro404")
+
+    def harvest_site_data(results, cache=None, negative_cache=None):
+        return make_harvester(pool).iter_site_data(results)
+
+    async def run():
+        stream = object.__new__(PipelineOrchestrator)._search_with_playwright_harvester("crm", 5)
+        return [lead async for lead in stream]
+
+    with patch.object(pipeline_orchestrator, "search_company_sites", return_value=search_results), \
+         patch.object(pipeline_orchestrator, "harvest_site_data", harvest_site_data), \
+         patch.object(pipeline_orchestrator, "get_fetch_cache", return_value=None), \
+         patch.object(pipeline_orchestrator, "get_negative_cache", return_value=None):
+        leads = asyncio.run(run())
+    assert sorted(lead["company_name"] for lead in leads) == ["Acme", "Beta"]
+    assert "varejo" in leads[0]["adk1_enrichment"]["full_content"]
+    assert leads[0]["website"].startswith("https://")
+
+
+def test_static_first_only_renders_js_shells(tmp_path):
+    from core_logic.async_scraper import FetchResult
+    from core_logic.tiered_fetch import TIER_RENDER, TierMemory, TieredFetcher
+
+    class StaticScraper:
+        def fetch_sync(self, url):
+            if "acme" in url:
+                return FetchResult(url=url, status_code=200, text=COMPANY_HTML.format(name="Acme"))
+            return FetchResult(url=url, status_code=200, text='<html><body><div id="root"></div></body></html>')
+
+    pool, stats = make_pool(delay=0.0)
+    tiered = TieredFetcher(StaticScraper(), TierMemory(str(tmp_path / "tiers.json")), min_text_chars=100)
+    harvester = make_harvester(pool, static_first=True, tiered=tiered)
+    sites = {site.google_search_data.title: site for site in harvest(harvester, results_for("acme", "beta"))}
+    assert sites["Acme"].extraction_status_message == "SUCESSO NA EXTRAÇÃO (VIA HTTP)"
+    assert sites["Beta"].extraction_status_message == "SUCESSO NA EXTRAÇÃO"
+    assert [url for url, _ in stats["visits"]] == ["https://beta.com.br/"]
+    assert tiered.memory.tier_for("https://beta.com.br/") == TIER_RENDER
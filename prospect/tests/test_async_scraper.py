@@ -0,0 +1,131 @@
+"""
+Unit tests for the async scraping engine and the interval rate limiter
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from core_logic.async_scraper import AsyncScraper
+from core_logic.rate_limiter import IntervalRateLimiter, get_rate_limiter
+
+PAGE = "<html><head><title> Acme Ltda </title><script>var x=1;</script></head><body><p>Software de CRM</p></body></html>"
+
+
+class RecordingHandler:
+    """Async MockTransport handler tracking concurrency and request start times per host"""
+
+    def __init__(self, delay: float = 0.02):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.starts = {}
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.starts.setdefault(request.url.host, []).append(time.monotonic())
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.delay)
+        self.in_flight -= 1
+        if request.url.path == "/big":
+            return httpx.Response(200, headers={"content-type": "text/html"}, content=b"a" * 10_000)
+        if request.url.path == "/file.pdf":
+            return httpx.Response(200, headers={"content-type": "application/pdf"}, content=b"%PDF")
+        if request.url.path == "/missing":
+            return httpx.Response(404, headers={"content-type": "text/html"}, content=b"not found")
+        return httpx.Response(200, headers={"content-type": "text/html; charset=utf-8"}, content=PAGE.encode())
+
+
+@pytest.fixture
+def handler():
+    return RecordingHandler()
+
+
+@pytest.fixture
+def make_scraper(handler):
+    scrapers = []
+
+    def factory(**kwargs):
+        kwargs.setdefault("per_host_delay_seconds", 0.0)
+        scraper = AsyncScraper(transport=httpx.MockTransport(handler), **kwargs)
+        scrapers.append(scraper)
+        return scraper
+
+    yield factory
+    for scraper in scrapers:
+        scraper.close()
+
+
+def test_scrape_extracts_title_and_visible_text(make_scraper):
+    result = make_scraper().scrape_sync("  https://acme.com.br/\n")
+    assert result["title"] == "Acme Ltda"
+    assert result["content"] == result["main_content"] == "Software de CRM"
+    assert result["url"] == "  https://acme.com.br/\n"
+    assert result["final_url"] == "https://acme.com.br/"
+
+
+def test_global_concurrency_is_bounded(make_scraper, handler):
+    scraper = make_scraper(max_concurrency=3, per_host_concurrency=5)
+    urls = [f"https://site{i}.com/" for i in range(12)]
+    results = scraper.scrape_many_sync(urls)
+    assert all("content" in r for r in results)
+    assert handler.max_in_flight == 3
+    assert scraper.stats["requests"] == 12
+
+
+def test_results_keep_input_order(make_scraper):
+    urls = ["https://a.com/", "https://b.com/missing", "https://c.com/"]
+    results = make_scraper().scrape_many_sync(urls)
+    assert [r.get("url") for r in results] == ["https://a.com/", None, "https://c.com/"]
+    assert "404" in results[1]["error"]
+
+
+def test_per_host_politeness_spaces_requests(make_scraper, handler):
+    scraper = make_scraper(per_host_concurrency=1, per_host_delay_seconds=0.05)
+    scraper.scrape_many_sync(["https://same.com/a", "https://same.com/b", "https://same.com/c", "https://other.com/"])
+    starts = handler.starts["same.com"]
+    gaps = [later - earlier for earlier, later in zip(starts, starts[1:])]
+    assert len(starts) == 3
+    assert min(gaps) >= 0.045
+    assert handler.starts["other.com"][0] - starts[0] < 0.05
+
+
+def test_fetch_seconds_exclude_time_queued_behind_the_host(make_scraper):
+    scraper = make_scraper(per_host_concurrency=1, per_host_delay_seconds=0.1)
+    results = scraper.scrape_many_sync(["https://same.com/a", "https://same.com/b", "https://same.com/c"])
+    assert all(r["fetch_seconds"] < 0.09 for r in results)  # A terceira esperou ~0.2s na fila do host
+
+
+def test_response_size_cap_truncates_body(make_scraper):
+    scraper = make_scraper(max_response_bytes=1000)
+    fetched = asyncio.run_coroutine_threadsafe(scraper.fetch("https://big.com/big"), scraper._ensure_loop()).result()
+    assert fetched.truncated
+    assert fetched.bytes_read == 1000
+    assert len(fetched.text) == 1000
+    assert scraper.stats["truncated"] == 1
+
+
+def test_non_text_content_is_rejected(make_scraper):
+    result = make_scraper().scrape_sync("https://docs.com/file.pdf")
+    assert "Tipo de conteúdo não suportado" in result["error"]
+
+
+def test_rate_limiter_enforces_minimum_interval():
+    limiter = IntervalRateLimiter(0.05)
+    start = time.monotonic()
+    waits = [limiter.acquire() for _ in range(3)]
+    assert waits[0] == 0
+    assert time.monotonic() - start >= 0.095
+
+
+def test_rate_limiter_counts_elapsed_work_toward_interval():
+    limiter = IntervalRateLimiter(0.05)
+    limiter.acquire()
+    time.sleep(0.06)
+    assert limiter.acquire() == 0
+
+
+def test_named_rate_limiters_are_shared():
+    assert get_rate_limiter("test-shared", 1.0) is get_rate_limiter("test-shared")
@@ -0,0 +1,120 @@
+"""
+Unit tests for the harvester browser pool and politeness scheduler
+"""
+
+import time
+
+import pytest
+
+from core_logic.browser_pool import BrowserPool, PolitenessScheduler
+
+
+class FakePage:
+    def __init__(self):
+        self.closed = False
+        self.visited = []
+
+    def is_closed(self):
+        return self.closed
+
+    def goto(self, url):
+        self.visited.append(url)
+
+
+class FakeContext:
+    def __init__(self):
+        self.page = FakePage()
+        self.closed = False
+
+    def new_page(self):
+        return self.page
+
+    def close(self):
+        self.closed = self.page.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    def new_context(self, **options):
+        self.contexts.append(FakeContext())
+        return self.contexts[-1]
+
+    def close(self):
+        self.connected = False
+
+
+@pytest.fixture
+def launched():
+    return []
+
+
+@pytest.fixture
+def make_pool(launched):
+    def launcher():
+        launched.append(FakeBrowser())
+        return launched[-1]
+
+    def factory(**kwargs):
+        return BrowserPool(launcher=launcher, **kwargs)
+    return factory
+
+
+def test_pages_are_recycled_on_one_browser(make_pool, launched):
+    pool = make_pool(page_max_uses=10)
+    pages = []
+    for _ in range(5):
+        with pool.page() as page:
+            pages.append(page)
+    assert len(launched) == 1 and len(set(map(id, pages))) == 1
+    assert pages[0].visited == ["about:blank"] * 5
+    assert pool.stats["pages_created"] == 1 and pool.stats["pages_reused"] == 4
+
+
+def test_worn_out_and_failed_pages_are_replaced(make_pool, launched):
+    pool = make_pool(page_max_uses=2)
+    for _ in range(4):
+        with pool.page():
+            pass
+    assert len(launched[0].contexts) == 2 and all(context.closed for context in launched[0].contexts)
+    with pytest.raises(RuntimeError):
+        with pool.page():
+            raise RuntimeError("crash na página")
+    assert launched[0].contexts[-1].closed and pool.stats["pages_created"] == 3
+
+
+def test_browser_restarts_after_n_pages_and_on_crash(make_pool, launched):
+    pool = make_pool(restart_after_pages=3)
+    for _ in range(4):
+        with pool.page():
+            pass
+    assert len(launched) == 2 and not launched[0].connected
+    launched[1].connected = False  # Simula o navegador caindo
+    with pool.page():
+        pass
+    assert len(launched) == 3 and pool.stats["restarts"] == 2
+    pool.close()
+    assert not launched[2].connected
+
+
+def test_pool_spreads_leases_across_browsers(make_pool, launched):
+    pool = make_pool(size=2)
+    first, second = pool.acquire(), pool.acquire()
+    assert first.slot is not second.slot and len(launched) == 2
+    pool.release(first)
+    pool.release(second)
+
+
+def test_politeness_spaces_same_domain_only():
+    politeness = PolitenessScheduler(per_domain_seconds=0.2)
+    start = time.monotonic()
+    politeness.wait("https://acme.com.br/")
+    politeness.wait("https://beta.com/")
+    politeness.wait("https://www.gama.com.br/")
+    assert time.monotonic() - start < 0.1
+    assert politeness.wait("https://loja.acme.com.br/contato") > 0.1
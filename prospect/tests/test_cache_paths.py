@@ -0,0 +1,31 @@
+"""
+Unit tests for the default cache locations
+"""
+
+import os
+
+import adk1.agent as adk1_agent
+from core_logic import (
+    context_profile_cache,
+    embeddings,
+    fetch_cache,
+    negative_cache,
+    page_readiness,
+    screenshot_pipeline,
+    serp_session,
+    tavily_client,
+    tiered_fetch,
+)
+from core_logic.cache_paths import CACHE_DIR, PROJECT_DIR
+
+
+def test_cache_defaults_are_anchored_to_the_project():
+    assert PROJECT_DIR == os.path.dirname(os.path.dirname(os.path.abspath(fetch_cache.__file__)))
+    paths = [
+        fetch_cache.FETCH_CACHE_PATH, tavily_client.TAVILY_CACHE_PATH, negative_cache.NEGATIVE_CACHE_PATH,
+        page_readiness.READINESS_STATS_PATH, screenshot_pipeline.VISION_CACHE_PATH, tiered_fetch.FETCH_TIER_MEMORY_PATH,
+        context_profile_cache.CONTEXT_PROFILE_CACHE_PATH, embeddings.EMBEDDING_ONNX_DIR, adk1_agent.URL_BATCH_CHECKPOINT_DIR,
+        serp_session.GOOGLE_STORAGE_STATE_PATH,
+    ]
+    for path in paths:
+        assert os.path.isabs(path) and path.startswith(CACHE_DIR + os.sep), path
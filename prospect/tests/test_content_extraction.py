@@ -0,0 +1,71 @@
+"""
+Unit tests for the main-content extraction pipeline
+"""
+
+from core_logic.content_extraction import ExtractedContent, extract_content, split_prompt_text
+
+PAGE = """<!DOCTYPE html>
+<html><head><title> Acme Sistemas | CRM </title><script>var tracking = 1;</script></head>
+<body class="home has-sidebar">
+<div id="cookie-banner">Usamos cookies para melhorar sua experiência. <a href="#">Aceitar</a></div>
+<header class="site-header"><a href="/">Logo</a>
+  <nav><ul><li><a href="/">Início</a></li><li><a href="/sobre">Sobre</a></li></ul></nav></header>
+<main>
+  <h1>Acme Sistemas</h1>
+  <p>A Acme desenvolve software de CRM para pequenas e médias empresas do varejo, com automação de vendas.</p>
+  <p>Atendemos mais de 500 clientes em todo o Brasil e estamos contratando vendedores para o Nordeste.</p>
+  <p style="display: none">Texto oculto</p>
+</main>
+<aside class="sidebar"><ul><li><a href="/p1">Post 1</a></li><li><a href="/p2">Post 2</a></li></ul></aside>
+<footer>
+  <p>Fale conosco: <a href="mailto:contato@acme.com.br?subject=Oi">contato@acme.com.br</a></p>
+  <p>Telefone: <a href="tel:+551134567890">(11) 3456-7890</a></p>
+  <address>Av. Paulista, 1000 - São Paulo/SP</address>
+</footer>
+</body></html>"""
+
+
+def test_main_content_excludes_boilerplate():
+    content = extract_content(PAGE)
+    assert content.title == "Acme Sistemas | CRM"
+    assert content.method == "landmark"
+    assert content.main_text.splitlines()[0] == "Acme Sistemas"
+    assert "software de CRM" in content.main_text
+    for boilerplate in ("cookies", "Início", "Post 1", "tracking", "Texto oculto", "contato@"):
+        assert boilerplate not in content.main_text
+
+
+def test_contact_sections_are_kept_separately():
+    content = extract_content(PAGE)
+    assert "Av. Paulista, 1000" in content.contact_text
+    assert content.emails == ["contato@acme.com.br"]
+    assert "(11) 3456-7890" in content.phones and "+551134567890" in content.phones
+
+
+def test_prompt_text_round_trip():
+    content = extract_content(PAGE)
+    main_text, contact_text = split_prompt_text(content.to_prompt_text())
+    assert (main_text, contact_text) == (content.main_text, content.contact_text)
+    assert split_prompt_text("só texto") == ("só texto", "")
+
+
+def test_pages_without_landmarks_use_link_pruned_body():
+    html = (
+        "<html><body><div class='top'><a href='/a'>Produtos</a> <a href='/b'>Preços</a> <a href='/c'>Contato</a></div>"
+        "<div><p>Consultoria tributária para indústrias de médio porte no interior de São Paulo.</p></div></body></html>"
+    )
+    content = extract_content(html)
+    assert content.method == "body"
+    assert content.main_text == "Consultoria tributária para indústrias de médio porte no interior de São Paulo."
+    assert content.title == "No Title Found"
+
+
+def test_dominant_block_is_never_treated_as_boilerplate():
+    html = "<html><body><div class='page-wrapper has-sidebar'><p>" + "Conteúdo institucional. " * 20 + "</p></div></body></html>"
+    assert extract_content(html).main_text.startswith("Conteúdo institucional.")
+
+
+def test_empty_and_xml_declared_documents():
+    assert extract_content("") == ExtractedContent(title="No Title Found", main_text="")
+    xhtml = '<?xml version="1.0" encoding="utf-8"?><html><head><title>X</title></head><body><p>Olá</p></body></html>'
+    assert extract_content(xhtml).main_text == "Olá"
@@ -0,0 +1,93 @@
+"""
+Unit tests for the per-tenant context profile cache
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import pipeline_orchestrator
+from core_logic.context_profile_cache import ContextProfileCache, context_fingerprint
+from pipeline_orchestrator import PipelineOrchestrator
+
+CONTEXT = {
+    "business_description": "Plataforma de CRM",
+    "industry_focus": ["varejo"],
+    "max_leads_to_generate": 10,
+}
+ENRICHED = {"search_query": "crm varejo", "business_offering": {"description": "Plataforma de CRM"}}
+
+
+def test_fingerprint_ignores_volatile_fields_and_key_order():
+    reordered = {"industry_focus": ["varejo"], "business_description": "Plataforma de CRM", "max_leads_to_generate": 50}
+    assert context_fingerprint(reordered) == context_fingerprint(CONTEXT)
+    assert context_fingerprint({**CONTEXT, "industry_focus": ["atacado"]}) != context_fingerprint(CONTEXT)
+
+
+def test_profiles_persist_and_are_invalidated_when_the_context_changes(tmp_path):
+    path = str(tmp_path / "context_profiles.json")
+    cache = ContextProfileCache(path=path)
+    assert cache.get("user-1", CONTEXT) is None
+    cache.put("user-1", CONTEXT, "crm varejo", ENRICHED, "{...}", ["crm varejo", "empresas de varejo"])
+
+    reloaded = ContextProfileCache(path=path)
+    profile = reloaded.get("user-1", CONTEXT)
+    assert (profile.search_query, profile.enriched_context, profile.query_variants) == ("crm varejo", ENRICHED, ["crm varejo", "empresas de varejo"])
+    assert reloaded.get("user-2", CONTEXT) is None
+    assert reloaded.get("user-1", {**CONTEXT, "pain_points": ["churn"]}) is None
+
+    assert ContextProfileCache(path=path, ttl_hours=0).get("user-1", CONTEXT) is None
+    reloaded.invalidate("user-1")
+    assert ContextProfileCache(path=path).get("user-1", CONTEXT) is None
+
+
+def test_oldest_tenants_are_dropped_beyond_the_limit():
+    cache = ContextProfileCache(path=None, max_tenants=2)
+    for tenant in ("a", "b", "c"):
+        cache.put(tenant, CONTEXT, "crm", ENRICHED, "{}")
+    assert cache.get("a", CONTEXT) is None
+    assert cache.get("b", CONTEXT) and cache.get("c", CONTEXT)
+
+
+def test_repeat_job_skips_query_generation_and_context_serialization():
+    cache = ContextProfileCache(path=None)
+    calls = {"query": 0, "serialize": 0}
+
+    async def generate_query(business_context, user_input):
+        calls["query"] += 1
+        return "crm varejo"
+
+    def serialize(enriched_context, job_id):
+        calls["serialize"] += 1
+        return ""
+
+    async def no_leads(query, max_leads, query_variants=None):
+        return
+        yield
+
+    async def setup_rag(job_id, context_text):
+        return False
+
+    def run_job(job_id, business_context):
+        orchestrator = object.__new__(PipelineOrchestrator)
+        orchestrator.user_id, orchestrator.job_id, orchestrator.business_context = "user-1", job_id, business_context
+        orchestrator.job_vector_stores = {}
+
+        async def collect():
+            return [event async for event in orchestrator.execute_streaming_pipeline()]
+
+        with patch.object(pipeline_orchestrator, "get_context_profile_cache", lambda: cache), \
+             patch.object(orchestrator, "_generate_intelligent_search_query", generate_query), \
+             patch.object(orchestrator, "_serialize_enriched_context", serialize), \
+             patch.object(orchestrator, "_setup_rag_for_job", setup_rag), \
+             patch.object(orchestrator, "_search_leads", no_leads):
+            events = asyncio.run(collect())
+        return events[0], orchestrator.rag_context_text
+
+    first_start, first_rag = run_job("job-1", CONTEXT)
+    second_start, second_rag = run_job("job-2", {**CONTEXT, "max_leads_to_generate": 5})
+    assert calls == {"query": 1, "serialize": 1}
+    assert second_start["initial_query"] == first_start["initial_query"] == "crm varejo"
+    assert second_rag == first_rag
+
+    run_job("job-3", {**CONTEXT, "industry_focus": ["atacado"]})
+    assert calls == {"query": 2, "serialize": 2}
@@ -0,0 +1,93 @@
+"""
+Unit tests for domain canonicalization and search result dedup
+"""
+
+import concurrent.futures
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+import adk1.agent as adk1_agent
+from core_logic.domain_index import DomainIndex, canonical_url, dedupe_by_domain, registrable_domain
+
+
+@pytest.mark.parametrize("url, domain", [
+    ("https://www.acme.com.br/contato", "acme.com.br"),
+    ("http://loja.acme.com.br", "acme.com.br"),
+    ("https://acme.ind.br/", "acme.ind.br"),
+    ("https://blog.acme.co.uk/post", "acme.co.uk"),
+    ("https://app.acme.io/login", "acme.io"),
+    ("acme.com", "acme.com"),
+    ("http://192.168.0.10:8080/", "192.168.0.10"),
+    ("not a url", ""),
+    # Sites em hospedagens compartilhadas são empresas diferentes
+    ("https://padariaboa.wixsite.com/site", "padariaboa.wixsite.com"),
+    ("https://oficinajoao.wixsite.com/", "oficinajoao.wixsite.com"),
+    ("https://www.modafeminina.lojaintegrada.com.br/produto/1", "modafeminina.lojaintegrada.com.br"),
+    ("https://contabilsilva.blogspot.com/2024/01/post.html", "contabilsilva.blogspot.com"),
+    ("https://contabilsilva.blogspot.com.br/", "contabilsilva.blogspot.com.br"),
+    ("https://wixsite.com/", "wixsite.com"),
+])
+def test_registrable_domain(url, domain):
+    assert registrable_domain(url) == domain
+
+
+def test_sites_on_a_shared_host_are_not_merged():
+    results = dedupe_by_domain([
+        {"url": "https://padariaboa.wixsite.com/site", "title": "Padaria Boa"},
+        {"url": "https://oficinajoao.wixsite.com/site", "title": "Oficina João"},
+    ])
+    assert [result["title"] for result in results] == ["Padaria Boa", "Oficina João"]
+    assert not any(result.get("duplicate_urls") for result in results)
+
+
+def test_canonical_url_ignores_www_slash_and_tracking():
+    assert canonical_url("https://WWW.Acme.com.br/sobre/?utm_source=google") == canonical_url("https://acme.com.br/sobre")
+
+
+def test_one_result_per_domain_with_homepage_as_primary():
+    results = dedupe_by_domain([
+        {"url": "https://acme.com.br/contato", "title": "Contato"},
+        {"url": "https://beta.com/", "title": "Beta"},
+        {"url": "https://www.acme.com.br/", "title": "Acme"},
+        {"url": "https://acme.com.br/?utm_campaign=x", "title": "Acme (tracking)"},
+        {"url": "https://acme.com.br/sobre/", "title": "Sobre"},
+    ])
+    assert [(r["domain"], r["title"]) for r in results] == [("acme.com.br", "Acme"), ("beta.com", "Beta")]
+    assert results[0]["duplicate_urls"] == ["https://acme.com.br/contato", "https://acme.com.br/sobre/"]
+
+
+def test_index_dedups_across_sources():
+    index = DomainIndex()
+    assert index.add_many([{"url": "https://acme.com.br/"}, {"url": "ftp://acme.com.br/"}]) == 1
+    assert not index.add({"url": "https://www.acme.com.br/produtos"})  # mesmo domínio vindo do Google
+    assert index.add({"url": "https://gama.com.br/"})
+    assert "https://loja.acme.com.br/" in index and len(index) == 2
+    assert index.entry("https://acme.com.br/x").subpage_urls == ["https://www.acme.com.br/produtos"]
+
+
+def done_future(value):
+    future = concurrent.futures.Future()
+    future.set_result(value)
+    return future
+
+
+def test_adk1_extracts_each_company_once_with_subpage_text():
+    model = MagicMock()
+    model.generate_content.side_effect = lambda prompt: MagicMock(text='{"company_name": "Acme"}')
+    search_results = [
+        {"url": "https://acme.com.br/contato", "title": "Contato", "snippet": ""},
+        {"url": "https://www.acme.com.br/", "title": "Acme", "snippet": ""},
+    ]
+    homepage = "Quem somos: a Acme desenvolve sistemas de gestão para o varejo em todo o Brasil. Nossos serviços: PDV."
+    scraper = MagicMock()
+    scraper.submit_many.side_effect = lambda urls: [done_future({"content": homepage if url.endswith(".br/") else "Fale conosco: (11) 4000-1234"}) for url in urls]
+    with patch.object(adk1_agent, "_initialize_gemini_model", return_value=model), \
+         patch.object(adk1_agent, "_tavily_search_internal", return_value=search_results), \
+         patch.object(adk1_agent, "get_async_scraper", return_value=scraper), \
+         patch.object(adk1_agent._gemini_rate_limiter, "min_interval_seconds", 0.0):
+        leads = adk1_agent.find_and_extract_structured_leads("crm", 5)
+    assert [lead["source_url"] for lead in leads] == ["https://www.acme.com.br/"]
+    assert model.generate_content.call_count == 1
+    assert "(11) 4000-1234" in model.generate_content.call_args[0][0]
+    assert leads[0]["contact_phones"]
@@ -0,0 +1,115 @@
+"""
+Parity tests for the ONNX embedding backend against sentence-transformers
+"""
+
+import shutil
+
+import numpy
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+transformers = pytest.importorskip("transformers")
+sentence_transformers = pytest.importorskip("sentence_transformers")
+
+from core_logic import embeddings
+from core_logic.embeddings import OnnxEmbeddingModel, export_onnx_model, load_embedding_model
+
+SENTENCES = [
+    "empresa de software para vendas",
+    "consultoria de crm em são paulo com foco em pmes e automação",
+    "vendas",
+    "",
+    "uma frase bem mais longa sobre automação de marketing, geração de leads e qualificação de oportunidades",
+]
+
+
+def build_tiny_sentence_transformer(directory):
+    """Randomly initialized MiniLM-shaped model (transformer + mean pooling + normalize), built offline"""
+    words = sorted({w.strip(",") for s in SENTENCES for w in s.split()})
+    vocab_file = directory / "vocab.txt"
+    vocab_file.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words), encoding="utf-8")
+    tokenizer = transformers.BertTokenizerFast(vocab_file=str(vocab_file))
+    torch.manual_seed(0)
+    config = transformers.BertConfig(
+        vocab_size=tokenizer.vocab_size, hidden_size=32, num_hidden_layers=2,
+        num_attention_heads=4, intermediate_size=64, max_position_embeddings=64,
+    )
+    hf_dir = directory / "hf"
+    transformers.BertModel(config).save_pretrained(str(hf_dir))
+    tokenizer.save_pretrained(str(hf_dir))
+
+    from sentence_transformers.models import Normalize, Pooling, Transformer
+
+    transformer = Transformer(str(hf_dir), max_seq_length=16)
+    pooling = Pooling(transformer.get_word_embedding_dimension(), pooling_mode="mean")
+    model = sentence_transformers.SentenceTransformer(modules=[transformer, pooling, Normalize()], device="cpu")
+    st_dir = directory / "st"
+    model.save(str(st_dir))
+    return model, st_dir
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("embeddings")
+    model, st_dir = build_tiny_sentence_transformer(directory)
+    onnx_dir = export_onnx_model(str(directory / "onnx"), str(st_dir), quantize=True)
+    return model, st_dir, onnx_dir
+
+
+def test_onnx_matches_sentence_transformers(exported):
+    model, _, onnx_dir = exported
+    reference = model.encode(SENTENCES, show_progress_bar=False)
+    onnx_vectors = OnnxEmbeddingModel(str(onnx_dir)).encode(SENTENCES, batch_size=2)
+
+    assert onnx_vectors.dtype == numpy.float32
+    assert onnx_vectors.shape == reference.shape
+    numpy.testing.assert_allclose(onnx_vectors, reference, atol=1e-4)
+
+
+def test_single_string_returns_vector(exported):
+    model, _, onnx_dir = exported
+    vector = OnnxEmbeddingModel(str(onnx_dir)).encode(SENTENCES[1])
+    assert vector.shape == (model.get_sentence_embedding_dimension(),)
+    numpy.testing.assert_allclose(vector, model.encode(SENTENCES[1]), atol=1e-4)
+
+
+def test_int8_model_stays_close(exported):
+    model, _, onnx_dir = exported
+    reference = model.encode(SENTENCES, show_progress_bar=False)
+    quantized = OnnxEmbeddingModel(str(onnx_dir), quantized=True).encode(SENTENCES)
+    cosines = (reference * quantized).sum(axis=1)
+    assert cosines.min() > 0.9
+
+
+def test_onnx_backend_selection_and_fallback(exported, monkeypatch, tmp_path):
+    _, st_dir, onnx_dir = exported
+    assert isinstance(load_embedding_model("onnx-int8", onnx_dir=str(onnx_dir)), OnnxEmbeddingModel)
+
+    monkeypatch.setattr(embeddings, "EMBEDDING_MODEL_NAME", str(st_dir))
+    fallback = load_embedding_model("onnx", onnx_dir=str(tmp_path / "missing"))
+    assert isinstance(fallback, sentence_transformers.SentenceTransformer)
+
+
+def test_missing_model_file_falls_back_to_sentence_transformers(exported, monkeypatch, tmp_path):
+    _, st_dir, onnx_dir = exported
+    # Exportação sem quantização: existe model.onnx, mas não model_int8.onnx
+    partial_dir = tmp_path / "onnx"
+    shutil.copytree(onnx_dir, partial_dir)
+    (partial_dir / embeddings.ONNX_INT8_MODEL_FILE).unlink()
+    monkeypatch.setattr(embeddings, "EMBEDDING_MODEL_NAME", str(st_dir))
+    assert isinstance(load_embedding_model("onnx", onnx_dir=str(partial_dir)), OnnxEmbeddingModel)
+    assert isinstance(load_embedding_model("onnx-int8", onnx_dir=str(partial_dir)), sentence_transformers.SentenceTransformer)
+
+
+def test_real_minilm_parity(tmp_path):
+    """Parity on the production model; skipped when the weights cannot be downloaded"""
+    try:
+        model = sentence_transformers.SentenceTransformer(embeddings.EMBEDDING_MODEL_NAME, device="cpu")
+    except OSError as e:
+        pytest.skip(f"embedding model not available offline: {e}")
+    onnx_dir = export_onnx_model(str(tmp_path), embeddings.EMBEDDING_MODEL_NAME)
+    numpy.testing.assert_allclose(
+        OnnxEmbeddingModel(str(onnx_dir)).encode(SENTENCES), model.encode(SENTENCES), atol=1e-4
+    )
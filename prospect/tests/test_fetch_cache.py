@@ -0,0 +1,127 @@
+"""
+Unit tests for the on-disk fetch cache and its use by the async scraper
+"""
+
+import os
+import time
+
+import httpx
+import pytest
+
+from core_logic.async_scraper import AsyncScraper
+from core_logic.fetch_cache import KIND_RENDERED, FetchCache, normalize_url
+
+PAGE = "<html><head><title>Acme</title></head><body><p>Software de CRM</p></body></html>"
+
+
+@pytest.fixture
+def make_cache(tmp_path):
+    caches = []
+
+    def factory(**kwargs):
+        cache = FetchCache(path=str(tmp_path / "fetch_cache.sqlite3"), **kwargs)
+        caches.append(cache)
+        return cache
+
+    yield factory
+    for cache in caches:
+        cache.close()
+
+
+def test_normalize_url_ignores_cosmetic_differences():
+    assert normalize_url(" HTTPS://Acme.com.br:443/Sobre/?utm_source=x&b=2&a=1#contato ") == "https://acme.com.br/Sobre?a=1&b=2"
+    assert normalize_url("http://acme.com.br") == normalize_url("http://acme.com.br/")
+    assert normalize_url("http://acme.com.br:8080/") == "http://acme.com.br:8080/"
+
+
+def test_round_trip_and_kinds_are_separate(make_cache):
+    cache = make_cache()
+    cache.put("https://acme.com.br/", body=PAGE, status_code=200, etag='"v1"')
+    cache.set_extraction("https://acme.com.br", "Acme", "Software de CRM")
+    page = cache.get("https://ACME.com.br/?utm_medium=email")
+    assert (page.body, page.title, page.extracted_text, page.etag) == (PAGE, "Acme", "Software de CRM", '"v1"')
+    assert page.is_fresh
+    assert cache.get("https://acme.com.br/", kind=KIND_RENDERED) is None
+
+
+def test_domain_ttl_overrides_match_subdomains(make_cache):
+    cache = make_cache(default_ttl_seconds=100, domain_ttls={"linkedin.com": 5, "br.linkedin.com": 1})
+    assert cache.ttl_for("https://www.linkedin.com/company/acme") == 5
+    assert cache.ttl_for("https://br.linkedin.com/") == 1
+    assert cache.ttl_for("https://acme.com.br/") == 100
+
+
+def test_lru_eviction_keeps_cache_under_size_bound(make_cache):
+    cache = make_cache(max_bytes=800)
+    bodies = {f"https://site{i}.com/": os.urandom(300).hex() for i in range(3)}
+    urls = list(bodies)
+    cache.put(urls[0], body=bodies[urls[0]])
+    cache.put(urls[1], body=bodies[urls[1]])
+    time.sleep(0.01)
+    cache.get(urls[0])  # site0 passa a ser o mais recente
+    cache.put(urls[2], body=bodies[urls[2]])
+    assert cache.total_bytes() <= 800
+    assert cache.get(urls[1]) is None
+    assert cache.get(urls[0]) is not None and cache.get(urls[2]) is not None
+    assert cache.stats["evictions"] >= 1
+
+
+class ConditionalHandler:
+    """Origin that honours If-None-Match and counts full and conditional responses"""
+
+    def __init__(self):
+        self.full_responses = 0
+        self.not_modified = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.headers.get("if-none-match") == '"v1"':
+            self.not_modified += 1
+            return httpx.Response(304, headers={"etag": '"v1"'})
+        self.full_responses += 1
+        return httpx.Response(200, headers={"content-type": "text/html", "etag": '"v1"'}, content=PAGE.encode())
+
+
+@pytest.fixture
+def make_scraper():
+    scrapers = []
+
+    def factory(cache, handler):
+        scraper = AsyncScraper(transport=httpx.MockTransport(handler), cache=cache, per_host_delay_seconds=0.0)
+        scrapers.append(scraper)
+        return scraper
+
+    yield factory
+    for scraper in scrapers:
+        scraper.close()
+
+
+def test_scraper_serves_fresh_entries_without_requests(make_cache, make_scraper):
+    handler = ConditionalHandler()
+    scraper = make_scraper(make_cache(), handler)
+    first = scraper.scrape_sync("https://acme.com.br/")
+    second = scraper.scrape_sync("https://acme.com.br")
+    assert first["content"] == second["content"] == "Software de CRM"
+    assert handler.full_responses == 1
+    assert scraper.stats["cache_hits"] == 1
+
+
+def test_scraper_revalidates_stale_entries_with_conditional_get(make_cache, make_scraper):
+    handler = ConditionalHandler()
+    cache = make_cache(default_ttl_seconds=0)
+    scraper = make_scraper(cache, handler)
+    scraper.scrape_sync("https://acme.com.br/")
+    result = scraper.scrape_sync("https://acme.com.br/")
+    assert result["title"] == "Acme"
+    assert (handler.full_responses, handler.not_modified) == (1, 1)
+    assert scraper.stats["revalidated"] == 1 and cache.stats["revalidated"] == 1
+
+
+def test_offline_mode_serves_stale_entries_and_fails_misses(make_cache, make_scraper):
+    cache = make_cache(default_ttl_seconds=0)
+    cache.put("https://acme.com.br/", body=PAGE, status_code=200, content_type="text/html")
+    cache.offline = True
+    handler = ConditionalHandler()
+    scraper = make_scraper(cache, handler)
+    assert scraper.scrape_sync("https://acme.com.br/")["content"] == "Software de CRM"
+    assert "offline" in scraper.scrape_sync("https://other.com.br/")["error"]
+    assert handler.full_responses == handler.not_modified == 0
@@ -0,0 +1,152 @@
+"""
+Unit tests for the harvester's incremental JSONL output and checkpoints
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from core_logic.harvest_stream import (
+    HarvestCheckpoint,
+    HarvestStreamWriter,
+    checkpoint_path_for,
+    follow_harvest_jsonl,
+    follow_harvest_sites,
+    follow_harvest_sites_async,
+    iterate_limited,
+    load_harvest_file,
+    read_harvest_jsonl,
+)
+from data_models.lead_structures import HarvesterOutput
+
+RESULTS = [{"url": f"https://{name}.com.br/", "title": name.capitalize(), "snippet": ""} for name in ("acme", "beta", "gama")]
+
+
+def payload(result, status="SUCESSO NA EXTRAÇÃO"):
+    return {
+        "url": result["url"],
+        "google_search_data": {"title": result["title"], "snippet": result["snippet"], "duplicate_urls": []},
+        "extracted_text_content": f"Texto de {result['title']}",
+        "extraction_status_message": status,
+        "screenshot_filepath": None,
+    }
+
+
+def test_interrupted_run_is_readable_and_resumable(tmp_path):
+    output_path = str(tmp_path / "harvested_data_crm.jsonl")
+    checkpoint = HarvestCheckpoint(checkpoint_path_for("crm varejo", str(tmp_path)), "crm varejo", output_path, RESULTS)
+    checkpoint.save()
+
+    # Primeira execução cai depois do primeiro site
+    writer = HarvestStreamWriter(output_path, "crm varejo", len(RESULTS))
+    writer.append(payload(RESULTS[0]))
+    checkpoint.mark_done(RESULTS[0]["url"])
+    with open(output_path, "a", encoding="utf-8") as f:
+        f.write('{"record": "site", "url": "https://beta.com.br/", "extra')  # Linha cortada pela queda
+    writer.close(completed=False)
+
+    partial = read_harvest_jsonl(output_path)
+    assert not partial["completed"] and [site["url"] for site in partial["sites_data"]] == ["https://acme.com.br/"]
+
+    resumed = HarvestCheckpoint.load(checkpoint.path)
+    assert [result["url"] for result in resumed.pending_results] == ["https://beta.com.br/", "https://gama.com.br/"]
+    with HarvestStreamWriter(resumed.output_path, "crm varejo", len(RESULTS), resume=True) as writer:
+        for result in resumed.pending_results:
+            writer.append(payload(result))
+            resumed.mark_done(result["url"])
+
+    final = read_harvest_jsonl(output_path)
+    assert final["completed"] and final["original_query"] == "crm varejo"
+    assert [site["url"] for site in final["sites_data"]] == [result["url"] for result in RESULTS]
+    assert HarvestCheckpoint.load(checkpoint.path).pending_results == []
+
+
+def test_downstream_loader_accepts_jsonl_mid_run(tmp_path):
+    output_path = str(tmp_path / "harvest.jsonl")
+    writer = HarvestStreamWriter(output_path, "crm", len(RESULTS))
+    writer.append(payload(RESULTS[0]))
+    writer.append(payload(RESULTS[1], status="FALHA NA EXTRAÇÃO: ERRO DE DNS."))
+    harvester_output = HarvesterOutput.parse_obj(load_harvest_file(output_path))
+    assert harvester_output.total_sites_targeted_for_processing == 3
+    assert harvester_output.total_sites_processed_in_extraction_phase == 2
+    writer.close()
+
+
+def test_follow_yields_sites_while_the_harvest_runs(tmp_path):
+    output_path = str(tmp_path / "harvest.jsonl")
+
+    def harvest():
+        with HarvestStreamWriter(output_path, "crm", len(RESULTS)) as writer:
+            for result in RESULTS:
+                time.sleep(0.05)
+                writer.append(payload(result))
+
+    thread = threading.Thread(target=harvest)
+    thread.start()
+    received = [site["url"] for site in follow_harvest_jsonl(output_path, poll_interval=0.01, idle_timeout=5)]
+    thread.join()
+    assert received == [result["url"] for result in RESULTS]
+
+
+def test_loader_follow_mode_streams_each_site_once(tmp_path):
+    import enhanced_main
+
+    output_path = str(tmp_path / "harvest.jsonl")
+    started = threading.Event()
+
+    def harvest():
+        with HarvestStreamWriter(output_path, "crm", len(RESULTS)) as writer:
+            started.set()
+            for result in RESULTS + RESULTS[:1]:  # Execução retomada regravou o primeiro site
+                time.sleep(0.05)
+                writer.append(payload(result))
+
+    thread = threading.Thread(target=harvest)
+    thread.start()
+    started.wait(5)
+    async def collect():
+        return [site async for site in enhanced_main.follow_harvester_data(output_path, idle_timeout=5)]
+
+    sites = asyncio.run(collect())
+    thread.join()
+    assert [str(site.url) for site in sites] == [result["url"] for result in RESULTS]
+    with pytest.raises(ValueError):
+        next(follow_harvest_sites(str(tmp_path / "harvest.json")))
+
+
+def test_async_follow_does_not_block_the_event_loop_and_stops_when_idle(tmp_path):
+    output_path = str(tmp_path / "harvest.jsonl")
+    writer = HarvestStreamWriter(output_path, "crm", len(RESULTS))
+    writer.append(payload(RESULTS[0]))  # Harvester morreu sem escrever o rodapé
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    async def run():
+        ticking = asyncio.create_task(ticker())
+        stream = follow_harvest_sites_async(output_path, poll_interval=0.05, idle_timeout=0.3)
+        urls = [site["url"] async for site in iterate_limited(stream, limit=5)]
+        ticking.cancel()
+        return urls
+
+    assert asyncio.run(run()) == [RESULTS[0]["url"]]
+    assert len(ticks) > 10
+    writer.close()
+
+
+def test_iterate_limited_accepts_lists_and_streams():
+    async def stream():
+        for i in range(5):
+            yield i
+
+    async def collect(items, limit=None):
+        return [item async for item in iterate_limited(items, limit)]
+
+    assert asyncio.run(collect([1, 2, 3], 2)) == [1, 2]
+    assert asyncio.run(collect(stream())) == [0, 1, 2, 3, 4]
+    assert asyncio.run(collect(stream(), 3)) == [0, 1, 2]
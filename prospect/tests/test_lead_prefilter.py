@@ -0,0 +1,75 @@
+"""
+Unit tests for the lead pre-qualification filter
+"""
+
+from pathlib import Path
+
+import pytest
+
+from core_logic.lead_prefilter import LeadPrefilter, evaluate, load_samples
+
+SAMPLES_PATH = Path(__file__).parent / "fixtures" / "prefilter_samples.jsonl"
+
+COMPANY_TEXT = (
+    "A Acme Software desenvolve sistemas de gestão para o varejo. Quem somos: empresa de Campinas com "
+    "120 colaboradores. Nossos serviços incluem PDV, estoque e emissão fiscal. Fale conosco."
+)
+
+
+@pytest.mark.parametrize("url, reason", [
+    ("https://pt.wikipedia.org/wiki/CRM", "domain:reference"),
+    ("https://valor.globo.com/empresas/noticia/2024/01/02/x.ghtml", "domain:news"),
+    ("https://acme.gupy.io/jobs/1", "domain:jobs"),
+    ("https://acme.com.br/vagas/analista-comercial", "path:jobs"),
+    ("https://acme.com.br/2024/05/lancamento/", "path:news"),
+    ("https://acme.com.br/catalogo.pdf", "document_url"),
+    ("mailto:contato@acme.com.br", "invalid_url"),
+])
+def test_url_rules_reject_non_company_pages(url, reason):
+    decision = LeadPrefilter().check_url(url)
+    assert not decision.accept and decision.reason == reason
+
+
+def test_url_rules_accept_company_sites():
+    prefilter = LeadPrefilter()
+    urls = (
+        "https://acme.com.br/", "https://www.acme.com.br/sobre", "https://maxim.com/", "https://acme.com.br/produtos",
+        "https://www.totvs.com/produtos/erp/", "https://www.rdstation.com/produtos/marketing/",
+        "https://acme.com.br/p/contato", "https://acme.com.br/item/servicos",
+        "https://www.contaazul.com/blog/gestao-financeira/fluxo-de-caixa/",
+    )
+    for url in urls:
+        assert prefilter.check_url(url).accept, url
+    assert prefilter.stats == {"accepted": len(urls), "rejected": 0}
+
+
+def test_path_rejections_point_to_the_company_homepage():
+    prefilter = LeadPrefilter()
+    assert prefilter.check_url("https://www.acme.com.br/vagas/analista-comercial").homepage_url == "https://www.acme.com.br/"
+    assert prefilter.check_url("https://pt.wikipedia.org/wiki/CRM").homepage_url is None
+
+
+def test_page_heuristics_weigh_company_cues_against_page_type_cues():
+    prefilter = LeadPrefilter()
+    article = "Publicado em 10/03/2024. Por Redação. " + COMPANY_TEXT.replace("Quem somos", "").replace("Nossos serviços", "Os serviços") + " Leia também: outras notícias."
+    assert prefilter.check_page("https://portal.com.br/acme", "Acme cresce", article).reason == "page:news"
+    shop_with_company_cues = COMPANY_TEXT + " Frete grátis acima de R$ 500. Comprar agora."
+    assert prefilter.check_page("https://acme.com.br/", "Acme", shop_with_company_cues).accept
+    assert prefilter.check_page("https://acme.com.br/", "Acme", "Em construção").reason == "too_short"
+
+
+def test_optional_similarity_rejects_off_topic_pages():
+    prefilter = LeadPrefilter(similarity_fn=lambda query, text: 0.9 if "varejo" in text else 0.05, min_similarity=0.2)
+    assert prefilter.check_page("https://acme.com.br/", "Acme", COMPANY_TEXT, query="gestão de varejo").similarity == 0.9
+    off_topic = COMPANY_TEXT.replace("varejo", "hospitais")
+    assert prefilter.check_page("https://acme.com.br/", "Acme", off_topic, query="gestão de varejo").reason == "low_similarity"
+    # Sem query, a similaridade não é calculada
+    assert prefilter.check_page("https://acme.com.br/", "Acme", off_topic).accept
+
+
+def test_precision_and_recall_on_recorded_samples():
+    samples = load_samples(str(SAMPLES_PATH))
+    report = evaluate(LeadPrefilter(), samples)
+    assert report["true_positives"] + report["false_positives"] + report["false_negatives"] + report["true_negatives"] == len(samples)
+    assert report["precision"] >= 0.9
+    assert report["recall"] >= 0.95
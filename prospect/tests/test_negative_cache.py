@@ -0,0 +1,121 @@
+"""
+Unit tests for the negative-result cache of failing domains and URLs
+"""
+
+import httpx
+
+from core_logic.async_scraper import AsyncScraper
+from core_logic.negative_cache import (
+    FAILURE_BLOCKED,
+    FAILURE_DNS,
+    FAILURE_LOGIN,
+    FAILURE_NOT_FOUND,
+    FAILURE_TIMEOUT,
+    VIA_BROWSER,
+    NegativeCache,
+    classify_error,
+    classify_status,
+    skip_message,
+)
+
+
+def test_failures_are_classified_from_statuses_and_messages():
+    assert classify_error("FALHA NA EXTRAÇÃO: ERRO DE DNS.") == FAILURE_DNS
+    assert classify_error("Page.goto: net::ERR_NAME_NOT_RESOLVED at https://x.com.br/") == FAILURE_DNS
+    assert classify_error("FALHA NA EXTRAÇÃO: TIMEOUT NA NAVEGAÇÃO.") == FAILURE_TIMEOUT
+    assert classify_error("HTTPStatusError: Client error '403 Forbidden' for url 'https://x.com.br/'") == FAILURE_BLOCKED
+    assert classify_error("FALHA NA EXTRAÇÃO: Página retornou status 404.") == FAILURE_NOT_FOUND
+    assert classify_error("FALHA NA EXTRAÇÃO: CONTEXTO DESTRUÍDO.") is None
+    assert classify_status(200, "https://acme.com.br/login?next=/") == FAILURE_LOGIN
+    assert classify_status(200, "https://acme.com.br/blog/login-social") is None
+
+
+def test_backoff_doubles_per_failure_and_success_clears(tmp_path):
+    path = str(tmp_path / "negative_cache.json")
+    cache = NegativeCache(path=path)
+    first = cache.record_failure("https://www.morta.com.br/", FAILURE_DNS)
+    second = cache.record_failure("https://morta.com.br/contato", FAILURE_DNS)
+    assert second.failures == 2
+    assert (second.retry_at - second.last_failed_at) == 2 * (first.retry_at - first.last_failed_at)
+    # Falha de DNS vale para o domínio inteiro e sobrevive a um reinício
+    cache.flush()
+    entry = NegativeCache(path=path).check("https://loja.morta.com.br/produtos")
+    assert entry.failure_class == FAILURE_DNS and entry.failures == 2 and "DNS" in skip_message(entry)
+
+    cache.record_failure("https://acme.com.br/vagas", FAILURE_NOT_FOUND)
+    assert cache.check("https://acme.com.br/vagas") and cache.check("https://acme.com.br/") is None
+    cache.record_success("https://acme.com.br/vagas")
+    assert cache.check("https://acme.com.br/vagas") is None
+
+    expired = NegativeCache(path=None, max_backoff_hours=0)
+    expired.record_failure("https://morta.com.br/", FAILURE_DNS)
+    assert expired.check("https://morta.com.br/") is None  # Hora de testar de novo
+
+
+def test_timeouts_only_block_the_slow_url():
+    cache = NegativeCache(path=None)
+    cache.record_failure("https://acme.com.br/relatorio-pesado", FAILURE_TIMEOUT)
+    assert cache.check("https://acme.com.br/relatorio-pesado")
+    assert cache.check("https://acme.com.br/contato") is None
+
+
+def test_blocks_start_on_the_url_and_spread_to_the_domain():
+    cache = NegativeCache(path=None, domain_block_urls=2)
+    cache.record_failure("https://acme.com.br/area-do-cliente", FAILURE_BLOCKED)
+    assert cache.check("https://acme.com.br/area-do-cliente")
+    assert cache.check("https://acme.com.br/") is None  # A home da empresa continua sendo visitada
+    cache.record_failure("https://acme.com.br/painel", FAILURE_BLOCKED)
+    assert cache.check("https://acme.com.br/contato")  # Várias URLs bloqueadas: o domínio inteiro
+
+    cache.record_failure("https://padariaboa.wixsite.com/site", FAILURE_BLOCKED)
+    assert cache.check("https://oficinajoao.wixsite.com/site") is None
+    cache.record_failure("https://beta.com.br/", FAILURE_BLOCKED)
+    assert cache.check("https://beta.com.br/produtos")  # A home bloqueada vale para o domínio
+
+
+def test_file_is_rewritten_at_most_once_per_interval(tmp_path):
+    path = tmp_path / "negative_cache.json"
+    cache = NegativeCache(path=str(path), persist_interval_seconds=3600)
+    cache.record_failure("https://morta.com.br/", FAILURE_DNS)
+    written_at = path.stat().st_mtime_ns
+    for i in range(20):
+        cache.record_failure(f"https://acme.com.br/pagina{i}", FAILURE_NOT_FOUND)
+    assert path.stat().st_mtime_ns == written_at
+    assert NegativeCache(path=str(path)).check("https://acme.com.br/pagina0") is None
+    cache.flush()
+    assert NegativeCache(path=str(path)).check("https://acme.com.br/pagina0")
+
+
+def test_http_blocks_do_not_stop_the_browser():
+    cache = NegativeCache(path=None)
+    cache.record_failure("https://protegida.com.br/", FAILURE_BLOCKED)
+    assert cache.check("https://protegida.com.br/")
+    assert cache.check("https://protegida.com.br/", via=VIA_BROWSER) is None
+    assert cache.record_outcome("https://protegida.com.br/", "FALHA NA EXTRAÇÃO: Página retornou status 403.", via=VIA_BROWSER) == FAILURE_BLOCKED
+    assert cache.check("https://protegida.com.br/", via=VIA_BROWSER)
+
+
+def test_scraper_skips_known_bad_targets_without_a_request():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(str(request.url))
+        if request.url.path == "/removida":
+            return httpx.Response(404, headers={"content-type": "text/html"}, content=b"not found")
+        if request.url.path == "/area":
+            return httpx.Response(302, headers={"location": "https://acme.com.br/login"})
+        return httpx.Response(200, headers={"content-type": "text/html"}, content=b"<p>Acme</p>")
+
+    cache = NegativeCache(path=None)
+    scraper = AsyncScraper(transport=httpx.MockTransport(handler), per_host_delay_seconds=0.0, negative_cache=cache)
+    try:
+        assert scraper.fetch_sync("https://acme.com.br/removida").error
+        assert "Falha conhecida (not_found" in scraper.fetch_sync("https://acme.com.br/removida").error
+        assert not scraper.fetch_sync("https://acme.com.br/area").error
+        assert scraper.fetch_sync("https://acme.com.br/area").error  # Redireciona para login
+        assert not scraper.fetch_sync("https://acme.com.br/").error
+    finally:
+        scraper.close()
+    assert requests.count("https://acme.com.br/removida") == 1
+    assert requests.count("https://acme.com.br/area") == 1
+    assert scraper.stats["known_failures"] == 2
@@ -0,0 +1,96 @@
+"""
+Unit tests for adaptive page-readiness detection
+"""
+
+import asyncio
+import json
+import time
+
+from core_logic.page_readiness import DomainWaitStats, ReadinessDetector, ReadinessTracker
+
+
+def test_tracker_waits_for_text_to_stop_growing():
+    tracker = ReadinessTracker(quiet_window_ms=500, min_text_chars=100, stable_delta=0.02)
+    growing = [(0, 50), (100, 400), (200, 900), (300, 1500)]
+    assert all(tracker.observe(t, {"textLength": n, "quietMs": 0}) is None for t, n in growing)
+    assert tracker.observe(600, {"textLength": 1510, "quietMs": 0}) is None  # Variação dentro da tolerância
+    assert tracker.observe(800, {"textLength": 1505, "quietMs": 0}) == "text_stable"
+
+
+def test_tracker_accepts_quiet_dom_once_loaded():
+    tracker = ReadinessTracker(quiet_window_ms=500, min_text_chars=100)
+    assert tracker.observe(0, {"textLength": 30, "quietMs": 900, "readyState": "interactive"}) is None
+    assert tracker.observe(100, {"textLength": 30, "quietMs": 900, "readyState": "complete"}) == "dom_quiet"
+
+
+class ScriptedPage:
+    """Sync page whose body text grows until `settle_at` seconds after creation"""
+
+    def __init__(self, settle_at, final_length=3000):
+        self.start = time.monotonic()
+        self.settle_at = settle_at
+        self.final_length = final_length
+        self.probes = 0
+
+    def is_closed(self):
+        return False
+
+    def evaluate(self, script):
+        self.probes += 1
+        elapsed = time.monotonic() - self.start
+        if elapsed < self.settle_at:
+            return {"textLength": int(self.final_length * elapsed / self.settle_at), "quietMs": 0, "readyState": "interactive"}
+        return {"textLength": self.final_length, "quietMs": 0, "readyState": "interactive"}
+
+
+def make_detector(tmp_path, **kwargs):
+    kwargs = {"poll_interval_ms": 10, "quiet_window_ms": 50, "min_text_chars": 100, "max_wait_ms": 1000, **kwargs}
+    return ReadinessDetector(stats=DomainWaitStats(str(tmp_path / "waits.json")), **kwargs)
+
+
+def test_proceeds_as_soon_as_content_is_stable(tmp_path):
+    detector = make_detector(tmp_path)
+    result = detector.wait_until_ready(ScriptedPage(settle_at=0.1), "https://acme.com.br/")
+    assert result.ready and result.reason == "text_stable"
+    assert 100 <= result.waited_ms < 400 and result.text_chars == 3000
+
+
+def test_learned_wait_shrinks_budget_for_pages_that_never_settle(tmp_path):
+    detector = make_detector(tmp_path, max_wait_ms=600)
+    detector.wait_until_ready(ScriptedPage(settle_at=0.05), "https://www.acme.com.br/")
+    assert detector.budget_ms("https://loja.acme.com.br/contato") < 600
+    assert detector.budget_ms("https://beta.com/") == 600
+
+    # Página que nunca estabiliza (texto sempre crescendo): na repetição, o orçamento aprendido a encerra antes
+    never_stable = ScriptedPage(settle_at=60)
+    start = time.monotonic()
+    result = detector.wait_until_ready(never_stable, "https://acme.com.br/")
+    assert result.reason == "timeout" and time.monotonic() - start < 0.5
+
+    reloaded = DomainWaitStats(str(tmp_path / "waits.json"))
+    assert reloaded.learned_ms("https://acme.com.br/") is not None
+    assert set(json.loads((tmp_path / "waits.json").read_text())) == {"acme.com.br"}
+
+
+def test_stats_are_written_on_an_interval_and_capped(tmp_path):
+    path = tmp_path / "waits.json"
+    stats = DomainWaitStats(str(path), max_domains=2, persist_interval_seconds=60)
+    stats.record("https://acme.com.br/", 100)
+    stats.record("https://beta.com.br/", 200)
+    stats.record("https://gama.com.br/", 300)
+    # Só a primeira gravação foi ao disco; as demais esperam o intervalo ou o flush
+    assert json.loads(path.read_text()) == {"acme.com.br": 100}
+    stats.flush()
+    assert json.loads(path.read_text()) == {"beta.com.br": 200, "gama.com.br": 300}
+    assert stats.learned_ms("https://acme.com.br/") is None
+
+
+def test_async_wait_and_unlearned_scroll_waits(tmp_path):
+    class AsyncPage(ScriptedPage):
+        async def evaluate(self, script):
+            return ScriptedPage.evaluate(self, script)
+
+    detector = make_detector(tmp_path)
+    result = asyncio.run(detector.wait_until_ready_async(AsyncPage(settle_at=0.05), "https://acme.com.br/", learn=False))
+    assert result.ready
+    assert detector.stats.learned_ms("https://acme.com.br/") is None
@@ -0,0 +1,135 @@
+"""
+Unit tests for the PipelineOrchestrator relevance pre-ranking stage
+"""
+
+import asyncio
+from unittest.mock import patch
+
+import numpy
+import pytest
+
+import pipeline_orchestrator
+from core_logic.context_profile_cache import ContextProfileCache
+from pipeline_orchestrator import PipelineOrchestrator
+from event_models import LeadGeneratedEvent
+
+
+class FakeEmbeddingModel:
+    """Maps texts to fixed directions by keyword so similarities are predictable"""
+
+    DIRECTIONS = {
+        "crm": [1.0, 0.0, 0.0],
+        "vendas": [0.9, 0.1, 0.0],
+        "notícia": [0.0, 1.0, 0.0],
+        "vagas": [0.0, 0.0, 1.0],
+    }
+
+    def encode(self, texts, show_progress_bar=False):
+        rows = []
+        for text in texts:
+            lowered = text.lower()
+            vector = next((v for k, v in self.DIRECTIONS.items() if k in lowered), [0.3, 0.3, 0.3])
+            rows.append(vector)
+        return numpy.array(rows, dtype="float32")
+
+
+@pytest.fixture
+def orchestrator():
+    instance = object.__new__(PipelineOrchestrator)
+    instance.job_id = "job-1"
+    instance.embedding_model = FakeEmbeddingModel()
+    instance.job_vector_stores = {}
+    asyncio.run(instance._setup_rag_for_job("job-1", "Plataforma de CRM\n\nAutomação de vendas B2B"))
+    return instance
+
+
+LEADS = [
+    {"company_name": "Portal de Notícia", "description": "notícia sobre o mercado"},
+    {"company_name": "Acme CRM", "description": "Software de CRM para PMEs"},
+    {"company_name": "Banco de Vagas", "description": "vagas de emprego"},
+    {"company_name": "Loja Vendas", "description": "Consultoria de vendas"},
+]
+
+
+def test_scores_use_job_rag_index(orchestrator):
+    scores = asyncio.run(orchestrator._score_leads_relevance("job-1", LEADS))
+    assert scores[1] == pytest.approx(1.0, abs=1e-3)
+    assert scores[3] == pytest.approx(0.9939, abs=1e-3)
+    assert scores[0] == pytest.approx(0.0, abs=1e-3) and scores[2] == pytest.approx(0.0, abs=1e-3)
+
+
+def test_scores_are_none_without_vector_store(orchestrator):
+    assert asyncio.run(orchestrator._score_leads_relevance("other-job", LEADS)) == [None] * len(LEADS)
+
+
+def test_deprioritize_mode_orders_by_relevance_and_keeps_all(orchestrator):
+    scores = asyncio.run(orchestrator._score_leads_relevance("job-1", LEADS))
+    with patch.object(pipeline_orchestrator, "LEAD_RELEVANCE_THRESHOLD", 0.5), \
+         patch.object(pipeline_orchestrator, "LEAD_RELEVANCE_MODE", "deprioritize"):
+        ranked = orchestrator._rank_leads_by_relevance(LEADS, scores)
+    assert [lead["company_name"] for lead, _ in ranked][:2] == ["Acme CRM", "Loja Vendas"]
+    assert len(ranked) == len(LEADS)
+    assert [score for _, score in ranked] == sorted(scores, reverse=True)
+
+
+def test_drop_mode_removes_leads_below_threshold(orchestrator):
+    scores = asyncio.run(orchestrator._score_leads_relevance("job-1", LEADS))
+    with patch.object(pipeline_orchestrator, "LEAD_RELEVANCE_THRESHOLD", 0.5), \
+         patch.object(pipeline_orchestrator, "LEAD_RELEVANCE_MODE", "drop"):
+        ranked = orchestrator._rank_leads_by_relevance(LEADS, scores)
+    assert [lead["company_name"] for lead, _ in ranked] == ["Acme CRM", "Loja Vendas"]
+
+
+def test_missing_scores_keep_arrival_order(orchestrator):
+    ranked = orchestrator._rank_leads_by_relevance(LEADS, [None] * len(LEADS))
+    assert [lead for lead, _ in ranked] == LEADS
+
+
+def test_lead_generated_event_exposes_relevance():
+    event = LeadGeneratedEvent(
+        event_type="lead_generated", timestamp="t", job_id="j", user_id="u", lead_id="l",
+        lead_data={}, source_url="s", agent_name="a", relevance_score=0.83, relevance_rank=1
+    ).to_dict()
+    assert (event["relevance_score"], event["relevance_rank"]) == (0.83, 1)
+
+
+def run_pipeline(orchestrator, leads, max_leads=10):
+    async def search_leads(query, max_leads, query_variants=None):
+        for lead in leads:
+            yield dict(lead)
+
+    async def enrich(lead_data, lead_id):
+        return []
+
+    async def query(business_context, user_input):
+        return "crm"
+
+    async def collect():
+        return [event async for event in orchestrator.execute_streaming_pipeline()]
+
+    orchestrator.user_id = "user-1"
+    orchestrator.business_context = {"max_leads_to_generate": max_leads}
+    with patch.object(orchestrator, "_generate_intelligent_search_query", query), \
+         patch.object(orchestrator, "_create_enriched_search_context", return_value={"context": "Plataforma de CRM"}), \
+         patch.object(orchestrator, "_serialize_enriched_context", return_value=None), \
+         patch.object(orchestrator, "_search_leads", search_leads), \
+         patch.object(orchestrator, "_enrich_lead_and_collect_events", enrich), \
+         patch.object(pipeline_orchestrator, "get_context_profile_cache", lambda: ContextProfileCache(path=None)):
+        events = asyncio.run(collect())
+    return [event for event in events if event["event_type"] == "lead_generated"]
+
+
+def test_streaming_pipeline_enriches_relevant_leads_on_arrival_and_defers_the_rest(orchestrator):
+    with patch.object(pipeline_orchestrator, "LEAD_RELEVANCE_THRESHOLD", 0.5), \
+         patch.object(pipeline_orchestrator, "LEAD_RELEVANCE_MODE", "deprioritize"):
+        events = run_pipeline(orchestrator, LEADS)
+    names = [event["lead_data"]["company_name"] for event in events]
+    assert names == ["Acme CRM", "Loja Vendas", "Portal de Notícia", "Banco de Vagas"]
+    assert [event["relevance_rank"] for event in events] == [1, 2, 3, 4]
+
+
+def test_streaming_pipeline_drop_mode_and_max_leads(orchestrator):
+    with patch.object(pipeline_orchestrator, "LEAD_RELEVANCE_THRESHOLD", 0.5), \
+         patch.object(pipeline_orchestrator, "LEAD_RELEVANCE_MODE", "drop"):
+        assert [e["lead_data"]["company_name"] for e in run_pipeline(orchestrator, LEADS)] == ["Acme CRM", "Loja Vendas"]
+        assert len(run_pipeline(orchestrator, LEADS, max_leads=1)) == 1
@@ -0,0 +1,114 @@
+"""
+Unit tests for the multi-query search fan-out
+"""
+
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pipeline_orchestrator
+from core_logic.query_fanout import build_query_variants, build_widening_query, fuse_search_results
+from pipeline_orchestrator import PipelineOrchestrator
+
+CONTEXT = {
+    "industry_focus": ["varejo", "atacado"],
+    "geographic_focus": ["Brasil", "São Paulo"],
+    "pain_points": ["gestão de estoque"],
+}
+
+
+def site(name, path=""):
+    return {"url": f"https://www.{name}.com.br/{path}", "title": name.capitalize(), "snippet": ""}
+
+
+def test_variants_start_with_the_primary_query_and_are_distinct():
+    variants = build_query_variants("CRM para varejo", CONTEXT, k=4)
+    assert variants == [
+        "CRM para varejo",
+        "empresas de varejo em São Paulo",
+        "empresas de varejo em expansão em São Paulo",
+        "varejo gestão de estoque em São Paulo",
+    ]
+    assert build_query_variants("empresas de varejo em são paulo", CONTEXT, k=2) == [
+        "empresas de varejo em são paulo",
+        "empresas de varejo em expansão em São Paulo",
+    ]
+    assert build_query_variants("crm", {}, k=3) == ["crm"]
+    assert build_query_variants("crm", CONTEXT, k=1) == ["crm"]
+
+
+def test_widening_rounds_reformulate_the_query():
+    assert [build_widening_query("CRM  para varejo", n) for n in (1, 2, 3, 4)] == [
+        "empresas de CRM para varejo", "CRM para varejo fornecedores", "CRM para varejo empresas no Brasil",
+        "empresas de CRM para varejo",
+    ]
+    assert build_widening_query("empresas de software", 1) == "empresas de software fornecedores"
+
+
+def test_fusion_merges_by_domain_and_ranks_by_cross_query_frequency():
+    fused = fuse_search_results([
+        [site("acme"), site("beta"), site("gama")],
+        [site("gama", "contato"), site("delta")],
+        [site("gama"), {"url": "", "title": "sem url"}],
+    ])
+    assert [result["domain"] for result in fused] == ["gama.com.br", "acme.com.br", "beta.com.br", "delta.com.br"]
+    gama = fused[0]
+    assert gama["query_hits"] == 3 and gama["url"] == "https://www.gama.com.br/"
+    assert gama["duplicate_urls"] == ["https://www.gama.com.br/contato"]
+
+
+class FakeSearch:
+    def __init__(self, results_by_query, slow_query=None):
+        self.results_by_query = results_by_query
+        self.slow_query = slow_query
+        self.release = threading.Event()
+
+    def __call__(self, query, max_results):
+        if query == self.slow_query:
+            self.release.wait(5)
+        return self.results_by_query[query]
+
+
+def test_fan_out_searches_concurrently_and_stops_early():
+    search = FakeSearch({
+        "a": [site("acme"), site("beta")],
+        "b": [site("beta"), site("gama")],
+        "lenta": [site("delta")],
+    }, slow_query="lenta")
+    orchestrator = object.__new__(PipelineOrchestrator)
+
+    async def run():
+        started = time.monotonic()
+        fused = await orchestrator._fan_out_search(["a", "b", "lenta"], max_leads=3)
+        elapsed = time.monotonic() - started
+        search.release.set()
+        return fused, elapsed
+
+    with patch.object(pipeline_orchestrator, "search_company_sites", search), \
+         patch.object(pipeline_orchestrator, "QUERY_FANOUT_OVERSAMPLE", 1.0):
+        fused, elapsed = asyncio.run(run())
+    assert elapsed < 2  # Não esperou a busca lenta
+    assert [result["domain"] for result in fused] == ["beta.com.br", "acme.com.br", "gama.com.br"]
+
+
+def test_search_leads_feeds_the_fused_results_to_the_source():
+    received = {}
+
+    async def source(query, max_leads, search_results=None):
+        received["search_results"] = search_results
+        yield {"company_name": "Acme"}
+
+    search = FakeSearch({"a": [site("acme")], "b": [site("acme"), site("beta")]})
+    orchestrator = object.__new__(PipelineOrchestrator)
+
+    async def run(variants):
+        return [lead async for lead in orchestrator._search_leads("a", 5, query_variants=variants)]
+
+    with patch.object(pipeline_orchestrator, "search_company_sites", search), \
+         patch.object(orchestrator, "_search_with_adk1_agent", source), \
+         patch.object(pipeline_orchestrator, "HARVESTER_MODE", "adk1"):
+        assert asyncio.run(run(["a", "b"])) == [{"company_name": "Acme"}]
+        assert [result["domain"] for result in received["search_results"]] == ["acme.com.br", "beta.com.br"]
+        asyncio.run(run(["a"]))
+        assert received["search_results"] is None
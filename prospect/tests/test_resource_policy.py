@@ -0,0 +1,119 @@
+"""
+Unit tests for the Playwright resource policy
+"""
+
+import pytest
+
+from core_logic.resource_policy import ResourcePolicy, attach_resource_policy, detach_resource_policy
+
+
+@pytest.mark.parametrize("resource_type, url, reason", [
+    ("image", "https://acme.com.br/logo.png", "type:image"),
+    ("font", "https://fonts.gstatic.com/s/roboto.woff2", "type:font"),
+    ("script", "https://www.googletagmanager.com/gtm.js", "tracker"),
+    ("xhr", "https://region1.google-analytics.com/g/collect", "tracker"),
+    ("script", "https://acme.com.br/app.js", None),
+    ("stylesheet", "https://acme.com.br/site.css", None),
+    ("document", "https://www.googletagmanager.com/ns.html", None),
+])
+def test_block_reasons(resource_type, url, reason):
+    assert ResourcePolicy().block_reason(resource_type, url) == reason
+
+
+def test_relaxed_policy_only_blocks_trackers():
+    policy = ResourcePolicy()
+    assert policy.block_reason("image", "https://acme.com.br/logo.png", relaxed=True) is None
+    assert policy.block_reason("script", "https://connect.facebook.net/pixel.js", relaxed=True) == "tracker"
+    assert policy.allows_everything_on("https://www.instagram.com/acme/")
+
+
+class FakeRequest:
+    def __init__(self, resource_type, url, body_size=1000):
+        self.resource_type = resource_type
+        self.url = url
+        self.body_size = body_size
+
+    def sizes(self):
+        return {"responseBodySize": self.body_size, "responseHeadersSize": 100}
+
+
+class FakeRoute:
+    def __init__(self, request):
+        self.request = request
+        self.outcome = None
+
+    def abort(self):
+        self.outcome = "aborted"
+
+    def continue_(self):
+        self.outcome = "continued"
+
+
+class FakePage:
+    def __init__(self):
+        self.routes = {}
+        self.listeners = {}
+
+    def on(self, event, handler):
+        self.listeners[event] = handler
+
+    def remove_listener(self, event, handler):
+        assert self.listeners.pop(event) is handler
+
+    def route(self, pattern, handler):
+        self.routes[pattern] = handler
+
+    def unroute(self, pattern, handler):
+        assert self.routes.pop(pattern) is handler
+
+    def load(self, requests):
+        outcomes = []
+        for request in requests:
+            route = FakeRoute(request)
+            if self.routes:
+                self.routes["**/*"](route)
+            else:
+                route.continue_()
+            if route.outcome == "continued":
+                self.listeners["requestfinished"](request)
+            outcomes.append(route.outcome)
+        return outcomes
+
+
+PAGE_REQUESTS = [
+    FakeRequest("document", "https://acme.com.br/", 20000),
+    FakeRequest("script", "https://acme.com.br/app.js", 50000),
+    FakeRequest("image", "https://acme.com.br/hero.jpg", 800000),
+    FakeRequest("font", "https://acme.com.br/font.woff2", 60000),
+    FakeRequest("script", "https://www.google-analytics.com/analytics.js", 45000),
+]
+
+
+def test_traffic_is_measured_and_hooks_are_removed():
+    page = FakePage()
+    traffic = attach_resource_policy(page, "https://acme.com.br/")
+    assert page.load(PAGE_REQUESTS) == ["continued", "continued", "aborted", "aborted", "aborted"]
+    summary = traffic.summary()
+    assert summary["bytes_received"] == 70200 and summary["blocked_requests"] == 3
+    assert summary["blocked"] == {"type:image": 1, "type:font": 1, "tracker": 1}
+    assert traffic.blocked_images
+    detach_resource_policy(traffic)
+    assert page.routes == {} and page.listeners == {}
+
+
+def test_relax_lets_images_through_for_the_image_fallback():
+    page = FakePage()
+    traffic = attach_resource_policy(page, "https://acme.com.br/")
+    traffic.relax()
+    assert page.load(PAGE_REQUESTS)[2:] == ["continued", "continued", "aborted"]
+
+
+def test_disabled_or_allowlisted_pages_are_only_measured():
+    page = FakePage()
+    traffic = attach_resource_policy(page, "https://acme.com.br/", enabled=False)
+    assert page.routes == {}
+    page.load(PAGE_REQUESTS)
+    assert traffic.blocked_requests == 0 and traffic.bytes_received == 975500
+    page = FakePage()
+    attach_resource_policy(page, "https://br.linkedin.com/company/acme")
+    assert page.routes == {}
@@ -0,0 +1,70 @@
+"""
+Unit tests for the screenshot pipeline and the vision response cache
+"""
+
+import io
+import json
+
+import pytest
+
+from core_logic.screenshot_pipeline import VisionCache, hash_distance, prepare_screenshot, select_tiles
+
+PIL = pytest.importorskip("PIL")
+from PIL import Image, ImageDraw  # noqa: E402
+
+PROMPT = "Analise a imagem desta página web."
+
+
+def landing_page_png(height=4000, banner="Acme", shift=0):
+    image = Image.new("RGB", (1280, height), "white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 1280, 120), fill="navy")
+    draw.text((40 + shift, 40), banner, fill="white")
+    for top in range(300, height - 300, 200):
+        draw.rectangle((100 + shift, top, 1180, top + 120), fill=(200, (top // 10) % 255, 120))
+    draw.rectangle((0, height - 200, 1280, height), fill="black")
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_tiles_keep_top_of_page_and_footer():
+    assert select_tiles(1500, viewport_height=900, max_tiles=3) == [0, 900]
+    assert select_tiles(9000, viewport_height=900, max_tiles=3) == [0, 900, 8100]
+
+
+def test_screenshot_is_cropped_downscaled_and_compact():
+    png = landing_page_png()
+    prepared = prepare_screenshot(png, viewport_height=900, max_tiles=3, max_width=768)
+    assert prepared.mime_type in ("image/webp", "image/jpeg")
+    assert (prepared.width, prepared.height) == (768, 1620)
+    assert len(prepared.data) < len(png) / 2
+    assert prepared.image_hash.startswith("dhash:")
+
+
+def test_near_identical_screenshots_reuse_the_analysis(tmp_path):
+    cache = VisionCache(str(tmp_path / "vision.json"))
+    first = prepare_screenshot(landing_page_png())
+    cache.store("https://www.acme.com.br/", first.image_hash, PROMPT, "Site institucional da Acme.")
+
+    # Mesmo layout com pequenas diferenças de renderização
+    again = prepare_screenshot(landing_page_png(shift=2))
+    assert hash_distance(first.image_hash, again.image_hash) <= cache.max_distance
+    assert cache.lookup("https://acme.com.br/", again.image_hash, PROMPT) == "Site institucional da Acme."
+
+    reloaded = VisionCache(str(tmp_path / "vision.json"))
+    assert reloaded.lookup("https://acme.com.br/", again.image_hash, PROMPT) == "Site institucional da Acme."
+    assert reloaded.lookup("https://beta.com.br/", again.image_hash, PROMPT) is None
+    assert reloaded.lookup("https://acme.com.br/", again.image_hash, "Outro prompt") is None
+    assert list(json.loads((tmp_path / "vision.json").read_text())) == ["acme.com.br"]
+
+
+def test_different_pages_and_expired_entries_are_not_reused():
+    cache = VisionCache(None, ttl_hours=1)
+    first = prepare_screenshot(landing_page_png())
+    cache.store("https://acme.com.br/", first.image_hash, PROMPT, "Site da Acme.")
+    other = prepare_screenshot(landing_page_png(height=1800, banner="Em manutenção"))
+    assert cache.lookup("https://acme.com.br/", other.image_hash, PROMPT) is None
+
+    cache.ttl_seconds = 0
+    assert cache.lookup("https://acme.com.br/", first.image_hash, PROMPT) is None
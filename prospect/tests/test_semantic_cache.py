@@ -0,0 +1,152 @@
+"""
+Unit tests for the semantic LLM cache and its BaseAgent integration
+"""
+
+import asyncio
+import hashlib
+from typing import Optional
+from unittest.mock import MagicMock
+
+import numpy
+import pytest
+from pydantic import BaseModel
+
+from agents.base_agent import BaseAgent
+from core_logic.semantic_cache import SemanticLLMCache, is_semantic_cache_enabled, normalize_agent_input
+
+
+def hashed_bag_of_words(texts):
+    """Deterministic stand-in for MiniLM: normalized hashed bag of words"""
+    vectors = numpy.zeros((len(texts), 64), dtype="float32")
+    for row, text in enumerate(texts):
+        for token in text.split():
+            vectors[row, int(hashlib.md5(token.encode()).hexdigest(), 16) % 64] += 1.0
+    norms = numpy.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / numpy.maximum(norms, 1e-12)
+
+
+class CompanyInput(BaseModel):
+    company_name: str
+    description: str
+
+
+class CompanySummary(BaseModel):
+    summary: str
+    error_message: Optional[str] = None
+
+
+class SummaryAgent(BaseAgent[CompanyInput, CompanySummary]):
+    def __init__(self, cache, product_service_context="CRM", **kwargs):
+        super().__init__(name="SummaryAgent", description="test agent", llm_client=MagicMock(), **kwargs)
+        self.semantic_cache = cache
+        self.product_service_context = product_service_context
+        self.calls = 0
+
+    def process(self, input_data: CompanyInput) -> CompanySummary:
+        self.calls += 1
+        return CompanySummary(summary=f"summary of {input_data.description}")
+
+
+BRANCH_A = CompanyInput(company_name="Franquia Centro", description="Rede de academias com unidades em São Paulo, tel 11 9999-1234")
+BRANCH_B = CompanyInput(company_name="Franquia Centro", description="Rede de academias com unidades em São Paulo, tel 11 8888-4321")
+OTHER = CompanyInput(company_name="Software House", description="Consultoria de ERP para indústria têxtil")
+
+
+@pytest.fixture
+def cache():
+    return SemanticLLMCache(default_threshold=0.95, thresholds={}, audit_rate=0.0, encoder=hashed_bag_of_words)
+
+
+def test_normalization_collapses_digits_urls_and_case():
+    assert normalize_agent_input(BRANCH_A) == normalize_agent_input(BRANCH_B)
+    assert normalize_agent_input("Visit HTTPS://www.Example.com  now") == "visit example.com now"
+
+
+def test_near_duplicate_input_reuses_cached_output(cache):
+    agent = SummaryAgent(cache)
+    first = agent.execute(BRANCH_A)
+    second = agent.execute(BRANCH_B)
+    third = agent.execute(OTHER)
+
+    assert agent.calls == 2
+    assert second == first
+    assert second is not first
+    assert third.summary.startswith("summary of Consultoria")
+    stats = cache.get_stats("SummaryAgent")
+    assert (stats["lookups"], stats["hits"], stats["misses"], stats["entries"]) == (3, 1, 2, 2)
+    assert stats["hit_rate"] == pytest.approx(1 / 3)
+    assert agent.get_metrics_summary()["semantic_cache"]["hits"] == 1
+
+
+def test_async_execution_uses_cache(cache):
+    agent = SummaryAgent(cache)
+
+    async def run():
+        await agent.execute_async(BRANCH_A)
+        return await agent.execute_async(BRANCH_B)
+
+    assert asyncio.run(run()).summary == f"summary of {BRANCH_A.description}"
+    assert agent.calls == 1
+
+
+def test_agents_with_different_context_do_not_share_entries(cache):
+    crm_agent = SummaryAgent(cache, product_service_context="CRM para varejo")
+    erp_agent = SummaryAgent(cache, product_service_context="ERP para indústria")
+    crm_agent.execute(BRANCH_A)
+    erp_agent.execute(BRANCH_B)
+    assert (crm_agent.calls, erp_agent.calls) == (1, 1)
+
+    # Outra instância com o mesmo contexto reaproveita a saída
+    same_context = SummaryAgent(cache, product_service_context="CRM para varejo")
+    same_context.execute(BRANCH_B)
+    assert same_context.calls == 0
+    assert cache.get_stats("SummaryAgent")["entries"] == 2
+
+
+def test_per_agent_threshold_overrides_default(cache):
+    cache.thresholds["SummaryAgent"] = 1.01
+    agent = SummaryAgent(cache)
+    agent.execute(BRANCH_A)
+    agent.execute(BRANCH_B)
+    assert agent.calls == 2
+
+
+def test_error_outputs_are_not_cached(cache):
+    agent = SummaryAgent(cache)
+    agent.process = lambda data: CompanySummary(summary="", error_message="LLM failed")
+    agent.execute(BRANCH_A)
+    assert cache.get_stats("SummaryAgent")["entries"] == 0
+
+
+def test_audited_hits_are_recomputed_and_false_hits_reported(cache):
+    cache.audit_rate = 1.0
+    agent = SummaryAgent(cache)
+    agent.execute(CompanyInput(company_name="Franquia Centro", description="Rede de academias"))
+    agent.process = lambda data: CompanySummary(summary="completely different output for an unrelated company")
+    fresh = agent.execute(CompanyInput(company_name="Franquia Centro", description="Rede de academias"))
+
+    assert fresh.summary.startswith("completely different")
+    stats = cache.get_stats("SummaryAgent")
+    assert (stats["audits"], stats["false_hits"]) == (1, 1)
+    audit = cache.get_audit_log("SummaryAgent")[0]
+    assert audit["false_hit"] is True
+    assert audit["input_similarity"] == pytest.approx(1.0)
+
+
+def test_eviction_keeps_index_bounded(cache):
+    cache.max_entries_per_agent = 4
+    agent = SummaryAgent(cache)
+    for i in range(10):
+        agent.execute(CompanyInput(company_name=f"empresa{'x' * i}", description=f"setor {'y' * i} distinto"))
+    assert cache.get_stats("SummaryAgent")["entries"] <= 4
+
+
+def test_enabled_by_config_or_env(monkeypatch):
+    agent = MagicMock(config={"semantic_cache": True})
+    agent.name = "Any"
+    assert is_semantic_cache_enabled(agent)
+    agent.config = {}
+    monkeypatch.setattr("core_logic.semantic_cache.SEMANTIC_CACHE_AGENTS", "Other, Any")
+    assert is_semantic_cache_enabled(agent)
+    monkeypatch.setattr("core_logic.semantic_cache.SEMANTIC_CACHE_AGENTS", "")
+    assert not is_semantic_cache_enabled(agent)
@@ -0,0 +1,107 @@
+"""
+Unit tests for Google SERP session reuse, result cache and prefetch
+"""
+
+import json
+
+from core_logic.fetch_cache import KIND_SERP, FetchCache
+from core_logic.serp_session import SerpCache, SerpPrefetcher, google_serp_url, load_storage_state, save_storage_state
+
+PAGE_RESULTS = [
+    {"url": "https://acme.com.br/", "title": "Acme", "snippet": "Sistemas para o varejo"},
+    {"url": "https://beta.com.br/", "title": "Beta", "snippet": "CRM para PMEs"},
+]
+
+
+def test_serp_urls_are_stable_cache_keys():
+    assert google_serp_url("crm varejo", 1) == "https://www.google.com/search?q=crm+varejo"
+    assert google_serp_url("crm varejo", 3) == "https://www.google.com/search?q=crm+varejo&start=20"
+
+
+def test_pages_are_cached_with_their_own_ttl(tmp_path):
+    fetch_cache = FetchCache(path=str(tmp_path / "fetch_cache.sqlite3"), default_ttl_seconds=3600)
+    serp_cache = SerpCache(fetch_cache, ttl_seconds=600)
+    assert serp_cache.get("crm varejo", 1) is None
+    serp_cache.put("crm varejo", 1, PAGE_RESULTS)
+    serp_cache.put("crm varejo", 2, [])  # Fim dos resultados
+    assert serp_cache.get("crm varejo", 1) == PAGE_RESULTS
+    assert serp_cache.get("crm varejo", 2) == []
+    assert serp_cache.get("crm atacado", 1) is None
+
+    entry = fetch_cache.get(google_serp_url("crm varejo", 1), kind=KIND_SERP)
+    assert 590 < entry.expires_at - entry.fetched_at <= 600
+
+    SerpCache(fetch_cache, ttl_seconds=0).put("crm varejo", 1, PAGE_RESULTS)
+    assert serp_cache.get("crm varejo", 1) is None
+    fetch_cache.close()
+
+
+class FakeLocator:
+    def __init__(self, href):
+        self.href = href
+
+    @property
+    def first(self):
+        return self
+
+    def get_attribute(self, name, timeout=None):
+        return self.href
+
+
+class FakePage:
+    def __init__(self, url="https://www.google.com/search?q=crm", next_href=None):
+        self.url = url
+        self.next_href = next_href
+        self.navigations = []
+        self.closed = False
+
+    def locator(self, selector):
+        return FakeLocator(self.next_href)
+
+    def goto(self, url, wait_until=None, timeout=None):
+        self.navigations.append((url, wait_until))
+
+    def close(self):
+        self.closed = True
+
+
+class FakeContext:
+    def __init__(self):
+        self.pages = []
+        self.cookies = [{"name": "SOCS", "value": "consent", "domain": ".google.com"}]
+
+    def new_page(self):
+        self.pages.append(FakePage())
+        return self.pages[-1]
+
+    def storage_state(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"cookies": self.cookies, "origins": []}, f)
+
+
+def test_prefetch_loads_next_page_in_a_second_tab():
+    context = FakeContext()
+    prefetcher = SerpPrefetcher(context)
+    assert not prefetcher.start_from(FakePage())  # Última página: sem link "Próxima"
+
+    current = FakePage(next_href="/search?q=crm&start=10")
+    assert prefetcher.start_from(current)
+    assert not prefetcher.start_from(current)  # Uma pré-carga por vez (novas tentativas da mesma página)
+    prefetched = prefetcher.take()
+    assert prefetched.navigations == [("https://www.google.com/search?q=crm&start=10", "commit")]
+    assert prefetcher.take() is None
+
+    prefetcher.start_from(current)
+    prefetcher.cancel()
+    assert context.pages[-1].closed
+
+
+def test_storage_state_round_trip(tmp_path):
+    path = str(tmp_path / "state" / "google.json")
+    assert load_storage_state(path) is None
+    assert save_storage_state(FakeContext(), path)
+    assert load_storage_state(path) == path
+    assert json.loads(open(path, encoding="utf-8").read())["cookies"][0]["name"] == "SOCS"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{corrompido")
+    assert load_storage_state(path) is None
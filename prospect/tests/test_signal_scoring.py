@@ -0,0 +1,126 @@
+"""
+Unit tests for the compiled signal scoring engine
+"""
+
+import random
+import re
+
+import numpy
+import pytest
+
+from core_logic.signal_scoring import (
+    BUYING_INTENT_KEYWORDS,
+    URGENCY_KEYWORDS,
+    KeywordSet,
+    SignalScorer,
+    get_keyword_set,
+    pain_keyword_set,
+)
+from ai_prospect_intelligence import AdvancedProspectProfiler, BuyingSignalPredictor, ProspectIntentScorer
+
+
+CONTEXT = {
+    "lead_qualification_criteria": {
+        "problems_we_solve": ["qualificação manual de leads", "baixa conversão em vendas"]
+    }
+}
+
+
+def reference_scores(text, enriched_context):
+    """Original substring-scan heuristics, kept here as the behavioural reference"""
+    intent = round(min(sum(1 for k in BUYING_INTENT_KEYWORDS if k in text) / 3.0, 1.0), 3)
+    urgency = round(min(sum(1 for k in URGENCY_KEYWORDS if k in text) / 2.0, 1.0), 3)
+    problems = enriched_context.get("lead_qualification_criteria", {}).get("problems_we_solve", [])
+    pain_keywords = set()
+    for problem in problems:
+        pain_keywords.update(re.findall(r"\b\w+\b", str(problem).lower()))
+    if pain_keywords:
+        alignment = round(min(sum(1 for k in pain_keywords if k in text) / len(pain_keywords), 1.0), 3)
+    else:
+        alignment = 0.5
+    overall = round(intent * 0.4 + alignment * 0.4 + urgency * 0.2, 3)
+    return intent, alignment, urgency, overall
+
+
+def random_texts(count, seed=7):
+    rng = random.Random(seed)
+    vocabulary = list(BUYING_INTENT_KEYWORDS + URGENCY_KEYWORDS) + [
+        "de", "leads", "vendas", "conversão", "empresa", "needed", "requirements", "prioritys", "a", "xyz",
+    ]
+    return [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(0, 12))) for _ in range(count)]
+
+
+def test_keyword_set_matches_overlapping_and_nested_keywords():
+    keywords = KeywordSet(["need", "needs", "looking for", "for"])
+    assert keywords.matches("she needs it, looking for more") == {"need", "needs", "looking for", "for"}
+    assert keywords.matches("") == frozenset()
+    assert KeywordSet([]).matches("anything") == frozenset()
+
+
+def test_keyword_set_escapes_regex_metacharacters():
+    keywords = KeywordSet(["c++", "a.b"])
+    assert keywords.matches("we use c++") == {"c++"}
+    assert keywords.matches("axb") == frozenset()
+
+
+def test_keyword_sets_are_cached():
+    assert get_keyword_set(["b", "a"]) is get_keyword_set(["a", "b", "a"])
+    assert pain_keyword_set(CONTEXT) is pain_keyword_set(CONTEXT)
+
+
+@pytest.mark.parametrize("context", [CONTEXT, {}])
+def test_scalar_scores_match_substring_reference(context):
+    scorer = SignalScorer()
+    for text in random_texts(300):
+        scores = scorer.score_text(text, context)
+        assert (scores.buying_intent, scores.pain_alignment, scores.urgency, scores.overall) == \
+            reference_scores(text, context)
+
+
+def test_batch_scores_match_scalar_scores():
+    scorer = SignalScorer()
+    texts = random_texts(500, seed=11)
+    batch = scorer.score_batch(texts, CONTEXT)
+
+    assert isinstance(batch.overall, numpy.ndarray)
+    assert len(batch) == len(texts)
+    for index, text in enumerate(texts):
+        assert batch.row(index) == scorer.score_text(text, CONTEXT)
+
+
+def test_batch_ranking_is_descending_and_stable():
+    scorer = SignalScorer()
+    batch = scorer.score_batch(["nothing here", "urgent hiring asap", "nothing either", "hiring"])
+    assert list(batch.ranking()) == [1, 3, 0, 2]
+
+
+def test_profiler_pre_rank_orders_leads_by_overall_score():
+    profiler = object.__new__(AdvancedProspectProfiler)
+    leads = [
+        {"company_name": "Quieta"},
+        {"company_name": "Urgente", "description": "Urgent: hiring and expanding, need a new solution asap"},
+        {"company_name": "Media", "description": "seeking vendas partners"},
+    ]
+    ranked = profiler.pre_rank_leads(leads, CONTEXT)
+    assert [lead["company_name"] for lead, _ in ranked] == ["Urgente", "Media", "Quieta"]
+    assert ranked[0][1] == profiler.score_leads_batch(leads, CONTEXT).overall.max()
+
+
+def test_buying_signal_predictor_rules():
+    signals = BuyingSignalPredictor().predict_buying_signals(
+        {"description": "Job opening for engineers", "news": "Launching a new platform", "employees": 50}
+    )
+    assert signals == {"detected_signals": [
+        {"signal_type": "Hiring/Growth", "confidence": 0.8},
+        {"signal_type": "Technology Shift", "confidence": 0.7},
+    ]}
+    assert BuyingSignalPredictor().predict_buying_signals({"description": "nada"}) == {"detected_signals": []}
+
+
+def test_prospect_intent_scorer_stages():
+    scorer = ProspectIntentScorer()
+    assert scorer.calculate_intent_score({"a": "Evaluating vendors", "b": "Contact Sales"}) == \
+        {"intent_score": 0.9, "intent_stage": "decision"}
+    assert scorer.calculate_intent_score({"a": "considering options"}) == \
+        {"intent_score": 0.6, "intent_stage": "consideration"}
+    assert scorer.calculate_intent_score({}) == {"intent_score": 0.0, "intent_stage": "awareness"}
@@ -0,0 +1,108 @@
+"""
+Unit tests for the shared Tavily client, run against the local stand-in server
+"""
+
+import threading
+import time
+
+import pytest
+
+from core_logic.tavily_client import (
+    LocalTavilyServer,
+    TavilyResultCache,
+    TavilySearchClient,
+    TavilySearchError,
+)
+
+
+@pytest.fixture
+def server():
+    with LocalTavilyServer(fixtures={"crm varejo": [{"title": "Acme", "url": "https://acme.com.br/", "content": "CRM"}]}) as stand_in:
+        yield stand_in
+
+
+@pytest.fixture
+def make_client(server, tmp_path):
+    clients = []
+
+    def factory(cache=None, **kwargs):
+        kwargs.setdefault("min_interval_seconds", 0.0)
+        client = TavilySearchClient(api_key="local", base_url=server.url, cache=cache, **kwargs)
+        clients.append(client)
+        return client
+
+    yield factory
+    for client in clients:
+        client.close()
+
+
+def test_search_returns_fixture_results(server, make_client):
+    client = make_client()
+    assert client.search_results("CRM varejo") == [{"title": "Acme", "url": "https://acme.com.br/", "content": "CRM"}]
+    assert len(client.search_results("outra busca", max_results=3)) == 3
+    assert server.requests[0]["api_key"] == "local"
+
+
+def test_exclude_domains_is_sent_and_keys_the_cache(server, make_client, tmp_path):
+    client = make_client(cache=TavilyResultCache(path=str(tmp_path / "tavily.sqlite3"), ttl_seconds=60))
+    assert client.search_results("CRM varejo", exclude_domains=["acme.com.br"]) == []
+    assert server.requests[-1]["exclude_domains"] == ["acme.com.br"]
+    assert len(client.search_results("CRM varejo")) == 1
+    assert len(server.requests) == 2
+
+
+def test_missing_api_key_and_http_errors(server):
+    client = TavilySearchClient(api_key=None, base_url=server.url)
+    client.api_key = None
+    with pytest.raises(ValueError):
+        client.search("crm")
+    client.api_key = "local"
+    client.base_url = f"{server.url}/missing"
+    with pytest.raises(TavilySearchError):
+        client.search("crm")
+    client.close()
+
+
+def test_cache_is_keyed_by_params_and_expires(server, make_client, tmp_path):
+    cache = TavilyResultCache(path=str(tmp_path / "tavily.sqlite3"), ttl_seconds=60)
+    client = make_client(cache=cache)
+    client.search("CRM varejo", max_results=5)
+    client.search("  crm   VAREJO ", max_results=5)
+    client.search("CRM varejo", max_results=2)
+    assert (len(server.requests), client.stats["cache_hits"]) == (2, 1)
+
+    cache.ttl_seconds = -1
+    client.search("novo termo")
+    client.search("novo termo")
+    assert len(server.requests) == 4
+    cache.close()
+
+
+def test_search_many_keeps_order_and_runs_concurrently(make_client):
+    active = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    def slow_results(query, max_results):
+        with lock:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        time.sleep(0.1)
+        with lock:
+            active["now"] -= 1
+        return [{"title": query, "url": f"https://{query}.com/", "content": ""}]
+
+    with LocalTavilyServer(results_factory=slow_results) as slow_server:
+        client = make_client(max_concurrency=4)
+        client.base_url = slow_server.url
+        queries = [f"q{i}" for i in range(4)]
+        responses = client.search_many(queries)
+    assert [response["results"][0]["title"] for response in responses] == queries
+    assert active["max"] > 1
+
+
+def test_search_many_reports_failures_per_query(make_client):
+    client = make_client()
+    client.base_url = client.base_url + "/missing"
+    responses = client.search_many(["a", "b"])
+    assert all(response["results"] == [] and "error" in response for response in responses)
+    assert client.stats["errors"] == 2
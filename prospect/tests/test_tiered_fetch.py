@@ -0,0 +1,99 @@
+"""
+Unit tests for static-first tiered fetching
+"""
+
+import json
+import time
+
+import pytest
+
+from core_logic.async_scraper import FetchResult
+from core_logic.tiered_fetch import TIER_RENDER, TierMemory, TieredFetcher, detect_js_shell
+
+ARTICLE = "<p>" + "A Acme Ltda distribui insumos industriais para todo o Brasil desde 1998. " * 10 + "</p>"
+SERVER_RENDERED = f"<html><head><title>Acme</title></head><body><main><h1>Acme</h1>{ARTICLE}</main></body></html>"
+SPA_SHELL = ('<html><head><title>Acme</title></head><body><div id="root"></div>'
+             '<script src="/static/js/main.8f3a.js"></script></body></html>')
+
+
+@pytest.mark.parametrize("html, reason", [
+    (SPA_SHELL, "empty_app_root"),
+    ('<html><body><noscript>You need to enable JavaScript to run this app.</noscript><div id="app">'
+     '<span>Carregando</span></div></body></html>', "noscript_warning"),
+    ("<html><body><script>" + "var a=1;" * 200 + "</script><p>Olá</p></body></html>", "script_heavy"),
+    ("<html><body><p>Em construção</p></body></html>", "too_short"),
+])
+def test_js_shell_reasons(html, reason):
+    assert detect_js_shell(html, "Acme", min_text_chars=300) == reason
+
+
+def test_long_text_is_never_a_shell():
+    assert detect_js_shell(SPA_SHELL, "x" * 400, min_text_chars=300) is None
+
+
+class FakeScraper:
+    def __init__(self, pages):
+        self.pages = pages
+        self.fetched = []
+
+    def fetch_sync(self, url):
+        self.fetched.append(url)
+        html = self.pages.get(url)
+        if html is None:
+            return FetchResult(url=url, error="HTTP 403")
+        return FetchResult(url=url, final_url=url, status_code=200, text=html, elapsed_seconds=0.1)
+
+
+def test_server_rendered_page_skips_the_browser(tmp_path):
+    fetcher = TieredFetcher(FakeScraper({"https://acme.com.br/": SERVER_RENDERED}), TierMemory(str(tmp_path / "tiers.json")))
+    attempt = fetcher.try_static("https://acme.com.br/")
+    assert attempt.escalation_reason is None and "insumos industriais" in attempt.text
+    assert json.loads((tmp_path / "tiers.json").read_text())["acme.com.br"]["tier"] == "static"
+
+
+def test_js_shell_escalates_and_domain_is_remembered(tmp_path):
+    scraper = FakeScraper({"https://beta.com.br/": SPA_SHELL})
+    fetcher = TieredFetcher(scraper, TierMemory(str(tmp_path / "tiers.json")))
+    assert fetcher.try_static("https://beta.com.br/").escalation_reason == "empty_app_root"
+    assert fetcher.try_static("https://erro.com.br/").escalation_reason == "http_error: HTTP 403"
+    fetcher.record_render("https://beta.com.br/", succeeded=True, reason="empty_app_root")
+    fetcher.record_render("https://erro.com.br/", succeeded=False, reason="http_error: HTTP 403")
+
+    # Nova execução: o domínio que precisou do navegador vai direto para ele, sem fetch HTTP
+    reloaded = TieredFetcher(scraper, TierMemory(str(tmp_path / "tiers.json")))
+    assert reloaded.memory.tier_for("https://www.beta.com.br/contato") == TIER_RENDER
+    assert reloaded.try_static("https://beta.com.br/sobre").escalation_reason == "domain_needs_render"
+    assert reloaded.memory.tier_for("https://erro.com.br/") is None
+    assert scraper.fetched == ["https://beta.com.br/", "https://erro.com.br/"]
+
+
+def test_social_media_always_renders():
+    scraper = FakeScraper({})
+    fetcher = TieredFetcher(scraper)
+    assert fetcher.try_static("https://www.instagram.com/acme/").escalation_reason == "render_only_domain"
+    assert scraper.fetched == [] and fetcher.stats["skipped_static"] == 1
+
+
+def test_only_js_shells_mark_a_domain_as_render_only(tmp_path):
+    fetcher = TieredFetcher(FakeScraper({}), TierMemory(str(tmp_path / "tiers.json")))
+    fetcher.record_render("https://erro.com.br/", succeeded=True, reason="http_error: HTTP 403")
+    fetcher.record_render("https://curto.com.br/", succeeded=True, reason="too_short")
+    fetcher.record_render("https://spa.com.br/", succeeded=True, reason="script_heavy")
+    assert fetcher.memory.tier_for("https://erro.com.br/") is None
+    assert fetcher.memory.tier_for("https://curto.com.br/") is None
+    assert fetcher.memory.tier_for("https://spa.com.br/") == TIER_RENDER
+
+
+def test_render_tier_expires_and_static_is_retried(tmp_path, monkeypatch):
+    path = str(tmp_path / "tiers.json")
+    scraper = FakeScraper({"https://beta.com.br/": SERVER_RENDERED})
+    fetcher = TieredFetcher(scraper, TierMemory(path, ttl_seconds=60))
+    fetcher.record_render("https://beta.com.br/", succeeded=True, reason="empty_app_root")
+    assert fetcher.try_static("https://beta.com.br/").escalation_reason == "domain_needs_render"
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    reloaded = TieredFetcher(scraper, TierMemory(path, ttl_seconds=60))
+    assert reloaded.memory.tier_for("https://beta.com.br/") is None
+    assert "insumos industriais" in reloaded.try_static("https://beta.com.br/").text
+    assert json.loads((tmp_path / "tiers.json").read_text())["beta.com.br"]["tier"] == "static"